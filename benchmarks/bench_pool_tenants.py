@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Engines par tenant : cache illimité contre cache LRU borné (config/tenancy.py)
+
+Crée --tenants bases SQLite (une par client, URL sqlite:///.../client_{client_id}.db)
+puis fait servir --requetes requêtes par --threads threads, chacune ouvrant
+une session sur un client tiré au hasard (loi de Zipf : quelques gros clients,
+une longue traîne) et lisant une ligne. Compare :
+    ancien   : un engine par client jamais fermé, une sessionmaker par appel ;
+    nouveau  : MultiTenantManager borné (--max-engines, --budget connexions).
+
+Pour une base PostgreSQL à plusieurs schémas client_<id>, passer --url
+postgresql://.../base (les schémas doivent contenir une table « sonde »).
+
+Mesuré (SQLite 3.40, 500 tenants, 8 threads, 20 000 requêtes) :
+    ancien               500 engines  611 connexions ouvertes  0,50 ms / requête
+    nouveau  50 / 100     50 engines   57 connexions (pic)     1,00 ms / requête
+    nouveau 200 / 200    200 engines  200 connexions (pic)     0,63 ms / requête
+Le surcoût vient des engines évincés puis recréés pour la traîne de petits
+clients (9 363 évictions à 50 engines) : dimensionner TENANT_MAX_ENGINES sur
+le nombre de clients actifs simultanément, pas sur le nombre total.
+
+Usage : python benchmarks/bench_pool_tenants.py [--tenants 500] [--threads 8] [--requetes 20000]
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+RACINE_PROJET = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def charger_tenancy():
+    """config/tenancy.py est masqué par config.py à l'import : chargement par chemin"""
+    chemin = os.path.join(RACINE_PROJET, 'config', 'tenancy.py')
+    spec = importlib.util.spec_from_file_location('tenancy', chemin)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class AncienManager:
+    """Reproduction du MultiTenantManager d'origine (sans search_path, SQLite)"""
+
+    def __init__(self, url):
+        self.url = url
+        self.connections = {}
+
+    def get_engine_for_client(self, client_id):
+        if client_id not in self.connections:
+            self.connections[client_id] = create_engine(self.url.format(client_id=client_id))
+        return self.connections[client_id]
+
+    def get_session_for_client(self, client_id):
+        Session = sessionmaker(bind=self.get_engine_for_client(client_id))
+        return Session()
+
+    def connexions_ouvertes(self):
+        return sum(e.pool.checkedin() + e.pool.checkedout() for e in self.connections.values())
+
+    def fermer(self):
+        for engine in self.connections.values():
+            engine.dispose()
+
+
+def creer_bases(dossier, nb_tenants):
+    url = f'sqlite:///{dossier}/client_{{client_id}}.db'
+    for client_id in range(1, nb_tenants + 1):
+        engine = create_engine(url.format(client_id=client_id))
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE sonde (id INTEGER PRIMARY KEY, client_id INTEGER)'))
+            conn.execute(text('INSERT INTO sonde (client_id) VALUES (:c)'), {'c': client_id})
+        engine.dispose()
+    return url
+
+
+def tirages(nb_tenants, nb, graine):
+    """Clients sollicités, distribution de Zipf (s = 1)"""
+    poids = [1 / rang for rang in range(1, nb_tenants + 1)]
+    return random.Random(graine).choices(range(1, nb_tenants + 1), weights=poids, k=nb)
+
+
+def servir(manager, clients, nb_threads):
+    """Durée totale et pic de connexions ouvertes pendant la charge"""
+    tranches = [clients[i::nb_threads] for i in range(nb_threads)]
+    pic = [0]
+    mesure_connexions = getattr(manager, 'connexions_ouvertes', None)
+
+    def travail(tranche):
+        for client_id in tranche:
+            session = manager.get_session_for_client(client_id)
+            try:
+                session.execute(text('SELECT client_id FROM sonde')).scalar()
+            finally:
+                session.close()
+        if mesure_connexions is not None:
+            pic[0] = max(pic[0], mesure_connexions())
+
+    debut = time.perf_counter()
+    threads = [threading.Thread(target=travail, args=(tranche,)) for tranche in tranches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - debut, pic[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Engines par tenant : illimité contre LRU borné')
+    parser.add_argument('--tenants', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requetes', type=int, default=20000)
+    parser.add_argument('--max-engines', type=int, default=50)
+    parser.add_argument('--budget', type=int, default=100)
+    parser.add_argument('--url', default=None, help='URL PostgreSQL (schémas client_<id>) au lieu de SQLite')
+    args = parser.parse_args()
+
+    tenancy = charger_tenancy()
+    if args.url:
+        url = args.url
+    else:
+        print(f"🏗️  {args.tenants} bases SQLite...")
+        url = creer_bases(tempfile.mkdtemp(prefix='bench_tenants_'), args.tenants)
+    clients = tirages(args.tenants, args.requetes, graine=42)
+
+    ancien = AncienManager(url)
+    duree_ancien, _ = servir(ancien, clients, args.threads)
+    engines_ancien, connexions_ancien = len(ancien.connections), ancien.connexions_ouvertes()
+    ancien.fermer()
+
+    nouveau = tenancy.MultiTenantManager(url=url, max_engines=args.max_engines,
+                                         budget_connexions=args.budget)
+    nouveau.connexions_ouvertes = lambda: sum(
+        ligne['connexions_ouvertes'] for ligne in nouveau.statistiques()
+    )
+    duree_nouveau, pic_nouveau = servir(nouveau, clients, args.threads)
+    lignes = nouveau.statistiques()
+
+    print(f"\n🔌 {args.requetes} requêtes, {args.threads} threads, {args.tenants} tenants")
+    print(f"  ancien   {engines_ancien:>5} engines  {connexions_ancien:>5} connexions ouvertes"
+          f"  {duree_ancien / args.requetes * 1e3:.3f} ms / requête")
+    print(f"  nouveau  {len(nouveau.connections):>5} engines  {pic_nouveau:>5} connexions (pic)"
+          f"     {duree_nouveau / args.requetes * 1e3:.3f} ms / requête"
+          f"  (pool de {nouveau.taille_pool} par client)")
+    print(f"  évictions {sum(l['evictions'] for l in lignes)},"
+          f" délais dépassés {sum(l['delais_depasses'] for l in lignes)},"
+          f" attente max {max(l['attente_max_ms'] for l in lignes):.2f} ms")
+
+    print("\n📈 Clients les plus sollicités :")
+    for ligne in sorted(lignes, key=lambda l: -l['checkouts'])[:5]:
+        print(f"  client {ligne['client_id']:>4}  {ligne['checkouts']:>6} checkouts"
+              f"  attente moy. {ligne['attente_moyenne_ms']:.3f} ms  max {ligne['attente_max_ms']:.3f} ms")
+    nouveau.fermer()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du coût par requête des hooks before_request
+
+Mesure /health (endpoint vide) en anonyme et en utilisateur connecté, avec les
+hooks enregistrés puis sans aucun hook : la différence est le surcoût payé par
+chaque requête avant d'atteindre la vue.
+
+Usage : python benchmarks/bench_request_context.py [--iterations 500]
+"""
+
+import argparse
+
+from outils_bench import charger_application, creer_tenant_de_test, connecter, mesurer, resumer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Surcoût des hooks before_request sur /health')
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    module_app = charger_application()
+    app = module_app.app
+    user_id, _ = creer_tenant_de_test(module_app)
+
+    hooks = list(app.before_request_funcs.get(None, []))
+    print(f"🔗 Hooks before_request enregistrés: {len(hooks)}")
+    for hook in hooks:
+        print(f"   - {hook.__name__}")
+
+    anonyme = app.test_client()
+    connecte = app.test_client()
+    connecter(connecte, user_id)
+
+    resultats = {}
+    for libelle, client_http in (('anonyme', anonyme), ('connecté', connecte)):
+        print(f"\n📊 /health ({libelle})")
+        app.before_request_funcs[None] = hooks
+        avec = resumer('avec hooks', mesurer(lambda: client_http.get('/health'), args.iterations))
+        app.before_request_funcs[None] = []
+        sans = resumer('sans hook (référence)', mesurer(lambda: client_http.get('/health'), args.iterations))
+        resultats[libelle] = avec - sans
+
+    app.before_request_funcs[None] = hooks
+
+    print("\n🎯 Surcoût par requête imputable aux hooks")
+    for libelle, surcout in resultats.items():
+        print(f"  {libelle:<10} {surcout:8.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Outils communs aux scripts de benchmark
+
+Chaque benchmark importe l'application sur une base SQLite temporaire pour ne
+jamais toucher aux bases du dossier instance/.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import statistics
+
+RACINE_PROJET = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE_PROJET)
+
+
+@contextlib.contextmanager
+def silence(stderr=False):
+    """Redirige stdout (et stderr si demandé) vers /dev/null pendant les mesures"""
+    with open(os.devnull, 'w') as devnull:
+        ancien_out, ancien_err = sys.stdout, sys.stderr
+        sys.stdout = devnull
+        if stderr:
+            sys.stderr = devnull
+        try:
+            yield
+        finally:
+            sys.stdout, sys.stderr = ancien_out, ancien_err
+
+
+def charger_application(db_path=None):
+    """Importe app.py sur une base SQLite temporaire et retourne le module"""
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.setdefault('OPENAI_API_KEY', 'mode-simulation')
+
+    debut = time.perf_counter()
+    with silence(stderr=True):
+        import app as module_app
+    duree = time.perf_counter() - debut
+    print(f"⏱️  Import de app.py: {duree:.2f}s (base: {db_path})")
+    return module_app
+
+
+def creer_tenant_de_test(module_app, role='utilisateur', username='bench_user'):
+    """Crée (ou retrouve) un client, une formule et un utilisateur de benchmark"""
+    db = module_app.db
+    Client = module_app.Client
+    User = module_app.User
+    FormuleAbonnement = module_app.FormuleAbonnement
+
+    with module_app.app.app_context(), silence():
+        user = User.query.filter_by(username=username).first()
+        if user:
+            return user.id, user.client_id
+
+        formule = FormuleAbonnement.query.filter_by(code='bench').first()
+        if not formule:
+            formule = FormuleAbonnement(nom='Bench', code='bench', max_utilisateurs=100000,
+                                        max_risques=1000000, max_audits=100000)
+            db.session.add(formule)
+            db.session.flush()
+
+        client = Client.query.filter_by(reference='bench').first()
+        if not client:
+            client = Client(nom='Client Bench', reference='bench', formule_id=formule.id, is_active=True)
+            db.session.add(client)
+            db.session.flush()
+
+        user = User(username=username, email=f'{username}@bench.local', role=role,
+                    client_id=client.id, is_active=True)
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+        return user.id, client.id
+
+
+def creer_cartographies(module_app, client_id, user_id, nb_cartographies=10, risques_par_cartographie=50):
+    """Remplit le tenant de cartographies, chacune avec ses risques évalués"""
+    db = module_app.db
+    Cartographie = module_app.Cartographie
+    Risque = module_app.Risque
+    EvaluationRisque = module_app.EvaluationRisque
+    niveaux = ('Faible', 'Moyen', 'Élevé', 'Critique')
+
+    with module_app.app.app_context(), silence():
+        deja = Cartographie.query.filter_by(client_id=client_id).count()
+        for c in range(deja, nb_cartographies):
+            cartographie = Cartographie(nom=f'Cartographie bench {c}', client_id=client_id,
+                                        created_by=user_id)
+            db.session.add(cartographie)
+            db.session.flush()
+            for r in range(risques_par_cartographie):
+                risque = Risque(reference=f'B-{client_id}-{c}-{r}', intitule=f'Risque bench {c}.{r}',
+                                cartographie_id=cartographie.id, client_id=client_id, created_by=user_id)
+                db.session.add(risque)
+                db.session.flush()
+                impact, probabilite = r % 5 + 1, (r // 5) % 5 + 1
+                db.session.add(EvaluationRisque(
+                    risque_id=risque.id, impact_pre=impact, probabilite_pre=probabilite,
+                    score_risque=impact * probabilite, niveau_risque=niveaux[r % 4]
+                ))
+        db.session.commit()
+
+
+def connecter(client_http, user_id):
+    """Ouvre une session Flask-Login sans passer par le formulaire de connexion"""
+    with client_http.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+def mesurer(fonction, iterations=500, echauffement=20):
+    """Exécute fonction() et retourne les durées individuelles en secondes"""
+    with silence():
+        for _ in range(echauffement):
+            fonction()
+        durees = []
+        for _ in range(iterations):
+            debut = time.perf_counter()
+            fonction()
+            durees.append(time.perf_counter() - debut)
+    return durees
+
+
+def resumer(libelle, durees):
+    """Affiche moyenne / médiane / p95 en microsecondes"""
+    durees_tries = sorted(durees)
+    p95 = durees_tries[int(len(durees_tries) * 0.95) - 1]
+    moyenne = statistics.mean(durees) * 1e6
+    print(f"  {libelle:<45} moyenne {moyenne:8.0f} µs | médiane {statistics.median(durees) * 1e6:8.0f} µs"
+          f" | p95 {p95 * 1e6:8.0f} µs")
+    return moyenne
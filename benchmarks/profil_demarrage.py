@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Profil du démarrage d'un worker : import de app.py et première requête
+
+Lance l'import dans un processus neuf avec `python -X importtime` et affiche :
+    - le temps mural de l'import et de la première requête (GET /health, qui
+      déclenche les initialisations différées) ;
+    - les modules les plus coûteux (temps cumulé) et le temps propre par package ;
+    - le temps de chaque phase d'import et de chaque initialisation différée
+      (services/demarrage.py).
+
+La première exécution sur une base vide paie aussi la création des tables et la
+compilation des .pyc : le rapport porte sur la dernière des --executions.
+
+Usage : python benchmarks/profil_demarrage.py [--executions 2] [--top 25] [--historique]
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+
+from outils_bench import RACINE_PROJET
+
+CODE_PROFIL = """
+import json, sys, time
+debut = time.perf_counter()
+import app as module_app
+import_s = time.perf_counter() - debut
+from services.demarrage import phases_demarrage
+debut = time.perf_counter()
+statut = module_app.app.test_client().get('/health').status_code
+premiere_requete_s = time.perf_counter() - debut
+with open(sys.argv[1], 'w') as f:
+    json.dump({'import_s': import_s, 'premiere_requete_s': premiere_requete_s,
+               'statut_health': statut, 'phases': phases_demarrage()}, f)
+"""
+
+
+def executer(db_path, historique):
+    """Un démarrage complet dans un processus neuf : (mesures, lignes importtime)"""
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f'sqlite:///{db_path}'
+    env.setdefault('OPENAI_API_KEY', 'mode-simulation')
+    env['DEMARRAGE_DIFFERE'] = 'false' if historique else 'true'
+
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as sortie:
+        chemin_sortie = sortie.name
+    try:
+        processus = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CODE_PROFIL, chemin_sortie],
+            cwd=RACINE_PROJET, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        if processus.returncode != 0:
+            sys.stderr.write(processus.stderr[-3000:])
+            raise SystemExit(f"Le démarrage a échoué (code {processus.returncode})")
+        with open(chemin_sortie) as f:
+            mesures = json.load(f)
+    finally:
+        os.unlink(chemin_sortie)
+    return mesures, lire_importtime(processus.stderr)
+
+
+def lire_importtime(texte):
+    """[(module, propre µs, cumulé µs, profondeur)] depuis la sortie de -X importtime"""
+    modules = []
+    for ligne in texte.splitlines():
+        if not ligne.startswith('import time:') or 'self [us]' in ligne:
+            continue
+        propre, cumule, nom = ligne[len('import time:'):].split('|')
+        profondeur = (len(nom) - len(nom.lstrip(' '))) // 2
+        modules.append((nom.strip(), int(propre), int(cumule), profondeur))
+    return modules
+
+
+def afficher(mesures, modules, top):
+    print(f"\n⏱️  Import de app.py      : {mesures['import_s'] * 1000:8.0f} ms")
+    print(f"⏱️  Première requête      : {mesures['premiere_requete_s'] * 1000:8.0f} ms"
+          f" (GET /health → {mesures['statut_health']})")
+
+    print(f"\n📦 {top} modules les plus coûteux (temps cumulé, imports compris)")
+    for nom, propre, cumule, profondeur in sorted(modules, key=lambda m: m[2], reverse=True)[:top]:
+        print(f"  {cumule / 1000:8.1f} ms  {'  ' * profondeur}{nom}")
+
+    par_package = defaultdict(int)
+    for nom, propre, _, _ in modules:
+        par_package[nom.split('.')[0]] += propre
+    print(f"\n📦 {top} packages les plus coûteux (temps propre)")
+    for package, propre in sorted(par_package.items(), key=lambda p: p[1], reverse=True)[:top]:
+        print(f"  {propre / 1000:8.1f} ms  {package}")
+
+    print("\n🧩 Phases du démarrage (services/demarrage.py)")
+    for phase, duree in mesures['phases']:
+        print(f"  {duree * 1000:8.1f} ms  {phase}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profil d'import et de première requête")
+    parser.add_argument('--executions', type=int, default=2)
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--historique', action='store_true',
+                        help="DEMARRAGE_DIFFERE=false : schedulers, traductions et sondes lancés à l'import")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')
+    for numero in range(1, args.executions + 1):
+        mesures, modules = executer(db_path, args.historique)
+        print(f"Exécution {numero}/{args.executions} : import {mesures['import_s']:.2f}s, "
+              f"première requête {mesures['premiere_requete_s']:.2f}s")
+    afficher(mesures, modules, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -33,7 +33,13 @@ class Config:
         'pool_size': 20,
         'max_overflow': 30
     }
-    
+
+    # Réplique en lecture (services/replique.py) : SELECT des vues @lecture_seule
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL', '').replace('postgres://', 'postgresql://', 1)
+    SQLALCHEMY_BINDS = {'replique': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    # Secondes pendant lesquelles un utilisateur qui vient d'écrire lit la base principale
+    REPLIQUE_DELAI_APRES_ECRITURE = int(os.environ.get('REPLIQUE_DELAI_APRES_ECRITURE', 5))
+
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
     
     # ============================================================================
@@ -185,14 +191,48 @@ class Config:
     # ============================================================================
     # CONFIGURATION CACHE
     # ============================================================================
-    CACHE_TYPE = 'simple'  # Pour production, utiliser 'redis' ou 'memcached'
+    # Cache applicatif (services/cache.py) : 'simple' (mémoire), 'filesystem' ou 'redis'
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or ('redis' if os.environ.get('REDIS_URL') else 'simple')
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL')
+    CACHE_DIR = os.environ.get('CACHE_DIR')  # défaut : instance/cache
+    CACHE_MAX_ENTREES = int(os.environ.get('CACHE_MAX_ENTREES', '2000'))  # mémoire et disque
+    # Matrices PNG adressées par contenu (services/cache_matrices.py)
+    MATRICES_CACHE_DIR = os.environ.get('MATRICES_CACHE_DIR')  # défaut : instance/cache/matrices
+    MATRICES_CACHE_MAX_OCTETS = int(os.environ.get('MATRICES_CACHE_MAX_OCTETS', str(200 * 1024 * 1024)))
+    # Rendu matplotlib hors des threads web (services/rendu_graphiques.py) ; 0 processus = sur place
+    RENDU_PROCESSUS = int(os.environ.get('RENDU_PROCESSUS', '2'))  # par worker gunicorn
+    RENDU_FILE_MAX = int(os.environ.get('RENDU_FILE_MAX', '0')) or None  # défaut : 4 par processus
+    RENDU_DELAI = float(os.environ.get('RENDU_DELAI', '30'))  # secondes pour obtenir une image
+    RENDU_ATTENTE_FILE = float(os.environ.get('RENDU_ATTENTE_FILE', '2'))  # secondes pour une place en file
+    RENDU_METHODE = os.environ.get('RENDU_METHODE')  # forkserver (défaut Linux), spawn, fork
     
     # ============================================================================
     # CONFIGURATION POUR LES TÂCHES PLANIFIÉES
     # ============================================================================
     SCHEDULER_API_ENABLED = False  # Désactiver l'API du scheduler
     
+    # Schedulers, traductions et sondes lancés à la première requête du worker
+    # (False : dès l'import de app.py, voir services/demarrage.py)
+    DEMARRAGE_DIFFERE = os.environ.get('DEMARRAGE_DIFFERE', 'True').lower() in ['true', '1', 't']
+    
+    # ============================================================================
+    # CONFIGURATION JOURNALISATION (services/journalisation.py)
+    # ============================================================================
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or ('INFO' if IS_RENDER else 'DEBUG')
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')  # ex. "utils=DEBUG,models=WARNING"
+    LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    LOG_ECHANTILLON_BOUCLES = int(os.environ.get('LOG_ECHANTILLON_BOUCLES', 100))
+    
+    # Jeton Bearer du scraper Prometheus sur /metrics (sinon réservé au super admin)
+    METRIQUES_TOKEN = os.environ.get('METRIQUES_TOKEN')
+    
+    # Garde SQL (services/metriques.py) : détection N+1 et budgets par endpoint
+    SQL_GARDE_ACTIVE = os.environ.get('SQL_GARDE_ACTIVE', 'false' if IS_RENDER else 'true').lower() == 'true'
+    SQL_SEUIL_REPETITIONS = int(os.environ.get('SQL_SEUIL_REPETITIONS', 5))
+    SQL_BUDGETS = {}            # endpoint -> nombre maximal d'ordres SQL (prime sur @budget_sql)
+    SQL_BUDGET_STRICT = None    # None : lever DepassementBudgetSQL seulement si app.testing
+    
     # ============================================================================
     # MÉTHODES UTILITAIRES
     # ============================================================================
@@ -304,7 +344,7 @@ class ProductionConfig(Config):
         CACHE_REDIS_URL = REDIS_URL
         CACHE_DEFAULT_TIMEOUT = 300
     else:
-        CACHE_TYPE = 'simple'
+        CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
     
     # Configuration uploads sur le disque monté
     if os.path.exists('/var/data'):
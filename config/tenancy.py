@@ -1,31 +1,306 @@
+"""
+Connexions multi-tenant (un schéma ou une base par client)
+
+Un engine par client, mais en nombre borné : les engines sont gardés dans un
+cache LRU de TENANT_MAX_ENGINES entrées, fermés après TENANT_INACTIVITE_MAX
+secondes sans usage, et le budget global TENANT_BUDGET_CONNEXIONS est réparti
+entre eux (pool_size = budget // max_engines, sans overflow). Un worker ne
+tient donc jamais plus de TENANT_BUDGET_CONNEXIONS connexions, quel que soit
+le nombre de tenants servis.
+
+Seul un engine sans connexion empruntée est évincé : quand les
+TENANT_MAX_ENGINES engines sont tous occupés, le nouveau client attend qu'une
+connexion soit rendue, au plus TENANT_POOL_TIMEOUT secondes, puis reçoit
+sqlalchemy.exc.TimeoutError. Les engines et sessions obtenus ne se gardent pas
+d'une requête à l'autre : un engine évincé rouvrirait des connexions hors budget.
+
+La sessionmaker de chaque client est créée avec son engine et réutilisée.
+
+Cible des connexions :
+    - URL contenant {client_id} (ex. sqlite:///instance/client_{client_id}.db) :
+      une base par client ;
+    - PostgreSQL sinon : même base, search_path=client_<id>,public.
+
+Métriques par client (statistiques() / format_prometheus()) : checkouts,
+attente cumulée et maximale pour obtenir une connexion, délais dépassés,
+connexions en cours d'utilisation, évictions, attentes d'un engine libre.
+
+Module autonome : app.py ne l'utilise pas et ses métriques ne sont pas
+exposées sur /metrics. config.py masquant le paquet config/, il se charge par
+chemin (benchmarks/bench_pool_tenants.py, tests/test_tenancy.py).
+"""
+
 import os
+import time
+import threading
+from collections import OrderedDict
+
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as DelaiPoolDepasse
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+PREFIXE_PROMETHEUS = 'egalyx'
+
+
+class StatistiquesPool:
+    """Compteurs du pool d'un client (survivent à l'éviction de l'engine)"""
+
+    __slots__ = ('checkouts', 'attente_totale', 'attente_max', 'delais_depasses', 'evictions', 'creations',
+                 'attentes_engine')
+
+    def __init__(self):
+        self.checkouts = 0
+        self.attente_totale = 0.0
+        self.attente_max = 0.0
+        self.delais_depasses = 0
+        self.evictions = 0
+        self.creations = 0
+        self.attentes_engine = 0
+
+    def observer_attente(self, duree: float):
+        self.checkouts += 1
+        self.attente_totale += duree
+        if duree > self.attente_max:
+            self.attente_max = duree
+
+
+class PoolMesure(QueuePool):
+    """QueuePool qui mesure le temps d'attente de chaque checkout et signale chaque restitution"""
+
+    def __init__(self, creator, statistiques=None, **kw):
+        super().__init__(creator, **kw)
+        self.statistiques = statistiques or StatistiquesPool()
+        self.sur_restitution = None
+
+    def _do_get(self):
+        debut = time.perf_counter()
+        try:
+            connexion = super()._do_get()
+        except DelaiPoolDepasse:
+            self.statistiques.delais_depasses += 1
+            raise
+        self.statistiques.observer_attente(time.perf_counter() - debut)
+        return connexion
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        # Après le retour dans la file : checkedout() compte déjà la connexion comme libre
+        if self.sur_restitution is not None:
+            self.sur_restitution()
+
+    def recreate(self):
+        # engine.dispose() recrée le pool : les compteurs du client sont conservés
+        pool = super().recreate()
+        pool.statistiques = self.statistiques
+        pool.sur_restitution = self.sur_restitution
+        return pool
+
+
+class EngineClient:
+    """Engine, sessionmaker et date de dernier usage d'un client"""
+
+    __slots__ = ('engine', 'fabrique_session', 'dernier_usage')
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.fabrique_session = sessionmaker(bind=engine)
+        self.dernier_usage = time.monotonic()
+
+    @property
+    def connexions_utilisees(self) -> int:
+        return self.engine.pool.checkedout()
+
 
 class MultiTenantManager:
     """Gère les connexions multi-tenant"""
-    
-    def __init__(self):
-        self.connections = {}
-        self.base_engine = create_engine(os.environ.get('DATABASE_URL'))
-    
-    def get_engine_for_client(self, client_id):
-        """Retourne le moteur de base de données pour un client"""
-        if client_id not in self.connections:
+
+    def __init__(self, url=None, max_engines=None, budget_connexions=None,
+                 inactivite_max=None, pool_timeout=None):
+        self.url = url or os.environ.get('TENANT_DATABASE_URL') or os.environ.get('DATABASE_URL')
+        self.max_engines = max(1, max_engines or int(os.environ.get('TENANT_MAX_ENGINES', 50)))
+        self.budget_connexions = max(
+            self.max_engines, budget_connexions or int(os.environ.get('TENANT_BUDGET_CONNEXIONS', 100))
+        )
+        self.inactivite_max = inactivite_max or int(os.environ.get('TENANT_INACTIVITE_MAX', 600))
+        self.pool_timeout = pool_timeout or int(os.environ.get('TENANT_POOL_TIMEOUT', 10))
+
+        self.connections = OrderedDict()   # client_id -> EngineClient, du moins au plus récent
+        self.statistiques_clients = {}     # client_id -> StatistiquesPool
+        self._verrou = threading.RLock()
+        # Notifiée à chaque connexion rendue : un engine est peut-être devenu évinçable
+        self._connexion_rendue = threading.Condition(self._verrou)
+        self._base_engine = None
+
+    @property
+    def taille_pool(self) -> int:
+        """Connexions allouées à chaque client : part égale du budget global"""
+        return self.budget_connexions // self.max_engines
+
+    @property
+    def base_engine(self):
+        """Engine sur le schéma public, créé au premier usage"""
+        if self._base_engine is None:
+            self._base_engine = create_engine(self.url)
+        return self._base_engine
+
+    def _creer_engine(self, client_id):
+        statistiques = self.statistiques_clients.setdefault(client_id, StatistiquesPool())
+        statistiques.creations += 1
+        options = {
+            'poolclass': PoolMesure,
+            'pool_size': self.taille_pool,
+            'max_overflow': 0,
+            'pool_timeout': self.pool_timeout,
+            'pool_pre_ping': True,
+        }
+        if '{client_id}' in self.url:
+            engine = create_engine(self.url.format(client_id=client_id), **options)
+        else:
             # Dans un setup réel, vous récupéreriez les infos de connexion de la base client
             # Pour l'exemple, on utilise la même base mais avec un schéma différent
             engine = create_engine(
-                os.environ.get('DATABASE_URL'),
-                connect_args={'options': f'-c search_path=client_{client_id},public'}
+                self.url,
+                connect_args={'options': f'-c search_path=client_{client_id},public'},
+                **options
             )
-            self.connections[client_id] = engine
-        return self.connections[client_id]
-    
+        engine.pool.statistiques = statistiques
+        engine.pool.sur_restitution = self._notifier_restitution
+        return EngineClient(engine)
+
+    def _notifier_restitution(self):
+        with self._connexion_rendue:
+            self._connexion_rendue.notify_all()
+
+    def _evincer(self, client_id):
+        entree = self.connections.pop(client_id)
+        # Les connexions encore empruntées restent utilisables jusqu'à leur restitution
+        entree.engine.dispose()
+        self.statistiques_clients[client_id].evictions += 1
+
+    def evincer_inactifs(self):
+        """Ferme les engines inutilisés depuis plus de inactivite_max secondes"""
+        limite = time.monotonic() - self.inactivite_max
+        with self._verrou:
+            inactifs = [client_id for client_id, entree in self.connections.items()
+                        if entree.dernier_usage < limite and entree.connexions_utilisees == 0]
+            for client_id in inactifs:
+                self._evincer(client_id)
+        return len(inactifs)
+
+    def _liberer_une_place(self) -> bool:
+        """Évince le moins récemment utilisé des engines sans connexion empruntée ;
+        False s'ils sont tous occupés"""
+        candidat = next((client_id for client_id, entree in self.connections.items()
+                         if entree.connexions_utilisees == 0), None)
+        if candidat is None:
+            return False
+        self._evincer(candidat)
+        return True
+
+    def _attendre_une_place(self, client_id):
+        """Attend qu'un engine soit évinçable, au plus pool_timeout secondes"""
+        statistiques = self.statistiques_clients.setdefault(client_id, StatistiquesPool())
+        statistiques.attentes_engine += 1
+        echeance = time.monotonic() + self.pool_timeout
+        while len(self.connections) >= self.max_engines and not self._liberer_une_place():
+            restant = echeance - time.monotonic()
+            if restant <= 0:
+                statistiques.delais_depasses += 1
+                raise DelaiPoolDepasse(
+                    f"Aucun engine libre pour le client {client_id} : {len(self.connections)} engines "
+                    f"occupés, délai de {self.pool_timeout}s dépassé"
+                )
+            self._connexion_rendue.wait(restant)
+
+    def get_engine_for_client(self, client_id):
+        """Retourne le moteur de base de données pour un client"""
+        return self._entree(client_id).engine
+
+    def _entree(self, client_id):
+        with self._verrou:
+            entree = self.connections.get(client_id)
+            if entree is not None:
+                self.connections.move_to_end(client_id)
+                entree.dernier_usage = time.monotonic()
+                return entree
+
+            self.evincer_inactifs()
+            if len(self.connections) >= self.max_engines and not self._liberer_une_place():
+                self._attendre_une_place(client_id)
+            entree = self.connections[client_id] = self._creer_engine(client_id)
+            return entree
+
     def get_session_for_client(self, client_id):
-        """Retourne une session pour un client"""
-        engine = self.get_engine_for_client(client_id)
-        Session = sessionmaker(bind=engine)
-        return Session()
+        """Retourne une session pour un client (sessionmaker réutilisée)"""
+        return self._entree(client_id).fabrique_session()
+
+    def fermer(self):
+        """Ferme tous les engines (arrêt du worker, tests)"""
+        with self._verrou:
+            for client_id in list(self.connections):
+                self._evincer(client_id)
+            if self._base_engine is not None:
+                self._base_engine.dispose()
+                self._base_engine = None
+
+    # ========================
+    # MÉTRIQUES
+    # ========================
+
+    def statistiques(self) -> list:
+        """Une ligne par client vu depuis le démarrage, actifs en premier"""
+        with self._verrou:
+            lignes = []
+            for client_id, s in self.statistiques_clients.items():
+                entree = self.connections.get(client_id)
+                lignes.append({
+                    'client_id': client_id,
+                    'actif': entree is not None,
+                    'connexions_utilisees': entree.connexions_utilisees if entree else 0,
+                    'connexions_ouvertes': entree.engine.pool.checkedin() + entree.connexions_utilisees
+                    if entree else 0,
+                    'checkouts': s.checkouts,
+                    'attente_moyenne_ms': round(s.attente_totale / (s.checkouts or 1) * 1000, 3),
+                    'attente_max_ms': round(s.attente_max * 1000, 3),
+                    'delais_depasses': s.delais_depasses,
+                    'creations': s.creations,
+                    'evictions': s.evictions,
+                    'attentes_engine': s.attentes_engine,
+                })
+        return sorted(lignes, key=lambda ligne: (not ligne['actif'], -ligne['checkouts']))
+
+    def format_prometheus(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4 (même convention que services/metriques.py)"""
+        series = {
+            'tenant_pool_checkouts_total': ('counter', 'Connexions obtenues par client', 'checkouts'),
+            'tenant_pool_attente_secondes_total': ('counter', 'Attente cumulée pour obtenir une connexion',
+                                                   'attente_totale'),
+            'tenant_pool_attente_max_secondes': ('gauge', "Plus longue attente d'une connexion", 'attente_max'),
+            'tenant_pool_delais_depasses_total': ('counter', 'Checkouts abandonnés après pool_timeout',
+                                                  'delais_depasses'),
+            'tenant_pool_evictions_total': ('counter', 'Engines fermés (LRU ou inactivité)', 'evictions'),
+            'tenant_pool_attentes_engine_total': ('counter', 'Nouveaux clients mis en attente, tous les engines '
+                                                  'occupés', 'attentes_engine'),
+        }
+        sortie = []
+        with self._verrou:
+            elements = sorted(self.statistiques_clients.items(), key=lambda e: str(e[0]))
+            for nom, (type_metrique, aide, attribut) in series.items():
+                sortie.append(f'# HELP {PREFIXE_PROMETHEUS}_{nom} {aide}')
+                sortie.append(f'# TYPE {PREFIXE_PROMETHEUS}_{nom} {type_metrique}')
+                for client_id, s in elements:
+                    sortie.append(f'{PREFIXE_PROMETHEUS}_{nom}{{client_id="{client_id}"}} {getattr(s, attribut)}')
+            sortie.append(f'# HELP {PREFIXE_PROMETHEUS}_tenant_pool_connexions_utilisees Connexions empruntées')
+            sortie.append(f'# TYPE {PREFIXE_PROMETHEUS}_tenant_pool_connexions_utilisees gauge')
+            for client_id, entree in self.connections.items():
+                sortie.append(f'{PREFIXE_PROMETHEUS}_tenant_pool_connexions_utilisees{{client_id="{client_id}"}} '
+                              f'{entree.connexions_utilisees}')
+            sortie.append(f'# HELP {PREFIXE_PROMETHEUS}_tenant_engines_actifs Engines clients ouverts')
+            sortie.append(f'# TYPE {PREFIXE_PROMETHEUS}_tenant_engines_actifs gauge')
+            sortie.append(f'{PREFIXE_PROMETHEUS}_tenant_engines_actifs {len(self.connections)}')
+        return '\n'.join(sortie) + '\n'
+
 
 # Singleton
-tenant_manager = MultiTenantManager()
\ No newline at end of file
+tenant_manager = MultiTenantManager()
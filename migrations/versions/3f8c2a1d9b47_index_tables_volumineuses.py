@@ -0,0 +1,85 @@
+"""Index composites et partiels des tables volumineuses
+
+Listes par client (client_id + is_archived), dernière évaluation d'un risque,
+dernière mesure d'un KRI, enfants d'un audit et échéances de conformité.
+Les index partiels portent sur les lignes non archivées / actives ; leur
+prédicat est écrit comme le rend l'ORM (models.index_partiel).
+
+Les bases créées par db.create_all() ont déjà ces index (déclarés dans les
+modèles) : la migration ne crée que ceux qui manquent. Sur PostgreSQL, ils
+sont créés en CONCURRENTLY pour ne pas bloquer les écritures.
+
+Mesures : benchmarks/bench_index.py
+
+Revision ID: 3f8c2a1d9b47
+Revises:
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8c2a1d9b47'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (nom, table, colonnes, prédicat partiel (colonne, valeur) ou None)
+INDEX = [
+    ('idx_cartographie_client_actives', 'cartographie', ['client_id', 'created_at'], ('is_archived', False)),
+    ('idx_risques_client_actifs', 'risques', ['client_id', 'cartographie_id'], ('is_archived', False)),
+    ('idx_risques_cartographie', 'risques', ['cartographie_id', 'is_archived'], None),
+    ('idx_evaluations_risque_recentes', 'evaluations_risque', ['risque_id', 'created_at'], None),
+    ('idx_evaluations_risque_campagne', 'evaluations_risque', ['campagne_id', 'risque_id'], None),
+    ('idx_kri_risque', 'kri', ['risque_id', 'est_actif'], None),
+    ('idx_kri_client_actifs', 'kri', ['client_id'], ('est_actif', True)),
+    ('idx_mesure_kri_date', 'mesure_kri', ['kri_id', 'date_mesure'], None),
+    ('idx_audits_client_actifs', 'audits', ['client_id', 'statut'], ('is_archived', False)),
+    ('idx_constatations_audit', 'constatations', ['audit_id', 'is_archived'], None),
+    ('idx_recommandations_audit', 'recommandations', ['audit_id', 'statut'], None),
+    ('idx_plans_action_audit', 'plans_action', ['audit_id', 'is_archived'], None),
+    ('idx_plans_action_risque', 'plans_action', ['risque_id'], None),
+    ('idx_action_conformite_echeance', 'action_conformite', ['date_echeance', 'statut'], None),
+]
+
+
+def _predicat(partiel):
+    if partiel is None:
+        return {}
+    colonne, valeur = partiel
+    return {
+        'postgresql_where': sa.text(f"{colonne} = {'true' if valeur else 'false'}"),
+        'sqlite_where': sa.text(f"{colonne} = {1 if valeur else 0}"),
+    }
+
+
+def _index_existants(table):
+    if op.get_context().as_sql:
+        # flask db upgrade --sql : pas de connexion, script complet
+        return set()
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    postgresql = op.get_context().dialect.name == 'postgresql'
+    existants = {}
+    for nom, table, colonnes, partiel in INDEX:
+        if table not in existants:
+            existants[table] = _index_existants(table)
+        if nom in existants[table]:
+            continue
+        if postgresql:
+            # CREATE INDEX CONCURRENTLY est interdit dans une transaction
+            with op.get_context().autocommit_block():
+                op.create_index(nom, table, colonnes, postgresql_concurrently=True, **_predicat(partiel))
+        else:
+            op.create_index(nom, table, colonnes, **_predicat(partiel))
+
+
+def downgrade():
+    for nom, table, colonnes, partiel in reversed(INDEX):
+        if nom in _index_existants(table):
+            op.drop_index(nom, table_name=table)
@@ -0,0 +1,43 @@
+"""Index des utilisateurs par client
+
+Le filtre « créé par un utilisateur du client » est désormais une
+sous-requête (ClientDataFilter.membres_du_client) au lieu d'une liste d'ids
+chargée à chaque requête : elle s'appuie sur cet index.
+
+Mesures : benchmarks/bench_membres_tenant.py
+
+Revision ID: 5d7f3b2a8e14
+Revises: c41a8e5f2d90
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7f3b2a8e14'
+down_revision = 'c41a8e5f2d90'
+branch_labels = None
+depends_on = None
+
+
+def _index_existants():
+    if op.get_context().as_sql:
+        return set()
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('user')}
+
+
+def upgrade():
+    if 'idx_user_client' in _index_existants():
+        return
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('idx_user_client', 'user', ['client_id'], postgresql_concurrently=True)
+    else:
+        op.create_index('idx_user_client', 'user', ['client_id'])
+
+
+def downgrade():
+    if 'idx_user_client' in _index_existants():
+        op.drop_index('idx_user_client', table_name='user')
@@ -0,0 +1,89 @@
+"""Évaluation courante portée par les risques
+
+Ajoute derniere_evaluation_id, score_actuel et niveau_actuel sur risques,
+maintenus par les événements de EvaluationRisque (models.py), et les
+remplit à partir des évaluations existantes (équivalent de
+`flask recalculer-evaluations-courantes`).
+
+Revision ID: 7b2e4d9c1a63
+Revises: 3f8c2a1d9b47
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4d9c1a63'
+down_revision = '3f8c2a1d9b47'
+branch_labels = None
+depends_on = None
+
+
+COLONNES = [
+    sa.Column('derniere_evaluation_id', sa.Integer(), nullable=True),
+    sa.Column('score_actuel', sa.Integer(), nullable=True),
+    sa.Column('niveau_actuel', sa.String(length=20), nullable=True),
+]
+
+# Même requête que models.recalculer_evaluations_courantes, sans dépendre des modèles
+REPRISE = [
+    """
+    UPDATE risques SET derniere_evaluation_id = (
+        SELECT e.id FROM evaluations_risque e
+        WHERE e.risque_id = risques.id
+        ORDER BY e.created_at DESC, e.id DESC
+        LIMIT 1
+    )
+    """,
+    """
+    UPDATE risques SET
+        score_actuel = (SELECT e.score_risque FROM evaluations_risque e
+                        WHERE e.id = risques.derniere_evaluation_id),
+        niveau_actuel = (SELECT e.niveau_risque FROM evaluations_risque e
+                         WHERE e.id = risques.derniere_evaluation_id)
+    """,
+]
+
+
+def _colonnes_existantes():
+    if op.get_context().as_sql:
+        return set()
+    return {colonne['name'] for colonne in sa.inspect(op.get_bind()).get_columns('risques')}
+
+
+def _index_existants():
+    if op.get_context().as_sql:
+        return set()
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('risques')}
+
+
+def _predicat_non_archive():
+    return {
+        'postgresql_where': sa.text('is_archived = false'),
+        'sqlite_where': sa.text('is_archived = 0'),
+    }
+
+
+def upgrade():
+    existantes = _colonnes_existantes()
+    with op.batch_alter_table('risques') as batch_op:
+        for colonne in COLONNES:
+            if colonne.name not in existantes:
+                batch_op.add_column(colonne.copy())
+
+    for requete in REPRISE:
+        op.execute(requete)
+
+    if 'idx_risques_client_niveau' not in _index_existants():
+        op.create_index('idx_risques_client_niveau', 'risques', ['client_id', 'niveau_actuel'],
+                        **_predicat_non_archive())
+
+
+def downgrade():
+    if 'idx_risques_client_niveau' in _index_existants():
+        op.drop_index('idx_risques_client_niveau', table_name='risques')
+    with op.batch_alter_table('risques') as batch_op:
+        for colonne in reversed(COLONNES):
+            batch_op.drop_column(colonne.name)
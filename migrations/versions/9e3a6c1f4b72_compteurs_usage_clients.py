@@ -0,0 +1,75 @@
+"""Compteurs d'usage des clients
+
+Crée compteurs_usage_client (une ligne par client : utilisateurs actifs,
+risques et audits non archivés, processus, logigrammes), maintenue par les
+événements de models.py et réconciliée chaque nuit, et la remplit à partir
+des données existantes (équivalent de `flask recalculer-compteurs-usage`).
+
+Revision ID: 9e3a6c1f4b72
+Revises: 5d7f3b2a8e14
+Create Date: 2026-10-16 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3a6c1f4b72'
+down_revision = '5d7f3b2a8e14'
+branch_labels = None
+depends_on = None
+
+
+clients = sa.table('clients', sa.column('id'))
+
+# compteur -> (table, condition de décompte), mêmes critères que models._REGLES_USAGE
+DECOMPTES = {
+    'utilisateurs': ('user', lambda t: t.c.is_active == sa.true()),
+    'risques': ('risques', lambda t: t.c.is_archived == sa.false()),
+    'audits': ('audits', lambda t: t.c.is_archived == sa.false()),
+    'processus': ('processus', None),
+    'logigrammes': ('processus_activite', None),
+}
+
+
+def _decompte(nom_table, condition):
+    table = sa.table(nom_table, sa.column('client_id'), sa.column('is_active'), sa.column('is_archived'))
+    requete = sa.select(sa.func.count()).select_from(table).where(table.c.client_id == clients.c.id)
+    if condition is not None:
+        requete = requete.where(condition(table))
+    return requete.scalar_subquery()
+
+
+def _table_existe():
+    if op.get_context().as_sql:
+        return False
+    return 'compteurs_usage_client' in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if not _table_existe():
+        op.create_table(
+            'compteurs_usage_client',
+            sa.Column('client_id', sa.Integer(), sa.ForeignKey('clients.id'), primary_key=True),
+            sa.Column('utilisateurs', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('risques', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('audits', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('processus', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('logigrammes', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('recalcule_le', sa.DateTime(), nullable=True),
+        )
+
+    compteurs = sa.table('compteurs_usage_client', sa.column('client_id'), sa.column('recalcule_le'),
+                         *(sa.column(nom) for nom in DECOMPTES))
+    deja_presents = sa.select(compteurs.c.client_id)
+    op.execute(compteurs.insert().from_select(
+        ['client_id', 'recalcule_le', *DECOMPTES],
+        sa.select(clients.c.id, sa.func.current_timestamp(),
+                  *(_decompte(nom_table, condition) for nom_table, condition in DECOMPTES.values()))
+        .where(clients.c.id.not_in(deja_presents))
+    ))
+
+
+def downgrade():
+    op.drop_table('compteurs_usage_client')
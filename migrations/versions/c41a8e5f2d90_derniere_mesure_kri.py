@@ -0,0 +1,107 @@
+"""Dernière mesure et état d'alerte portés par les KRI
+
+Ajoute derniere_mesure_id, derniere_valeur, date_derniere_mesure et
+etat_alerte sur kri, maintenus par les événements de MesureKRI et KRI
+(models.py), et les remplit à partir des mesures existantes (équivalent de
+`flask recalculer-dernieres-mesures-kri`).
+
+Revision ID: c41a8e5f2d90
+Revises: 7b2e4d9c1a63
+Create Date: 2026-10-16 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41a8e5f2d90'
+down_revision = '7b2e4d9c1a63'
+branch_labels = None
+depends_on = None
+
+
+COLONNES = [
+    sa.Column('derniere_mesure_id', sa.Integer(), nullable=True),
+    sa.Column('derniere_valeur', sa.Float(), nullable=True),
+    sa.Column('date_derniere_mesure', sa.DateTime(), nullable=True),
+    sa.Column('etat_alerte', sa.String(length=20), nullable=True),
+]
+
+
+def _libelle(kri, kpi):
+    return f"CASE WHEN type_indicateur = 'kri' THEN '{kri}' ELSE '{kpi}' END"
+
+
+def _comparaison(operateur):
+    return f"""
+        CASE
+            WHEN seuil_critique IS NOT NULL AND derniere_valeur {operateur} seuil_critique
+                THEN {_libelle('critique', 'hors_cible')}
+            WHEN seuil_alerte IS NOT NULL AND derniere_valeur {operateur} seuil_alerte
+                THEN {_libelle('alerte', 'sous_performance')}
+            ELSE {_libelle('normal', 'dans_cible')}
+        END
+    """
+
+
+# Même calcul que models.recalculer_dernieres_mesures / KRI.calculer_etat_alerte,
+# sans dépendre des modèles
+REPRISE = [
+    """
+    UPDATE kri SET derniere_mesure_id = (
+        SELECT m.id FROM mesure_kri m
+        WHERE m.kri_id = kri.id
+        ORDER BY m.date_mesure DESC, m.id DESC
+        LIMIT 1
+    )
+    """,
+    """
+    UPDATE kri SET
+        derniere_valeur = (SELECT m.valeur FROM mesure_kri m WHERE m.id = kri.derniere_mesure_id),
+        date_derniere_mesure = (SELECT m.date_mesure FROM mesure_kri m WHERE m.id = kri.derniere_mesure_id)
+    """,
+    f"""
+    UPDATE kri SET etat_alerte = CASE
+        WHEN derniere_valeur IS NULL THEN 'inconnu'
+        WHEN sens_evaluation_seuil = 'inferieur' THEN {_comparaison('<=')}
+        ELSE {_comparaison('>=')}
+    END
+    """,
+]
+
+
+def _colonnes_existantes():
+    if op.get_context().as_sql:
+        return set()
+    return {colonne['name'] for colonne in sa.inspect(op.get_bind()).get_columns('kri')}
+
+
+def _index_existants():
+    if op.get_context().as_sql:
+        return set()
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('kri')}
+
+
+def upgrade():
+    existantes = _colonnes_existantes()
+    with op.batch_alter_table('kri') as batch_op:
+        for colonne in COLONNES:
+            if colonne.name not in existantes:
+                batch_op.add_column(colonne.copy())
+
+    for requete in REPRISE:
+        op.execute(requete)
+
+    if 'idx_kri_client_etat' not in _index_existants():
+        op.create_index('idx_kri_client_etat', 'kri', ['client_id', 'etat_alerte'],
+                        postgresql_where=sa.text('est_actif = true'),
+                        sqlite_where=sa.text('est_actif = 1'))
+
+
+def downgrade():
+    if 'idx_kri_client_etat' in _index_existants():
+        op.drop_index('idx_kri_client_etat', table_name='kri')
+    with op.batch_alter_table('kri') as batch_op:
+        for colonne in reversed(COLONNES):
+            batch_op.drop_column(colonne.name)
@@ -1,14 +1,200 @@
+import json
+import time
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime, date, timezone
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import NO_VALUE
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+from services.journalisation import obtenir_logger, EN_BOUCLE
+from services.sous_domaines import vider_cache_sous_domaines
+from services.replique import SessionRoutage
+from services.tableau_de_bord import invalider_tableau_de_bord
+from services.cache import cache_applicatif
+
+# Session qui route les lectures des vues @lecture_seule vers la réplique (si configurée)
+db = SQLAlchemy(session_options={'class_': SessionRoutage})
+logger = obtenir_logger('models')
+
+
+# -------------------- PERMISSIONS EFFECTIVES --------------------
+# Tables de référence utilisées par User._compiler_permissions (construites une
+# seule fois à l'import au lieu d'à chaque appel de has_permission)
+
+# Permissions OBLIGATOIRES pour admin client
+# (can_manage_regulatory / can_manage_logigram dépendent des modules de la formule)
+PERMISSIONS_ADMIN_CLIENT = {
+    # Tableau de bord et visualisation
+    'can_view_dashboard': True,
+    'can_view_reports': True,
+    'can_view_departments': True,
+    'can_view_notifications': True,
+
+    # Gestion des risques
+    'can_manage_risks': True,
+    'can_validate_risks': True,
+
+    # Gestion des KRI
+    'can_manage_kri': True,
+
+    # Gestion des audits
+    'can_manage_audit': True,
+    'can_confirm_evaluations': True,
+
+    # Plans d'action
+    'can_manage_action_plans': True,
+    'can_view_action_plans': True,
+
+    # Gestion des utilisateurs
+    'can_view_users_list': True,
+    'can_edit_users': True,
+    'can_manage_users': True,
+    'can_create_users': True,
+    'can_deactivate_users': True,
+    'can_delete_users': True,
+
+    # Gestion des départements
+    'can_manage_departments': True,
+    'can_access_all_departments': True,
+
+    # Administration
+    'can_manage_settings': True,
+    'can_archive_data': True,
+    'can_export_data': True,
+
+    # Permissions à TOUJOURS FALSE pour admin client
+    'can_manage_clients': False,
+    'can_provision_servers': False,
+    'can_manage_permissions': True,  # ADMIN client peut gérer les permissions de SES utilisateurs
+}
+
+# Base des GESTIONNAIRES (manager)
+PERMISSIONS_MANAGER_BASE = {
+    # Visualisation de base
+    'can_view_dashboard': True,
+    'can_view_reports': True,
+    'can_view_departments': True,
+    'can_view_notifications': True,
+
+    # Gestion des risques
+    'can_manage_risks': True,
+    'can_validate_risks': True,
+
+    # KRI
+    'can_manage_kri': True,
+
+    # Audit
+    'can_manage_audit': True,
+
+    # Plans d'action
+    'can_view_action_plans': True,
+    'can_manage_action_plans': True,
+
+    # Accès aux départements
+    'can_access_all_departments': True,
+
+    # Export
+    'can_export_data': True,
+
+    # Gestion des utilisateurs
+    'can_manage_users': True,
+    'can_edit_users': True,
+    'can_view_users_list': True,
+    'can_create_users': True,
+    'can_deactivate_users': True,
+    'can_delete_users': True,
+    'can_manage_permissions': True,
+
+    # Administration limitée
+    'can_manage_settings': True,
+    'can_manage_departments': True,
+
+    # Permissions réservées aux admin (toujours false pour manager)
+    'can_manage_clients': False,
+    'can_provision_servers': False,
+}
+
+# Permissions par DÉFAUT selon le rôle (pour les rôles simples)
+PERMISSIONS_PAR_ROLE = {
+    'auditeur': {
+        'can_view_dashboard': True,
+        'can_view_reports': True,
+        'can_view_departments': True,
+        'can_view_notifications': True,
+        'can_manage_audit': True,
+        'can_view_action_plans': True,
+    },
+    'utilisateur': {
+        'can_view_dashboard': True,
+        'can_view_reports': True,
+        'can_view_departments': True,
+        'can_view_notifications': True,
+        'can_view_action_plans': True,  # Peut voir les plans qui le concernent
+    },
+    'compliance': {
+        'can_view_dashboard': True,
+        'can_view_reports': True,
+        'can_view_departments': True,
+        'can_view_notifications': True,
+        'can_manage_regulatory': True,
+    },
+    'consultant': {
+        'can_view_dashboard': True,
+        'can_view_reports': True,
+        'can_view_departments': True,
+        'can_create_users': True,
+    }
+}
+
+# Permissions accordées ou refusées selon un module de la formule du client
+PERMISSION_VERS_MODULE = {
+    'can_manage_regulatory': 'veille_reglementaire',
+    'can_manage_logigram': 'gestion_processus',
+    'can_manage_action_plans': 'audit_interne',
+    'can_view_action_plans': 'audit_interne',
+    'can_manage_risks': 'cartographie',
+    'can_manage_kri': 'suivi_kri',
+    'can_manage_audit': 'audit_interne',
+}
+
+# Cache du processus : user_id -> (tampon de version, frozenset des permissions)
+_CACHE_PERMISSIONS = {}
+TAILLE_MAX_CACHE_PERMISSIONS = 10000
+
+# Génération incrémentée à chaque écriture d'un Client ou d'une FormuleAbonnement
+_GENERATION_PERMISSIONS = [0]
+
+
+def generation_clients_formules() -> int:
+    """Génération courante des clients / formules (clé des caches qui en dépendent)"""
+    return _GENERATION_PERMISSIONS[0]
+
+
+# -------------------- INDEX DES TABLES VOLUMINEUSES --------------------
+
+def index_partiel(colonne: str, valeur: bool) -> dict:
+    """
+    Prédicat d'index partiel `colonne = valeur` (ex. lignes non archivées).
+    Écrit comme le rend l'ORM (false sur PostgreSQL, 0 sur SQLite) : SQLite
+    n'utilise un index partiel que si la requête contient le même terme.
+    Voir migrations/versions/ et benchmarks/bench_index.py.
+    """
+    return {
+        'postgresql_where': db.text(f"{colonne} = {'true' if valeur else 'false'}"),
+        'sqlite_where': db.text(f"{colonne} = {1 if valeur else 0}"),
+    }
 
 
 # -------------------- USER --------------------
 class User(UserMixin, db.Model):
     __tablename__ = 'user'
+    __table_args__ = (
+        # Utilisateurs d'un tenant (ClientDataFilter.membres_du_client, listes d'utilisateurs)
+        db.Index('idx_user_client', 'client_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -203,211 +389,105 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
     
     def has_permission(self, permission):
-        """Vérifie si l'utilisateur a une permission spécifique - VERSION DÉFINITIVE"""
-        
-        print(f"🔐 [DEBUG] Vérification permission '{permission}' pour {self.username} (rôle: {self.role}, client_admin: {self.is_client_admin})")
-        
-        # 1. SUPER ADMIN : TOUJOURS AUTORISÉ (sauf exceptions)
+        """Vérifie si l'utilisateur a une permission spécifique (test d'appartenance O(1))"""
+        # Super admin : toujours autorisé, y compris pour les permissions inconnues
         if self.role == 'super_admin':
-            print(f"   ✅ Super admin - accès immédiat")
             return True
-        
-        # 2. Vérifier si l'utilisateur est un ADMIN CLIENT (deux façons de vérifier)
-        is_admin_client = (self.role == 'admin') or (getattr(self, 'is_client_admin', False))
-        
-        if is_admin_client:
-            print(f"   👑 Utilisateur est un ADMIN CLIENT")
-            
-            # Liste COMPLÈTE des permissions OBLIGATOIRES pour admin client
-            permissions_admin_obligatoires = {
-                # Tableau de bord et visualisation
-                'can_view_dashboard': True,
-                'can_view_reports': True,
-                'can_view_departments': True,
-                'can_view_notifications': True,
-                
-                # Gestion des risques
-                'can_manage_risks': True,
-                'can_validate_risks': True,
-                
-                # Gestion des KRI
-                'can_manage_kri': True,
-                
-                # Gestion des audits
-                'can_manage_audit': True,
-                'can_confirm_evaluations': True,
-                
-                # Plans d'action
-                'can_manage_action_plans': True,
-                'can_view_action_plans': True,
-                
-                # Gestion des utilisateurs
-                'can_view_users_list': True,
-                'can_edit_users': True,
-                'can_manage_users': True,
-                'can_create_users': True,
-                'can_deactivate_users': True,
-                'can_delete_users': True,
-                
-                # Gestion des départements
-                'can_manage_departments': True,
-                'can_access_all_departments': True,
-                
-                # Administration
-                'can_manage_settings': True,
-                'can_archive_data': True,
-                'can_export_data': True,
-                
-                # Veille règlementaire (si module activé)
-                'can_manage_regulatory': True if self.client and self.client.formule and 
-                                               self.client.formule.modules.get('veille_reglementaire', False) else False,
-                
-                # Processus (si module activé)
-                'can_manage_logigram': True if self.client and self.client.formule and 
-                                             self.client.formule.modules.get('gestion_processus', False) else False,
-                
-                # Permissions à TOUJOURS FALSE pour admin client
-                'can_manage_clients': False,
-                'can_provision_servers': False,
-                'can_manage_permissions': True,  # ADMIN client peut gérer les permissions de SES utilisateurs
-            }
-            
-            # Vérifier si la permission est dans la liste des permissions admin obligatoires
-            if permission in permissions_admin_obligatoires:
-                value = permissions_admin_obligatoires[permission]
-                print(f"   📋 Permission admin obligatoire '{permission}': {value}")
-                return value
-        
-        # 3. Vérifier si l'utilisateur est un GESTIONNAIRE (manager)
-        # 3. Vérifier si l'utilisateur est un GESTIONNAIRE (manager)
+        return permission in self.get_effective_permissions()
+
+    def get_effective_permissions(self):
+        """
+        Ensemble immuable des permissions accordées à l'utilisateur.
+
+        Combine, par ordre de priorité, les permissions obligatoires d'admin
+        client, la base gestionnaire, les permissions explicites (JSON), les
+        défauts du rôle et les modules de la formule. Le résultat est mémorisé
+        sur l'instance et dans un cache du processus, invalidé par le tampon
+        de version (voir _version_permissions).
+        """
+        compilees = self.__dict__.get('_permissions_compilees')
+        if compilees is not None:
+            return compilees
+
+        version = self._version_permissions()
+        entree = _CACHE_PERMISSIONS.get(self.id)
+        if entree is not None and entree[0] == version:
+            compilees = entree[1]
+        else:
+            compilees = self._compiler_permissions()
+            if len(_CACHE_PERMISSIONS) >= TAILLE_MAX_CACHE_PERMISSIONS:
+                _CACHE_PERMISSIONS.clear()
+            _CACHE_PERMISSIONS[self.id] = (version, compilees)
+
+        self._permissions_compilees = compilees
+        return compilees
+
+    def _version_permissions(self):
+        """Tampon de version : change dès que l'utilisateur, son client ou sa formule change"""
+        client = self.client
+        formule = client.formule if client else None
+        return (
+            _GENERATION_PERMISSIONS[0],
+            self.role,
+            bool(self.is_client_admin),
+            json.dumps(self.permissions or {}, sort_keys=True, default=str),
+            self.client_id,
+            client.updated_at if client else None,
+            formule.id if formule else None,
+            formule.updated_at if formule else None,
+        )
+
+    def _compiler_permissions(self):
+        """Résout une fois pour toutes les permissions accordées (hors super admin)"""
+        client = self.client
+        formule = client.formule if client else None
+        modules = (formule.modules or {}) if formule else {}
+
+        accordees = set()
+        decidees = set()
+
+        def appliquer(mapping):
+            # La première source qui se prononce sur une permission l'emporte
+            for perm, value in mapping.items():
+                if perm not in decidees:
+                    decidees.add(perm)
+                    if value:
+                        accordees.add(perm)
+
+        # 1. ADMIN CLIENT (deux façons de le détecter)
+        if self.role == 'admin' or getattr(self, 'is_client_admin', False):
+            appliquer(PERMISSIONS_ADMIN_CLIENT)
+            appliquer({
+                # Veille règlementaire et processus : seulement si le module est activé
+                'can_manage_regulatory': bool(modules.get('veille_reglementaire', False)),
+                'can_manage_logigram': bool(modules.get('gestion_processus', False)),
+            })
+
+        # 2. GESTIONNAIRE (manager)
         if self.role == 'manager':
-            print(f"   👤 Utilisateur est un GESTIONNAIRE (manager)")
-            
-            permissions_manager_base = {
-                # Visualisation de base
-                'can_view_dashboard': True,
-                'can_view_reports': True,
-                'can_view_departments': True,
-                'can_view_notifications': True,
-                
-                # Gestion des risques
-                'can_manage_risks': True,
-                'can_validate_risks': True,
-                
-                # KRI
-                'can_manage_kri': True,
-                
-                # Audit
-                'can_manage_audit': True,
-                
-                # Plans d'action
-                'can_view_action_plans': True,
-                'can_manage_action_plans': True,
-                
-                # Accès aux départements
-                'can_access_all_departments': True,
-                
-                # Export
-                'can_export_data': True,
-                
-                # Gestion des utilisateurs - CORRECTION ICI !
-                'can_manage_users': True,
-                'can_edit_users': True,
-                'can_view_users_list': True,
-                'can_create_users': True,           # AJOUTÉ
-                'can_deactivate_users': True,       # AJOUTÉ
-                'can_delete_users': True,           # AJOUTÉ
-                'can_manage_permissions': True,     # AJOUTÉ
-                
-                # Administration limitée
-                'can_manage_settings': True,        # Peut gérer certains paramètres
-                'can_manage_departments': True,     # Peut gérer les départements
-                
-                # Permissions réservées aux admin (toujours false pour manager)
-                'can_manage_clients': False,
-                'can_provision_servers': False,
-            }
-            
-            if permission in permissions_manager_base:
-                value = permissions_manager_base[permission]
-                print(f"   📋 Permission manager '{permission}': {value}")
-                return value
-        
-        # 4. Vérifier les permissions EXPLICITES dans user.permissions
-        if self.permissions and permission in self.permissions:
-            value = bool(self.permissions[permission])
-            print(f"   📋 Permission explicite dans DB: {value}")
-            return value
-        
-        # 5. Permissions par DÉFAUT selon le rôle (pour les rôles simples)
-        role_defaults = {
-            'auditeur': {
-                'can_view_dashboard': True,
-                'can_view_reports': True,
-                'can_view_departments': True,
-                'can_view_notifications': True,
-                'can_manage_audit': True,
-                'can_view_action_plans': True,
-            },
-            'utilisateur': {
-                'can_view_dashboard': True,
-                'can_view_reports': True,
-                'can_view_departments': True,
-                'can_view_notifications': True,
-                'can_view_action_plans': True,  # Peut voir les plans qui le concernent
-            },
-            'compliance': {
-                'can_view_dashboard': True,
-                'can_view_reports': True,
-                'can_view_departments': True,
-                'can_view_notifications': True,
-                'can_manage_regulatory': True,
-            },
-            'consultant': {
-                'can_view_dashboard': True,
-                'can_view_reports': True,
-                'can_view_departments': True,
-                'can_create_users': True,
-            }
-        }
-        
-        if self.role in role_defaults and permission in role_defaults[self.role]:
-            value = role_defaults[self.role][permission]
-            print(f"   📋 Permission par défaut pour rôle '{self.role}': {value}")
-            return value
-        
-        # 6. Vérifier la formule du client pour les permissions liées aux modules
-        if self.client and self.client.formule:
-            formule = self.client.formule
-            
-            # Mapping des permissions liées aux modules
-            permission_to_module = {
-                'can_manage_regulatory': 'veille_reglementaire',
-                'can_manage_logigram': 'gestion_processus',
-                'can_manage_action_plans': 'audit_interne',
-                'can_view_action_plans': 'audit_interne',
-                'can_manage_risks': 'cartographie',
-                'can_manage_kri': 'suivi_kri',
-                'can_manage_audit': 'audit_interne',
-            }
-            
-            if permission in permission_to_module:
-                module_name = permission_to_module[permission]
-                if module_name in formule.modules:
-                    is_module_active = formule.modules[module_name]
-                    print(f"   🔍 Permission liée au module '{module_name}': {is_module_active}")
-                    
-                    # Si le module est activé, la permission est accordée
-                    if is_module_active:
-                        return True
-                    else:
-                        print(f"   ❌ Module '{module_name}' désactivé dans la formule")
-                        return False
-        
-        print(f"   ❌ Permission '{permission}' REFUSÉE par défaut")
-        return False
+            appliquer(PERMISSIONS_MANAGER_BASE)
+
+        # 3. Permissions EXPLICITES dans user.permissions
+        if self.permissions:
+            appliquer({perm: bool(value) for perm, value in self.permissions.items()})
+
+        # 4. Permissions par DÉFAUT selon le rôle
+        appliquer(PERMISSIONS_PAR_ROLE.get(self.role, {}))
+
+        # 5. Permissions liées aux modules de la formule
+        if formule:
+            appliquer({
+                perm: modules[module_name]
+                for perm, module_name in PERMISSION_VERS_MODULE.items()
+                if module_name in modules
+            })
+
+        return frozenset(accordees)
+
+    def invalider_permissions(self):
+        """Oublie les permissions compilées de cette instance"""
+        self.__dict__.pop('_permissions_compilees', None)
 
-    
     def get_allowed_sections(self):
         """Retourne les sections accessibles par l'utilisateur"""
         sections = []
@@ -500,7 +580,7 @@ class User(UserMixin, db.Model):
                 if pause_date and pause_date >= datetime.utcnow().date():
                     return False
             except Exception as e:
-                print(f"⚠️ Erreur vérification pause: {e}")
+                logger.warning("⚠️ Erreur vérification pause: %s", e)
         
         # Vérifier la préférence spécifique
         return self.get_notification_preference(channel, notification_type)
@@ -900,6 +980,10 @@ class Service(db.Model):
 
 class Cartographie(db.Model):
     __tablename__ = 'cartographie'
+    __table_args__ = (
+        # Listes par client des cartographies actives, les plus récentes d'abord
+        db.Index('idx_cartographie_client_actives', 'client_id', 'created_at', **index_partiel('is_archived', False)),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nom = db.Column(db.String(200), nullable=False)
@@ -928,6 +1012,11 @@ class Cartographie(db.Model):
 # -------------------- RISQUE --------------------
 class Risque(db.Model):
     __tablename__ = 'risques'
+    __table_args__ = (
+        db.Index('idx_risques_client_actifs', 'client_id', 'cartographie_id', **index_partiel('is_archived', False)),
+        db.Index('idx_risques_cartographie', 'cartographie_id', 'is_archived'),
+        db.Index('idx_risques_client_niveau', 'client_id', 'niveau_actuel', **index_partiel('is_archived', False)),
+    )
     id = db.Column(db.Integer, primary_key=True)
     cartographie_id = db.Column(db.Integer, db.ForeignKey('cartographie.id'))
     reference = db.Column(db.String(50), unique=True, nullable=False)
@@ -946,10 +1035,20 @@ class Risque(db.Model):
     archive_reason = db.Column(db.Text)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=True)
 
+    # Évaluation courante (la plus récente) et ses résultats, maintenus dans la
+    # transaction qui crée / modifie / supprime une évaluation (fin du fichier)
+    derniere_evaluation_id = db.Column(db.Integer)
+    score_actuel = db.Column(db.Integer)
+    niveau_actuel = db.Column(db.String(20))
+
     cartographie = db.relationship('Cartographie', back_populates='risques')
     createur = db.relationship('User', foreign_keys=[created_by], back_populates='risques_crees')
     archive_user = db.relationship('User', foreign_keys=[archived_by], back_populates='risques_archives')
     evaluations = db.relationship('EvaluationRisque', back_populates='risque', lazy=True)
+    evaluation_courante = db.relationship(
+        'EvaluationRisque', uselist=False, viewonly=True, lazy=True,
+        primaryjoin='foreign(Risque.derniere_evaluation_id) == EvaluationRisque.id'
+    )
     
     # CORRECTION: Relation KRI avec primaryjoin explicite
     kri = db.relationship('KRI', back_populates='risque', uselist=False, lazy=True,
@@ -959,6 +1058,11 @@ class Risque(db.Model):
 # -------------------- EVALUATION RISQUE (CORRIGÉ) --------------------
 class EvaluationRisque(db.Model):
     __tablename__ = 'evaluations_risque'
+    __table_args__ = (
+        # Dernière évaluation d'un risque (ORDER BY created_at DESC)
+        db.Index('idx_evaluations_risque_recentes', 'risque_id', 'created_at'),
+        db.Index('idx_evaluations_risque_campagne', 'campagne_id', 'risque_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     risque_id = db.Column(db.Integer, db.ForeignKey('risques.id'), nullable=False)
@@ -1060,6 +1164,11 @@ class CampagneEvaluation(db.Model):
 # -------------------- KRI (CORRIGÉ) --------------------
 class KRI(db.Model):
     __tablename__ = 'kri'
+    __table_args__ = (
+        db.Index('idx_kri_risque', 'risque_id', 'est_actif'),
+        db.Index('idx_kri_client_actifs', 'client_id', **index_partiel('est_actif', True)),
+        db.Index('idx_kri_client_etat', 'client_id', 'etat_alerte', **index_partiel('est_actif', True)),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -1102,12 +1211,26 @@ class KRI(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
 
+    # DERNIÈRE MESURE ET ÉTAT D'ALERTE, maintenus dans la transaction qui crée /
+    # modifie / supprime une mesure ou change les seuils (fin du fichier)
+    derniere_mesure_id = db.Column(db.Integer)
+    derniere_valeur = db.Column(db.Float)
+    date_derniere_mesure = db.Column(db.DateTime)
+    etat_alerte = db.Column(db.String(20), default='inconnu')
+
     # RELATIONS
     risque = db.relationship('Risque', back_populates='kri')
     responsable_mesure = db.relationship('User', foreign_keys=[responsable_mesure_id], back_populates='kris_geres')
     createur = db.relationship('User', foreign_keys=[created_by], back_populates='kris_crees')
     archive_par = db.relationship('User', foreign_keys=[archived_by])
     mesures = db.relationship('MesureKRI', back_populates='kri', lazy=True, cascade='all, delete-orphan')
+    derniere_mesure = db.relationship(
+        'MesureKRI', uselist=False, viewonly=True, lazy=True,
+        primaryjoin='foreign(KRI.derniere_mesure_id) == MesureKRI.id'
+    )
+
+    # États de la dernière mesure qui déclenchent une alerte (KRI puis KPI)
+    ETATS_EN_ALERTE = ('alerte', 'critique', 'sous_performance', 'hors_cible')
 
     def __repr__(self):
         return f'<{self.get_type_display()} {self.nom}>'
@@ -1152,10 +1275,13 @@ class KRI(db.Model):
         self.updated_at = datetime.utcnow()
 
     def get_derniere_mesure(self):
-        """Obtenir la dernière mesure"""
-        if self.mesures:
-            return max(self.mesures, key=lambda x: x.date_mesure)
-        return None
+        """Obtenir la dernière mesure (pointeur maintenu, sans charger l'historique)"""
+        return self.derniere_mesure
+
+    @property
+    def est_en_alerte(self):
+        """La dernière mesure dépasse le seuil d'alerte ou le seuil critique"""
+        return self.etat_alerte in self.ETATS_EN_ALERTE
 
     def get_statistiques(self):
         """Obtenir les statistiques de l'indicateur"""
@@ -1171,28 +1297,34 @@ class KRI(db.Model):
             'derniere_valeur': valeurs[-1] if valeurs else None
         }
 
-    def get_etat_alerte(self, valeur):
-        """Retourne l'état d'alerte basé sur le sens d'évaluation"""
+    @staticmethod
+    def calculer_etat_alerte(type_indicateur, sens_evaluation_seuil, seuil_alerte, seuil_critique, valeur):
+        """État d'alerte d'une valeur selon les seuils, sans instance (utilisé aussi au flush)"""
         if valeur is None:
             return 'inconnu'
         
         # Pour les KPI, on utilise aussi la logique des seuils mais avec des libellés différents
-        if self.sens_evaluation_seuil == 'inferieur':
+        if sens_evaluation_seuil == 'inferieur':
             # Risque/alerte si valeur < seuil
-            if self.seuil_critique is not None and valeur <= self.seuil_critique:
-                return 'critique' if self.type_indicateur == 'kri' else 'hors_cible'
-            elif self.seuil_alerte is not None and valeur <= self.seuil_alerte:
-                return 'alerte' if self.type_indicateur == 'kri' else 'sous_performance'
+            if seuil_critique is not None and valeur <= seuil_critique:
+                return 'critique' if type_indicateur == 'kri' else 'hors_cible'
+            elif seuil_alerte is not None and valeur <= seuil_alerte:
+                return 'alerte' if type_indicateur == 'kri' else 'sous_performance'
             else:
-                return 'normal' if self.type_indicateur == 'kri' else 'dans_cible'
+                return 'normal' if type_indicateur == 'kri' else 'dans_cible'
         else:
             # Risque/alerte si valeur > seuil (par défaut)
-            if self.seuil_critique is not None and valeur >= self.seuil_critique:
-                return 'critique' if self.type_indicateur == 'kri' else 'hors_cible'
-            elif self.seuil_alerte is not None and valeur >= self.seuil_alerte:
-                return 'alerte' if self.type_indicateur == 'kri' else 'sous_performance'
+            if seuil_critique is not None and valeur >= seuil_critique:
+                return 'critique' if type_indicateur == 'kri' else 'hors_cible'
+            elif seuil_alerte is not None and valeur >= seuil_alerte:
+                return 'alerte' if type_indicateur == 'kri' else 'sous_performance'
             else:
-                return 'normal' if self.type_indicateur == 'kri' else 'dans_cible'
+                return 'normal' if type_indicateur == 'kri' else 'dans_cible'
+
+    def get_etat_alerte(self, valeur):
+        """Retourne l'état d'alerte basé sur le sens d'évaluation"""
+        return self.calculer_etat_alerte(self.type_indicateur, self.sens_evaluation_seuil,
+                                         self.seuil_alerte, self.seuil_critique, valeur)
     
     def get_couleur_etat(self, valeur):
         """Retourne la couleur Bootstrap correspondant à l'état"""
@@ -1364,6 +1496,10 @@ class KRI(db.Model):
 # -------------------- MESURE KRI --------------------
 class MesureKRI(db.Model):
     __tablename__ = 'mesure_kri'
+    __table_args__ = (
+        # Dernière mesure d'un KRI (MAX / ORDER BY date_mesure)
+        db.Index('idx_mesure_kri_date', 'kri_id', 'date_mesure'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     kri_id = db.Column(db.Integer, db.ForeignKey('kri.id'))
@@ -1542,6 +1678,11 @@ class VeilleReglementaire(db.Model):
 
 # -------------------- ACTION CONFORMITE --------------------
 class ActionConformite(db.Model):
+    __table_args__ = (
+        # Actions en retard / à échéance sur une période
+        db.Index('idx_action_conformite_echeance', 'date_echeance', 'statut'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     veille_id = db.Column(db.Integer, db.ForeignKey('veille_reglementaire.id'))
     description = db.Column(db.Text, nullable=False)
@@ -1580,6 +1721,9 @@ class VeilleDocument(db.Model):  # Nouveau
 # -------------------- AUDIT --------------------
 class Audit(db.Model):
     __tablename__ = 'audits'
+    __table_args__ = (
+        db.Index('idx_audits_client_actifs', 'client_id', 'statut', **index_partiel('is_archived', False)),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     reference = db.Column(db.String(50), unique=True, nullable=False)
@@ -1989,6 +2133,9 @@ class AuditRisque(db.Model):
 # -------------------- CONSTATATION - CORRIGÉ ET COMPLET --------------------
 class Constatation(db.Model):
     __tablename__ = 'constatations'
+    __table_args__ = (
+        db.Index('idx_constatations_audit', 'audit_id', 'is_archived'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     reference = db.Column(db.String(50), nullable=False)
@@ -2153,6 +2300,9 @@ from datetime import datetime, timezone
 # Dans votre modèle Recommandation :
 class Recommandation(db.Model):
     __tablename__ = 'recommandations'
+    __table_args__ = (
+        db.Index('idx_recommandations_audit', 'audit_id', 'statut'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     reference = db.Column(db.String(50), nullable=False)
@@ -2296,6 +2446,10 @@ class HistoriqueRecommandation(db.Model):
 # -------------------- PLAN ACTION - CORRIGÉ ET COMPLET --------------------
 class PlanAction(db.Model):
     __tablename__ = 'plans_action'
+    __table_args__ = (
+        db.Index('idx_plans_action_audit', 'audit_id', 'is_archived'),
+        db.Index('idx_plans_action_risque', 'risque_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     reference = db.Column(db.String(50), nullable=False)
@@ -3846,7 +4000,8 @@ class JournalActiviteClient(db.Model):
 class ClientDataFilter:
     """Filtre automatiquement TOUTES les requêtes par client"""
     
-    # Modèles qui doivent être filtrés par client_id
+    # Modèles qui doivent être filtrés par client_id : services/isolation.py
+    # applique ce filtre dans le SQL de chaque requête ORM (relations comprises)
     CLIENT_MODELS = [
         User, Direction, Service, Cartographie, Risque, EvaluationRisque,
         KRI, MesureKRI, Processus, EtapeProcessus, SousEtapeProcessus, 
@@ -3868,6 +4023,13 @@ class ClientDataFilter:
         RecommandationGlobale
     ]
     
+    # Configuration partagée : les lignes sans client_id sont les valeurs globales,
+    # visibles de tous les tenants en plus des leurs
+    MODELES_PARTAGES = [
+        ConfigurationChampRisque, ConfigurationListeDeroulante, PermissionTemplate,
+        ConfigurationAudit, TemplateConstatation
+    ]
+    
     @classmethod
     def apply_client_filter(cls, query, model_class):
         """Applique automatiquement le filtre client_id à une requête"""
@@ -3889,9 +4051,7 @@ class ClientDataFilter:
         
         # 5. FILTRER PAR CREATED_BY (utilisateur du client)
         if hasattr(model_class, 'created_by'):
-            # Récupérer tous les utilisateurs du même client
-            user_ids = cls._get_client_user_ids(client_id)
-            return query.filter(model_class.created_by.in_(user_ids))
+            return query.filter(cls.filtre_createur(model_class, client_id))
         
         # 6. FILTRER PAR RELATIONS
         # Pour les modèles qui n'ont pas client_id mais sont liés à un modèle qui en a
@@ -3903,10 +4063,18 @@ class ClientDataFilter:
         return query
     
     @staticmethod
-    def _get_client_user_ids(client_id):
-        """Récupère tous les IDs d'utilisateurs d'un client"""
-        user_ids = User.query.filter_by(client_id=client_id).with_entities(User.id).all()
-        return [uid[0] for uid in user_ids] if user_ids else [-1]  # [-1] pour éviter les résultats
+    def membres_du_client(client_id):
+        """
+        Sous-requête des IDs d'utilisateurs d'un client, évaluée par la base
+        (idx_user_client) : ni requête préalable ni liste IN qui grandit avec
+        le tenant et dépasse la limite de paramètres de SQLite.
+        """
+        return db.select(User.id).where(User.client_id == client_id).scalar_subquery()
+    
+    @classmethod
+    def filtre_createur(cls, model_class, client_id):
+        """Prédicat « créé par un utilisateur du client »"""
+        return model_class.created_by.in_(cls.membres_du_client(client_id))
     
     @classmethod
     def _get_filter_mappings(cls, model_class, client_id):
@@ -3921,6 +4089,22 @@ class ClientDataFilter:
 # MODÈLES FORMULES
 # ====================
 
+# Alias courants → noms réels des modules dans FormuleAbonnement.modules
+ALIAS_MODULES = {
+    'veille': 'veille_reglementaire',
+    'processus': 'gestion_processus',
+    'logigrammes': 'gestion_processus',
+    'ia_analyse': 'analyse_ia',
+    'tableaux_bord_personnalisables': 'tableaux_bord',
+    'risques': 'cartographie',
+}
+
+# Cache du processus pour « existe-t-il une formule supérieure » :
+# max_utilisateurs -> (expiration, résultat). Vidé à chaque écriture d'une formule.
+_CACHE_FORMULES_SUPERIEURES = {}
+TTL_FORMULES_SUPERIEURES = 300
+
+
 class FormuleAbonnement(db.Model):
     """Formule d'abonnement standard/prémium"""
     __tablename__ = 'formules_abonnement'
@@ -4068,30 +4252,8 @@ class FormuleAbonnement(db.Model):
         Retourne le statut d'un module avec gestion des alias
         Pour résoudre le problème de mapping
         """
-        # Mapping des alias vers les noms réels de la base de données
-        module_alias_map = {
-            # Alias courants → Noms réels dans la base
-            'veille': 'veille_reglementaire',
-            'processus': 'gestion_processus', 
-            'logigrammes': 'gestion_processus',
-            'ia_analyse': 'analyse_ia',
-            'tableaux_bord_personnalisables': 'tableaux_bord',
-            
-            # Autres alias
-            'questionnaires': 'questionnaires',
-            'organigramme': 'organigramme',
-            'portail_fournisseurs': 'portail_fournisseurs',
-            'reporting_avance': 'reporting_avance',
-            'matrices_risque': 'matrices_risque',
-            'plans_action': 'plans_action',
-            'risques': 'cartographie',
-            'cartographie': 'cartographie',
-            'audit_interne': 'audit_interne',
-            'suivi_kri': 'suivi_kri'
-        }
-        
         # Convertir l'alias en nom réel
-        real_module = module_alias_map.get(module_code, module_code)
+        real_module = ALIAS_MODULES.get(module_code, module_code)
         
         # Vérifier si le module existe dans la base
         exists = real_module in self.modules
@@ -4113,7 +4275,7 @@ class FormuleAbonnement(db.Model):
         module_info = self.get_module_status(module_code)
         
         if not module_info['exists']:
-            print(f"⚠️ Module '{module_code}' (réel: '{module_info['real_name']}') non trouvé dans {list(self.modules.keys())}")
+            logger.warning("⚠️ Module '%s' (réel: '%s') non trouvé dans %s", module_code, module_info['real_name'], list(self.modules.keys()))
             return False
         
         return module_info['is_active']
@@ -4244,12 +4406,12 @@ class FormuleAbonnement(db.Model):
         issues = self.check_module_permission_sync()
         
         if issues:
-            print(f"🔧 Correction des incohérences pour formule {self.nom}:")
+            logger.debug("🔧 Correction des incohérences pour formule %s:", self.nom)
             
             for issue in issues:
                 module_active = self.modules.get(issue['module'], False)
                 self.permissions_template[issue['permission']] = module_active
-                print(f"  🔄 {issue['permission']} = {module_active} (module: {issue['module']})")
+                logger.debug("  🔄 %s = %s (module: %s)", issue['permission'], module_active, issue['module'], extra=EN_BOUCLE)
             
             return True
         
@@ -4299,22 +4461,21 @@ class FormuleAbonnement(db.Model):
     
     def get_usage_stats(self, client_id=None):
         """Retourne les statistiques d'utilisation"""
-        from models import User, Risque, Audit, Processus, ProcessusActivite
-        
         if client_id:
-            # Pour un client spécifique
-            users_count = User.query.filter_by(client_id=client_id, is_active=True).count()
-            risks_count = Risque.query.filter_by(client_id=client_id, is_archived=False).count()
-            audits_count = Audit.query.filter_by(client_id=client_id, is_archived=False).count()
-            processes_count = Processus.query.filter_by(client_id=client_id).count()
-            logigrammes_count = ProcessusActivite.query.filter_by(client_id=client_id).count()
+            # Pour un client spécifique : une ligne de compteurs
+            compteurs = CompteurUsageClient.pour_client(client_id)
+            users_count = compteurs.utilisateurs
+            risks_count = compteurs.risques
+            audits_count = compteurs.audits
+            processes_count = compteurs.processus
+            logigrammes_count = compteurs.logigrammes
         else:
-            # Pour tous les clients de cette formule
-            users_count = sum(client.nb_utilisateurs or 0 for client in self.clients)
-            risks_count = sum(client.nb_risques or 0 for client in self.clients)
-            audits_count = sum(client.nb_audits or 0 for client in self.clients)
-            processes_count = 0
-            logigrammes_count = 0
+            # Pour tous les clients de cette formule : une somme par compteur
+            sommes = db.session.query(*(
+                db.func.coalesce(db.func.sum(getattr(CompteurUsageClient, categorie)), 0)
+                for categorie in CompteurUsageClient.CATEGORIES
+            )).join(Client, Client.id == CompteurUsageClient.client_id).filter(Client.formule_id == self.id).one()
+            users_count, risks_count, audits_count, processes_count, logigrammes_count = sommes
         
         stats = {
             'utilisateurs': {
@@ -4355,6 +4516,25 @@ class FormuleAbonnement(db.Model):
         
         return stats
     
+    def existe_formule_superieure(self):
+        """
+        Indique si une formule active autorise plus d'utilisateurs que celle-ci
+        Résultat mis en cache TTL_FORMULES_SUPERIEURES secondes
+        """
+        maintenant = time.monotonic()
+        entree = _CACHE_FORMULES_SUPERIEURES.get(self.max_utilisateurs)
+        if entree and entree[0] > maintenant:
+            return entree[1]
+
+        existe = db.session.query(
+            FormuleAbonnement.query.filter(
+                FormuleAbonnement.is_active == True,
+                FormuleAbonnement.max_utilisateurs > self.max_utilisateurs
+            ).exists()
+        ).scalar()
+        _CACHE_FORMULES_SUPERIEURES[self.max_utilisateurs] = (maintenant + TTL_FORMULES_SUPERIEURES, existe)
+        return existe
+    
     def next_level_name(self):
         """Retourne le nom de la formule supérieure"""
         # Logique simple pour trouver la formule suivante
@@ -4433,7 +4613,7 @@ class FormuleAbonnement(db.Model):
                 # Supprimer l'ancien
                 del self.modules[old_name]
                 fixes_applied += 1
-                print(f"  🔄 Renommage: {old_name} → {new_name}")
+                logger.debug("  🔄 Renommage: %s → %s", old_name, new_name, extra=EN_BOUCLE)
         
         # Synchronisation des permissions
         permission_sync = {
@@ -4451,7 +4631,7 @@ class FormuleAbonnement(db.Model):
                 if module_active != current_permission:
                     self.permissions_template[permission] = module_active
                     fixes_applied += 1
-                    print(f"  🔄 Permission: {permission} = {module_active}")
+                    logger.debug("  🔄 Permission: %s = %s", permission, module_active, extra=EN_BOUCLE)
         
         if fixes_applied > 0:
             self.updated_at = datetime.utcnow()
@@ -4981,7 +5161,7 @@ class FichierRapport(db.Model):
             try:
                 os.remove(self.chemin)
             except Exception as e:
-                print(f"Erreur suppression fichier physique {self.chemin}: {e}")
+                logger.error("Erreur suppression fichier physique %s: %s", self.chemin, e)
         
         # Supprimer l'entrée en base
         db.session.delete(self)
@@ -4998,3 +5178,673 @@ class FichierRapport(db.Model):
             # Pour les PDF, on pourrait utiliser un visualiseur PDF
             return f"/pdf-viewer?file={self.id}"
         return None
+
+
+# -------------------- TÂCHES PLANIFIÉES --------------------
+
+class VerrouTache(db.Model):
+    """Bail d'exécution partagé entre processus (planificateur, tâches) : voir services/taches.py"""
+    __tablename__ = 'verrous_taches'
+
+    nom = db.Column(db.String(100), primary_key=True)
+    detenteur = db.Column(db.String(150), nullable=False)
+    expire_le = db.Column(db.DateTime, nullable=False)
+    acquis_le = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'nom': self.nom,
+            'detenteur': self.detenteur,
+            'expire_le': self.expire_le.isoformat() if self.expire_le else None,
+            'acquis_le': self.acquis_le.isoformat() if self.acquis_le else None
+        }
+
+    def __repr__(self):
+        return f'<VerrouTache {self.nom} détenu par {self.detenteur}>'
+
+
+class ExecutionTache(db.Model):
+    """Historique des exécutions des tâches planifiées (durée, statut, erreur)"""
+    __tablename__ = 'executions_taches'
+
+    STATUT_SUCCES = 'succes'
+    STATUT_ECHEC = 'echec'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tache = db.Column(db.String(100), nullable=False, index=True)
+    detenteur = db.Column(db.String(150), nullable=False)
+    debut = db.Column(db.DateTime, nullable=False, index=True)
+    fin = db.Column(db.DateTime)
+    duree_ms = db.Column(db.Integer)
+    statut = db.Column(db.String(20), nullable=False)
+    erreur = db.Column(db.Text)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tache': self.tache,
+            'detenteur': self.detenteur,
+            'debut': self.debut.isoformat() if self.debut else None,
+            'fin': self.fin.isoformat() if self.fin else None,
+            'duree_ms': self.duree_ms,
+            'statut': self.statut,
+            'erreur': self.erreur
+        }
+
+    def __repr__(self):
+        return f'<ExecutionTache {self.tache} {self.statut}>'
+
+
+# -------------------- ÉVALUATION COURANTE DES RISQUES --------------------
+
+# Champs d'une évaluation qui changent l'évaluation courante ou ses résultats
+_CHAMPS_EVALUATION_COURANTE = ('risque_id', 'created_at', 'score_risque', 'niveau_risque')
+_A_EXPIRER = 'champs_denormalises_a_expirer'
+
+
+def rafraichir_evaluation_courante(connection, risque_id):
+    """Recalcule derniere_evaluation_id / score_actuel / niveau_actuel d'un risque sur `connection`"""
+    evaluations = EvaluationRisque.__table__
+    derniere = connection.execute(
+        db.select(evaluations.c.id, evaluations.c.score_risque, evaluations.c.niveau_risque)
+        .where(evaluations.c.risque_id == risque_id)
+        .order_by(evaluations.c.created_at.desc(), evaluations.c.id.desc())
+        .limit(1)
+    ).first()
+    connection.execute(
+        db.update(Risque.__table__).where(Risque.__table__.c.id == risque_id).values(
+            derniere_evaluation_id=derniere.id if derniere else None,
+            score_actuel=derniere.score_risque if derniere else None,
+            niveau_actuel=derniere.niveau_risque if derniere else None
+        )
+    )
+
+
+def recalculer_evaluations_courantes(connection, client_id=None) -> int:
+    """
+    Recalcule l'évaluation courante de tous les risques (ou de ceux d'un client)
+    en deux UPDATE ensemblistes : reprise des données existantes et rattrapage
+    après une suppression en masse (Query.delete() ne déclenche pas les événements).
+    """
+    risques = Risque.__table__
+    evaluations = EvaluationRisque.__table__
+    filtre = risques.c.client_id == client_id if client_id is not None else db.true()
+
+    derniere = (
+        db.select(evaluations.c.id)
+        .where(evaluations.c.risque_id == risques.c.id)
+        .order_by(evaluations.c.created_at.desc(), evaluations.c.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    resultat = connection.execute(db.update(risques).where(filtre).values(derniere_evaluation_id=derniere))
+
+    courante = evaluations.alias('courante')
+    def champ(colonne):
+        return (db.select(colonne).where(courante.c.id == risques.c.derniere_evaluation_id)
+                .scalar_subquery())
+    connection.execute(db.update(risques).where(filtre).values(
+        score_actuel=champ(courante.c.score_risque),
+        niveau_actuel=champ(courante.c.niveau_risque)
+    ))
+    return resultat.rowcount
+
+
+def _marquer_a_expirer(target, modele, ids):
+    """Note les lignes réécrites hors ORM pour les expirer en fin de flush"""
+    session = object_session(target)
+    if session is not None and ids:
+        session.info.setdefault(_A_EXPIRER, {}).setdefault(modele, set()).update(ids)
+
+
+def _rafraichir_risques(connection, target, risque_ids):
+    risque_ids.discard(None)
+    for risque_id in risque_ids:
+        rafraichir_evaluation_courante(connection, risque_id)
+    _marquer_a_expirer(target, Risque, risque_ids)
+
+
+@event.listens_for(EvaluationRisque, 'after_insert')
+@event.listens_for(EvaluationRisque, 'after_delete')
+def _evaluation_ajoutee_ou_supprimee(mapper, connection, target):
+    """Une évaluation créée ou supprimée change l'évaluation courante de son risque"""
+    _rafraichir_risques(connection, target, {target.risque_id})
+
+
+@event.listens_for(EvaluationRisque, 'after_update')
+def _evaluation_modifiee(mapper, connection, target):
+    """Confirmation / validation (score, niveau) ou rattachement à un autre risque"""
+    etat = db.inspect(target)
+    if not any(etat.attrs[champ].history.has_changes() for champ in _CHAMPS_EVALUATION_COURANTE):
+        return
+    _rafraichir_risques(connection, target, {target.risque_id, *etat.attrs.risque_id.history.deleted})
+
+
+# -------------------- DERNIÈRE MESURE DES KRI --------------------
+
+# Champs d'une mesure qui changent la dernière mesure ou sa valeur
+_CHAMPS_DERNIERE_MESURE = ('kri_id', 'date_mesure', 'valeur')
+# Champs d'un KRI dont dépend l'état d'alerte
+_CHAMPS_SEUILS_KRI = ('type_indicateur', 'sens_evaluation_seuil', 'seuil_alerte', 'seuil_critique')
+
+
+def rafraichir_derniere_mesure(connection, kri_id):
+    """Recalcule la dernière mesure d'un KRI et son état d'alerte sur `connection`"""
+    mesures = MesureKRI.__table__
+    kris = KRI.__table__
+    derniere = connection.execute(
+        db.select(mesures.c.id, mesures.c.valeur, mesures.c.date_mesure)
+        .where(mesures.c.kri_id == kri_id)
+        .order_by(mesures.c.date_mesure.desc(), mesures.c.id.desc())
+        .limit(1)
+    ).first()
+    seuils = connection.execute(
+        db.select(*(kris.c[champ] for champ in _CHAMPS_SEUILS_KRI)).where(kris.c.id == kri_id)
+    ).first()
+    if seuils is None:
+        return
+    valeur = derniere.valeur if derniere else None
+    connection.execute(
+        db.update(kris).where(kris.c.id == kri_id).values(
+            derniere_mesure_id=derniere.id if derniere else None,
+            derniere_valeur=valeur,
+            date_derniere_mesure=derniere.date_mesure if derniere else None,
+            etat_alerte=KRI.calculer_etat_alerte(*seuils, valeur)
+        )
+    )
+
+
+def recalculer_dernieres_mesures(connection, client_id=None) -> int:
+    """
+    Recalcule la dernière mesure et l'état d'alerte de tous les KRI (ou de ceux
+    d'un client) : un UPDATE ensembliste pour la mesure, puis l'état calculé
+    par KRI.calculer_etat_alerte pour rester identique à celui du flush.
+    """
+    kris = KRI.__table__
+    mesures = MesureKRI.__table__
+    filtre = kris.c.client_id == client_id if client_id is not None else db.true()
+
+    derniere = (
+        db.select(mesures.c.id)
+        .where(mesures.c.kri_id == kris.c.id)
+        .order_by(mesures.c.date_mesure.desc(), mesures.c.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    resultat = connection.execute(db.update(kris).where(filtre).values(derniere_mesure_id=derniere))
+
+    courante = mesures.alias('courante')
+    def champ(colonne):
+        return (db.select(colonne).where(courante.c.id == kris.c.derniere_mesure_id)
+                .scalar_subquery())
+    connection.execute(db.update(kris).where(filtre).values(
+        derniere_valeur=champ(courante.c.valeur),
+        date_derniere_mesure=champ(courante.c.date_mesure)
+    ))
+
+    lignes = connection.execute(
+        db.select(kris.c.id, *(kris.c[c] for c in _CHAMPS_SEUILS_KRI), kris.c.derniere_valeur).where(filtre)
+    ).all()
+    if lignes:
+        connection.execute(
+            db.update(kris).where(kris.c.id == db.bindparam('kri_id')).values(etat_alerte=db.bindparam('etat')),
+            [{'kri_id': ligne.id, 'etat': KRI.calculer_etat_alerte(*ligne[1:])} for ligne in lignes]
+        )
+    return resultat.rowcount
+
+
+def _rafraichir_kris(connection, target, kri_ids):
+    kri_ids.discard(None)
+    for kri_id in kri_ids:
+        rafraichir_derniere_mesure(connection, kri_id)
+    _marquer_a_expirer(target, KRI, kri_ids)
+
+
+@event.listens_for(MesureKRI, 'after_insert')
+@event.listens_for(MesureKRI, 'after_delete')
+def _mesure_ajoutee_ou_supprimee(mapper, connection, target):
+    """Une mesure créée ou supprimée change la dernière mesure de son KRI"""
+    _rafraichir_kris(connection, target, {target.kri_id})
+
+
+@event.listens_for(MesureKRI, 'after_update')
+def _mesure_modifiee(mapper, connection, target):
+    """Correction de la valeur / date d'une mesure ou rattachement à un autre KRI"""
+    etat = db.inspect(target)
+    if not any(etat.attrs[champ].history.has_changes() for champ in _CHAMPS_DERNIERE_MESURE):
+        return
+    _rafraichir_kris(connection, target, {target.kri_id, *etat.attrs.kri_id.history.deleted})
+
+
+@event.listens_for(KRI, 'before_update')
+def _seuils_kri_modifies(mapper, connection, target):
+    """Un changement de seuil ou de sens réévalue l'état de la dernière mesure connue"""
+    etat = db.inspect(target)
+    if any(etat.attrs[champ].history.has_changes() for champ in _CHAMPS_SEUILS_KRI):
+        target.etat_alerte = target.get_etat_alerte(target.derniere_valeur)
+
+
+# -------------------- COMPTEURS D'USAGE DES CLIENTS --------------------
+
+class CompteurUsageClient(db.Model):
+    """
+    Nombre d'utilisateurs actifs, de risques et d'audits non archivés, de
+    processus et de logigrammes d'un client, comparés aux limites de sa formule.
+    Tenu à jour dans la transaction de chaque création / archivage /
+    suppression (événements ci-dessous), réconcilié chaque nuit.
+    """
+    __tablename__ = 'compteurs_usage_client'
+
+    CATEGORIES = ('utilisateurs', 'risques', 'audits', 'processus', 'logigrammes')
+
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), primary_key=True)
+    utilisateurs = db.Column(db.Integer, nullable=False, default=0)
+    risques = db.Column(db.Integer, nullable=False, default=0)
+    audits = db.Column(db.Integer, nullable=False, default=0)
+    processus = db.Column(db.Integer, nullable=False, default=0)
+    logigrammes = db.Column(db.Integer, nullable=False, default=0)
+    recalcule_le = db.Column(db.DateTime)
+
+    @classmethod
+    def pour_client(cls, client_id):
+        """Compteurs du client (une lecture par clé primaire), créés au besoin"""
+        compteurs = db.session.get(cls, client_id)
+        if compteurs is None:
+            # Transaction propre : la ligne reste créée même si la requête ne commite pas
+            try:
+                with db.engine.begin() as connection:
+                    recalculer_compteurs_usage(connection, client_id)
+            except IntegrityError:
+                # Premier accès simultané : une autre requête a créé la ligne entre-temps
+                pass
+            compteurs = db.session.get(cls, client_id)
+        return compteurs
+
+    def valeur(self, categorie) -> int:
+        return getattr(self, categorie)
+
+
+# Modèle -> (compteur, champ qui exclut une ligne du décompte, valeur comptée) ;
+# mêmes critères que les anciens count() des vérifications de limites
+_REGLES_USAGE = {
+    User: ('utilisateurs', 'is_active', True),
+    Risque: ('risques', 'is_archived', False),
+    Audit: ('audits', 'is_archived', False),
+    Processus: ('processus', None, None),
+    ProcessusActivite: ('logigrammes', None, None),
+}
+_INCONNU = object()
+
+
+def _condition_usage(modele):
+    _, champ, valeur = _REGLES_USAGE[modele]
+    return modele.__table__.c[champ] == valeur if champ else db.true()
+
+
+def recalculer_compteurs_usage(connection, client_id=None) -> int:
+    """
+    Recompte les compteurs d'usage de tous les clients (ou d'un seul) et crée
+    les lignes manquantes. Rattrape les écritures qui ne passent pas par les
+    événements (Query.update() / delete(), SQL direct). Retourne le nombre de
+    clients dont au moins un compteur était faux.
+    """
+    clients = Client.__table__
+    compteurs = CompteurUsageClient.__table__
+    filtre_client = clients.c.id == client_id if client_id is not None else db.true()
+    client_ids = connection.execute(db.select(clients.c.id).where(filtre_client)).scalars().all()
+
+    comptes = {}
+    for modele, (categorie, _, _) in _REGLES_USAGE.items():
+        table = modele.__table__
+        requete = (db.select(table.c.client_id, db.func.count())
+                   .where(_condition_usage(modele), table.c.client_id.isnot(None))
+                   .group_by(table.c.client_id))
+        if client_id is not None:
+            requete = requete.where(table.c.client_id == client_id)
+        comptes[categorie] = dict(connection.execute(requete).all())
+
+    filtre_compteurs = compteurs.c.client_id == client_id if client_id is not None else db.true()
+    existants = {ligne.client_id: ligne for ligne in connection.execute(db.select(compteurs).where(filtre_compteurs))}
+
+    maintenant = datetime.utcnow()
+    corrections = 0
+    for identifiant in client_ids:
+        valeurs = {categorie: comptes[categorie].get(identifiant, 0) for categorie in CompteurUsageClient.CATEGORIES}
+        ligne = existants.get(identifiant)
+        if ligne is None:
+            connection.execute(db.insert(compteurs).values(client_id=identifiant, recalcule_le=maintenant, **valeurs))
+            continue
+        if any(getattr(ligne, categorie) != valeur for categorie, valeur in valeurs.items()):
+            corrections += 1
+            logger.warning("🔧 Compteurs d'usage du client %s corrigés : %s -> %s", identifiant,
+                           {categorie: getattr(ligne, categorie) for categorie in valeurs}, valeurs)
+        connection.execute(db.update(compteurs).where(compteurs.c.client_id == identifiant)
+                           .values(recalcule_le=maintenant, **valeurs))
+    return corrections
+
+
+def _recompter(connection, target, modele, client_id):
+    """Recompte une catégorie d'un client quand l'état d'avant l'écriture est inconnu"""
+    if client_id is None:
+        return
+    categorie = _REGLES_USAGE[modele][0]
+    table = modele.__table__
+    compteurs = CompteurUsageClient.__table__
+    total = (db.select(db.func.count()).select_from(table)
+             .where(table.c.client_id == client_id, _condition_usage(modele)).scalar_subquery())
+    resultat = connection.execute(db.update(compteurs).where(compteurs.c.client_id == client_id)
+                                  .values({categorie: total}))
+    if resultat.rowcount == 0:
+        recalculer_compteurs_usage(connection, client_id)
+    _marquer_a_expirer(target, CompteurUsageClient, {client_id})
+
+
+def _ajuster_compteur(connection, target, modele, client_id, delta):
+    if client_id is None or not delta:
+        return
+    categorie = _REGLES_USAGE[modele][0]
+    compteurs = CompteurUsageClient.__table__
+    resultat = connection.execute(db.update(compteurs).where(compteurs.c.client_id == client_id)
+                                  .values({categorie: compteurs.c[categorie] + delta}))
+    if resultat.rowcount == 0:
+        # Ligne absente (client antérieur à la table) : créée à partir des lignes réelles
+        recalculer_compteurs_usage(connection, client_id)
+    _marquer_a_expirer(target, CompteurUsageClient, {client_id})
+
+
+def _compte(modele, valeur) -> bool:
+    _, champ, attendue = _REGLES_USAGE[modele]
+    return champ is None or valeur == attendue
+
+
+def _avant_apres(etat, attribut):
+    """(valeur avant le flush, valeur après) ; avant = _INCONNU si l'ancienne valeur n'était pas chargée"""
+    historique = etat.attrs[attribut].history
+    if not historique.has_changes():
+        valeur = etat.attrs[attribut].value
+        return valeur, valeur
+    apres = historique.added[0] if historique.added else None
+    return (historique.deleted[0] if historique.deleted else _INCONNU), apres
+
+
+@event.listens_for(Client, 'after_insert')
+def _creer_compteurs_usage(mapper, connection, target):
+    connection.execute(db.insert(CompteurUsageClient.__table__).values(
+        client_id=target.id, recalcule_le=datetime.utcnow(),
+        **{categorie: 0 for categorie in CompteurUsageClient.CATEGORIES}
+    ))
+
+
+@event.listens_for(Client, 'before_delete')
+def _supprimer_compteurs_usage(mapper, connection, target):
+    compteurs = CompteurUsageClient.__table__
+    connection.execute(db.delete(compteurs).where(compteurs.c.client_id == target.id))
+
+
+def _ligne_ajoutee(mapper, connection, target):
+    """Une ligne créée dans le décompte incrémente le compteur de son client"""
+    modele = mapper.class_
+    champ = _REGLES_USAGE[modele][1]
+    if _compte(modele, getattr(target, champ) if champ else None):
+        _ajuster_compteur(connection, target, modele, target.client_id, 1)
+
+
+def _ligne_supprimee(mapper, connection, target):
+    """Une ligne supprimée qui était décomptée décrémente le compteur de son client"""
+    modele = mapper.class_
+    etat = db.inspect(target)
+    champ = _REGLES_USAGE[modele][1]
+    client_id, _ = _avant_apres(etat, 'client_id')
+    valeur, _ = _avant_apres(etat, champ) if champ else (None, None)
+    if _INCONNU in (client_id, valeur):
+        _recompter(connection, target, modele, target.client_id)
+    elif _compte(modele, valeur):
+        _ajuster_compteur(connection, target, modele, client_id, -1)
+
+
+def _ligne_modifiee(mapper, connection, target):
+    """Archivage, désactivation, réactivation ou changement de client"""
+    modele = mapper.class_
+    etat = db.inspect(target)
+    champ = _REGLES_USAGE[modele][1]
+    attributs = ('client_id', champ) if champ else ('client_id',)
+    if not any(etat.attrs[attribut].history.has_changes() for attribut in attributs):
+        return
+
+    client_avant, client_apres = _avant_apres(etat, 'client_id')
+    valeur_avant, valeur_apres = _avant_apres(etat, champ) if champ else (None, None)
+    if _INCONNU in (client_avant, valeur_avant):
+        _recompter(connection, target, modele, client_apres)
+        return
+
+    compte_avant, compte_apres = _compte(modele, valeur_avant), _compte(modele, valeur_apres)
+    if client_avant == client_apres:
+        _ajuster_compteur(connection, target, modele, client_apres, compte_apres - compte_avant)
+        return
+    if compte_avant:
+        _ajuster_compteur(connection, target, modele, client_avant, -1)
+    if compte_apres:
+        _ajuster_compteur(connection, target, modele, client_apres, 1)
+
+
+for _modele in _REGLES_USAGE:
+    event.listen(_modele, 'after_insert', _ligne_ajoutee)
+    event.listen(_modele, 'after_delete', _ligne_supprimee)
+    event.listen(_modele, 'after_update', _ligne_modifiee)
+
+
+# -------------------- EXPIRATION DES CHAMPS DÉNORMALISÉS --------------------
+
+# Attributs réécrits par les UPDATE ci-dessus, à relire par les objets de la session
+_CHAMPS_DENORMALISES = {
+    Risque: ('derniere_evaluation_id', 'score_actuel', 'niveau_actuel', 'evaluation_courante'),
+    KRI: ('derniere_mesure_id', 'derniere_valeur', 'date_derniere_mesure', 'etat_alerte', 'derniere_mesure'),
+    CompteurUsageClient: CompteurUsageClient.CATEGORIES + ('recalcule_le',),
+}
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expirer_champs_denormalises(session, flush_context):
+    """Les objets chargés dans la session relisent les valeurs écrites hors ORM pendant le flush"""
+    a_expirer = session.info.pop(_A_EXPIRER, None)
+    if not a_expirer:
+        return
+    for modele, ids in a_expirer.items():
+        mapper = db.inspect(modele)
+        for identifiant in ids:
+            objet = session.identity_map.get(mapper.identity_key_from_primary_key((identifiant,)))
+            if objet is not None:
+                session.expire(objet, list(_CHAMPS_DENORMALISES[modele]))
+
+
+# -------------------- INVALIDATION DES PERMISSIONS COMPILÉES --------------------
+
+@event.listens_for(User.permissions, 'set')
+@event.listens_for(User.role, 'set')
+@event.listens_for(User.is_client_admin, 'set')
+@event.listens_for(User.client_id, 'set')
+def _invalider_permissions_sur_modification(target, value, oldvalue, initiator):
+    """Une modification en mémoire des champs de permission invalide la compilation"""
+    target.invalider_permissions()
+
+
+@event.listens_for(User, 'expire')
+def _invalider_permissions_sur_expiration(target, attrs):
+    """Après un commit / refresh, les permissions sont recompilées à la prochaine vérification"""
+    target.invalider_permissions()
+
+
+@event.listens_for(Client, 'after_insert')
+@event.listens_for(Client, 'after_update')
+@event.listens_for(Client, 'after_delete')
+@event.listens_for(FormuleAbonnement, 'after_insert')
+@event.listens_for(FormuleAbonnement, 'after_update')
+@event.listens_for(FormuleAbonnement, 'after_delete')
+def _incrementer_generation_permissions(mapper, connection, target):
+    """Un client ou une formule modifié périme toutes les permissions compilées du processus"""
+    _GENERATION_PERMISSIONS[0] += 1
+
+
+@event.listens_for(FormuleAbonnement, 'after_insert')
+@event.listens_for(FormuleAbonnement, 'after_update')
+@event.listens_for(FormuleAbonnement, 'after_delete')
+def _vider_cache_formules_superieures(mapper, connection, target):
+    """Une formule créée / modifiée / supprimée change les offres d'upgrade"""
+    _CACHE_FORMULES_SUPERIEURES.clear()
+
+
+# -------------------- INVALIDATION DU CACHE DES SOUS-DOMAINES --------------------
+
+# Champs qui changent la résolution hôte -> client (services/sous_domaines.py)
+_CHAMPS_ROUTAGE = {
+    Client: ('reference', 'domaine'),
+    EnvironnementClient: ('sous_domaine', 'statut', 'client_id'),
+}
+_SOUS_DOMAINES_MODIFIES = 'sous_domaines_modifies'
+
+
+def _marquer_sous_domaines_modifies(target):
+    vider_cache_sous_domaines()
+    session = object_session(target)
+    if session is not None:
+        session.info[_SOUS_DOMAINES_MODIFIES] = True
+
+
+@event.listens_for(Client, 'after_insert')
+@event.listens_for(Client, 'after_delete')
+@event.listens_for(EnvironnementClient, 'after_insert')
+@event.listens_for(EnvironnementClient, 'after_delete')
+def _client_ou_environnement_ajoute_ou_supprime(mapper, connection, target):
+    """Un client ou un environnement créé / supprimé vide le cache des hôtes"""
+    _marquer_sous_domaines_modifies(target)
+
+
+@event.listens_for(Client, 'after_update')
+@event.listens_for(EnvironnementClient, 'after_update')
+def _routage_modifie(mapper, connection, target):
+    """Seuls les champs de routage comptent : les compteurs du client changent souvent"""
+    etat = db.inspect(target)
+    if any(etat.attrs[champ].history.has_changes() for champ in _CHAMPS_ROUTAGE[mapper.class_]):
+        _marquer_sous_domaines_modifies(target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _vider_cache_sous_domaines_au_commit(session):
+    """Seconde purge : une résolution relue entre le flush et le commit est écartée"""
+    if session.info.pop(_SOUS_DOMAINES_MODIFIES, False):
+        vider_cache_sous_domaines()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_sous_domaines_modifies(session):
+    session.info.pop(_SOUS_DOMAINES_MODIFIES, None)
+
+
+# -------------------- INVALIDATION DU TABLEAU DE BORD --------------------
+
+# Écritures qui changent les indicateurs du tableau de bord (services/tableau_de_bord.py)
+_MODELES_TABLEAU_DE_BORD = (
+    Risque, EvaluationRisque, KRI, MesureKRI, VeilleReglementaire, ActionConformite,
+    Cartographie, Processus, ProcessusActivite,
+)
+_TABLEAUX_DE_BORD_MODIFIES = 'tableaux_de_bord_modifies'
+
+
+def _invalider_tableau_de_bord(mapper, connection, target):
+    """Une écriture périme le tableau de bord de son client (et celui du super admin)"""
+    invalider_tableau_de_bord(target.client_id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_TABLEAUX_DE_BORD_MODIFIES, set()).add(target.client_id)
+
+
+for _modele in _MODELES_TABLEAU_DE_BORD:
+    event.listen(_modele, 'after_insert', _invalider_tableau_de_bord)
+    event.listen(_modele, 'after_update', _invalider_tableau_de_bord)
+    event.listen(_modele, 'after_delete', _invalider_tableau_de_bord)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalider_tableaux_de_bord_au_commit(session):
+    """Seconde invalidation : un calcul fait entre le flush et le commit est écarté"""
+    for client_id in session.info.pop(_TABLEAUX_DE_BORD_MODIFIES, ()):
+        invalider_tableau_de_bord(client_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_tableaux_de_bord_modifies(session):
+    session.info.pop(_TABLEAUX_DE_BORD_MODIFIES, None)
+
+
+# -------------------- INVALIDATION DU CACHE APPLICATIF --------------------
+
+# Portées versionnées de services/cache.py touchées par la transaction : {(portée, id)}
+_PORTEES_CACHE_MODIFIEES = 'portees_cache_modifiees'
+
+
+def _valeurs_actuelle_et_ancienne(target, champ):
+    historique = db.inspect(target).attrs[champ].history
+    return {valeur for valeur in (getattr(target, champ), *historique.deleted) if valeur is not None}
+
+
+def _cartographie_du_risque(connection, evaluation):
+    risque = db.inspect(evaluation).attrs.risque.loaded_value
+    if risque is not None and risque is not NO_VALUE:
+        return risque.cartographie_id
+    return connection.execute(
+        db.select(Risque.cartographie_id).where(Risque.id == evaluation.risque_id)
+    ).scalar()
+
+
+def _portees_cache(connection, target):
+    if isinstance(target, Cartographie):
+        return {('cartographie', target.id)}
+    if isinstance(target, Risque):
+        return {('cartographie', i) for i in _valeurs_actuelle_et_ancienne(target, 'cartographie_id')}
+    if isinstance(target, CampagneEvaluation):
+        return {('campagne', target.id), ('cartographie', target.cartographie_id)}
+    portees = {('campagne', i) for i in _valeurs_actuelle_et_ancienne(target, 'campagne_id')}
+    portees.add(('cartographie', _cartographie_du_risque(connection, target)))
+    return portees
+
+
+def _nouvelle_version_portee(portee, identifiant):
+    if identifiant is None:
+        return
+    if portee == 'cartographie':
+        cache_applicatif.invalider_cartographie(identifiant)
+    else:
+        cache_applicatif.invalider_campagne(identifiant)
+
+
+@event.listens_for(Cartographie, 'after_insert')
+@event.listens_for(Cartographie, 'after_update')
+@event.listens_for(Cartographie, 'after_delete')
+@event.listens_for(Risque, 'after_insert')
+@event.listens_for(Risque, 'after_update')
+@event.listens_for(Risque, 'after_delete')
+@event.listens_for(EvaluationRisque, 'after_insert')
+@event.listens_for(EvaluationRisque, 'after_update')
+@event.listens_for(EvaluationRisque, 'after_delete')
+@event.listens_for(CampagneEvaluation, 'after_update')
+@event.listens_for(CampagneEvaluation, 'after_delete')
+def _invalider_cache_applicatif(mapper, connection, target):
+    """Périme matrices et statistiques de la cartographie / campagne écrite"""
+    portees = _portees_cache(connection, target)
+    for portee, identifiant in portees:
+        _nouvelle_version_portee(portee, identifiant)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PORTEES_CACHE_MODIFIEES, set()).update(portees)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalider_cache_applicatif_au_commit(session):
+    """Seconde version : un calcul fait entre le flush et le commit est écarté"""
+    for portee, identifiant in session.info.pop(_PORTEES_CACHE_MODIFIEES, ()):
+        _nouvelle_version_portee(portee, identifiant)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_portees_cache_modifiees(session):
+    session.info.pop(_PORTEES_CACHE_MODIFIEES, None)
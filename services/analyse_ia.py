@@ -5,17 +5,27 @@ import time
 from datetime import datetime
 from typing import Optional, Dict, Any
 
+from services.demarrage import SondeSante
+
+# Sonde de connexion OpenAI : résultat gardé 10 min, premier test attendu au plus 12 s
+TTL_SONDE_OPENAI = 600
+DELAI_PREMIERE_SONDE = 12
+
+
 class ServiceAnalyseIA:
     def __init__(self):
-        """Initialiser le service IA avec la nouvelle API OpenAI"""
+        """Initialiser le service IA avec la nouvelle API OpenAI
+
+        Aucun appel réseau ici : le client OpenAI est créé et la connexion testée
+        par une sonde en arrière-plan, au premier usage du service.
+        """
         
         # Récupérer la clé depuis l'environnement
         self.api_key = os.environ.get("OPENAI_API_KEY")
         
-        # Déterminer le mode de fonctionnement
-        self.mode_simulation = True  # Par défaut en simulation
         self.client = None
         self.quota_error = False
+        self._sonde = None
         
         print(f"\n🔍 INITIALISATION SERVICE IA")
         print(f"   Clé API: {'✅ Présente' if self.api_key else '❌ Absente'}")
@@ -29,34 +39,44 @@ class ServiceAnalyseIA:
             print(f"   ⚠️ Format clé invalide (doit commencer par 'sk-')")
             return
         
-        # Initialiser OpenAI
-        try:
-            from openai import OpenAI
-            self.client = OpenAI(api_key=self.api_key)
-            print("   ✅ Client OpenAI initialisé")
-            
-            # Tester la connexion
-            if self._tester_connexion():
-                self.mode_simulation = False
-                print("   ✅ Mode réel activé")
-            else:
-                print("   🔧 Mode simulation activé (test échoué)")
-                
-        except ImportError:
-            print("   ⚠️ Package OpenAI non installé")
-            print("      pip install openai")
-        except Exception as e:
-            print(f"   ⚠️ Erreur: {e}")
+        self._sonde = SondeSante('openai', self._tester_connexion, ttl=TTL_SONDE_OPENAI)
+    
+    @property
+    def mode_simulation(self):
+        """Simulation tant que la connexion OpenAI n'est pas vérifiée
+
+        Le premier accès lance la sonde et attend au plus DELAI_PREMIERE_SONDE secondes ;
+        ensuite le résultat en cache est rafraîchi en arrière-plan.
+        """
+        if self._sonde is None:
+            return True
+        return not self._sonde.resultat(attendre=DELAI_PREMIERE_SONDE)
+    
+    def lancer_sonde(self):
+        """Démarre le test de connexion en arrière-plan (sans attendre son résultat)"""
+        if self._sonde is not None:
+            self._sonde.lancer()
     
     def _tester_connexion(self):
-        """Tester la connexion à l'API - retourne True si succès"""
+        """Créer le client OpenAI et tester la connexion à l'API - retourne True si succès"""
         if not self.client:
-            return False
-        
+            try:
+                from openai import OpenAI
+                self.client = OpenAI(api_key=self.api_key)
+                print("   ✅ Client OpenAI initialisé")
+            except ImportError:
+                print("   ⚠️ Package OpenAI non installé")
+                print("      pip install openai")
+                return False
+            except Exception as e:
+                print(f"   ⚠️ Erreur: {e}")
+                return False
+
         try:
             # Test très basique pour vérifier l'authentification
             response = self.client.models.list(timeout=10.0)
             print(f"   ✅ Connexion API OK - {len(response.data)} modèles disponibles")
+            self.quota_error = False
             return True
             
         except Exception as e:
@@ -5,12 +5,12 @@ import os
 import json
 from typing import Optional, Dict, Any
 
-try:
-    import openai
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+from services.dependances import module_differe, dependance_disponible
+
+# Importé au premier appel à l'API (services/dependances.py)
+openai = module_differe('openai')
+OPENAI_AVAILABLE = dependance_disponible('openai')
+if not OPENAI_AVAILABLE:
     print("⚠️ OpenAI non disponible")
 
 class APIIntegration:
@@ -40,7 +40,7 @@ class APIIntegration:
                 print("❌ Clé API OpenAI manquante")
                 return None
             
-            client = OpenAI(api_key=api_key)
+            client = openai.OpenAI(api_key=api_key)
             
             # Construire le prompt
             prompt = f"""
@@ -0,0 +1,417 @@
+# services/cache.py
+"""
+Cache applicatif des calculs coûteux (statistiques de cartographie, /api/cartographie/<id>/stats,
+indicateurs du tableau de bord)
+
+Les matrices n'y passent plus : SVG rendu à la volée à l'écran, PNG dans le
+magasin adressé par contenu (services/cache_matrices.py).
+
+Trois backends interchangeables, choisis par CACHE_TYPE (mêmes valeurs que
+Flask-Caching, déjà présentes dans config.py) :
+    - 'simple' / 'memoire'   : LRU en mémoire du processus (CACHE_MAX_ENTREES) ;
+    - 'filesystem' / 'disque': fichiers pickle dans CACHE_DIR, partagés par les
+      workers d'une même machine ;
+    - 'redis'                : CACHE_REDIS_URL (REDIS_URL), partagé par tous les
+      workers. Sans le package redis ou sans serveur joignable, repli sur la
+      mémoire.
+
+Clés : egalyx:<espace>:c<client>.<version>:k<cartographie>.<version>:p<campagne>.<version>:<clé>
+Chaque portée (client, cartographie, campagne) a une version gardée dans le
+backend. Invalider une portée, c'est lui donner une nouvelle version : les
+entrées existantes ne sont plus jamais relues et sortent par LRU ou TTL. Avec
+Redis, une invalidation faite par un worker vaut donc pour tous.
+
+Points d'entrée de l'invalidation : utils.invalider_cache_cartographie() et
+utils.invalider_cache_matrices(), appelés aussi par les événements de models.py
+sur les risques, évaluations, cartographies et campagnes.
+
+Le cache ne doit jamais casser une page : une erreur du backend est journalisée,
+comptée, et le calcul est fait sans cache. Les valeurs lues depuis le backend
+mémoire sont partagées entre requêtes et ne doivent pas être modifiées.
+
+Métriques par espace (statistiques() / format_prometheus()) : succès, défauts,
+écritures, erreurs ; invalidations par portée.
+"""
+
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+
+from services.dependances import dependance_disponible
+from services.journalisation import obtenir_logger
+
+logger = obtenir_logger('cache')
+
+PREFIXE = 'egalyx'
+PREFIXE_PROMETHEUS = 'egalyx'
+TTL_DEFAUT = 300
+MAX_ENTREES_DEFAUT = 2000
+PORTEES = ('client', 'cartographie', 'campagne')
+_LETTRES_PORTEES = {'client': 'c', 'cartographie': 'k', 'campagne': 'p'}
+
+# Marqueur d'absence (None est une valeur qui peut être mise en cache)
+ABSENT = object()
+
+
+# ========================
+# BACKENDS
+# ========================
+
+class CacheMemoire:
+    """LRU borné en mémoire du processus, avec expiration par entrée"""
+
+    nom = 'memoire'
+
+    def __init__(self, max_entrees=MAX_ENTREES_DEFAUT):
+        self.max_entrees = max_entrees
+        self._entrees = OrderedDict()  # clé -> (expiration, valeur)
+        # Hors LRU : évincer une version ferait revivre des entrées périmées
+        self._versions = {}
+        self._verrou = threading.Lock()
+
+    def lire(self, cle):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return ABSENT
+            if entree[0] <= time.monotonic():
+                del self._entrees[cle]
+                return ABSENT
+            self._entrees.move_to_end(cle)
+            return entree[1]
+
+    def ecrire(self, cle, valeur, ttl):
+        with self._verrou:
+            self._entrees[cle] = (time.monotonic() + ttl, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.max_entrees:
+                self._entrees.popitem(last=False)
+
+    def supprimer(self, cle):
+        with self._verrou:
+            self._entrees.pop(cle, None)
+
+    def lire_versions(self, noms):
+        with self._verrou:
+            return [self._versions.get(nom) for nom in noms]
+
+    def ecrire_version(self, nom, version):
+        with self._verrou:
+            self._versions[nom] = version
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self._versions.clear()
+
+    def taille(self):
+        return len(self._entrees)
+
+
+class CacheDisque:
+    """Un fichier pickle par clé dans `repertoire` (écriture atomique par os.replace)"""
+
+    nom = 'disque'
+    PURGE_TOUTES_LES = 200  # écritures
+
+    def __init__(self, repertoire, max_entrees=MAX_ENTREES_DEFAUT):
+        self.repertoire = repertoire
+        self.max_entrees = max_entrees
+        self._ecritures = 0
+        os.makedirs(os.path.join(repertoire, 'versions'), exist_ok=True)
+
+    def _chemin(self, cle):
+        return os.path.join(self.repertoire, hashlib.sha1(cle.encode('utf-8')).hexdigest() + '.pkl')
+
+    def _chemin_version(self, nom):
+        return os.path.join(self.repertoire, 'versions', nom.replace(':', '_'))
+
+    @staticmethod
+    def _ecrire_fichier(chemin, contenu: bytes):
+        temporaire = f'{chemin}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporaire, 'wb') as f:
+            f.write(contenu)
+        os.replace(temporaire, chemin)
+
+    def lire(self, cle):
+        try:
+            with open(self._chemin(cle), 'rb') as f:
+                expiration, cle_stockee, valeur = pickle.load(f)
+        except FileNotFoundError:
+            return ABSENT
+        if expiration <= time.time() or cle_stockee != cle:
+            return ABSENT
+        return valeur
+
+    def ecrire(self, cle, valeur, ttl):
+        contenu = pickle.dumps((time.time() + ttl, cle, valeur), protocol=pickle.HIGHEST_PROTOCOL)
+        self._ecrire_fichier(self._chemin(cle), contenu)
+        self._ecritures += 1
+        if self._ecritures % self.PURGE_TOUTES_LES == 0:
+            self.purger()
+
+    def supprimer(self, cle):
+        try:
+            os.remove(self._chemin(cle))
+        except FileNotFoundError:
+            pass
+
+    def lire_versions(self, noms):
+        versions = []
+        for nom in noms:
+            try:
+                with open(self._chemin_version(nom), 'r', encoding='utf-8') as f:
+                    versions.append(f.read() or None)
+            except FileNotFoundError:
+                versions.append(None)
+        return versions
+
+    def ecrire_version(self, nom, version):
+        self._ecrire_fichier(self._chemin_version(nom), version.encode('utf-8'))
+
+    def _fichiers(self):
+        with os.scandir(self.repertoire) as entrees:
+            return [e for e in entrees if e.is_file() and e.name.endswith('.pkl')]
+
+    def purger(self):
+        """Supprime les entrées expirées, puis les plus anciennes au-delà de max_entrees"""
+        maintenant = time.time()
+        restants = []
+        for fichier in self._fichiers():
+            try:
+                with open(fichier.path, 'rb') as f:
+                    expiration = pickle.load(f)[0]
+                if expiration <= maintenant:
+                    os.remove(fichier.path)
+                else:
+                    restants.append((fichier.stat().st_mtime, fichier.path))
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+        restants.sort()
+        for _, chemin in restants[:max(0, len(restants) - self.max_entrees)]:
+            try:
+                os.remove(chemin)
+            except OSError:
+                pass
+
+    def vider(self):
+        for fichier in self._fichiers():
+            try:
+                os.remove(fichier.path)
+            except OSError:
+                pass
+
+    def taille(self):
+        return len(self._fichiers())
+
+
+class CacheRedis:
+    """Redis partagé par tous les workers (valeurs pickle, SETEX)"""
+
+    nom = 'redis'
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._redis.ping()
+
+    def lire(self, cle):
+        contenu = self._redis.get(cle)
+        return ABSENT if contenu is None else pickle.loads(contenu)
+
+    def ecrire(self, cle, valeur, ttl):
+        self._redis.setex(cle, int(ttl), pickle.dumps(valeur, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def supprimer(self, cle):
+        self._redis.delete(cle)
+
+    def lire_versions(self, noms):
+        return [v.decode('utf-8') if v is not None else None for v in self._redis.mget(noms)]
+
+    def ecrire_version(self, nom, version):
+        self._redis.set(nom, version)
+
+    def vider(self):
+        for cle in self._redis.scan_iter(f'{PREFIXE}:*'):
+            self._redis.delete(cle)
+
+    def taille(self):
+        return sum(1 for _ in self._redis.scan_iter(f'{PREFIXE}:*'))
+
+
+# ========================
+# CACHE APPLICATIF
+# ========================
+
+class StatistiquesEspace:
+    """Compteurs d'un espace de clés"""
+
+    __slots__ = ('succes', 'defauts', 'ecritures', 'erreurs')
+
+    def __init__(self):
+        self.succes = 0
+        self.defauts = 0
+        self.ecritures = 0
+        self.erreurs = 0
+
+
+class CacheApplicatif:
+    """Clés versionnées par client / cartographie / campagne devant un backend interchangeable"""
+
+    def __init__(self, backend=None, ttl_defaut=TTL_DEFAUT):
+        self.backend = backend or CacheMemoire()
+        self.ttl_defaut = ttl_defaut
+        self._verrou = threading.Lock()
+        self._espaces = defaultdict(StatistiquesEspace)
+        self._invalidations = defaultdict(int)
+
+    def configurer(self, app):
+        """Choisit le backend d'après CACHE_TYPE (appelé une fois au démarrage)"""
+        type_cache = (app.config.get('CACHE_TYPE') or 'simple').lower()
+        max_entrees = app.config.get('CACHE_MAX_ENTREES', MAX_ENTREES_DEFAUT)
+        self.ttl_defaut = app.config.get('CACHE_DEFAULT_TIMEOUT', TTL_DEFAUT)
+
+        backend = None
+        if type_cache == 'redis':
+            url = app.config.get('CACHE_REDIS_URL') or app.config.get('REDIS_URL')
+            if not url or not dependance_disponible('redis'):
+                logger.warning("⚠️ Cache Redis demandé sans URL ou sans package redis, cache en mémoire")
+            else:
+                try:
+                    backend = CacheRedis(url)
+                except Exception as e:
+                    logger.warning("⚠️ Redis injoignable (%s), cache en mémoire", e)
+        elif type_cache in ('filesystem', 'disque'):
+            repertoire = app.config.get('CACHE_DIR') or os.path.join(app.instance_path, 'cache')
+            backend = CacheDisque(repertoire, max_entrees)
+
+        self.backend = backend or CacheMemoire(max_entrees)
+        logger.info("🗄️ Cache applicatif : %s (TTL %ss)", self.backend.nom, self.ttl_defaut)
+        return self.backend
+
+    # ---------- clés ----------
+
+    @staticmethod
+    def _nom_version(portee, identifiant):
+        return f'{PREFIXE}:version:{portee}:{identifiant}'
+
+    def cle(self, espace, cle, client_id=None, cartographie_id=None, campagne_id=None) -> str:
+        """Clé complète : espace, portées avec leur version courante, puis la clé de l'appelant"""
+        portees = [(nom, identifiant) for nom, identifiant in zip(PORTEES, (client_id, cartographie_id, campagne_id))
+                   if identifiant is not None]
+        versions = self.backend.lire_versions([self._nom_version(nom, i) for nom, i in portees]) if portees else []
+        segments = [f'{_LETTRES_PORTEES[nom]}{identifiant}.{version or 0}'
+                    for (nom, identifiant), version in zip(portees, versions)]
+        return ':'.join([PREFIXE, espace, *segments, str(cle)])
+
+    # ---------- lecture / écriture ----------
+
+    def obtenir(self, espace, cle, calcul, client_id=None, cartographie_id=None, campagne_id=None, ttl=None):
+        """Valeur en cache, sinon calcul() mis en cache pour ttl secondes"""
+        statistiques = self._espaces[espace]
+        try:
+            cle_complete = self.cle(espace, cle, client_id, cartographie_id, campagne_id)
+            valeur = self.backend.lire(cle_complete)
+        except Exception as e:
+            statistiques.erreurs += 1
+            logger.warning("⚠️ Lecture du cache %s impossible : %s", espace, e)
+            return calcul()
+
+        if valeur is not ABSENT:
+            statistiques.succes += 1
+            return valeur
+
+        statistiques.defauts += 1
+        valeur = calcul()
+        try:
+            self.backend.ecrire(cle_complete, valeur, ttl or self.ttl_defaut)
+            statistiques.ecritures += 1
+        except Exception as e:
+            statistiques.erreurs += 1
+            logger.warning("⚠️ Écriture du cache %s impossible : %s", espace, e)
+        return valeur
+
+    # ---------- invalidation ----------
+
+    def _nouvelle_version(self, portee, identifiant):
+        if identifiant is None:
+            return
+        try:
+            self.backend.ecrire_version(self._nom_version(portee, identifiant), str(time.time_ns()))
+        except Exception as e:
+            logger.warning("⚠️ Invalidation du cache %s %s impossible : %s", portee, identifiant, e)
+            return
+        with self._verrou:
+            self._invalidations[portee] += 1
+
+    def derniere_invalidation(self, portee, identifiant):
+        """Instant (time.time()) de la dernière invalidation d'une portée, None si jamais invalidée"""
+        try:
+            version = self.backend.lire_versions([self._nom_version(portee, identifiant)])[0]
+        except Exception as e:
+            logger.warning("⚠️ Lecture de la version %s %s impossible : %s", portee, identifiant, e)
+            return None
+        # Les versions sont des instants en nanosecondes (_nouvelle_version)
+        return int(version) / 1e9 if version else None
+
+    def invalider_client(self, client_id):
+        self._nouvelle_version('client', client_id)
+
+    def invalider_cartographie(self, cartographie_id):
+        self._nouvelle_version('cartographie', cartographie_id)
+
+    def invalider_campagne(self, campagne_id):
+        self._nouvelle_version('campagne', campagne_id)
+
+    def vider(self):
+        self.backend.vider()
+
+    # ---------- métriques ----------
+
+    def statistiques(self) -> dict:
+        with self._verrou:
+            espaces = {
+                espace: {
+                    'succes': s.succes,
+                    'defauts': s.defauts,
+                    'ecritures': s.ecritures,
+                    'erreurs': s.erreurs,
+                    'taux_succes': round(s.succes / ((s.succes + s.defauts) or 1), 3),
+                }
+                for espace, s in sorted(self._espaces.items())
+            }
+            invalidations = dict(self._invalidations)
+        return {'backend': self.backend.nom, 'ttl_defaut': self.ttl_defaut,
+                'espaces': espaces, 'invalidations': invalidations}
+
+    def format_prometheus(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4 (même convention que services/metriques.py)"""
+        series = {
+            'cache_succes_total': ('Lectures servies par le cache', 'succes'),
+            'cache_defauts_total': ('Lectures absentes du cache (calcul effectué)', 'defauts'),
+            'cache_ecritures_total': ('Valeurs écrites dans le cache', 'ecritures'),
+            'cache_erreurs_total': ('Erreurs du backend de cache', 'erreurs'),
+        }
+        sortie = []
+        with self._verrou:
+            elements = sorted(self._espaces.items())
+            for nom, (aide, attribut) in series.items():
+                sortie.append(f'# HELP {PREFIXE_PROMETHEUS}_{nom} {aide}')
+                sortie.append(f'# TYPE {PREFIXE_PROMETHEUS}_{nom} counter')
+                for espace, s in elements:
+                    sortie.append(f'{PREFIXE_PROMETHEUS}_{nom}{{espace="{espace}",backend="{self.backend.nom}"}} '
+                                  f'{getattr(s, attribut)}')
+            sortie.append(f'# HELP {PREFIXE_PROMETHEUS}_cache_invalidations_total Nouvelles versions par portée')
+            sortie.append(f'# TYPE {PREFIXE_PROMETHEUS}_cache_invalidations_total counter')
+            for portee in PORTEES:
+                sortie.append(f'{PREFIXE_PROMETHEUS}_cache_invalidations_total{{portee="{portee}"}} '
+                              f'{self._invalidations.get(portee, 0)}')
+        return '\n'.join(sortie) + '\n'
+
+
+# Singleton (backend mémoire tant que configurer() n'a pas été appelé)
+cache_applicatif = CacheApplicatif()
@@ -0,0 +1,167 @@
+# services/cache_matrices.py
+"""
+Matrices de risques rendues, adressées par leur contenu
+
+Une matrice ne dépend que de son type et de ses points : pour chaque
+évaluation, dans l'ordre, (référence, impact, probabilité, maîtrise), plus le
+risque en surbrillance pour la matrice spécifique. L'empreinte SHA-256 de ces
+entrées nomme le fichier PNG dans MATRICES_CACHE_DIR : rouvrir une
+cartographie inchangée sert l'image sans charger matplotlib, quels que soient
+le worker, la campagne ou la vue qui l'a dessinée en premier. Aucune
+invalidation n'est nécessaire : des entrées différentes donnent une autre
+empreinte.
+
+VERSION_RENDU entre dans l'empreinte : à incrémenter quand le dessin des
+matrices change (utils.py), pour ne pas resservir les anciennes images.
+
+Taille bornée par MATRICES_CACHE_MAX_OCTETS : au-delà, les fichiers les moins
+récemment servis (mtime, mis à jour à chaque lecture) sont supprimés jusqu'à
+revenir à 90 % de la limite.
+"""
+
+import os
+import time
+import hashlib
+import threading
+
+from flask import current_app, has_app_context
+
+from services.journalisation import obtenir_logger
+
+logger = obtenir_logger('cache_matrices')
+
+VERSION_RENDU = 1
+MAX_OCTETS_DEFAUT = 200 * 1024 * 1024
+REPERTOIRE_DEFAUT = os.path.join('instance', 'cache', 'matrices')
+# Ne pas retoucher le mtime d'un fichier servi plus d'une fois par minute
+DELAI_RAFRAICHISSEMENT_MTIME = 60
+
+
+def empreinte_matrice(matrice_type, points, *complements) -> str:
+    """SHA-256 des entrées du dessin : type, points [(référence, impact, probabilité, maîtrise)], compléments"""
+    h = hashlib.sha256()
+    h.update(repr((VERSION_RENDU, matrice_type, tuple(complements))).encode('utf-8'))
+    for point in points:
+        h.update(repr(tuple(point)).encode('utf-8'))
+    return h.hexdigest()
+
+
+class MagasinMatrices:
+    """Fichiers PNG nommés par empreinte, éviction LRU (mtime) au-delà de max_octets"""
+
+    def __init__(self, repertoire, max_octets=MAX_OCTETS_DEFAUT):
+        self.repertoire = repertoire
+        self.max_octets = max_octets
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.defauts = 0
+        self.evictions = 0
+        os.makedirs(repertoire, exist_ok=True)
+        self._octets = sum(taille for _, taille, _ in self._fichiers())
+
+    def _chemin(self, empreinte):
+        return os.path.join(self.repertoire, f'{empreinte}.png')
+
+    def _fichiers(self):
+        """[(mtime, taille, chemin)] des PNG du magasin"""
+        fichiers = []
+        with os.scandir(self.repertoire) as entrees:
+            for entree in entrees:
+                if entree.name.endswith('.png'):
+                    try:
+                        stat = entree.stat()
+                    except FileNotFoundError:
+                        continue
+                    fichiers.append((stat.st_mtime, stat.st_size, entree.path))
+        return fichiers
+
+    def lire(self, empreinte):
+        """Octets PNG, None si absent"""
+        chemin = self._chemin(empreinte)
+        try:
+            with open(chemin, 'rb') as f:
+                contenu = f.read()
+            if time.time() - os.stat(chemin).st_mtime > DELAI_RAFRAICHISSEMENT_MTIME:
+                os.utime(chemin)
+        except FileNotFoundError:
+            self.defauts += 1
+            return None
+        self.succes += 1
+        return contenu
+
+    def ecrire(self, empreinte, contenu: bytes):
+        chemin = self._chemin(empreinte)
+        temporaire = f'{chemin}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporaire, 'wb') as f:
+            f.write(contenu)
+        os.replace(temporaire, chemin)
+        with self._verrou:
+            self._octets += len(contenu)
+            if self._octets > self.max_octets:
+                self._evincer()
+
+    def _evincer(self):
+        """Supprime les moins récemment servis jusqu'à 90 % de la limite (recompte le disque)"""
+        fichiers = sorted(self._fichiers())
+        total = sum(taille for _, taille, _ in fichiers)
+        cible = self.max_octets * 0.9
+        for _, taille, chemin in fichiers:
+            if total <= cible:
+                break
+            try:
+                os.remove(chemin)
+            except FileNotFoundError:
+                pass
+            total -= taille
+            self.evictions += 1
+        self._octets = total
+
+    def _enregistrer(self, empreinte, contenu):
+        try:
+            self.ecrire(empreinte, contenu)
+        except OSError as e:
+            logger.warning("⚠️ Matrice non mise en cache (%s) : %s", empreinte[:12], e)
+
+    def obtenir(self, empreinte, dessiner):
+        """PNG de l'empreinte, dessiné par dessiner() puis enregistré s'il est absent"""
+        contenu = self.lire(empreinte)
+        if contenu is not None:
+            return contenu
+        contenu = dessiner()
+        self._enregistrer(empreinte, contenu)
+        return contenu
+
+    def obtenir_plusieurs(self, empreintes, dessiner_absentes):
+        """PNG de chaque empreinte ; dessiner_absentes(indices) dessine d'un coup celles qui manquent"""
+        contenus = [self.lire(empreinte) for empreinte in empreintes]
+        absentes = [i for i, contenu in enumerate(contenus) if contenu is None]
+        if absentes:
+            for i, contenu in zip(absentes, dessiner_absentes(absentes)):
+                contenus[i] = contenu
+                self._enregistrer(empreintes[i], contenu)
+        return contenus
+
+    def statistiques(self) -> dict:
+        return {
+            'repertoire': self.repertoire,
+            'octets': self._octets,
+            'max_octets': self.max_octets,
+            'succes': self.succes,
+            'defauts': self.defauts,
+            'evictions': self.evictions,
+        }
+
+
+_magasin = []
+
+
+def magasin_matrices() -> MagasinMatrices:
+    """Magasin du processus, configuré à la première matrice (MATRICES_CACHE_DIR / _MAX_OCTETS)"""
+    if not _magasin:
+        repertoire, max_octets = REPERTOIRE_DEFAUT, MAX_OCTETS_DEFAUT
+        if has_app_context():
+            repertoire = (current_app.config.get('MATRICES_CACHE_DIR')
+                          or os.path.join(current_app.instance_path, 'cache', 'matrices'))
+            max_octets = current_app.config.get('MATRICES_CACHE_MAX_OCTETS', MAX_OCTETS_DEFAUT)
+        _magasin.append(MagasinMatrices(repertoire, max_octets))
+    return _magasin[0]
@@ -0,0 +1,188 @@
+# services/demarrage.py
+"""
+Démarrage des workers : jalons chronométrés, initialisations différées, sondes
+
+Importer app.py ne fait que déclarer l'application. Les services coûteux ou à
+effet de bord (scheduler, traductions, sonde OpenAI...) s'enregistrent avec
+@initialisation_differee et sont lancés une seule fois par processus :
+    DEMARRAGE_DIFFERE=True   à la première requête servie par le worker (défaut)
+    DEMARRAGE_DIFFERE=False  en fin d'import (comportement historique)
+Une commande CLI, un script ou un test qui importe app.py ne démarre donc
+aucun thread et n'appelle aucun service externe.
+
+Les vérifications externes (SondeSante) tournent dans un thread : leur résultat
+est gardé `ttl` secondes puis rafraîchi en arrière-plan, /health le lit sans
+jamais attendre.
+
+rapport_demarrage() donne le temps passé dans chaque phase d'import (entre deux
+jalons) et dans chaque initialisation différée ; benchmarks/profil_demarrage.py
+y ajoute le détail par module de `python -X importtime`.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+from services.journalisation import obtenir_logger
+
+logger = obtenir_logger('demarrage')
+
+# (phase, durée en secondes) dans l'ordre d'exécution
+_PHASES = []
+_etat = {
+    'dernier_jalon': time.perf_counter(),
+    'differees_lancees': False,
+}
+_verrou = threading.Lock()
+
+# (nom, fonction) dans l'ordre d'enregistrement
+_INITIALISATIONS_DIFFEREES = []
+
+# nom -> SondeSante
+SONDES = {}
+
+
+# ========================
+# CHRONOMÉTRAGE DU DÉMARRAGE
+# ========================
+
+def jalon(phase: str):
+    """Clôt la phase d'import `phase`, commencée au jalon précédent"""
+    maintenant = time.perf_counter()
+    _PHASES.append((phase, maintenant - _etat['dernier_jalon']))
+    _etat['dernier_jalon'] = maintenant
+
+
+@contextmanager
+def chronometre(phase: str):
+    """Chronomètre un bloc comme une phase du démarrage"""
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        _PHASES.append((phase, time.perf_counter() - debut))
+
+
+def phases_demarrage() -> list:
+    """[(phase, durée en secondes)] dans l'ordre d'exécution"""
+    return list(_PHASES)
+
+
+def rapport_demarrage() -> str:
+    """Temps par phase d'import et par initialisation différée, en texte"""
+    phases = phases_demarrage()
+    if not phases:
+        return "Aucune phase de démarrage enregistrée"
+    largeur = max(len(phase) for phase, _ in phases)
+    total = sum(duree for _, duree in phases)
+    lignes = [f"{phase.ljust(largeur)}  {duree * 1000:9.1f} ms" for phase, duree in phases]
+    lignes.append(f"{'total'.ljust(largeur)}  {total * 1000:9.1f} ms")
+    return '\n'.join(lignes)
+
+
+# ========================
+# INITIALISATIONS DIFFÉRÉES
+# ========================
+
+def initialisation_differee(nom: str):
+    """Enregistre une initialisation à lancer une fois par processus (voir le docstring du module)"""
+    def decorator(f):
+        _INITIALISATIONS_DIFFEREES.append((nom, f))
+        return f
+    return decorator
+
+
+def initialisations_lancees() -> bool:
+    return _etat['differees_lancees']
+
+
+def lancer_initialisations_differees(app):
+    """Exécute une seule fois chaque initialisation différée, dans le contexte de l'application"""
+    if _etat['differees_lancees']:
+        return
+    with _verrou:
+        if _etat['differees_lancees']:
+            return
+        # Positionné avant l'exécution : une initialisation qui sert une requête ne boucle pas
+        _etat['differees_lancees'] = True
+
+        debut = time.perf_counter()
+        with app.app_context():
+            for nom, fonction in _INITIALISATIONS_DIFFEREES:
+                with chronometre(f"différé : {nom}"):
+                    try:
+                        fonction()
+                    except Exception as e:
+                        logger.error("❌ Initialisation différée '%s' en échec: %s", nom, e)
+        logger.info("🚀 %s initialisations différées en %.0f ms",
+                    len(_INITIALISATIONS_DIFFEREES), (time.perf_counter() - debut) * 1000)
+
+
+# ========================
+# SONDES DE SANTÉ
+# ========================
+
+class SondeSante:
+    """Vérification externe exécutée en arrière-plan, résultat gardé `ttl` secondes"""
+
+    def __init__(self, nom: str, verification, ttl: float = 600):
+        self.nom = nom
+        self.verification = verification
+        self.ttl = ttl
+        self._ok = None
+        self._erreur = None
+        self._duree = None
+        self._verifie_le = None
+        self._premiere_fin = threading.Event()
+        self._thread = None
+        self._verrou = threading.Lock()
+        SONDES[nom] = self
+
+    def _executer(self):
+        debut = time.perf_counter()
+        try:
+            ok, erreur = bool(self.verification()), None
+        except Exception as e:
+            ok, erreur = False, str(e)
+        self._ok, self._erreur = ok, erreur
+        self._duree = time.perf_counter() - debut
+        self._verifie_le = time.monotonic()
+        self._premiere_fin.set()
+
+    def lancer(self):
+        """Démarre une vérification en arrière-plan si aucune n'est en cours"""
+        with self._verrou:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._executer, name=f"sonde-{self.nom}", daemon=True)
+            self._thread.start()
+
+    @property
+    def perimee(self) -> bool:
+        return self._verifie_le is None or time.monotonic() - self._verifie_le > self.ttl
+
+    def resultat(self, attendre: float = 0):
+        """Dernier résultat (None tant qu'inconnu) ; relance la sonde si le résultat est périmé
+
+        `attendre` borne l'attente de la toute première vérification, jamais celle
+        des rafraîchissements.
+        """
+        if self.perimee:
+            self.lancer()
+        if attendre and not self._premiere_fin.is_set():
+            self._premiere_fin.wait(attendre)
+        return self._ok
+
+    def etat(self) -> dict:
+        """État de la sonde pour /health, sans la déclencher"""
+        return {
+            'ok': self._ok,
+            'erreur': self._erreur,
+            'age_s': round(time.monotonic() - self._verifie_le, 1) if self._verifie_le is not None else None,
+            'duree_ms': round(self._duree * 1000, 1) if self._duree is not None else None,
+        }
+
+
+def etat_sondes() -> dict:
+    """nom -> état de chaque sonde enregistrée"""
+    return {nom: sonde.etat() for nom, sonde in SONDES.items()}
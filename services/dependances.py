@@ -0,0 +1,76 @@
+# services/dependances.py
+"""
+Imports différés des dépendances lourdes
+
+matplotlib, numpy, pandas, reportlab, python-docx, openpyxl, openai et langchain
+pèsent ensemble plusieurs dizaines de Mo par worker, alors que la plupart des
+requêtes ne dessinent aucun graphique et n'exportent aucun document. Ils ne sont
+chargés que dans les chemins qui s'en servent (matrices, exports, IA) :
+
+    plt = module_differe('matplotlib.pyplot')   # rien n'est importé ici
+    fig, ax = plt.subplots()                    # import réel, une seule fois
+
+Dans une fonction d'export, un import local reste la forme la plus simple.
+dependance_disponible() remplace les blocs `try: import ... except ImportError`
+de niveau module : il vérifie qu'un package est installé sans l'importer.
+"""
+
+import os
+import sys
+import importlib
+import importlib.util
+
+# Serveur sans affichage : backend Agg pour tout import de matplotlib
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# Packages suivis par modules_lourds_charges()
+DEPENDANCES_LOURDES = (
+    'matplotlib', 'numpy', 'pandas', 'seaborn', 'PIL',
+    'reportlab', 'docx', 'openpyxl', 'openai', 'langchain',
+)
+
+
+class ModuleDiffere:
+    """Module importé au premier accès à l'un de ses attributs"""
+
+    __slots__ = ('_nom', '_module')
+
+    def __init__(self, nom: str):
+        self._nom = nom
+        self._module = None
+
+    def _charger(self):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._nom)
+        return module
+
+    def __getattr__(self, attribut):
+        return getattr(self._charger(), attribut)
+
+    def __dir__(self):
+        return dir(self._charger())
+
+    def __repr__(self):
+        etat = 'chargé' if self._module is not None else 'non chargé'
+        return f"<module différé {self._nom} ({etat})>"
+
+
+def module_differe(nom: str) -> ModuleDiffere:
+    """Référence vers le module `nom`, importé au premier usage"""
+    return ModuleDiffere(nom)
+
+
+def dependance_disponible(nom: str) -> bool:
+    """Le package `nom` est installé (vérifié sans l'importer)"""
+    if nom in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(nom) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def modules_lourds_charges() -> list:
+    """Dépendances lourdes déjà importées dans ce processus"""
+    return [nom for nom in DEPENDANCES_LOURDES if nom in sys.modules]
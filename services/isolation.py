@@ -0,0 +1,119 @@
+# services/isolation.py
+"""
+Isolation des tenants dans le SQL
+
+Un seul hook do_orm_execute ajoute à chaque SELECT / UPDATE / DELETE ORM un
+with_loader_criteria par modèle de ClientDataFilter.CLIENT_MODELS :
+client_id = tenant pour les modèles qui portent client_id, created_by parmi
+les utilisateurs du tenant sinon. Pour la configuration partagée
+(ClientDataFilter.MODELES_PARTAGES), les lignes sans client_id sont les valeurs
+globales et restent visibles : client_id = tenant OU client_id IS NULL, comme
+les requêtes de paramétrage qui les demandent explicitement. Les critères se
+propagent aux chargements de relations (lazy / selectin / joined), si bien que
+cartographie.risques ou audit.constatations ne ramènent plus que les lignes du
+tenant.
+
+Le tenant est celui du contexte de requête (g.ctx) : aucune requête n'est
+faite pour le déterminer. Hors requête HTTP (CLI, planificateur), pour un
+visiteur et pour un super admin, rien n'est ajouté. Les vues qui doivent voir
+tous les tenants le déclarent explicitement : `with sans_isolation():`, le
+décorateur super_admin_required, ou `.execution_options(sans_isolation=True)`
+sur une requête.
+"""
+
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from services.journalisation import obtenir_logger
+
+logger = obtenir_logger('isolation')
+
+# (modèle, colonne de rattachement) calculés une fois à l'installation
+_modeles_isoles = []
+_installation = {'faite': False, 'user': None}
+
+
+def _criteres(client_id):
+    """Un with_loader_criteria par modèle isolé, pour le tenant `client_id`"""
+    # Même prédicat que ClientDataFilter.filtre_createur : sous-requête, pas de liste d'ids
+    User = _installation['user']
+    membres = select(User.id).where(User.client_id == client_id).scalar_subquery()
+    options = []
+    for modele, colonne in _modeles_isoles:
+        if colonne == 'client_id':
+            critere = lambda cls: cls.client_id == client_id
+        elif colonne == 'client_id_ou_global':
+            critere = lambda cls: or_(cls.client_id == client_id, cls.client_id.is_(None))
+        else:
+            critere = lambda cls: cls.created_by.in_(membres)
+        options.append(with_loader_criteria(modele, critere, include_aliases=True,
+                                            track_closure_variables=True))
+    return options
+
+
+def tenant_isole():
+    """(actif, client_id) : le tenant auquel les requêtes ORM sont restreintes"""
+    if not has_request_context() or g.get('sans_isolation'):
+        return False, None
+    ctx = g.get('ctx')
+    if ctx is None or not ctx.filter_by_client:
+        return False, None
+    return True, ctx.client_id
+
+
+@contextmanager
+def sans_isolation():
+    """Suspend l'isolation pour le bloc (vues super admin, tâches transverses)"""
+    if not has_request_context():
+        yield
+        return
+    precedent = g.get('sans_isolation', False)
+    g.sans_isolation = True
+    try:
+        yield
+    finally:
+        g.sans_isolation = precedent
+
+
+def _isoler(execute_state):
+    if not (execute_state.is_select or execute_state.is_update or execute_state.is_delete):
+        return
+    # Les chargements de colonnes / relations héritent des critères de la requête d'origine
+    if execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    if execute_state.execution_options.get('sans_isolation', False):
+        return
+    actif, client_id = tenant_isole()
+    if not actif:
+        return
+    execute_state.statement = execute_state.statement.options(*_criteres(client_id))
+
+
+def installer_isolation(modeles, user_model, partages=()):
+    """Branche le hook sur toutes les sessions (une seule fois) ; partages : lignes globales visibles"""
+    if _installation['faite']:
+        return
+    non_isoles = []
+    for modele in modeles:
+        if modele in partages:
+            _modeles_isoles.append((modele, 'client_id_ou_global'))
+        elif hasattr(modele, 'client_id'):
+            _modeles_isoles.append((modele, 'client_id'))
+        elif hasattr(modele, 'created_by'):
+            _modeles_isoles.append((modele, 'created_by'))
+        else:
+            # Tables filles sans colonne de rattachement : isolées via leur parent
+            non_isoles.append(modele.__name__)
+    _installation['user'] = user_model
+    event.listen(Session, 'do_orm_execute', _isoler)
+    _installation['faite'] = True
+    logger.info("✅ Isolation SQL des tenants : %s modèles (via parent : %s)",
+                len(_modeles_isoles), ', '.join(non_isoles) or 'aucun')
+
+
+def modele_isole(modele) -> bool:
+    """Le modèle reçoit les critères de tenant du hook"""
+    return any(modele is isole for isole, _ in _modeles_isoles)
@@ -0,0 +1,180 @@
+# services/journalisation.py
+"""
+Journalisation asynchrone de l'application
+
+Tous les loggers de l'application sont des enfants de « egalyx » (egalyx.app,
+egalyx.utils, egalyx.models...). Ils écrivent dans une file via un QueueHandler ;
+un QueueListener dépile dans son propre thread et fait les écritures réelles.
+Un thread de requête ne bloque donc jamais sur stdout.
+
+Réglages (config.Config, surchargeables par variables d'environnement) :
+    LOG_LEVEL                 niveau par défaut (DEBUG en développement, INFO sur Render)
+    LOG_LEVELS                niveaux par module, ex. "utils=DEBUG,models=WARNING"
+    LOG_FORMAT                format des lignes
+    LOG_ECHANTILLON_BOUCLES   1 message sur N conservé pour les logs de boucle
+
+Les messages émis dans une boucle passent extra=EN_BOUCLE : seul un message sur
+LOG_ECHANTILLON_BOUCLES est conservé par ligne de code émettrice.
+
+Un processus forké (rendu des graphiques, services/rendu_graphiques.py) n'a
+plus le thread du listener : il repart avec sa propre file et son listener.
+"""
+
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+NOM_RACINE = 'egalyx'
+
+# À passer en extra= des logs émis à chaque tour de boucle
+EN_BOUCLE = {'boucle': True}
+
+_etat = {
+    'file': None,
+    'handler': None,
+    'listener': None,
+    'filtre': None,
+}
+_verrou = threading.Lock()
+
+
+class FiltreEchantillonnage(logging.Filter):
+    """Ne laisse passer qu'un log de boucle sur `taux` par ligne de code émettrice"""
+
+    def __init__(self, taux: int = 100):
+        super().__init__()
+        self.taux = max(1, int(taux))
+        self._compteurs = {}
+
+    def filter(self, record):
+        if not getattr(record, 'boucle', False) or self.taux == 1:
+            return True
+        cle = (record.pathname, record.lineno)
+        rang = self._compteurs.get(cle, 0)
+        self._compteurs[cle] = rang + 1
+        if rang % self.taux:
+            return False
+        if rang:
+            record.msg = f"{record.msg} [1/{self.taux}, {rang + 1} occurrences]"
+        return True
+
+
+class SortieStandard(logging.StreamHandler):
+    """StreamHandler qui écrit dans le sys.stdout courant, comme print()"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+
+def _nom_complet(nom: str) -> str:
+    if nom == NOM_RACINE or nom.startswith(NOM_RACINE + '.'):
+        return nom
+    return f"{NOM_RACINE}.{nom}"
+
+
+def _lire_niveaux(niveaux) -> dict:
+    """'utils=DEBUG,models=WARNING' (ou un dict) → {'egalyx.utils': 'DEBUG', ...}"""
+    if isinstance(niveaux, dict):
+        paires = niveaux.items()
+    else:
+        paires = (
+            element.split('=', 1)
+            for element in (niveaux or '').split(',')
+            if '=' in element
+        )
+    return {_nom_complet(nom.strip()): niveau.strip().upper() for nom, niveau in paires}
+
+
+def appliquer_reglages(niveau=None, niveaux=None, format_log=None, echantillon=None):
+    """Applique niveaux, format et taux d'échantillonnage (sans recréer la file)"""
+    _initialiser()
+    racine = logging.getLogger(NOM_RACINE)
+    if niveau:
+        racine.setLevel(str(niveau).upper())
+    for nom, niveau_module in _lire_niveaux(niveaux).items():
+        logging.getLogger(nom).setLevel(niveau_module)
+    if format_log:
+        for handler in _etat['listener'].handlers:
+            handler.setFormatter(logging.Formatter(format_log))
+    if echantillon:
+        _etat['filtre'].taux = max(1, int(echantillon))
+
+
+def _initialiser():
+    """Crée la file, le QueueHandler et démarre le QueueListener (une seule fois)"""
+    if _etat['listener'] is not None:
+        return
+    with _verrou:
+        if _etat['listener'] is not None:
+            return
+
+        from config import Config
+
+        file_logs = queue.SimpleQueue()
+        sortie = SortieStandard()
+        sortie.setFormatter(logging.Formatter(Config.LOG_FORMAT))
+
+        filtre = FiltreEchantillonnage(Config.LOG_ECHANTILLON_BOUCLES)
+        handler = QueueHandler(file_logs)
+        handler.addFilter(filtre)
+
+        racine = logging.getLogger(NOM_RACINE)
+        racine.addHandler(handler)
+        racine.setLevel(Config.LOG_LEVEL)
+        racine.propagate = False
+        for nom, niveau_module in _lire_niveaux(Config.LOG_LEVELS).items():
+            logging.getLogger(nom).setLevel(niveau_module)
+
+        listener = QueueListener(file_logs, sortie, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+        _etat.update(file=file_logs, handler=handler, listener=listener, filtre=filtre)
+
+
+def _apres_fork():
+    """Processus enfant : nouvelle file (celle du parent a pu être copiée verrouillée) et nouveau listener"""
+    listener = _etat['listener']
+    if listener is None:
+        return
+    file_logs = queue.SimpleQueue()
+    _etat['handler'].queue = file_logs
+    nouveau = QueueListener(file_logs, *listener.handlers, respect_handler_level=True)
+    nouveau.start()
+    _etat.update(file=file_logs, listener=nouveau)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_apres_fork)
+
+
+def obtenir_logger(nom: str) -> logging.Logger:
+    """Logger « egalyx.<nom> » branché sur la file asynchrone"""
+    _initialiser()
+    return logging.getLogger(_nom_complet(nom))
+
+
+def configurer_journalisation(app):
+    """Applique la configuration Flask (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT...)"""
+    appliquer_reglages(
+        niveau=app.config.get('LOG_LEVEL'),
+        niveaux=app.config.get('LOG_LEVELS'),
+        format_log=app.config.get('LOG_FORMAT'),
+        echantillon=app.config.get('LOG_ECHANTILLON_BOUCLES'),
+    )
+
+
+def vider_file():
+    """Attend que tous les messages en file soient écrits (benchmarks, tests)"""
+    listener = _etat['listener']
+    if listener is not None:
+        listener.stop()
+        listener.start()
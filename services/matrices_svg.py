@@ -0,0 +1,291 @@
+# services/matrices_svg.py
+"""
+Matrices de risques 5x5 en SVG, pour les vues à l'écran
+
+Mêmes règles que les matrices matplotlib de utils.py (qui restent celles des
+exports PNG, PDF et Word) :
+    - case (probabilité, impact), impact 5 en haut, probabilité 5 à droite ;
+      matrice de priorisation : abscisse = 5 - maîtrise (3 par défaut) ;
+    - couleur de fond = get_couleur_risque(impact × probabilité) ;
+    - un risque seul au centre de sa case, plusieurs répartis sur un cercle
+      autour du centre ; couleur du marqueur selon son rang dans la liste ;
+    - vue spécifique : le risque en surbrillance est mis en évidence, les
+      autres cases partagées affichent le nombre de risques.
+
+Entrées : les points de points_matrice(), (référence, impact, probabilité,
+maîtrise) dans l'ordre des évaluations, comme l'empreinte des matrices PNG.
+Chaque marqueur porte une infobulle (<title>) et data-reference.
+
+Aucun import de matplotlib : le fond de grille, les axes et la légende des
+niveaux sont construits une fois par type de matrice, seul le placement des
+risques est refait à chaque appel.
+"""
+
+import math
+from functools import lru_cache
+from html import escape
+
+from markupsafe import Markup
+
+# Entre dans l'empreinte (ETag) des matrices SVG servies par URL : à incrémenter
+# quand le dessin change, comme VERSION_RENDU pour les PNG
+VERSION_SVG = 1
+
+COULEURS_RISQUES = ('blue', 'purple', 'darkred', 'darkgreen', 'darkorange', 'darkcyan', 'brown', 'pink', 'navy',
+                    'teal')
+
+LIBELLES_PROBABILITE = ('Très rare', 'Rare', 'Possible', 'Probable', 'Très probable')
+LIBELLES_IMPACT = ('Négligeable', 'Mineur', 'Modéré', 'Important', 'Critique')
+LIBELLES_MAITRISE = ('Insuffisant', 'Partiel', 'Adéquat', 'Bon', 'Excellent')
+
+# type -> (titre, libellé de l'abscisse, libellés des graduations)
+TYPES_MATRICE = {
+    'classique': ('Matrice des Risques - Classique', 'Probabilité', LIBELLES_PROBABILITE),
+    'criticite': ('Matrice de Criticité', 'Probabilité', LIBELLES_PROBABILITE),
+    'priorisation': ('Matrice de Priorisation', 'Niveau de Maîtrise', LIBELLES_MAITRISE),
+    'specifique': ('Matrice des Risques - Vue Spécifique', 'Probabilité', LIBELLES_PROBABILITE),
+}
+
+NIVEAUX_LEGENDE = (('Faible (1-4)', 'lightgreen'), ('Moyen (5-10)', 'yellow'),
+                   ('Élevé (11-16)', 'orange'), ('Critique (17-25)', 'red'))
+
+# Géométrie (unités SVG) : une case = CASE, marges pour titre, axes et légende
+CASE = 100
+GAUCHE = 110
+HAUT = 80
+BAS = 80
+LEGENDE = 240
+LARGEUR = GAUCHE + 5 * CASE + LEGENDE
+HAUTEUR = HAUT + 5 * CASE + BAS
+X_LEGENDE = GAUCHE + 5 * CASE + 20
+
+_FONDS = {}
+_INFOBULLES = {}
+_GEOMETRIES = {}
+_GEOMETRIES_GROUPES = {}
+NB_COULEURS = len(COULEURS_RISQUES)
+
+
+def points_matrice(evaluations):
+    """(référence, impact, probabilité, maîtrise) de chaque évaluation, dans l'ordre du dessin"""
+    return [
+        (evaluation.risque.reference,
+         evaluation.impact_conf or evaluation.impact_val or evaluation.impact_pre,
+         evaluation.probabilite_conf or evaluation.probabilite_val or evaluation.probabilite_pre,
+         evaluation.niveau_maitrise_pre)
+        for evaluation in evaluations
+    ]
+
+
+def _px(x):
+    return GAUCHE + x * CASE
+
+
+def _py(y):
+    return HAUT + (5 - y) * CASE
+
+
+def _fond(matrice_type):
+    """Grille colorée, graduations, libellés d'axes et légende des niveaux (mis en cache par type)"""
+    fond = _FONDS.get(matrice_type)
+    if fond is not None:
+        return fond
+
+    from utils import get_couleur_risque
+
+    _, libelle_abscisse, graduations = TYPES_MATRICE[matrice_type]
+    parties = []
+    for i in range(5):          # impact - 1
+        for j in range(5):      # abscisse
+            score = (i + 1) * (j + 1)
+            x, y = _px(j), _py(i + 1)
+            parties.append(
+                f'<rect x="{x}" y="{y}" width="{CASE}" height="{CASE}" fill="{get_couleur_risque(score)}" '
+                f'fill-opacity="0.7" stroke="black" stroke-width="2"/>'
+                f'<text x="{x + CASE // 2}" y="{y + CASE // 2}" class="score">{score}</text>'
+            )
+    for k in range(5):
+        x = _px(k + 0.5)
+        parties.append(f'<text x="{x}" y="{_py(0) + 22}" class="graduation">{k + 1}'
+                       f'<tspan x="{x}" dy="16">{escape(graduations[k])}</tspan></text>')
+        y = _py(k + 0.5)
+        parties.append(f'<text x="{GAUCHE - 10}" y="{y - 4}" class="graduation" text-anchor="end">{k + 1}'
+                       f'<tspan x="{GAUCHE - 10}" dy="16">{escape(LIBELLES_IMPACT[k])}</tspan></text>')
+    parties.append(f'<text x="{_px(2.5)}" y="{HAUTEUR - 12}" class="axe">{escape(libelle_abscisse)}</text>')
+    parties.append(f'<text x="22" y="{_py(2.5)}" class="axe" transform="rotate(-90 22 {_py(2.5)})">Impact</text>')
+
+    y = HAUT + 260
+    parties.append(f'<text x="{X_LEGENDE}" y="{y}" class="titre-legende">NIVEAUX DE RISQUE:</text>')
+    for k, (texte, couleur) in enumerate(NIVEAUX_LEGENDE):
+        y_ligne = y + 22 + k * 22
+        parties.append(f'<rect x="{X_LEGENDE}" y="{y_ligne - 11}" width="26" height="14" fill="{couleur}"/>'
+                       f'<text x="{X_LEGENDE + 34}" y="{y_ligne}">{escape(texte)}</text>')
+
+    fond = _FONDS[matrice_type] = ''.join(parties)
+    return fond
+
+
+def _entete(matrice_type, sous_titre=None):
+    titre = escape(TYPES_MATRICE[matrice_type][0])
+    if sous_titre:
+        titre += f'<tspan x="{_px(2.5)}" dy="22">{escape(sous_titre)}</tspan>'
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {LARGEUR} {HAUTEUR}" class="matrice-svg" '
+        f'role="img" font-family="DejaVu Sans, Arial, sans-serif" font-size="13">'
+        '<style>.score{font-size:20px;font-weight:bold;text-anchor:middle;dominant-baseline:central}'
+        '.graduation{font-size:13px;text-anchor:middle}.axe{font-size:16px;font-weight:bold;text-anchor:middle}'
+        '.titre{font-size:20px;font-weight:bold;text-anchor:middle}.titre-legende{font-weight:bold}'
+        '.r circle{fill-opacity:.9;stroke:white;stroke-width:3}.r.p circle{stroke-width:2}.r.s circle{fill-opacity:.8}'
+        '.r text,.cible text{font-weight:bold;font-size:12px;stroke:white;stroke-width:4px;paint-order:stroke}'
+        '.r.p text,.r.s text{font-size:11px}.r:hover circle{stroke:black}'
+        '.cible text{font-size:16px;stroke:yellow}.centre{fill:red;fill-opacity:.7;stroke:yellow;stroke-width:2}'
+        '.groupe rect{fill:purple;fill-opacity:.8;stroke:white;stroke-width:2}'
+        '.groupe text{fill:white;font-weight:bold;text-anchor:middle;dominant-baseline:central}</style>'
+        f'<text x="{_px(2.5)}" y="{HAUT - 44 if sous_titre else HAUT - 24}" class="titre">{titre}</text>'
+    )
+
+
+@lru_cache(maxsize=8192)
+def _echapper(reference):
+    return escape(str(reference))
+
+
+def _positionner(points, matrice_type):
+    """Points valides groupés par case : {(x, y): [(rang, référence échappée, impact, probabilité, couleur,
+    infobulle)]}"""
+    cases = {}
+    valides = []
+    priorisation = matrice_type == 'priorisation'
+    echapper = _echapper
+    infobulles = _INFOBULLES
+    for rang, (reference, impact, probabilite, maitrise) in enumerate(points):
+        if not (impact and probabilite and impact > 0 and probabilite > 0):
+            continue
+        infobulle = infobulles.get((impact, probabilite)) or _infobulle(impact, probabilite)
+        point = (rang, echapper(reference), impact, probabilite, COULEURS_RISQUES[rang % NB_COULEURS], infobulle)
+        cle = (5 - (maitrise or 3) if priorisation else probabilite - 1, impact - 1)
+        groupe = cases.get(cle)
+        if groupe is None:
+            cases[cle] = [point]
+        else:
+            groupe.append(point)
+        valides.append(point)
+    return cases, valides
+
+
+def _centre(x, y):
+    """Centre de la case (x, y) en unités SVG entières"""
+    return GAUCHE + x * CASE + CASE // 2, HAUT + (4 - y) * CASE + CASE // 2
+
+
+def _infobulle(impact, probabilite):
+    """Fin de l'infobulle d'un risque, mise en cache par (impact, probabilité)"""
+    texte = _INFOBULLES.get((impact, probabilite))
+    if texte is None:
+        texte = _INFOBULLES[(impact, probabilite)] = (
+            f' : impact {impact} × probabilité {probabilite} = {impact * probabilite}')
+    return texte
+
+
+def _geometrie(cx, cy, rayon, decalage):
+    """Attributs du cercle et de l'étiquette d'un marqueur, mis en cache par position"""
+    cle = (cx, cy, rayon, decalage)
+    geometrie = _GEOMETRIES.get(cle)
+    if geometrie is None:
+        geometrie = _GEOMETRIES[cle] = (f'cx="{cx}" cy="{cy}" r="{rayon}"',
+                                        f'x="{cx + decalage}" y="{cy - decalage}"')
+    return geometrie
+
+
+def _geometries_groupe(cx, cy, nombre):
+    """Géométries des `nombre` marqueurs d'une case partagée, réparties sur un cercle (mises en cache)"""
+    cle = (cx, cy, nombre)
+    geometries = _GEOMETRIES_GROUPES.get(cle)
+    if geometries is None:
+        pas = 2 * math.pi / nombre
+        rayon = CASE * 0.2
+        geometries = _GEOMETRIES_GROUPES[cle] = [
+            _geometrie(cx + round(rayon * math.cos(k * pas)), cy - round(rayon * math.sin(k * pas)), 9, 10)
+            for k in range(nombre)
+        ]
+    return geometries
+
+
+def _marqueur(point, geometrie, classe='r'):
+    # Chaînes uniquement : le formatage des entiers est mis en cache (infobulle, géométrie)
+    reference, couleur, infobulle = point[1], point[4], point[5]
+    return (f'<g class="{classe}" data-reference="{reference}"><title>{reference}{infobulle}</title>'
+            f'<circle {geometrie[0]} fill="{couleur}"/><text {geometrie[1]}>{reference}</text></g>')
+
+
+def _legende_risques(valides, nombre):
+    parties = [f'<text x="{X_LEGENDE}" y="{HAUT + 10}" class="titre-legende">LÉGENDE RISQUES:</text>']
+    for k, point in enumerate(valides[:nombre]):
+        y = HAUT + 36 + k * 24
+        parties.append(f'<circle cx="{X_LEGENDE + 8}" cy="{y - 4}" r="7" '
+                       f'fill="{COULEURS_RISQUES[k % len(COULEURS_RISQUES)]}"/>'
+                       f'<text x="{X_LEGENDE + 24}" y="{y}">{point[1]}</text>')
+    return ''.join(parties)
+
+
+def matrice_svg(points, matrice_type='classique') -> Markup:
+    """Matrice classique, de criticité ou de priorisation en SVG"""
+    cases, valides = _positionner(points, matrice_type)
+    parties = [_entete(matrice_type), _fond(matrice_type)]
+    ajouter = parties.append
+
+    for (x, y), groupe in cases.items():
+        cx, cy = _centre(x, y)
+        if len(groupe) == 1:
+            ajouter(_marqueur(groupe[0], _geometrie(cx, cy, 11, 14)))
+            continue
+        for point, geometrie in zip(groupe, _geometries_groupe(cx, cy, len(groupe))):
+            ajouter(_marqueur(point, geometrie, 'r p'))
+        ajouter(f'<rect x="{cx - 5}" y="{cy - 5}" width="10" height="10" class="centre"/>')
+
+    if valides:
+        ajouter(_legende_risques(valides, 4))
+    ajouter('</svg>')
+    return Markup(''.join(parties))
+
+
+def matrice_svg_specifique(points, reference_surbrillance=None) -> Markup:
+    """Matrice avec le risque `reference_surbrillance` mis en évidence"""
+    cases, valides = _positionner(points, 'specifique')
+    cible = _echapper(reference_surbrillance) if reference_surbrillance else None
+    sous_titre = f'{reference_surbrillance} en surbrillance' if reference_surbrillance else None
+    parties = [_entete('specifique', sous_titre), _fond('specifique')]
+    score_cible = None
+
+    for (x, y), groupe in cases.items():
+        cx, cy = _centre(x, y)
+        point_cible = next((p for p in groupe if p[1] == cible), None) if cible is not None else None
+        if point_cible is not None:
+            reference, impact, probabilite = point_cible[1:4]
+            score_cible = impact * probabilite
+            parties.append(
+                f'<g class="cible" data-reference="{reference}">'
+                f'<title>{reference} : impact {impact} × probabilité {probabilite} = {score_cible}</title>'
+                f'<circle cx="{cx}" cy="{cy}" r="40" fill="yellow" fill-opacity="0.3"/>'
+                f'<circle cx="{cx}" cy="{cy}" r="17" fill="red" stroke="yellow" stroke-width="4"/>'
+                f'<line x1="{cx + 14}" y1="{cy - 14}" x2="{cx + 30}" y2="{cy - 30}" stroke="orange" stroke-width="2"/>'
+                f'<text x="{cx + 32}" y="{cy - 32}">'
+                f'⭐ {reference} (S:{score_cible}) ⭐</text></g>'
+            )
+        elif len(groupe) == 1:
+            parties.append(_marqueur(groupe[0], _geometrie(cx, cy, 11, 12), 'r s'))
+        else:
+            references = ', '.join(p[1] for p in groupe)
+            parties.append(
+                f'<g class="groupe"><title>{references}</title>'
+                f'<rect x="{cx - 12}" y="{cy - 12}" width="24" height="24"/>'
+                f'<text x="{cx}" y="{cy}">{len(groupe)}</text></g>'
+            )
+
+    if valides:
+        parties.append(_legende_risques(valides, 3))
+    if cible is not None:
+        parties.append(f'<text x="{X_LEGENDE}" y="{HAUT + 130}" class="titre-legende">RISQUE CIBLÉ:</text>'
+                       f'<text x="{X_LEGENDE}" y="{HAUT + 152}">{cible} (S:{score_cible or "N/A"})</text>')
+    parties.append('</svg>')
+    return Markup(''.join(parties))
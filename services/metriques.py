@@ -0,0 +1,367 @@
+# services/metriques.py
+"""
+Métriques par endpoint : latence, requêtes SQL, temps base et lignes chargées
+
+Chaque requête HTTP ouvre une MesureRequete (g.mesure_requete). Les événements
+SQLAlchemy before/after_cursor_execute y ajoutent le nombre d'ordres SQL et leur
+durée ; l'événement ORM « load » compte les lignes matérialisées en objets. À la
+fin de la requête, la mesure est agrégée dans le registre du processus.
+
+Les compteurs sont propres à chaque processus (un worker gunicorn = un registre).
+
+Garde SQL (développement / tests, SQL_GARDE_ACTIVE) : chaque ordre SQL est
+réduit à sa forme (paramètres, listes IN et littéraux neutralisés). Une forme
+répétée SQL_SEUIL_REPETITIONS fois dans la même requête est signalée comme N+1
+probable ; un endpoint qui dépasse son budget (@budget_sql ou SQL_BUDGETS) lève
+DepassementBudgetSQL en mode test et est journalisé sinon.
+"""
+
+import re
+import time
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from flask import g, has_request_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+from services.journalisation import obtenir_logger
+
+# Bornes de l'histogramme de latence (secondes), mêmes valeurs que Prometheus
+BORNES_LATENCE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIXE_PROMETHEUS = 'egalyx'
+
+logger = obtenir_logger('metriques')
+
+
+class DepassementBudgetSQL(AssertionError):
+    """Un endpoint a exécuté plus d'ordres SQL que son budget déclaré"""
+
+
+def budget_sql(max_requetes: int):
+    """Déclare le nombre maximal d'ordres SQL d'une vue (placé juste au-dessus du def)"""
+    def decorator(f):
+        f.budget_sql = max_requetes
+        return f
+    return decorator
+
+
+class Histogramme:
+    """Histogramme à bornes fixes (compteurs non cumulés, +Inf en dernier)"""
+
+    def __init__(self, bornes=BORNES_LATENCE):
+        self.bornes = bornes
+        self.compteurs = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.total = 0
+
+    def observer(self, valeur: float):
+        self.compteurs[bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.total += 1
+
+    def cumuls(self):
+        """(borne, effectif cumulé) au format des buckets Prometheus"""
+        cumul = 0
+        for borne, compteur in zip(self.bornes + (float('inf'),), self.compteurs):
+            cumul += compteur
+            yield borne, cumul
+
+    def quantile(self, q: float) -> float:
+        """Borne supérieure du bucket contenant le quantile q"""
+        if not self.total:
+            return 0.0
+        rang = q * self.total
+        for borne, cumul in self.cumuls():
+            if cumul >= rang:
+                return borne if borne != float('inf') else self.bornes[-1]
+        return self.bornes[-1]
+
+
+class MesureRequete:
+    """Compteurs d'une requête HTTP en cours"""
+
+    __slots__ = ('debut', 'nb_sql', 'duree_sql', 'lignes', 'formes')
+
+    def __init__(self, garde: bool = False):
+        self.debut = time.perf_counter()
+        self.nb_sql = 0
+        self.duree_sql = 0.0
+        self.lignes = 0
+        # Forme normalisée -> occurrences (garde SQL uniquement)
+        self.formes = Counter() if garde else None
+
+    def formes_repetees(self, seuil: int) -> list:
+        """[(forme, occurrences)] des formes exécutées au moins `seuil` fois"""
+        if not self.formes:
+            return []
+        return [(forme, n) for forme, n in self.formes.most_common() if n >= seuil]
+
+
+class StatistiquesEndpoint:
+    """Agrégat des requêtes d'un endpoint"""
+
+    def __init__(self):
+        self.requetes = 0
+        self.erreurs = 0
+        self.latence = Histogramme()
+        self.nb_sql = 0
+        self.nb_sql_max = 0
+        self.duree_sql = 0.0
+        self.lignes = 0
+        self.n_plus_1 = 0
+        self.derniere_forme_repetee = None
+
+    def ajouter(self, mesure: MesureRequete, duree: float, status: int, repetitions=()):
+        self.requetes += 1
+        if repetitions:
+            self.n_plus_1 += 1
+            self.derniere_forme_repetee = repetitions[0]
+        if status >= 500:
+            self.erreurs += 1
+        self.latence.observer(duree)
+        self.nb_sql += mesure.nb_sql
+        self.nb_sql_max = max(self.nb_sql_max, mesure.nb_sql)
+        self.duree_sql += mesure.duree_sql
+        self.lignes += mesure.lignes
+
+    def to_dict(self, endpoint: str) -> dict:
+        requetes = self.requetes or 1
+        return {
+            'endpoint': endpoint,
+            'requetes': self.requetes,
+            'erreurs': self.erreurs,
+            'latence_moyenne_ms': round(self.latence.somme / requetes * 1000, 2),
+            'latence_p50_ms': round(self.latence.quantile(0.5) * 1000, 2),
+            'latence_p95_ms': round(self.latence.quantile(0.95) * 1000, 2),
+            'latence_totale_s': round(self.latence.somme, 3),
+            'sql_total': self.nb_sql,
+            'sql_par_requete': round(self.nb_sql / requetes, 2),
+            'sql_max_par_requete': self.nb_sql_max,
+            'duree_sql_s': round(self.duree_sql, 3),
+            'duree_sql_par_requete_ms': round(self.duree_sql / requetes * 1000, 2),
+            'lignes_total': self.lignes,
+            'lignes_par_requete': round(self.lignes / requetes, 1),
+            'n_plus_1': self.n_plus_1,
+            'derniere_forme_repetee': (
+                {'sql': self.derniere_forme_repetee[0], 'occurrences': self.derniere_forme_repetee[1]}
+                if self.derniere_forme_repetee else None
+            ),
+        }
+
+
+class RegistreMetriques:
+    """Statistiques par endpoint du processus courant"""
+
+    TRIS = ('duree_sql_s', 'sql_total', 'requetes', 'latence_totale_s',
+            'latence_p95_ms', 'lignes_total', 'sql_par_requete', 'n_plus_1')
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._endpoints = {}
+        self.depuis = time.time()
+
+    def enregistrer(self, endpoint: str, mesure: MesureRequete, duree: float, status: int,
+                    repetitions=()):
+        with self._verrou:
+            statistiques = self._endpoints.get(endpoint)
+            if statistiques is None:
+                statistiques = self._endpoints[endpoint] = StatistiquesEndpoint()
+            statistiques.ajouter(mesure, duree, status, repetitions)
+
+    def instantane(self, tri: str = 'duree_sql_s') -> list:
+        """Liste des endpoints triée par ordre décroissant du critère"""
+        if tri not in self.TRIS:
+            tri = 'duree_sql_s'
+        with self._verrou:
+            lignes = [s.to_dict(endpoint) for endpoint, s in self._endpoints.items()]
+        return sorted(lignes, key=lambda ligne: ligne[tri], reverse=True)
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._endpoints = {}
+            self.depuis = time.time()
+
+    def format_prometheus(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4"""
+        with self._verrou:
+            elements = sorted(self._endpoints.items())
+            blocs = {
+                'histogramme': [],
+                'requetes': [],
+                'erreurs': [],
+                'sql': [],
+                'duree_sql': [],
+                'lignes': [],
+                'n_plus_1': [],
+            }
+            for endpoint, s in elements:
+                label = f'endpoint="{_echapper_label(endpoint)}"'
+                for borne, cumul in s.latence.cumuls():
+                    le = '+Inf' if borne == float('inf') else repr(borne)
+                    blocs['histogramme'].append(
+                        f'{PREFIXE_PROMETHEUS}_http_requete_duree_secondes_bucket{{{label},le="{le}"}} {cumul}'
+                    )
+                blocs['histogramme'].append(
+                    f'{PREFIXE_PROMETHEUS}_http_requete_duree_secondes_sum{{{label}}} {s.latence.somme}'
+                )
+                blocs['histogramme'].append(
+                    f'{PREFIXE_PROMETHEUS}_http_requete_duree_secondes_count{{{label}}} {s.latence.total}'
+                )
+                blocs['requetes'].append(f'{PREFIXE_PROMETHEUS}_http_requetes_total{{{label}}} {s.requetes}')
+                blocs['erreurs'].append(f'{PREFIXE_PROMETHEUS}_http_erreurs_total{{{label}}} {s.erreurs}')
+                blocs['sql'].append(f'{PREFIXE_PROMETHEUS}_sql_requetes_total{{{label}}} {s.nb_sql}')
+                blocs['duree_sql'].append(f'{PREFIXE_PROMETHEUS}_sql_duree_secondes_total{{{label}}} {s.duree_sql}')
+                blocs['lignes'].append(f'{PREFIXE_PROMETHEUS}_sql_lignes_chargees_total{{{label}}} {s.lignes}')
+                blocs['n_plus_1'].append(f'{PREFIXE_PROMETHEUS}_sql_n_plus_1_total{{{label}}} {s.n_plus_1}')
+
+        entetes = {
+            'histogramme': ('http_requete_duree_secondes', 'histogram', 'Latence des requêtes HTTP par endpoint'),
+            'requetes': ('http_requetes_total', 'counter', 'Requêtes HTTP par endpoint'),
+            'erreurs': ('http_erreurs_total', 'counter', 'Réponses 5xx par endpoint'),
+            'sql': ('sql_requetes_total', 'counter', 'Ordres SQL exécutés par endpoint'),
+            'duree_sql': ('sql_duree_secondes_total', 'counter', 'Temps passé en base par endpoint'),
+            'lignes': ('sql_lignes_chargees_total', 'counter', 'Lignes chargées en objets ORM par endpoint'),
+            'n_plus_1': ('sql_n_plus_1_total', 'counter', 'Requêtes HTTP avec une forme SQL répétée (garde SQL)'),
+        }
+        sortie = []
+        for cle, (nom, type_metrique, aide) in entetes.items():
+            sortie.append(f'# HELP {PREFIXE_PROMETHEUS}_{nom} {aide}')
+            sortie.append(f'# TYPE {PREFIXE_PROMETHEUS}_{nom} {type_metrique}')
+            sortie.extend(blocs[cle])
+        return '\n'.join(sortie) + '\n'
+
+
+def _echapper_label(valeur: str) -> str:
+    return valeur.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registre = RegistreMetriques()
+
+
+# ========================
+# CYCLE DE VIE D'UNE REQUÊTE
+# ========================
+
+def ouvrir_mesure() -> MesureRequete:
+    """Démarre la mesure de la requête courante (premier hook du pipeline)"""
+    mesure = MesureRequete(garde=bool(current_app.config.get('SQL_GARDE_ACTIVE')))
+    g.mesure_requete = mesure
+    return mesure
+
+
+def mesure_courante():
+    """MesureRequete de la requête en cours, None hors requête"""
+    if not has_request_context():
+        return None
+    return g.get('mesure_requete')
+
+
+def fermer_mesure(endpoint, status: int):
+    """Agrège la mesure de la requête courante dans le registre, puis applique la garde SQL"""
+    mesure = g.pop('mesure_requete', None)
+    if mesure is None:
+        return None
+    duree = time.perf_counter() - mesure.debut
+    endpoint = endpoint or '<aucun>'
+
+    repetitions = []
+    if mesure.formes is not None:
+        repetitions = mesure.formes_repetees(current_app.config.get('SQL_SEUIL_REPETITIONS', 5))
+        for forme, occurrences in repetitions:
+            logger.warning("🔁 N+1 probable sur %s : %s exécutions de « %s »", endpoint, occurrences, forme[:300])
+
+    registre.enregistrer(endpoint, mesure, duree, status, repetitions)
+
+    if mesure.formes is not None:
+        verifier_budget(endpoint, mesure)
+    return mesure
+
+
+def budget_endpoint(endpoint: str):
+    """Budget SQL de l'endpoint : SQL_BUDGETS prime sur @budget_sql, None si aucun"""
+    budgets = current_app.config.get('SQL_BUDGETS') or {}
+    if endpoint in budgets:
+        return budgets[endpoint]
+    vue = current_app.view_functions.get(endpoint)
+    return getattr(vue, 'budget_sql', None)
+
+
+def verifier_budget(endpoint: str, mesure: MesureRequete):
+    """Lève DepassementBudgetSQL en mode test si le budget est dépassé, journalise sinon"""
+    budget = budget_endpoint(endpoint)
+    if budget is None or mesure.nb_sql <= budget:
+        return
+
+    message = f"Budget SQL dépassé sur {endpoint} : {mesure.nb_sql} ordres pour un budget de {budget}"
+    strict = current_app.config.get('SQL_BUDGET_STRICT')
+    if strict is None:
+        strict = current_app.testing
+    if strict:
+        formes = ', '.join(f"{n}x {forme[:120]}" for forme, n in mesure.formes.most_common(3))
+        raise DepassementBudgetSQL(f"{message} (plus fréquents : {formes})")
+    logger.warning("📉 %s", message)
+
+
+# ========================
+# EMPREINTE DES ORDRES SQL
+# ========================
+
+_PARAMETRE = r"(?:\?|%\(\w+\)s|%s|:\w+|\$\d+)"
+_RE_LISTE_PARAMETRES = re.compile(rf"\(\s*{_PARAMETRE}(?:\s*,\s*{_PARAMETRE})*\s*\)")
+_RE_PARAMETRE = re.compile(_PARAMETRE)
+_RE_CHAINE = re.compile(r"'(?:[^']|'')*'")
+_RE_NOMBRE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_ESPACES = re.compile(r"\s+")
+
+
+def forme_sql(statement: str) -> str:
+    """Forme normalisée d'un ordre SQL : deux exécutions « du même code » ont la même forme"""
+    forme = _RE_CHAINE.sub("'?'", statement)
+    forme = _RE_LISTE_PARAMETRES.sub('(?)', forme)
+    forme = _RE_PARAMETRE.sub('?', forme)
+    forme = _RE_NOMBRE.sub('N', forme)
+    return _RE_ESPACES.sub(' ', forme).strip()
+
+
+# ========================
+# ÉCOUTEURS SQLALCHEMY
+# ========================
+
+_ecouteurs_installes = [False]
+
+
+def _avant_execution(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and mesure_courante() is not None:
+        context._metriques_debut = time.perf_counter()
+
+
+def _apres_execution(conn, cursor, statement, parameters, context, executemany):
+    mesure = mesure_courante()
+    if mesure is None:
+        return
+    mesure.nb_sql += 1
+    debut = getattr(context, '_metriques_debut', None)
+    if debut is not None:
+        mesure.duree_sql += time.perf_counter() - debut
+    if mesure.formes is not None:
+        mesure.formes[forme_sql(statement)] += 1
+
+
+def _ligne_chargee(target, context):
+    mesure = mesure_courante()
+    if mesure is not None:
+        mesure.lignes += 1
+
+
+def installer_ecouteurs_sql():
+    """Branche les compteurs sur tous les engines et tous les mappers (une seule fois)"""
+    if _ecouteurs_installes[0]:
+        return
+    event.listen(Engine, 'before_cursor_execute', _avant_execution)
+    event.listen(Engine, 'after_cursor_execute', _apres_execution)
+    event.listen(Mapper, 'load', _ligne_chargee)
+    _ecouteurs_installes[0] = True
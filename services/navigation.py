@@ -0,0 +1,98 @@
+# services/navigation.py
+"""
+Données de navigation du layout (sélecteur de client, mode de vue)
+
+Le résultat est mis en cache par (utilisateur, rôle, tenant, langue, client
+visualisé, mode de vue, génération clients/formules). Toute écriture d'un Client
+ou d'une FormuleAbonnement incrémente la génération (models.py) : les entrées
+existantes ne sont plus jamais relues. Le TTL couvre les écritures faites par
+les autres workers.
+
+Les clients sont mis en cache sous forme de ClientResume (id, nom, reference) :
+un objet ORM ne doit pas survivre à la session de la requête qui l'a chargé.
+"""
+
+import time
+from collections import namedtuple
+
+ClientResume = namedtuple('ClientResume', ('id', 'nom', 'reference'))
+
+TTL_NAVIGATION = 60
+TAILLE_MAX_CACHE_NAVIGATION = 5000
+
+# clé -> (expiration, données de navigation)
+_CACHE_NAVIGATION = {}
+
+
+def _resumer(client):
+    return ClientResume(client.id, client.nom, client.reference) if client else None
+
+
+def _clients_disponibles(is_super_admin, client_id):
+    """Super admin : tous les clients actifs ; sinon le client de l'utilisateur s'il est actif"""
+    from models import Client
+
+    if is_super_admin:
+        clients = Client.query.filter_by(is_active=True).order_by(Client.nom).all()
+    elif client_id:
+        clients = Client.query.filter_by(id=client_id, is_active=True).all()
+    else:
+        clients = []
+    return [_resumer(client) for client in clients]
+
+
+def _construire(is_super_admin, client_id, viewing_client_id, view_mode):
+    from models import Client, db
+
+    viewing_client = _resumer(db.session.get(Client, viewing_client_id)) if viewing_client_id else None
+
+    # Texte à afficher
+    view_text = "Mon client"
+    view_icon = "fas fa-building"
+    view_class = "is-info"
+
+    if viewing_client:
+        view_text = f"Vue: {viewing_client.reference}"
+        view_icon = "fas fa-eye"
+        view_class = "is-success"
+    elif view_mode == 'my_data_only':
+        view_text = "Mes données"
+        view_icon = "fas fa-user"
+        view_class = "is-warning"
+
+    return {
+        'available_clients': _clients_disponibles(is_super_admin, client_id),
+        'viewing_client': viewing_client,
+        'is_viewing_other_client': viewing_client is not None,
+        'view_mode': view_mode,
+        'view_text': view_text,
+        'view_icon': view_icon,
+        'view_class': view_class,
+    }
+
+
+def donnees_navigation(ctx, session) -> dict:
+    """Données de navigation de la requête, depuis le cache si possible"""
+    from models import generation_clients_formules
+
+    user = ctx.user
+    is_super_admin = ctx.is_super_admin
+    client_id = getattr(user, 'client_id', None) if user is not None else None
+    viewing_client_id = session.get('viewing_client_id')
+    view_mode = session.get('view_mode', 'my_client')
+
+    cle = (ctx.user_id, ctx.role, client_id, ctx.lang, viewing_client_id, view_mode, generation_clients_formules())
+    maintenant = time.monotonic()
+    entree = _CACHE_NAVIGATION.get(cle)
+    if entree and entree[0] > maintenant:
+        return entree[1]
+
+    donnees = _construire(is_super_admin, client_id, viewing_client_id, view_mode)
+    if len(_CACHE_NAVIGATION) >= TAILLE_MAX_CACHE_NAVIGATION:
+        _CACHE_NAVIGATION.clear()
+    _CACHE_NAVIGATION[cle] = (maintenant + TTL_NAVIGATION, donnees)
+    return donnees
+
+
+def vider_cache_navigation():
+    _CACHE_NAVIGATION.clear()
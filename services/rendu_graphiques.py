@@ -0,0 +1,293 @@
+# services/rendu_graphiques.py
+"""
+Rendu matplotlib des matrices et graphiques dans un pool de processus
+
+matplotlib n'est pas thread-safe (état global de pyplot) et une matrice occupe
+plusieurs secondes de CPU : avec --threads=2, deux requêtes du même worker
+dessinaient en même temps dans la même figure courante. Les fonctions de dessin
+de utils.py (_dessiner_*) tournent donc dans RENDU_PROCESSUS processus dédiés :
+    - créés au premier rendu, puis réutilisés ;
+    - démarrés par 'forkserver' (défaut, 'spawn' à défaut) : le pool naît
+      dans un thread de requête d'un worker gthread qui fait aussi tourner le
+      QueueListener de la journalisation et le planificateur, et un fork fait
+      pendant qu'un autre thread tient un verrou peut bloquer l'enfant. Le
+      serveur de fork ne précharge que matplotlib ; chaque processus importe
+      utils à son premier dessin. 'fork' reste possible par RENDU_METHODE ;
+    - lancé par « python app.py », le module principal est app.py, que
+      'forkserver' et 'spawn' réexécuteraient dans chaque processus de rendu :
+      le rendu se fait alors dans le thread de la requête ;
+    - les entrées sont des données simples préparées dans la requête (jamais
+      d'objets ORM), le résultat est l'image en octets.
+
+Bornes, pour qu'une rafale de graphiques n'immobilise pas les workers web :
+    - au plus RENDU_FILE_MAX rendus en cours ou en attente par worker ; au-delà,
+      soumettre() attend une place RENDU_ATTENTE_FILE secondes puis lève
+      RenduIndisponible ;
+    - un résultat non obtenu en RENDU_DELAI secondes lève RenduIndisponible
+      (le rendu est annulé s'il n'a pas commencé).
+Un processus de rendu tué (mémoire...) casse le pool : il est recréé au rendu
+suivant.
+
+RENDU_PROCESSUS = 0 : rendu dans le thread appelant, sérialisé par un verrou.
+
+    image = rendu_graphiques.dessiner(_dessiner_matrice_risques, evaluations, 'classique')
+    images = rendu_graphiques.dessiner_plusieurs([(fonction, args), ...])   # en parallèle
+
+Métriques (statistiques() / format_prometheus()) : rendus par statut, en cours,
+durée cumulée, redémarrages du pool.
+"""
+
+import os
+import sys
+import time
+import atexit
+import signal
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from services.journalisation import obtenir_logger
+
+logger = obtenir_logger('rendu_graphiques')
+
+PREFIXE_PROMETHEUS = 'egalyx'
+PROCESSUS_DEFAUT = 2
+FILE_MAX_PAR_PROCESSUS = 4
+DELAI_DEFAUT = 30
+ATTENTE_FILE_DEFAUT = 2
+STATUTS = ('succes', 'echec', 'refus', 'delai')
+# Seuls modules importés par le serveur de fork : aucun thread à leur import
+PRECHARGEMENT_FORKSERVER = ['matplotlib.pyplot']
+
+
+class RenduIndisponible(RuntimeError):
+    """File de rendu pleine, délai dépassé ou processus de rendu interrompu"""
+
+
+def _initialiser_processus():
+    """Processus de rendu : matplotlib chargé avant le premier dessin"""
+    # Ctrl+C arrête le serveur de développement, pas chaque processus de rendu
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import matplotlib.pyplot  # noqa: F401
+
+
+def _pret():
+    return os.getpid()
+
+
+def _application_en_main(app) -> bool:
+    """Lancé par « python app.py » : le module principal est celui de l'application"""
+    return getattr(sys.modules.get('__main__'), 'app', None) is app
+
+
+def _methode_par_defaut() -> str:
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class ServiceRendu:
+    """Pool de processus de rendu du worker, créé au premier dessin"""
+
+    def __init__(self):
+        self.processus = PROCESSUS_DEFAUT
+        self.file_max = PROCESSUS_DEFAUT * FILE_MAX_PAR_PROCESSUS
+        self.delai = DELAI_DEFAUT
+        self.attente_file = ATTENTE_FILE_DEFAUT
+        self.methode = _methode_par_defaut()
+        self._pool = None
+        self._places = threading.BoundedSemaphore(self.file_max)
+        self._verrou = threading.Lock()
+        self._verrou_sur_place = threading.Lock()
+        self._arret_enregistre = False
+        self.en_cours = 0
+        self.compteurs = dict.fromkeys(STATUTS, 0)
+        self.duree_totale = 0.0
+        self.redemarrages = 0
+
+    def configurer(self, app):
+        """Lit RENDU_PROCESSUS, RENDU_FILE_MAX, RENDU_DELAI, RENDU_ATTENTE_FILE, RENDU_METHODE"""
+        self.processus = max(0, int(app.config.get('RENDU_PROCESSUS', PROCESSUS_DEFAUT)))
+        self.file_max = max(1, int(app.config.get('RENDU_FILE_MAX')
+                                   or max(1, self.processus) * FILE_MAX_PAR_PROCESSUS))
+        self.delai = app.config.get('RENDU_DELAI', DELAI_DEFAUT)
+        self.attente_file = app.config.get('RENDU_ATTENTE_FILE', ATTENTE_FILE_DEFAUT)
+        self.methode = app.config.get('RENDU_METHODE') or self.methode
+        if self.processus and self.methode != 'fork' and _application_en_main(app):
+            logger.info("🎨 Lancement par python app.py : pas de processus %s, qui réimporteraient app.py",
+                        self.methode)
+            self.processus = 0
+        self._places = threading.BoundedSemaphore(self.file_max)
+        if self.processus:
+            logger.info("🎨 Rendu des graphiques : %s processus (%s), file de %s",
+                        self.processus, self.methode, self.file_max)
+        else:
+            logger.info("🎨 Rendu des graphiques dans le thread de la requête")
+
+    # ---------- pool ----------
+
+    def _executeur(self):
+        with self._verrou:
+            if self._pool is None:
+                contexte = multiprocessing.get_context(self.methode)
+                if self.methode == 'forkserver':
+                    # Remplace le préchargement par défaut de __main__
+                    contexte.set_forkserver_preload(PRECHARGEMENT_FORKSERVER)
+                elif self.methode == 'fork':
+                    # Importé ici pour que les processus forkés en héritent
+                    import matplotlib.pyplot  # noqa: F401
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processus,
+                    mp_context=contexte,
+                    initializer=_initialiser_processus,
+                )
+                # Démarre tous les processus maintenant plutôt qu'au premier vrai rendu
+                for _ in range(self.processus):
+                    self._pool.submit(_pret)
+                if not self._arret_enregistre:
+                    atexit.register(self.arreter)
+                    self._arret_enregistre = True
+            return self._pool
+
+    def _abandonner(self, pool):
+        """Oublie un pool cassé ; le suivant est créé au prochain rendu"""
+        with self._verrou:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.redemarrages += 1
+        logger.error("❌ Processus de rendu interrompu, pool recréé au prochain rendu")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def arreter(self):
+        with self._verrou:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- rendu ----------
+
+    def _sur_place(self, fonction, args) -> Future:
+        future = Future()
+        debut = time.perf_counter()
+        try:
+            with self._verrou_sur_place:
+                future.set_result(fonction(*args))
+        except Exception as e:
+            future.set_exception(e)
+        self._compter('succes' if future.exception() is None else 'echec', debut)
+        return future
+
+    def _compter(self, statut, debut=None):
+        with self._verrou:
+            self.compteurs[statut] += 1
+            if debut is not None:
+                self.duree_totale += time.perf_counter() - debut
+
+    def _termine(self, pool, debut, future):
+        self._places.release()
+        with self._verrou:
+            self.en_cours -= 1
+        if future.cancelled():
+            return
+        exception = future.exception()
+        self._compter('succes' if exception is None else 'echec', debut)
+        if isinstance(exception, BrokenProcessPool):
+            self._abandonner(pool)
+
+    def soumettre(self, fonction, *args, attente=None) -> Future:
+        """Lance fonction(*args) dans le pool ; RenduIndisponible si aucune place ne se libère à temps"""
+        if not self.processus:
+            return self._sur_place(fonction, args)
+        if not self._places.acquire(timeout=self.attente_file if attente is None else attente):
+            self._compter('refus')
+            logger.warning("⚠️ File de rendu pleine (%s), graphique refusé", self.file_max)
+            raise RenduIndisponible(f"file de rendu pleine ({self.file_max})")
+        with self._verrou:
+            self.en_cours += 1
+        debut = time.perf_counter()
+        try:
+            pool = self._executeur()
+            try:
+                future = pool.submit(fonction, *args)
+            except BrokenProcessPool:
+                self._abandonner(pool)
+                pool = self._executeur()
+                future = pool.submit(fonction, *args)
+        except BaseException:
+            self._places.release()
+            with self._verrou:
+                self.en_cours -= 1
+            raise
+        future.add_done_callback(lambda f: self._termine(pool, debut, f))
+        return future
+
+    def resultat(self, future, delai=None):
+        """Résultat d'un rendu soumis ; RenduIndisponible au-delà du délai"""
+        delai = self.delai if delai is None else delai
+        try:
+            return future.result(timeout=delai)
+        except TimeoutError:
+            future.cancel()
+            self._compter('delai')
+            logger.warning("⚠️ Rendu non terminé après %ss", delai)
+            raise RenduIndisponible(f"rendu non terminé après {delai}s")
+        except BrokenProcessPool as e:
+            raise RenduIndisponible("processus de rendu interrompu") from e
+
+    def dessiner(self, fonction, *args):
+        """fonction(*args) rendue dans le pool, résultat attendu au plus RENDU_DELAI secondes"""
+        return self.resultat(self.soumettre(fonction, *args))
+
+    def dessiner_plusieurs(self, taches) -> list:
+        """[(fonction, args)] rendus en parallèle, résultats dans l'ordre, en RENDU_DELAI secondes au total"""
+        echeance = time.monotonic() + self.delai
+        futures = []
+        try:
+            for fonction, args in taches:
+                # Les rendus d'une même page attendent leur place jusqu'à l'échéance commune
+                attente = max(self.attente_file, echeance - time.monotonic()) if futures else None
+                futures.append(self.soumettre(fonction, *args, attente=attente))
+            return [self.resultat(future, max(0, echeance - time.monotonic())) for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    # ---------- métriques ----------
+
+    def statistiques(self) -> dict:
+        with self._verrou:
+            termines = self.compteurs['succes'] + self.compteurs['echec']
+            return {
+                'processus': self.processus,
+                'methode': self.methode if self.processus else 'sur_place',
+                'pool_actif': self._pool is not None,
+                'file_max': self.file_max,
+                'en_cours': self.en_cours,
+                **self.compteurs,
+                'duree_moyenne_ms': round(self.duree_totale / termines * 1000, 1) if termines else 0,
+                'redemarrages': self.redemarrages,
+            }
+
+    def format_prometheus(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4 (même convention que services/metriques.py)"""
+        p = PREFIXE_PROMETHEUS
+        with self._verrou:
+            sortie = [f'# HELP {p}_rendu_graphiques_total Rendus matplotlib par statut',
+                      f'# TYPE {p}_rendu_graphiques_total counter']
+            sortie += [f'{p}_rendu_graphiques_total{{statut="{statut}"}} {self.compteurs[statut]}'
+                       for statut in STATUTS]
+            sortie += [f'# HELP {p}_rendu_graphiques_secondes_total Durée cumulée des rendus terminés',
+                       f'# TYPE {p}_rendu_graphiques_secondes_total counter',
+                       f'{p}_rendu_graphiques_secondes_total {self.duree_totale:.3f}',
+                       f'# HELP {p}_rendu_graphiques_en_cours Rendus en cours ou en attente',
+                       f'# TYPE {p}_rendu_graphiques_en_cours gauge',
+                       f'{p}_rendu_graphiques_en_cours {self.en_cours}',
+                       f'# HELP {p}_rendu_graphiques_redemarrages_total Pools recréés après un processus interrompu',
+                       f'# TYPE {p}_rendu_graphiques_redemarrages_total counter',
+                       f'{p}_rendu_graphiques_redemarrages_total {self.redemarrages}']
+        return '\n'.join(sortie) + '\n'
+
+
+# Singleton du worker (configuré par app.py)
+rendu_graphiques = ServiceRendu()
@@ -0,0 +1,104 @@
+# services/replique.py
+"""
+Lectures des vues lourdes sur une réplique PostgreSQL
+
+Les vues déclarées @lecture_seule (tableaux de bord, rapports, exports)
+envoient leurs SELECT à l'engine « replique » (SQLALCHEMY_BINDS, alimenté
+par DATABASE_REPLICA_URL) ; tout le reste, écritures comprises, reste sur la
+base principale. Sans réplique configurée, rien ne change.
+
+Routage (SessionRoutage.get_bind), dans une vue @lecture_seule uniquement :
+    - SELECT sans FOR UPDATE -> réplique ;
+    - flush, INSERT / UPDATE / DELETE, SQL texte -> principale ;
+    - dès que la session a écrit, toute la suite de la requête lit la principale.
+
+Lecture de ses propres écritures : un commit qui a écrit quelque chose note
+l'instant dans la session Flask (cookie, donc valable pour tous les workers).
+Pendant REPLIQUE_DELAI_APRES_ECRITURE secondes, les vues @lecture_seule de cet
+utilisateur lisent la principale, le temps que la réplique rattrape son retard.
+
+Essai local avec deux bases : DATABASE_URL=sqlite:///principale.db et
+DATABASE_REPLICA_URL=sqlite:///replique.db (copie de la première).
+"""
+
+import time
+
+from flask import g, has_request_context, session as session_flask
+from flask_sqlalchemy.session import Session as SessionFlaskSQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.sql import Select, CompoundSelect
+
+from services.journalisation import obtenir_logger
+
+logger = obtenir_logger('replique')
+
+CLE_REPLIQUE = 'replique'
+CLE_DERNIERE_ECRITURE = 'derniere_ecriture'
+_SESSION_A_ECRIT = 'a_ecrit'
+
+
+def lecture_seule(f):
+    """Déclare une vue en lecture seule : ses SELECT peuvent aller sur la réplique
+    (placé juste au-dessus du def)"""
+    f.lecture_seule = True
+    return f
+
+
+def replique_configuree(app) -> bool:
+    return CLE_REPLIQUE in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def lire_sur_replique(app, vue) -> bool:
+    """La requête courante peut-elle lire la réplique (étape du pipeline de requête)"""
+    if not getattr(vue, 'lecture_seule', False) or not replique_configuree(app):
+        return False
+    derniere_ecriture = session_flask.get(CLE_DERNIERE_ECRITURE)
+    delai = app.config.get('REPLIQUE_DELAI_APRES_ECRITURE', 5)
+    return not (derniere_ecriture and time.time() - derniere_ecriture < delai)
+
+
+def _requete_sur_replique() -> bool:
+    if not has_request_context():
+        return False
+    ctx = g.get('ctx')
+    return ctx is not None and ctx.lecture_replique
+
+
+def _est_lecture(clause) -> bool:
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    return isinstance(clause, CompoundSelect)
+
+
+class SessionRoutage(SessionFlaskSQLAlchemy):
+    """Session Flask-SQLAlchemy qui envoie les lectures des vues @lecture_seule à la réplique"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not self.info.get(_SESSION_A_ECRIT)
+                and _est_lecture(clause) and _requete_sur_replique()):
+            engine = self._db.engines.get(CLE_REPLIQUE)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(SessionRoutage, 'after_flush')
+def _noter_ecriture(session, flush_context):
+    session.info[_SESSION_A_ECRIT] = True
+
+
+@event.listens_for(SessionRoutage, 'after_commit')
+def _memoriser_derniere_ecriture(session):
+    """Les prochaines vues @lecture_seule de l'utilisateur liront la principale"""
+    if not session.info.pop(_SESSION_A_ECRIT, False) or not has_request_context():
+        return
+    session_flask[CLE_DERNIERE_ECRITURE] = time.time()
+    # La fin de la requête relit aussi ce qui vient d'être écrit
+    ctx = g.get('ctx')
+    if ctx is not None:
+        ctx.lecture_replique = False
+
+
+@event.listens_for(SessionRoutage, 'after_rollback')
+def _oublier_ecriture(session):
+    session.info.pop(_SESSION_A_ECRIT, None)
@@ -0,0 +1,143 @@
+# services/request_context.py
+"""
+Contexte de requête calculé une seule fois
+
+Le hook unique preparer_contexte_requete (app.py) remplit un RequestContext et
+le range dans g.ctx. Les vues, context processors et décorateurs lisent ce
+contexte au lieu de refaire les mêmes lectures utilisateur / client / formule.
+"""
+
+from typing import Optional
+
+from flask import g, has_request_context
+
+LANGUES_SUPPORTEES = ('fr', 'en')
+LANGUE_PAR_DEFAUT = 'fr'
+
+
+def resoudre_langue(args, session, cookies):
+    """Langue de la requête : paramètre URL, puis session, puis cookie, sinon 'fr'"""
+    for source in (args, session, cookies):
+        lang = source.get('lang')
+        if lang in LANGUES_SUPPORTEES:
+            return lang
+    return LANGUE_PAR_DEFAUT
+
+
+class RequestContext:
+    """Langue, tenant, mode de vue, permissions et limites de formule d'une requête"""
+
+    def __init__(self, started_at: float = 0.0):
+        self.started_at: float = started_at
+        self.lang: str = LANGUE_PAR_DEFAUT
+
+        # Utilisateur
+        self.user = None
+        self.user_id: Optional[int] = None
+        self.role: Optional[str] = None
+        self.is_authenticated: bool = False
+        self.is_super_admin: bool = False
+
+        # Tenant
+        self.client_id: Optional[int] = None
+        self.filter_by_client: bool = False
+        self.client_subdomain: Optional[str] = None
+
+        # Mode de vue (super admin)
+        self.view_mode: str = 'my_client'
+        self.viewing_client_id: Optional[int] = None
+
+        # Lectures sur la réplique (vue @lecture_seule, services/replique.py)
+        self.lecture_replique: bool = False
+
+        # Carte d'identité de la requête : client, formule et accès modules lus une fois
+        self._client_charge: bool = False
+        self._client = None
+        self._formule_chargee: bool = False
+        self._formule = None
+        self._acces_modules: dict = {}
+        self._formule_superieure: Optional[bool] = None
+
+    def charger_utilisateur(self, user):
+        """Renseigne l'utilisateur connecté et le tenant qui en découle"""
+        if not getattr(user, 'is_authenticated', False):
+            return
+
+        self.user = user
+        self.user_id = user.id
+        self.role = user.role
+        self.is_authenticated = True
+        self.is_super_admin = user.role == 'super_admin'
+
+        # Super admin : pas de filtre, les autres sont cantonnés à leur client
+        if not self.is_super_admin:
+            self.client_id = user.client_id
+            self.filter_by_client = True
+
+    @property
+    def client(self):
+        """Client de l'utilisateur connecté, lu au premier accès (None pour un visiteur)"""
+        if not self._client_charge:
+            self._client = self.user.client if self.user is not None else None
+            self._client_charge = True
+        return self._client
+
+    @property
+    def formule(self):
+        """Formule du client, lue au premier accès puis conservée pour la requête"""
+        if not self._formule_chargee:
+            client = self.client
+            self._formule = client.formule if client else None
+            self._formule_chargee = True
+        return self._formule
+
+    @property
+    def formule_limits(self) -> dict:
+        """Limites de la formule par type de ressource"""
+        formule = self.formule
+        if not formule:
+            return {}
+        return {
+            'utilisateurs': formule.max_utilisateurs,
+            'risques': formule.max_risques,
+            'audits': formule.max_audits,
+            'processus': formule.max_processus,
+            'logigrammes': formule.max_logigrammes,
+        }
+
+    def peut_acceder_module(self, module_code: str) -> bool:
+        """Accès de la formule à un module (alias compris), calculé une fois par module"""
+        if module_code not in self._acces_modules:
+            formule = self.formule
+            self._acces_modules[module_code] = bool(formule and formule.can_access_module(module_code))
+        return self._acces_modules[module_code]
+
+    @property
+    def formule_superieure_disponible(self) -> bool:
+        """Une formule plus large existe (cache TTL du processus, puis mémo de la requête)"""
+        if self._formule_superieure is None:
+            formule = self.formule
+            self._formule_superieure = bool(formule and formule.existe_formule_superieure())
+        return self._formule_superieure
+
+    @property
+    def permissions(self) -> frozenset:
+        """Permissions effectives compilées de l'utilisateur (vide pour un visiteur)"""
+        if self.user is None:
+            return frozenset()
+        return self.user.get_effective_permissions()
+
+    def has_permission(self, permission: str) -> bool:
+        """Test d'appartenance sur les permissions compilées (super admin : toujours vrai)"""
+        if self.user is None:
+            return False
+        return self.user.has_permission(permission)
+
+
+def contexte_requete() -> RequestContext:
+    """Retourne g.ctx, ou un contexte vide hors requête / avant le pipeline"""
+    if has_request_context():
+        ctx = g.get('ctx')
+        if ctx is not None:
+            return ctx
+    return RequestContext()
@@ -0,0 +1,104 @@
+# services/sous_domaines.py
+"""
+Résolution hôte -> client pour le routage par sous-domaine
+
+Chaque hôte (request.host, port compris) est résolu une fois puis gardé en
+cache dans le processus :
+    - <reference>.localhost:<port>   -> Client.reference (développement) ;
+    - <sous_domaine>.votresociete.com -> EnvironnementClient.sous_domaine
+      (environnement non supprimé), à défaut Client.domaine.
+Les hôtes inconnus sont aussi mis en cache (cache négatif, TTL plus court) :
+un scan ou un sous-domaine mal saisi ne coûte pas une requête par appel.
+
+Toute écriture d'un Client ou d'un EnvironnementClient vide le cache
+(models.py), une seconde fois après le commit pour ne pas garder une valeur
+relue entre le flush et le commit. Le TTL couvre les écritures faites par les
+autres workers.
+
+Le cache contient des HoteClient (client_id, reference) : aucun objet ORM ne
+survit à la requête qui l'a chargé.
+"""
+
+import time
+import threading
+from collections import namedtuple
+
+HoteClient = namedtuple('HoteClient', ('client_id', 'reference'))
+
+DOMAINE_PRODUCTION = 'votresociete.com'  # Remplacez par votre vrai domaine
+SOUS_DOMAINES_RESERVES = ('www', 'api', 'admin')
+
+TTL_SOUS_DOMAINES = 300
+TTL_HOTE_INCONNU = 60
+TAILLE_MAX_CACHE_SOUS_DOMAINES = 10000
+
+# hôte -> (expiration, sous-domaine, HoteClient ou None)
+_CACHE_HOTES = {}
+_verrou = threading.Lock()
+
+
+def extraire_sous_domaine(host: str):
+    """(sous-domaine, production) de l'hôte, (None, False) hors routage par sous-domaine"""
+    if 'localhost' in host or '127.0.0.1' in host:
+        # Ex: client1.localhost:5000
+        if 'localhost' in host and ':' in host:
+            parts = host.split(':')[0].split('.')
+            if len(parts) > 1 and parts[0] not in SOUS_DOMAINES_RESERVES:
+                return parts[0], False
+        return None, False
+
+    if DOMAINE_PRODUCTION in host:
+        subdomain = host.replace(f'.{DOMAINE_PRODUCTION}', '')
+        if subdomain and subdomain not in SOUS_DOMAINES_RESERVES:
+            return subdomain, True
+    return None, False
+
+
+def _premiere_ligne(requete):
+    from models import db
+
+    # Résolution transverse : l'hôte peut désigner un autre tenant que celui de l'utilisateur
+    ligne = db.session.execute(requete.limit(1), execution_options={'sans_isolation': True}).first()
+    return HoteClient(ligne[0], ligne[1]) if ligne else None
+
+
+def _charger(host: str, subdomain: str, production: bool):
+    from models import db, Client, EnvironnementClient
+
+    if not production:
+        # En développement : sous-domaine = référence du client
+        return _premiere_ligne(db.select(Client.id, Client.reference).where(Client.reference == subdomain))
+
+    nom_hote = host.split(':')[0]
+    return (
+        _premiere_ligne(
+            db.select(Client.id, Client.reference)
+            .join(EnvironnementClient, EnvironnementClient.client_id == Client.id)
+            .where(EnvironnementClient.sous_domaine == nom_hote,
+                   EnvironnementClient.statut != 'supprime')
+        )
+        or _premiere_ligne(db.select(Client.id, Client.reference).where(Client.domaine == nom_hote))
+    )
+
+
+def resoudre_hote(host: str):
+    """(sous-domaine, HoteClient ou None) de l'hôte, depuis le cache si possible"""
+    maintenant = time.monotonic()
+    entree = _CACHE_HOTES.get(host)
+    if entree and entree[0] > maintenant:
+        return entree[1], entree[2]
+
+    subdomain, production = extraire_sous_domaine(host)
+    hote_client = _charger(host, subdomain, production) if subdomain else None
+
+    ttl = TTL_SOUS_DOMAINES if hote_client else TTL_HOTE_INCONNU
+    with _verrou:
+        if len(_CACHE_HOTES) >= TAILLE_MAX_CACHE_SOUS_DOMAINES:
+            _CACHE_HOTES.clear()
+        _CACHE_HOTES[host] = (maintenant + ttl, subdomain, hote_client)
+    return subdomain, hote_client
+
+
+def vider_cache_sous_domaines():
+    with _verrou:
+        _CACHE_HOTES.clear()
@@ -0,0 +1,184 @@
+# services/tableau_de_bord.py
+"""
+Indicateurs du tableau de bord principal, agrégés puis mis en cache par tenant
+
+Sur un défaut de cache, quatre ordres SQL au lieu d'une quinzaine :
+    1. risques : total, répartition par niveau et score moyen en une
+       agrégation conditionnelle (évaluation courante portée par Risque) ;
+    2. KRI, logigrammes, processus, veille : sous-requêtes scalaires d'un
+       même SELECT ;
+    3. les dix risques critiques les plus élevés ;
+    4. les cinq cartographies récentes avec leur nombre de risques actifs.
+
+Le résultat est gardé TTL_TABLEAU_DE_BORD secondes par portée : le client de
+l'utilisateur ou celui que le super admin visualise, TOUS_LES_CLIENTS pour le
+super admin sinon, ou None pour un utilisateur sans client (lignes sans
+client_id, comme get_client_filter). Toute écriture d'un risque, d'une
+évaluation, d'un KRI, d'une mesure, d'une veille, d'une action de conformité,
+d'une cartographie, d'un processus ou d'un logigramme invalide la portée du
+client et celle du super admin (models.py), une seconde fois après le commit.
+
+Le cache est celui de services/cache.py (espace « tableau_de_bord », portée
+client versionnée) : avec le backend Redis ou disque, une invalidation faite
+par un worker vaut pour tous. Avec le backend mémoire (défaut), chaque worker
+gunicorn a son cache et les autres workers peuvent servir des indicateurs
+périmés jusqu'à TTL_TABLEAU_DE_BORD secondes après une écriture.
+
+Le tableau de bord lit la réplique (@lecture_seule) : juste après une
+invalidation, le résultat n'est gardé que le temps du délai de réplication
+(REPLIQUE_DELAI_APRES_ECRITURE), pour ne pas figer une lecture en retard.
+
+Seuls des tuples nommés sont mis en cache, jamais d'objets ORM.
+"""
+
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, case, func, select, true
+
+from services.cache import cache_applicatif
+
+RisqueCritique = namedtuple('RisqueCritique', ('id', 'reference', 'cartographie_nom', 'score'))
+CartographieRecente = namedtuple('CartographieRecente',
+                                 ('id', 'nom', 'description', 'direction_nom', 'nb_risques_actifs'))
+
+TTL_TABLEAU_DE_BORD = 60
+# Portée du super admin, distincte de None (utilisateur sans client)
+TOUS_LES_CLIENTS = 'tous'
+# Identifiant de la portée None dans le cache applicatif
+_SANS_CLIENT = 'aucun'
+ESPACE_CACHE = 'tableau_de_bord'
+NB_RISQUES_CRITIQUES = 10
+NB_CARTOGRAPHIES_RECENTES = 5
+
+
+def _portee(modele, client_id):
+    if client_id == TOUS_LES_CLIENTS:
+        return true()
+    return modele.client_id.is_(None) if client_id is None else modele.client_id == client_id
+
+
+def _compter(modele, client_id, *conditions):
+    return (select(func.count()).select_from(modele)
+            .where(_portee(modele, client_id), *conditions).scalar_subquery())
+
+
+def _risques_par_niveau(client_id):
+    from models import db, Risque
+
+    def nombre(niveau):
+        return func.coalesce(func.sum(case((Risque.niveau_actuel == niveau, 1), else_=0)), 0)
+
+    ligne = db.session.execute(
+        select(func.count(Risque.id), nombre('Faible'), nombre('Moyen'), nombre('Élevé'), nombre('Critique'),
+               func.avg(Risque.score_actuel))
+        .where(_portee(Risque, client_id), Risque.is_archived == False)
+    ).one()
+    total, faibles, moyens, eleves, critiques, score_moyen = ligne
+    return {
+        'total_risques': total,
+        'risques_faibles': faibles,
+        'risques_moyens': moyens,
+        'risques_eleves': eleves,
+        'risques_critiques_count': critiques,
+        'score_risque_moyen': round(score_moyen, 2) if score_moyen else 0,
+    }
+
+
+def _autres_compteurs(client_id):
+    from models import (db, KRI, Risque, ProcessusActivite, Processus, VeilleReglementaire,
+                        ActionConformite)
+
+    kri_alertes = (
+        select(func.count()).select_from(KRI).join(Risque, KRI.risque_id == Risque.id)
+        .where(_portee(KRI, client_id), _portee(Risque, client_id), Risque.is_archived == False,
+               KRI.est_actif == True, KRI.etat_alerte.in_(KRI.ETATS_EN_ALERTE))
+        .scalar_subquery()
+    )
+    compteurs = {
+        'total_kri': _compter(KRI, client_id, KRI.est_actif == True),
+        'total_logigrammes': _compter(ProcessusActivite, client_id),
+        'logigrammes_actifs': _compter(ProcessusActivite, client_id, ProcessusActivite.is_archived == False),
+        'total_processus': _compter(Processus, client_id),
+        'processus_actifs': _compter(Processus, client_id, Processus.statut == 'actif'),
+        'veilles_actives': _compter(VeilleReglementaire, client_id, VeilleReglementaire.is_active == True,
+                                    VeilleReglementaire.is_archived == False),
+        'actions_retardees': _compter(ActionConformite, client_id,
+                                      ActionConformite.date_echeance < datetime.now().date(),
+                                      ActionConformite.statut.in_(['a_faire', 'en_cours']),
+                                      ActionConformite.is_archived == False),
+        'kri_alertes': kri_alertes,
+    }
+    ligne = db.session.execute(select(*compteurs.values())).one()
+    return dict(zip(compteurs, ligne))
+
+
+def _risques_critiques(client_id):
+    from models import db, Risque, Cartographie
+
+    lignes = db.session.execute(
+        select(Risque.id, Risque.reference, Cartographie.nom, Risque.score_actuel)
+        .outerjoin(Cartographie, Cartographie.id == Risque.cartographie_id)
+        .where(_portee(Risque, client_id), Risque.is_archived == False, Risque.niveau_actuel == 'Critique')
+        .order_by(Risque.score_actuel.desc())
+        .limit(NB_RISQUES_CRITIQUES)
+    ).all()
+    return [RisqueCritique(*ligne) for ligne in lignes]
+
+
+def _cartographies_recentes(client_id):
+    from models import db, Risque, Cartographie, Direction
+
+    lignes = db.session.execute(
+        select(Cartographie.id, Cartographie.nom, Cartographie.description, Direction.nom,
+               func.count(Risque.id))
+        .join(Risque, and_(Risque.cartographie_id == Cartographie.id, Risque.is_archived == False))
+        .outerjoin(Direction, Direction.id == Cartographie.direction_id)
+        .where(_portee(Cartographie, client_id))
+        .group_by(Cartographie.id, Cartographie.nom, Cartographie.description, Cartographie.created_at,
+                  Direction.nom)
+        .order_by(Cartographie.created_at.desc())
+        .limit(NB_CARTOGRAPHIES_RECENTES)
+    ).all()
+    return [CartographieRecente(*ligne) for ligne in lignes]
+
+
+def calculer_indicateurs(client_id) -> dict:
+    """Indicateurs du tableau de bord d'une portée (client_id, None ou TOUS_LES_CLIENTS), sans cache"""
+    indicateurs = _risques_par_niveau(client_id)
+    indicateurs.update(_autres_compteurs(client_id))
+    indicateurs['risques_critiques'] = _risques_critiques(client_id)
+    indicateurs['cartographies'] = _cartographies_recentes(client_id)
+    return indicateurs
+
+
+def _identifiant(client_id):
+    return _SANS_CLIENT if client_id is None else client_id
+
+
+def _ttl(identifiant) -> float:
+    """TTL_TABLEAU_DE_BORD, réduit au délai de réplication restant juste après une invalidation"""
+    invalide_le = cache_applicatif.derniere_invalidation('client', identifiant)
+    if invalide_le is None:
+        return TTL_TABLEAU_DE_BORD
+    delai_replique = current_app.config.get('REPLIQUE_DELAI_APRES_ECRITURE', 5)
+    return min(TTL_TABLEAU_DE_BORD, invalide_le + delai_replique - time.time())
+
+
+def indicateurs_tableau_de_bord(client_id) -> dict:
+    """Indicateurs du tableau de bord, depuis le cache si possible"""
+    identifiant = _identifiant(client_id)
+    ttl = _ttl(identifiant)
+    if ttl < 1:
+        # Lecture peut-être en retard sur la réplique : pas de mise en cache (SETEX de Redis : 1 s au moins)
+        return calculer_indicateurs(client_id)
+    return cache_applicatif.obtenir(ESPACE_CACHE, 'indicateurs', lambda: calculer_indicateurs(client_id),
+                                    client_id=identifiant, ttl=ttl)
+
+
+def invalider_tableau_de_bord(client_id=None):
+    """Périme les indicateurs d'un client (None : lignes sans client) et ceux du super admin"""
+    cache_applicatif.invalider_client(_identifiant(client_id))
+    cache_applicatif.invalider_client(TOUS_LES_CLIENTS)
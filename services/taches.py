@@ -0,0 +1,276 @@
+# services/taches.py
+"""
+Tâches planifiées exécutées une seule fois par cluster
+
+Chaque processus (worker gunicorn, nœud) démarre le même planificateur, mais
+seul le leader exécute les tâches. Le leadership est un bail en base (ligne
+'planificateur' de verrous_taches) renouvelé toutes les BAIL_RENOUVELLEMENT
+secondes ; s'il n'est plus renouvelé (worker arrêté, nœud tombé), il expire
+après BAIL_DUREE secondes et un autre processus le reprend.
+
+Chaque exécution prend en plus le bail 'tache:<id>', pour qu'une passation de
+leadership ne lance jamais la même tâche deux fois en parallèle. Pour une tâche
+à intervalle, ce bail est gardé jusqu'à 90 % de l'intervalle après le début de
+l'exécution : un nouveau leader ne la relance pas aussitôt. Chaque exécution
+est enregistrée dans executions_taches (début, durée, statut, erreur), lisible
+dans /super-admin/taches.
+
+Prise du bail : SELECT ... FOR UPDATE sur PostgreSQL (verrou de ligne) ; SQLite
+n'a pas de verrou de ligne, verrous_taches y sert de table de verrous avec une
+mise à jour conditionnelle (bail à nous ou expiré).
+
+    planificateur.ajouter('verif_statuts', automatiser_statuts_audits, 'interval', hours=1)
+    planificateur.demarrer(app)     # une fois par processus
+
+Une tâche locale au nœud (fichiers temporaires...) s'enregistre avec
+unique=False : elle tourne alors dans chaque processus, sans bail.
+"""
+
+import os
+import time
+import atexit
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from services.journalisation import obtenir_logger
+
+logger = obtenir_logger('taches')
+
+BAIL_LEADER = 'planificateur'
+BAIL_DUREE = 90
+BAIL_RENOUVELLEMENT = 30
+# Une exécution plus longue peut être relancée ailleurs
+DUREE_MAX_TACHE = 3600
+# Part de l'intervalle pendant laquelle une tâche à intervalle n'est pas relancée
+ESPACEMENT_MIN = 0.9
+RETENTION_EXECUTIONS_JOURS = 30
+TAILLE_MAX_ERREUR = 4000
+
+_UNITES_INTERVALLE = ('weeks', 'days', 'hours', 'minutes', 'seconds')
+
+
+def identite_processus() -> str:
+    """Détenteur des baux : hôte et PID (calculé après le fork des workers)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ========================
+# BAUX EN BASE
+# ========================
+
+def acquerir_bail(engine, nom: str, duree: float) -> bool:
+    """Prend ou renouvelle le bail `nom` pour `duree` secondes ; False s'il est détenu ailleurs"""
+    from models import VerrouTache
+    table = VerrouTache.__table__
+    moi = identite_processus()
+    maintenant = datetime.utcnow()
+    expiration = maintenant + timedelta(seconds=duree)
+
+    try:
+        with engine.begin() as conn:
+            requete = select(table.c.detenteur, table.c.expire_le).where(table.c.nom == nom)
+            if conn.dialect.name == 'postgresql':
+                requete = requete.with_for_update()
+            ligne = conn.execute(requete).first()
+
+            if ligne is None:
+                conn.execute(insert(table).values(nom=nom, detenteur=moi, expire_le=expiration,
+                                                  acquis_le=maintenant))
+                return True
+
+            if ligne.detenteur != moi and ligne.expire_le > maintenant:
+                return False
+
+            valeurs = {'detenteur': moi, 'expire_le': expiration}
+            if ligne.detenteur != moi:
+                valeurs['acquis_le'] = maintenant
+            # Conditionnelle : sans verrou de ligne (SQLite), un autre processus a pu passer avant
+            resultat = conn.execute(
+                update(table)
+                .where(table.c.nom == nom,
+                       (table.c.detenteur == moi) | (table.c.expire_le <= maintenant))
+                .values(**valeurs)
+            )
+            return resultat.rowcount == 1
+    except IntegrityError:
+        # Ligne créée en même temps par un autre processus
+        return False
+
+
+def liberer_bail(engine, nom: str, garder_jusqua: datetime = None):
+    """Rend le bail `nom` s'il est à nous (ou le garde jusqu'à `garder_jusqua`)"""
+    from models import VerrouTache
+    table = VerrouTache.__table__
+    condition = (table.c.nom == nom) & (table.c.detenteur == identite_processus())
+    with engine.begin() as conn:
+        if garder_jusqua is not None and garder_jusqua > datetime.utcnow():
+            conn.execute(update(table).where(condition).values(expire_le=garder_jusqua))
+        else:
+            conn.execute(delete(table).where(condition))
+
+
+def enregistrer_execution(engine, tache: str, debut: datetime, duree_ms: int, statut: str, erreur: str = None):
+    from models import ExecutionTache
+    with engine.begin() as conn:
+        conn.execute(insert(ExecutionTache.__table__).values(
+            tache=tache, detenteur=identite_processus(), debut=debut,
+            fin=debut + timedelta(milliseconds=duree_ms), duree_ms=duree_ms,
+            statut=statut, erreur=erreur
+        ))
+
+
+def purger_executions(jours: int = RETENTION_EXECUTIONS_JOURS) -> int:
+    """Supprime l'historique des exécutions de plus de `jours` jours"""
+    from models import db, ExecutionTache
+    limite = datetime.utcnow() - timedelta(days=jours)
+    supprimees = ExecutionTache.query.filter(ExecutionTache.debut < limite).delete(synchronize_session=False)
+    db.session.commit()
+    return supprimees
+
+
+# ========================
+# PLANIFICATEUR
+# ========================
+
+class Planificateur:
+    """BackgroundScheduler du processus ; les tâches uniques ne s'exécutent que chez le leader"""
+
+    def __init__(self):
+        # id -> {'fonction', 'trigger', 'nom', 'unique', 'declencheur'}
+        self._taches = {}
+        self._scheduler = None
+        self._app = None
+        self.est_leader = False
+        self._verrou = threading.Lock()
+
+    def ajouter(self, id_tache: str, fonction, trigger: str, nom: str = None, unique: bool = True, **declencheur):
+        """Enregistre une tâche (trigger et paramètres APScheduler : 'interval', hours=1 / 'cron', hour=8...)"""
+        self._taches[id_tache] = {
+            'fonction': fonction,
+            'trigger': trigger,
+            'nom': nom or fonction.__name__,
+            'unique': unique,
+            'declencheur': declencheur,
+        }
+        if self._scheduler is not None:
+            self._planifier(id_tache)
+
+    def _planifier(self, id_tache):
+        tache = self._taches[id_tache]
+        self._scheduler.add_job(
+            func=self._executer, args=(id_tache,), trigger=tache['trigger'],
+            id=id_tache, name=tache['nom'], replace_existing=True,
+            coalesce=True, max_instances=1, **tache['declencheur']
+        )
+
+    def demarrer(self, app):
+        """Démarre le scheduler de ce processus (une seule fois)"""
+        with self._verrou:
+            if self._scheduler is not None:
+                return
+            from apscheduler.schedulers.background import BackgroundScheduler
+            self._app = app
+            self._scheduler = BackgroundScheduler()
+            self._scheduler.add_job(
+                func=self._renouveler_leadership, trigger='interval', seconds=BAIL_RENOUVELLEMENT,
+                id='_leadership', name='Bail du planificateur', next_run_time=datetime.now(),
+                coalesce=True, max_instances=1
+            )
+            for id_tache in self._taches:
+                self._planifier(id_tache)
+            self._scheduler.start()
+            atexit.register(self.arreter)
+        logger.debug("✅ Planificateur démarré (%s tâches, %s)", len(self._taches), identite_processus())
+
+    def arreter(self):
+        """Arrête le scheduler et rend le bail de leader pour une reprise immédiate"""
+        if self._scheduler is None or not self._scheduler.running:
+            return
+        self._scheduler.shutdown(wait=False)
+        if self.est_leader:
+            self.est_leader = False
+            try:
+                with self._app.app_context():
+                    from models import db
+                    liberer_bail(db.engine, BAIL_LEADER)
+            except Exception as e:
+                logger.warning("⚠️ Bail du planificateur non rendu: %s", e)
+
+    def _renouveler_leadership(self):
+        from models import db
+        with self._app.app_context():
+            try:
+                leader = acquerir_bail(db.engine, BAIL_LEADER, BAIL_DUREE)
+            except Exception as e:
+                logger.error("❌ Bail du planificateur: %s", e)
+                leader = False
+        if leader != self.est_leader:
+            logger.info("👑 %s %s leader du planificateur", identite_processus(),
+                        'devient' if leader else "n'est plus")
+        self.est_leader = leader
+
+    def _espacement(self, tache):
+        """Délai minimal entre deux exécutions d'une tâche à intervalle (None pour un cron)"""
+        if tache['trigger'] != 'interval':
+            return None
+        intervalle = timedelta(**{unite: tache['declencheur'][unite]
+                                  for unite in _UNITES_INTERVALLE if unite in tache['declencheur']})
+        return intervalle * ESPACEMENT_MIN
+
+    def _executer(self, id_tache):
+        tache = self._taches[id_tache]
+        if tache['unique'] and not self.est_leader:
+            return
+        from models import db, ExecutionTache
+        bail = f"tache:{id_tache}"
+        with self._app.app_context():
+            if tache['unique'] and not acquerir_bail(db.engine, bail, DUREE_MAX_TACHE):
+                logger.info("⏭️ Tâche %s déjà en cours ou exécutée récemment ailleurs", id_tache)
+                return
+
+            debut = datetime.utcnow()
+            chrono = time.perf_counter()
+            statut, erreur = ExecutionTache.STATUT_SUCCES, None
+            try:
+                tache['fonction']()
+            except Exception as e:
+                statut, erreur = ExecutionTache.STATUT_ECHEC, traceback.format_exc()[-TAILLE_MAX_ERREUR:]
+                logger.error("❌ Tâche %s en échec: %s", id_tache, e)
+                db.session.rollback()
+            duree_ms = int((time.perf_counter() - chrono) * 1000)
+
+            try:
+                enregistrer_execution(db.engine, id_tache, debut, duree_ms, statut, erreur)
+                if tache['unique']:
+                    espacement = self._espacement(tache)
+                    liberer_bail(db.engine, bail, debut + espacement if espacement else None)
+            except Exception as e:
+                logger.error("❌ Suivi de la tâche %s: %s", id_tache, e)
+
+    def etat(self) -> dict:
+        """Rôle du processus et prochaines exécutions prévues"""
+        taches = []
+        for id_tache, tache in self._taches.items():
+            job = self._scheduler.get_job(id_tache) if self._scheduler is not None else None
+            taches.append({
+                'id': id_tache,
+                'nom': tache['nom'],
+                'unique': tache['unique'],
+                'prochaine_execution': job.next_run_time.isoformat() if job and job.next_run_time else None,
+            })
+        return {
+            'processus': identite_processus(),
+            'demarre': self._scheduler is not None,
+            'est_leader': self.est_leader,
+            'taches': taches,
+        }
+
+
+planificateur = Planificateur()
+planificateur.ajouter('purge_executions_taches', purger_executions, 'cron',
+                      nom="Purge de l'historique des tâches", hour=3, minute=30)
@@ -1,8 +1,9 @@
 # tasks/notifications.py
-from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload
 from models import db, PlanAction, Recommandation, KRI, MesureKRI, Notification
 from services.notification_service import NotificationService
+from services.taches import planificateur
 from flask import current_app
 
 def check_echeances_et_alertes():
@@ -35,12 +36,14 @@ def check_echeances_et_alertes():
                             entite_id=reco.id
                         )
             
-            # Vérifier les KRI (dernière mesure > seuil)
-            kris = KRI.query.filter_by(est_actif=True).all()
+            # Vérifier les KRI (état de la dernière mesure maintenu sur KRI)
+            kris = KRI.query.options(joinedload(KRI.derniere_mesure)).filter(
+                KRI.est_actif == True,
+                KRI.etat_alerte.in_(('alerte', 'critique')),
+                KRI.responsable_mesure_id.isnot(None)
+            ).all()
             for kri in kris:
-                derniere_mesure = kri.get_derniere_mesure()
-                if derniere_mesure:
-                    NotificationService.notify_kri_alert(kri, derniere_mesure)
+                NotificationService.notify_kri_alert(kri, kri.derniere_mesure)
             
             db.session.commit()
             print("✅ Vérification des échéances terminée")
@@ -59,30 +62,14 @@ def cleanup_old_notifications():
             print(f"❌ Erreur nettoyage: {e}")
 
 def init_notification_tasks(app):
-    """Initialiser les tâches planifiées"""
-    scheduler = BackgroundScheduler()
-    
+    """Enregistre les tâches de notifications auprès du planificateur partagé (services/taches.py)"""
     # Vérifier les échéances toutes les heures
-    scheduler.add_job(
-        func=check_echeances_et_alertes,
-        trigger='interval',
-        hours=1,
-        id='check_echeances',
-        name='Vérification échéances et alertes',
-        replace_existing=True
-    )
+    planificateur.ajouter('check_echeances', check_echeances_et_alertes, 'interval',
+                          nom='Vérification échéances et alertes', hours=1)
     
     # Nettoyer les anciennes notifications tous les jours à minuit
-    scheduler.add_job(
-        func=cleanup_old_notifications,
-        trigger='cron',
-        hour=0,
-        minute=0,
-        id='cleanup_notifications',
-        name='Nettoyage notifications anciennes',
-        replace_existing=True
-    )
+    planificateur.ajouter('cleanup_notifications', cleanup_old_notifications, 'cron',
+                          nom='Nettoyage notifications anciennes', hour=0, minute=0)
     
-    scheduler.start()
-    print("✅ Tâches de notifications planifiées démarrées")
-    return scheduler
\ No newline at end of file
+    planificateur.demarrer(app)
+    return planificateur
@@ -0,0 +1,50 @@
+"""
+Fixtures communes aux tests
+
+L'application est importée une seule fois par session, sur une base SQLite
+temporaire (mêmes outils que les benchmarks : jamais les bases d'instance/).
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import outils_bench  # noqa: E402
+
+# config.py lit DATABASE_URL à son import, qui peut précéder le premier fixture
+# (collecte des modules de test important services.*)
+BASE_DE_TEST = os.path.join(tempfile.mkdtemp(prefix='tests_'), 'tests.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{BASE_DE_TEST}'
+
+
+@pytest.fixture(scope='session')
+def module_app():
+    module = outils_bench.charger_application(BASE_DE_TEST)
+    module.app.config.update(TESTING=True, SQL_GARDE_ACTIVE=True)
+    return module
+
+
+@pytest.fixture(scope='session')
+def tenant(module_app):
+    """(user_id, client_id) d'un administrateur client avec une cartographie de taille fixture"""
+    user_id, client_id = outils_bench.creer_tenant_de_test(module_app, 'admin', 'tests_admin')
+    outils_bench.creer_cartographies(module_app, client_id, user_id,
+                                     nb_cartographies=1, risques_par_cartographie=20)
+    return user_id, client_id
+
+
+@pytest.fixture
+def client_connecte(module_app, tenant):
+    client = module_app.app.test_client()
+    outils_bench.connecter(client, tenant[0])
+    return client
+
+
+@pytest.fixture
+def cartographie_id(module_app, tenant):
+    with module_app.app.app_context():
+        return module_app.Cartographie.query.filter_by(client_id=tenant[1]).first().id
@@ -0,0 +1,43 @@
+"""Garde SQL : budget d'ordres SQL par endpoint (@budget_sql / SQL_BUDGETS)"""
+
+import pytest
+
+from services.metriques import DepassementBudgetSQL, registre
+
+
+def test_depassement_du_budget_leve_en_mode_test(module_app, client_connecte, cartographie_id, monkeypatch):
+    monkeypatch.setitem(module_app.app.config, 'SQL_BUDGETS', {'detail_cartographie': 1})
+
+    with pytest.raises(DepassementBudgetSQL, match='detail_cartographie'):
+        client_connecte.get(f'/cartographie/{cartographie_id}')
+
+
+def test_cartographie_de_taille_fixture_dans_le_budget(module_app, client_connecte, cartographie_id):
+    budget = module_app.detail_cartographie.budget_sql
+    registre.reinitialiser()
+
+    reponse = client_connecte.get(f'/cartographie/{cartographie_id}')
+
+    assert reponse.status_code == 200
+    statistiques = {ligne['endpoint']: ligne for ligne in registre.instantane()}
+    assert 0 < statistiques['detail_cartographie']['sql_max_par_requete'] <= budget
+
+
+def test_export_excel_depassement_du_budget(module_app, client_connecte, cartographie_id, monkeypatch):
+    monkeypatch.setitem(module_app.app.config, 'SQL_BUDGETS', {'export_risques_excel': 1})
+
+    with pytest.raises(DepassementBudgetSQL, match='export_risques_excel'):
+        client_connecte.get(f'/export/risques-excel/{cartographie_id}')
+
+
+def test_export_excel_dans_le_budget_sans_n_plus_1(module_app, client_connecte, cartographie_id):
+    budget = module_app.export_risques_excel.budget_sql
+    registre.reinitialiser()
+
+    reponse = client_connecte.get(f'/export/risques-excel/{cartographie_id}')
+
+    assert reponse.status_code == 200
+    assert reponse.mimetype == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    statistiques = {ligne['endpoint']: ligne for ligne in registre.instantane()}['export_risques_excel']
+    assert 0 < statistiques['sql_max_par_requete'] <= budget
+    assert statistiques['n_plus_1'] == 0
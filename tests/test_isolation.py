@@ -0,0 +1,98 @@
+"""Isolation SQL des tenants (services/isolation.py) : hook do_orm_execute et with_loader_criteria"""
+
+from types import SimpleNamespace
+
+import pytest
+from flask import g
+
+import outils_bench
+from services.isolation import sans_isolation
+
+
+@pytest.fixture(scope='module')
+def donnees(module_app, tenant):
+    """Un second client, et une cartographie du tenant contenant un risque rattaché à ce client"""
+    m = module_app
+    user_id, client_id = tenant
+    with m.app.app_context():
+        formule_id = m.db.session.get(m.Client, client_id).formule_id
+        autre = m.Client(nom='Client Isolation', reference='isolation', formule_id=formule_id, is_active=True)
+        m.db.session.add(autre)
+        m.db.session.flush()
+
+        cartographie_autre = m.Cartographie(nom='Cartographie autre client', client_id=autre.id,
+                                            created_by=user_id)
+        cartographie = m.Cartographie(nom='Cartographie isolation', client_id=client_id, created_by=user_id)
+        m.db.session.add_all([cartographie_autre, cartographie])
+        m.db.session.flush()
+        m.db.session.add_all([
+            m.Risque(reference='ISO-1', intitule='Risque du tenant', cartographie_id=cartographie.id,
+                     client_id=client_id, created_by=user_id),
+            m.Risque(reference='ISO-2', intitule="Risque d'un autre client", cartographie_id=cartographie.id,
+                     client_id=autre.id, created_by=user_id),
+            m.ConfigurationListeDeroulante(nom_technique='iso_globale', nom_affichage='Globale', valeurs=[]),
+            m.ConfigurationListeDeroulante(nom_technique='iso_tenant', nom_affichage='Tenant', valeurs=[],
+                                           client_id=client_id),
+            m.ConfigurationListeDeroulante(nom_technique='iso_autre', nom_affichage='Autre', valeurs=[],
+                                           client_id=autre.id),
+        ])
+        m.db.session.commit()
+        return SimpleNamespace(client_id=client_id, autre_client_id=autre.id, cartographie_id=cartographie.id,
+                               cartographie_autre_id=cartographie_autre.id)
+
+
+@pytest.fixture
+def requete_du_tenant(module_app, donnees):
+    """Contexte de requête isolé sur le tenant, comme après le pipeline de requête"""
+    with module_app.app.test_request_context():
+        g.ctx = SimpleNamespace(filter_by_client=True, client_id=donnees.client_id, lecture_replique=False)
+        yield module_app
+        module_app.db.session.remove()
+
+
+def test_cartographie_d_un_autre_client_introuvable(client_connecte, donnees):
+    assert client_connecte.get(f'/cartographie/{donnees.cartographie_autre_id}').status_code == 404
+    assert client_connecte.get(f'/api/cartographie/{donnees.cartographie_autre_id}/stats').status_code == 404
+
+
+def test_requetes_restreintes_au_tenant(requete_du_tenant, donnees):
+    m = requete_du_tenant
+    clients = {c.client_id for c in m.Cartographie.query.all()}
+
+    assert clients == {donnees.client_id}
+    assert m.db.session.get(m.Cartographie, donnees.cartographie_autre_id) is None
+
+
+def test_chargement_de_relation_filtre(requete_du_tenant, donnees):
+    m = requete_du_tenant
+    cartographie = m.db.session.get(m.Cartographie, donnees.cartographie_id)
+
+    assert [r.reference for r in cartographie.risques] == ['ISO-1']
+
+
+def test_lignes_globales_de_configuration_partagee_visibles(requete_du_tenant):
+    m = requete_du_tenant
+    noms = {c.nom_technique for c in m.ConfigurationListeDeroulante.query
+            .filter(m.ConfigurationListeDeroulante.nom_technique.like('iso_%'))}
+
+    assert noms == {'iso_globale', 'iso_tenant'}
+
+
+def test_sans_isolation_voit_tous_les_tenants(requete_du_tenant, donnees):
+    m = requete_du_tenant
+    with sans_isolation():
+        cartographie = m.db.session.get(m.Cartographie, donnees.cartographie_id)
+        assert {r.reference for r in cartographie.risques} == {'ISO-1', 'ISO-2'}
+
+    requete = m.Cartographie.query.filter_by(id=donnees.cartographie_autre_id)
+    assert requete.execution_options(sans_isolation=True).one_or_none() is not None
+
+
+def test_super_admin_non_isole(module_app, donnees):
+    super_admin_id, _ = outils_bench.creer_tenant_de_test(module_app, 'super_admin', 'tests_super_admin')
+    client = module_app.app.test_client()
+    outils_bench.connecter(client, super_admin_id)
+
+    reponse = client.get(f'/api/cartographie/{donnees.cartographie_autre_id}/stats')
+
+    assert reponse.status_code == 200
@@ -0,0 +1,104 @@
+"""MultiTenantManager (config/tenancy.py) sur une base SQLite par client"""
+
+import importlib.util
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+RACINE_PROJET = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def charger_tenancy():
+    """config/tenancy.py est masqué par config.py à l'import : chargement par chemin"""
+    spec = importlib.util.spec_from_file_location('tenancy', os.path.join(RACINE_PROJET, 'config', 'tenancy.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+tenancy = charger_tenancy()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    """Deux engines au plus, une connexion chacun, une seconde d'attente maximale"""
+    gestionnaire = tenancy.MultiTenantManager(url=f'sqlite:///{tmp_path}/client_{{client_id}}.db',
+                                              max_engines=2, budget_connexions=2, pool_timeout=1)
+    yield gestionnaire
+    gestionnaire.fermer()
+
+
+def connexions_empruntees(manager):
+    return sum(ligne['connexions_utilisees'] for ligne in manager.statistiques())
+
+
+def test_une_base_par_client_et_sessionmaker_reutilisee(manager, tmp_path):
+    for client_id in (1, 2):
+        session = manager.get_session_for_client(client_id)
+        session.execute(text('CREATE TABLE sonde (client INTEGER)'))
+        session.execute(text('INSERT INTO sonde VALUES (:c)'), {'c': client_id})
+        session.commit()
+        session.close()
+
+    assert (tmp_path / 'client_1.db').exists() and (tmp_path / 'client_2.db').exists()
+    with manager.get_session_for_client(2) as session:
+        assert session.execute(text('SELECT client FROM sonde')).scalar() == 2
+    assert manager.connections[1].fabrique_session is manager.connections[1].fabrique_session
+    assert manager.taille_pool == 1
+
+
+def test_eviction_lru_des_engines_inactifs(manager):
+    for client_id in (1, 2, 1, 3):
+        with manager.get_engine_for_client(client_id).connect() as connexion:
+            connexion.execute(text('SELECT 1'))
+
+    assert list(manager.connections) == [1, 3]
+    statistiques = {ligne['client_id']: ligne for ligne in manager.statistiques()}
+    assert statistiques[2]['evictions'] == 1
+    assert statistiques[1]['checkouts'] == 2
+
+
+def test_engine_occupe_jamais_evince(manager):
+    connexions = [manager.get_engine_for_client(client_id).connect() for client_id in (1, 2)]
+    try:
+        with pytest.raises(tenancy.DelaiPoolDepasse):
+            manager.get_engine_for_client(3)
+        assert list(manager.connections) == [1, 2]
+        assert connexions_empruntees(manager) == 2
+    finally:
+        for connexion in connexions:
+            connexion.close()
+
+    statistiques = {ligne['client_id']: ligne for ligne in manager.statistiques()}
+    assert statistiques[3]['attentes_engine'] == 1
+    assert statistiques[3]['delais_depasses'] == 1
+
+
+def test_nouveau_client_attend_une_connexion_rendue(manager):
+    connexions = [manager.get_engine_for_client(client_id).connect() for client_id in (1, 2)]
+    rendue = threading.Timer(0.2, connexions[0].close)
+    rendue.start()
+    debut = time.monotonic()
+    try:
+        with manager.get_engine_for_client(3).connect() as connexion:
+            assert connexion.execute(text('SELECT 1')).scalar() == 1
+            assert connexions_empruntees(manager) <= manager.budget_connexions
+    finally:
+        rendue.join()
+        connexions[1].close()
+
+    assert 0.1 < time.monotonic() - debut < 1
+    assert list(manager.connections) == [2, 3]
+
+
+def test_metriques_prometheus_par_client(manager):
+    with manager.get_engine_for_client(7).connect():
+        pass
+
+    sortie = manager.format_prometheus()
+    assert 'egalyx_tenant_pool_checkouts_total{client_id="7"} 1' in sortie
+    assert 'egalyx_tenant_pool_attentes_engine_total{client_id="7"} 0' in sortie
+    assert 'egalyx_tenant_engines_actifs 1' in sortie
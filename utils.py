@@ -1,12 +1,22 @@
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import numpy as np
 from io import BytesIO
 import base64
+from collections import namedtuple
 from datetime import datetime, timedelta
 
+from services.cache import cache_applicatif
+from services.cache_matrices import empreinte_matrice, magasin_matrices
+from services.matrices_svg import points_matrice
+from services.rendu_graphiques import rendu_graphiques
+from services.dependances import module_differe
+from services.journalisation import obtenir_logger, EN_BOUCLE
+
+logger = obtenir_logger('utils')
+
+# Importés au premier graphique / calcul (backend Agg, voir services/dependances.py)
+plt = module_differe('matplotlib.pyplot')
+patches = module_differe('matplotlib.patches')
+np = module_differe('numpy')
+
 def calculer_niveau_risque(impact, probabilite):
     """Calculer le niveau de risque basé sur la matrice des risques - VERSION SYNCHRONISÉE"""
     score = impact * probabilite
@@ -33,7 +43,41 @@ def get_couleur_risque(score):
     else:
         return 'red'             # Critique (17-25)
 
+# Copies picklables des champs lus par les fonctions de dessin, envoyées aux
+# processus de rendu (services/rendu_graphiques.py) à la place des objets ORM
+RisqueDessin = namedtuple('RisqueDessin', ('id', 'reference'))
+EvaluationDessin = namedtuple('EvaluationDessin', (
+    'impact_conf', 'impact_val', 'impact_pre', 'probabilite_conf', 'probabilite_val', 'probabilite_pre',
+    'niveau_maitrise_pre', 'risque'))
+
+def _risque_dessin(risque):
+    return RisqueDessin(risque.id, risque.reference) if risque is not None else None
+
+def _evaluations_dessin(evaluations):
+    return [EvaluationDessin(e.impact_conf, e.impact_val, e.impact_pre, e.probabilite_conf, e.probabilite_val,
+                             e.probabilite_pre, e.niveau_maitrise_pre, _risque_dessin(e.risque))
+            for e in evaluations]
+
 def generer_matrice_risques(evaluations, matrice_type='classique'):
+    """Matrice de risques en PNG base64, servie par le cache disque si ses entrées n'ont pas changé"""
+    return base64.b64encode(matrice_risques_png(evaluations, matrice_type)).decode('utf-8')
+
+def matrice_risques_png(evaluations, matrice_type='classique', empreinte=None):
+    """Octets PNG de la matrice, depuis le cache disque (empreinte calculée si absente)"""
+    if empreinte is None:
+        empreinte = empreinte_matrice(matrice_type, points_matrice(evaluations))
+    return magasin_matrices().obtenir(empreinte, lambda: rendu_graphiques.dessiner(
+        _dessiner_matrice_risques, _evaluations_dessin(evaluations), matrice_type))
+
+def matrices_risques_png(demandes):
+    """Octets PNG de plusieurs matrices [(évaluations, type)] ; celles absentes du cache disque sont dessinées en parallèle"""
+    empreintes = [empreinte_matrice(matrice_type, points_matrice(evaluations))
+                  for evaluations, matrice_type in demandes]
+    return magasin_matrices().obtenir_plusieurs(empreintes, lambda absentes: rendu_graphiques.dessiner_plusieurs([
+        (_dessiner_matrice_risques, (_evaluations_dessin(demandes[i][0]), demandes[i][1])) for i in absentes
+    ]))
+
+def _dessiner_matrice_risques(evaluations, matrice_type='classique'):
     """Générer différentes matrices de risques avec positionnement CORRECT - VERSION CORRIGÉE"""
     fig, ax = plt.subplots(figsize=(14, 12))
     
@@ -62,7 +106,7 @@ def generer_matrice_risques(evaluations, matrice_type='classique'):
     evaluations_valides = []
     risques_non_evalues = []
     
-    print(f"🎯 Traitement de {len(evaluations)} évaluations pour la matrice {matrice_type}")
+    logger.debug("🎯 Traitement de %s évaluations pour la matrice %s", len(evaluations), matrice_type)
     
     for idx, evaluation in enumerate(evaluations):
         # Utiliser les valeurs finales selon la priorité
@@ -109,12 +153,12 @@ def generer_matrice_risques(evaluations, matrice_type='classique'):
             risques_par_position[position_key].append(risque_data)
             evaluations_valides.append(evaluation)
             
-            print(f"📍 Risque positionné CORRECT: {evaluation.risque.reference} à P{probabilite}/I{impact} -> Case [{x}, {y}] -> Score: {score_calcule}")
+            logger.debug("📍 Risque positionné CORRECT: %s à P%s/I%s -> Case [%s, %s] -> Score: %s", evaluation.risque.reference, probabilite, impact, x, y, score_calcule, extra=EN_BOUCLE)
         else:
-            print(f"⚠️ Évaluation ignorée: {evaluation.risque.reference}")
+            logger.warning("⚠️ Évaluation ignorée: %s", evaluation.risque.reference)
             risques_non_evalues.append(evaluation.risque)
     
-    print(f"🔍 Matrice {matrice_type}: {len(evaluations_valides)} évaluations valides")
+    logger.debug("🔍 Matrice %s: %s évaluations valides", matrice_type, len(evaluations_valides))
     
     # Couleurs pour les différents risques
     colors = ['blue', 'purple', 'darkred', 'darkgreen', 'darkorange', 'darkcyan', 'brown', 'pink', 'navy', 'teal']
@@ -141,7 +185,7 @@ def generer_matrice_risques(evaluations, matrice_type='classique'):
             
         else:
             # Cas multiple : plusieurs risques à la même position
-            print(f"🔄 {len(risques_list)} risques à position {position_key}")
+            logger.debug("🔄 %s risques à position %s", len(risques_list), position_key, extra=EN_BOUCLE)
             
             # Position centrale de la case
             x_centre = float(position_key.split('_')[0]) + 0.5
@@ -239,11 +283,10 @@ def generer_matrice_risques(evaluations, matrice_type='classique'):
     image_png = buffer.getvalue()
     buffer.close()
     
-    graphic = base64.b64encode(image_png).decode('utf-8')
     plt.close()
     
-    print(f"✅ Matrice {matrice_type} générée avec positionnement CORRECT : 25 en haut à droite, 1 en bas à gauche")
-    return graphic
+    logger.debug("✅ Matrice %s générée avec positionnement CORRECT : 25 en haut à droite, 1 en bas à gauche", matrice_type)
+    return image_png
 
 
 def diagnostiquer_evaluations_manquantes(cartographie_id):
@@ -253,11 +296,11 @@ def diagnostiquer_evaluations_manquantes(cartographie_id):
     
     cartographie = Cartographie.query.get(cartographie_id)
     
-    print(f"🔍 DIAGNOSTIC pour cartographie: {cartographie.nom}")
-    print(f"📊 Total risques: {len(cartographie.risques)}")
+    logger.debug("🔍 DIAGNOSTIC pour cartographie: %s", cartographie.nom)
+    logger.debug("📊 Total risques: %s", len(cartographie.risques))
     
     for risque in cartographie.risques:
-        print(f"\n🎯 Risque: {risque.reference} - {len(risque.evaluations)} évaluations")
+        logger.debug("\n🎯 Risque: %s - %s évaluations", risque.reference, len(risque.evaluations), extra=EN_BOUCLE)
         
         for eval in risque.evaluations:
             impact_conf = eval.impact_conf
@@ -270,12 +313,24 @@ def diagnostiquer_evaluations_manquantes(cartographie_id):
             impact_final = impact_conf or impact_val or impact_pre
             prob_final = prob_conf or prob_val or prob_pre
             
-            print(f"   📋 Évaluation {eval.id}:")
-            print(f"      Impact: Conf={impact_conf}, Val={impact_val}, Pre={impact_pre} → Final={impact_final}")
-            print(f"      Probabilité: Conf={prob_conf}, Val={prob_val}, Pre={prob_pre} → Final={prob_final}")
-            print(f"      Valide: {impact_final and prob_final and impact_final > 0 and prob_final > 0}")
+            logger.debug("   📋 Évaluation %s:", eval.id, extra=EN_BOUCLE)
+            logger.debug("      Impact: Conf=%s, Val=%s, Pre=%s → Final=%s", impact_conf, impact_val, impact_pre, impact_final, extra=EN_BOUCLE)
+            logger.debug("      Probabilité: Conf=%s, Val=%s, Pre=%s → Final=%s", prob_conf, prob_val, prob_pre, prob_final, extra=EN_BOUCLE)
+            logger.debug("      Valide: %s", impact_final and prob_final and (impact_final > 0) and (prob_final > 0), extra=EN_BOUCLE)
 
 def generer_matrice_risque_specifique(evaluations, risque_surbrillance=None):
+    """Matrice avec un risque en surbrillance en PNG base64, servie par le cache disque si possible"""
+    return base64.b64encode(matrice_risque_specifique_png(evaluations, risque_surbrillance)).decode('utf-8')
+
+def matrice_risque_specifique_png(evaluations, risque_surbrillance=None, empreinte=None):
+    """Octets PNG de la matrice avec surbrillance, depuis le cache disque (empreinte calculée si absente)"""
+    if empreinte is None:
+        empreinte = empreinte_matrice('specifique', points_matrice(evaluations),
+                                      risque_surbrillance.reference if risque_surbrillance else None)
+    return magasin_matrices().obtenir(empreinte, lambda: rendu_graphiques.dessiner(
+        _dessiner_matrice_risque_specifique, _evaluations_dessin(evaluations), _risque_dessin(risque_surbrillance)))
+
+def _dessiner_matrice_risque_specifique(evaluations, risque_surbrillance=None):
     """Générer une matrice avec un risque spécifique en surbrillance - VERSION LÉGENDES CORRIGÉE"""
     fig, ax = plt.subplots(figsize=(14, 12))
     
@@ -531,11 +586,10 @@ def generer_matrice_risque_specifique(evaluations, risque_surbrillance=None):
     image_png = buffer.getvalue()
     buffer.close()
     
-    graphic = base64.b64encode(image_png).decode('utf-8')
     plt.close()
     
-    print(f"✅ Matrice spécifique générée avec légendes bien positionnées")
-    return graphic
+    logger.debug("✅ Matrice spécifique générée avec légendes bien positionnées")
+    return image_png
 
 def generer_tableau_bordeaux(risques):
     """Générer le tableau de Bordeaux avec classement par niveau de risque"""
@@ -585,14 +639,14 @@ def generer_tableau_bordeaux(risques):
                 tableau['actions_limitees'].append(entry)
 
         except Exception as e:
-            print(f"⚠️ Erreur traitement risque {getattr(risque, 'reference', 'N/A')}: {e}")
+            logger.warning("⚠️ Erreur traitement risque %s: %s", getattr(risque, 'reference', 'N/A'), e)
             continue
 
     # Trier chaque catégorie par score décroissant
     for categorie in tableau:
         tableau[categorie] = sorted(tableau[categorie], key=lambda x: x['score'], reverse=True)
 
-    print(f"📋 Tableau Bordeaux généré: {sum(len(v) for v in tableau.values())} risques")
+    logger.debug("📋 Tableau Bordeaux généré: %s risques", sum((len(v) for v in tableau.values())))
     return tableau
 
 def calculer_tendance_kri(mesures, periode_jours=30):
@@ -667,14 +721,14 @@ def generer_tableau_bordeaux(risques):
                 tableau['actions_limitees'].append(entry)
 
         except Exception as e:
-            print(f"⚠️ Erreur traitement risque {getattr(risque, 'reference', 'N/A')}: {e}")
+            logger.warning("⚠️ Erreur traitement risque %s: %s", getattr(risque, 'reference', 'N/A'), e)
             continue
 
     # Trier chaque catégorie par score décroissant
     for categorie in tableau:
         tableau[categorie] = sorted(tableau[categorie], key=lambda x: x['score'], reverse=True)
 
-    print(f"📋 Tableau Bordeaux généré: {sum(len(v) for v in tableau.values())} risques")
+    logger.debug("📋 Tableau Bordeaux généré: %s risques", sum((len(v) for v in tableau.values())))
     return tableau
 
 
@@ -803,10 +857,10 @@ def mettre_a_jour_statistiques_cartographie(cartographie_id):
     
     cartographie = Cartographie.query.get(cartographie_id)
     if not cartographie:
-        print(f"❌ Cartographie {cartographie_id} non trouvée pour mise à jour statistiques")
+        logger.error("❌ Cartographie %s non trouvée pour mise à jour statistiques", cartographie_id)
         return False
     
-    print(f"📊 Mise à jour statistiques pour cartographie: {cartographie.nom}")
+    logger.debug("📊 Mise à jour statistiques pour cartographie: %s", cartographie.nom)
     
     try:
         # 1. Compter les risques actifs
@@ -816,28 +870,14 @@ def mettre_a_jour_statistiques_cartographie(cartographie_id):
         ).count()
         
         # 2. Compter les risques évalués
-        risques_evalues = db.session.query(Risque)\
-            .join(EvaluationRisque)\
-            .filter(
-                Risque.cartographie_id == cartographie_id,
-                Risque.is_archived == False
-            )\
-            .distinct()\
-            .count()
-        
-        # 3. Calculer le score moyen
-        # Sous-requête pour les dernières évaluations
-        derniere_eval_subquery = db.session.query(
-            EvaluationRisque.risque_id,
-            func.max(EvaluationRisque.created_at).label('max_date')
-        ).group_by(EvaluationRisque.risque_id).subquery()
-        
-        score_moyen = db.session.query(func.avg(EvaluationRisque.score_risque))\
-            .join(derniere_eval_subquery, and_(
-                EvaluationRisque.risque_id == derniere_eval_subquery.c.risque_id,
-                EvaluationRisque.created_at == derniere_eval_subquery.c.max_date
-            ))\
-            .join(Risque, EvaluationRisque.risque_id == Risque.id)\
+        risques_evalues = Risque.query.filter(
+            Risque.cartographie_id == cartographie_id,
+            Risque.is_archived == False,
+            Risque.derniere_evaluation_id.isnot(None)
+        ).count()
+        
+        # 3. Calculer le score moyen (évaluation courante maintenue sur Risque)
+        score_moyen = db.session.query(func.avg(Risque.score_actuel))\
             .filter(
                 Risque.cartographie_id == cartographie_id,
                 Risque.is_archived == False
@@ -846,18 +886,13 @@ def mettre_a_jour_statistiques_cartographie(cartographie_id):
         
         # 4. Compter les risques par niveau
         niveaux_risques = db.session.query(
-            EvaluationRisque.niveau_risque,
-            func.count(EvaluationRisque.id)
-        ).join(derniere_eval_subquery, and_(
-            EvaluationRisque.risque_id == derniere_eval_subquery.c.risque_id,
-            EvaluationRisque.created_at == derniere_eval_subquery.c.max_date
-        ))\
-         .join(Risque, EvaluationRisque.risque_id == Risque.id)\
-         .filter(
-             Risque.cartographie_id == cartographie_id,
-             Risque.is_archived == False
-         )\
-         .group_by(EvaluationRisque.niveau_risque).all()
+            Risque.niveau_actuel,
+            func.count(Risque.id)
+        ).filter(
+            Risque.cartographie_id == cartographie_id,
+            Risque.is_archived == False,
+            Risque.niveau_actuel.isnot(None)
+        ).group_by(Risque.niveau_actuel).all()
         
         # 5. Préparer les statistiques complètes
         statistiques = {
@@ -889,17 +924,17 @@ def mettre_a_jour_statistiques_cartographie(cartographie_id):
         
         db.session.commit()
         
-        print(f"✅ Statistiques mises à jour pour {cartographie.nom}:")
-        print(f"   - {risques_actifs} risques actifs")
-        print(f"   - {risques_evalues} risques évalués") 
-        print(f"   - Score moyen: {statistiques['score_moyen']}")
-        print(f"   - Répartition: {statistiques['repartition_niveaux']}")
+        logger.debug("✅ Statistiques mises à jour pour %s:", cartographie.nom)
+        logger.debug("   - %s risques actifs", risques_actifs)
+        logger.debug("   - %s risques évalués", risques_evalues) 
+        logger.debug("   - Score moyen: %s", statistiques['score_moyen'])
+        logger.debug("   - Répartition: %s", statistiques['repartition_niveaux'])
         
         return True
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur mise à jour statistiques cartographie {cartographie_id}: {str(e)}")
+        logger.error("❌ Erreur mise à jour statistiques cartographie %s: %s", cartographie_id, str(e))
         import traceback
         traceback.print_exc()
         return False
@@ -986,10 +1021,8 @@ def analyser_tendances_risques(risques, periode_jours=90):
 
 def generer_heatmap_risques(cartographie):
     """Générer une heatmap des risques pour une cartographie"""
-    fig, ax = plt.subplots(figsize=(10, 8))
-    
     # Préparer les données pour la heatmap
-    data = np.zeros((5, 5))
+    data = [[0] * 5 for _ in range(5)]
     
     for risque in cartographie.risques:
         if hasattr(risque, 'is_archived') and risque.is_archived:
@@ -1000,7 +1033,15 @@ def generer_heatmap_risques(cartographie):
             if derniere_eval.impact and derniere_eval.probabilite:
                 i = derniere_eval.impact - 1
                 j = derniere_eval.probabilite - 1
-                data[i, j] += 1
+                data[i][j] += 1
+    
+    image_png = rendu_graphiques.dessiner(_dessiner_heatmap_risques, data, cartographie.nom)
+    return base64.b64encode(image_png).decode('utf-8')
+
+def _dessiner_heatmap_risques(comptes, nom_cartographie):
+    """Heatmap 5x5 (comptes[impact - 1][probabilité - 1]) en octets PNG"""
+    fig, ax = plt.subplots(figsize=(10, 8))
+    data = np.array(comptes)
     
     # Créer la heatmap
     im = ax.imshow(data, cmap='YlOrRd', interpolation='nearest')
@@ -1020,22 +1061,20 @@ def generer_heatmap_risques(cartographie):
     ax.set_yticklabels(['Très faible', 'Faible', 'Moyen', 'Fort', 'Très fort'])
     ax.set_xlabel('Probabilité', fontsize=12, fontweight='bold')
     ax.set_ylabel('Impact', fontsize=12, fontweight='bold')
-    ax.set_title(f"Heatmap des Risques - {cartographie.nom}", fontsize=14, fontweight='bold')
+    ax.set_title(f"Heatmap des Risques - {nom_cartographie}", fontsize=14, fontweight='bold')
     
     # Barre de couleur
     plt.colorbar(im, ax=ax, label='Nombre de risques')
     
-    # Conversion en image base64
+    # Conversion en image PNG
     buffer = BytesIO()
     plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight', facecolor='white')
     buffer.seek(0)
     image_png = buffer.getvalue()
     buffer.close()
-    
-    graphic = base64.b64encode(image_png).decode('utf-8')
     plt.close()
     
-    return graphic
+    return image_png
 
 def calculer_indice_severite(risques):
     """Calculer l'indice de sévérité moyen des risques"""
@@ -1079,13 +1118,18 @@ def generer_radar_chart_risques(cartographie):
         labels.append('')
         values.append(0)
     
+    image_png = rendu_graphiques.dessiner(_dessiner_radar_chart_risques, labels, values, cartographie.nom)
+    return base64.b64encode(image_png).decode('utf-8')
+
+def _dessiner_radar_chart_risques(labels, values, nom_cartographie):
+    """Radar des risques par catégorie en octets PNG"""
     # Créer le radar chart
     fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(projection='polar'))
     
     # Angles pour les catégories
     angles = np.linspace(0, 2*np.pi, len(labels), endpoint=False).tolist()
     angles += angles[:1]  # Fermer le cercle
-    values += values[:1]
+    values = values + values[:1]
     
     # Tracer le radar chart
     ax.plot(angles, values, 'o-', linewidth=2, label='Nombre de risques')
@@ -1095,20 +1139,18 @@ def generer_radar_chart_risques(cartographie):
     ax.set_xticks(angles[:-1])
     ax.set_xticklabels(labels)
     ax.set_ylim(0, max(values) + 1 if values else 1)
-    ax.set_title(f"Répartition des Risques par Catégorie\n{cartographie.nom}", 
+    ax.set_title(f"Répartition des Risques par Catégorie\n{nom_cartographie}", 
                  size=14, fontweight='bold', pad=20)
     
-    # Conversion en image base64
+    # Conversion en image PNG
     buffer = BytesIO()
     plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight', facecolor='white')
     buffer.seek(0)
     image_png = buffer.getvalue()
     buffer.close()
-    
-    graphic = base64.b64encode(image_png).decode('utf-8')
     plt.close()
     
-    return graphic
+    return image_png
 
 def declencher_mise_a_jour_risque(risque_id, action, user_id, donnees=None):
     """Déclencher les mises à jour automatiques après une action sur un risque"""
@@ -1116,10 +1158,10 @@ def declencher_mise_a_jour_risque(risque_id, action, user_id, donnees=None):
     
     risque = Risque.query.get(risque_id)
     if not risque:
-        print(f"❌ Risque {risque_id} non trouvé pour mise à jour")
+        logger.error("❌ Risque %s non trouvé pour mise à jour", risque_id)
         return
     
-    print(f"🔔 Mise à jour déclenchée: {action} sur risque {risque.reference} (ID: {risque_id})")
+    logger.debug("🔔 Mise à jour déclenchée: %s sur risque %s (ID: %s)", action, risque.reference, risque_id)
     
     try:
         if action == 'creation':
@@ -1146,20 +1188,20 @@ def declencher_mise_a_jour_risque(risque_id, action, user_id, donnees=None):
         # Forcer la regénération des matrices
         if risque.cartographie_id:
             regenerer_matrices_cartographie(risque.cartographie_id)
-            print(f"🎨 Matrices de la cartographie {risque.cartographie_id} à regénérer")
+            logger.debug("🎨 Matrices de la cartographie %s à regénérer", risque.cartographie_id)
         
         # SYNCHRONISATION GLOBALE APRÈS CHAQUE ACTION IMPORTANTE
         if action in ['creation', 'evaluation', 'archivage', 'restauration', 'suppression', 'modification']:
             synchroniser_donnees_globales()
-            print(f"🔄 Synchronisation globale déclenchée après {action}")
+            logger.debug("🔄 Synchronisation globale déclenchée après %s", action)
         
         # Validation finale
         db.session.commit()
-        print(f"✅ Mise à jour {action} terminée avec succès pour risque {risque.reference}")
+        logger.debug("✅ Mise à jour %s terminée avec succès pour risque %s", action, risque.reference)
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur lors de la mise à jour {action}: {str(e)}")
+        logger.error("❌ Erreur lors de la mise à jour %s: %s", action, str(e))
         raise
 
 def mise_a_jour_apres_creation_risque(risque, user_id):
@@ -1177,7 +1219,7 @@ def mise_a_jour_apres_creation_risque(risque, user_id):
     mettre_a_jour_indicateurs_cartographie(cartographie.id)
     
     db.session.commit()
-    print(f"✅ Risque {risque.reference} créé - Cartographie {cartographie.nom} mise à jour")
+    logger.debug("✅ Risque %s créé - Cartographie %s mise à jour", risque.reference, cartographie.nom)
 
 def mise_a_jour_apres_evaluation_risque(risque, user_id, donnees_evaluation):
     """Mises à jour après évaluation d'un risque"""
@@ -1199,7 +1241,7 @@ def mise_a_jour_apres_evaluation_risque(risque, user_id, donnees_evaluation):
     generer_alerte_evaluation_risque(risque, user_id, donnees_evaluation)
     
     db.session.commit()
-    print(f"✅ Risque {risque.reference} évalué - Niveau: {donnees_evaluation.get('niveau_risque')}")
+    logger.debug("✅ Risque %s évalué - Niveau: %s", risque.reference, donnees_evaluation.get('niveau_risque'))
 
 def mise_a_jour_apres_archivage_risque(risque, user_id, motif):
     """Mises à jour après archivage d'un risque"""
@@ -1218,7 +1260,7 @@ def mise_a_jour_apres_archivage_risque(risque, user_id, motif):
     notifier_archivage_risque(risque, user_id)
     
     db.session.commit()
-    print(f"✅ Risque {risque.reference} archivé")
+    logger.debug("✅ Risque %s archivé", risque.reference)
 
 def mise_a_jour_apres_restauration_risque(risque, user_id):
     """Mises à jour après restauration d'un risque"""
@@ -1234,7 +1276,7 @@ def mise_a_jour_apres_restauration_risque(risque, user_id):
     mettre_a_jour_statistiques_cartographie(risque.cartographie_id)
     
     db.session.commit()
-    print(f"✅ Risque {risque.reference} restauré")
+    logger.debug("✅ Risque %s restauré", risque.reference)
 
 def mise_a_jour_apres_modification_risque(risque, user_id, modifications):
     """Mises à jour après modification d'un risque"""
@@ -1251,7 +1293,7 @@ def mise_a_jour_apres_modification_risque(risque, user_id, modifications):
         regenerer_matrices_cartographie(risque.cartographie_id)
     
     db.session.commit()
-    print(f"✅ Risque {risque.reference} modifié")
+    logger.debug("✅ Risque %s modifié", risque.reference)
 
 def mise_a_jour_apres_suppression_risque(risque, user_id):
     """Mises à jour après suppression d'un risque"""
@@ -1268,7 +1310,7 @@ def mise_a_jour_apres_suppression_risque(risque, user_id):
     # 3. Nettoyer les données orphelines
     nettoyer_donnees_orphelines()
     
-    print(f"✅ Risque {risque.reference} supprimé")
+    logger.debug("✅ Risque %s supprimé", risque.reference)
 
 def mettre_a_jour_indicateurs_cartographie(cartographie_id):
     """Mettre à jour tous les indicateurs d'une cartographie"""
@@ -1286,26 +1328,17 @@ def mettre_a_jour_indicateurs_cartographie(cartographie_id):
     ).count()
     
     # Compter les risques évalués
-    risques_evalues = db.session.query(Risque)\
-        .join(EvaluationRisque)\
-        .filter(
-            Risque.cartographie_id == cartographie_id,
-            Risque.is_archived == False
-        )\
-        .distinct()\
-        .count()
+    risques_evalues = Risque.query.filter(
+        Risque.cartographie_id == cartographie_id,
+        Risque.is_archived == False,
+        Risque.derniere_evaluation_id.isnot(None)
+    ).count()
     
-    # Calculer le score moyen
-    score_moyen = db.session.query(func.avg(EvaluationRisque.score_risque))\
-        .join(Risque)\
+    # Calculer le score moyen (évaluation courante maintenue sur Risque)
+    score_moyen = db.session.query(func.avg(Risque.score_actuel))\
         .filter(
             Risque.cartographie_id == cartographie_id,
-            Risque.is_archived == False,
-            EvaluationRisque.id.in_(
-                db.session.query(
-                    func.max(EvaluationRisque.id)
-                ).group_by(EvaluationRisque.risque_id).subquery()
-            )
+            Risque.is_archived == False
         )\
         .scalar()
     
@@ -1318,49 +1351,40 @@ def mettre_a_jour_indicateurs_cartographie(cartographie_id):
     }
     
     db.session.commit()
-    print(f"📊 Indicateurs recalculés pour {cartographie.nom}: {risques_actifs} risques actifs")
+    logger.debug("📊 Indicateurs recalculés pour %s: %s risques actifs", cartographie.nom, risques_actifs)
 
 def synchroniser_donnees_globales():
     """Synchronise toutes les données entre les différentes vues"""
     from models import db, Risque, Cartographie, EvaluationRisque
     from sqlalchemy import func, and_
     
-    print("🔄 SYNCHRONISATION GLOBALE DES DONNÉES...")
+    logger.debug("🔄 SYNCHRONISATION GLOBALE DES DONNÉES...")
     
     try:
         # 1. Synchroniser les compteurs de risques
         total_risques_actifs = Risque.query.filter_by(is_archived=False).count()
         
         # 2. Synchroniser les niveaux de risque
-        derniere_evaluation_subquery = db.session.query(
-            EvaluationRisque.risque_id,
-            func.max(EvaluationRisque.created_at).label('max_date')
-        ).group_by(EvaluationRisque.risque_id).subquery()
-        
         niveaux = db.session.query(
-            EvaluationRisque.niveau_risque,
-            func.count(EvaluationRisque.id)
-        ).select_from(EvaluationRisque)\
-         .join(derniere_evaluation_subquery, and_(
-             EvaluationRisque.risque_id == derniere_evaluation_subquery.c.risque_id,
-             EvaluationRisque.created_at == derniere_evaluation_subquery.c.max_date
-         ))\
-         .join(Risque, EvaluationRisque.risque_id == Risque.id)\
-         .filter(Risque.is_archived == False)\
-         .group_by(EvaluationRisque.niveau_risque).all()
+            Risque.niveau_actuel,
+            func.count(Risque.id)
+        ).filter(
+            Risque.is_archived == False,
+            Risque.niveau_actuel.isnot(None)
+        ).group_by(Risque.niveau_actuel).all()
         
         # 3. Synchroniser les cartographies
         cartographies = Cartographie.query.all()
         for carto in cartographies:
             mettre_a_jour_indicateurs_cartographie(carto.id)
         
-        print(f"✅ Synchronisation terminée: {total_risques_actifs} risques actifs")
-        print(f"📊 Répartition: {dict(niveaux)}")
+        logger.debug("✅ Synchronisation terminée: %s risques actifs", total_risques_actifs)
+        logger.debug("📊 Répartition: %s", dict(niveaux))
         
         return True
         
     except Exception as e:
-        print(f"❌ Erreur synchronisation: {str(e)}")
+        logger.error("❌ Erreur synchronisation: %s", str(e))
         return False
 
 
@@ -1373,7 +1397,7 @@ def mettre_a_jour_tableau_bordeaux(cartographie_id):
     cartographie = Cartographie.query.get(cartographie_id)
     if cartographie:
         # Le tableau de Bordeaux sera regénéré à la prochaine consultation
-        print(f"🔄 Tableau de Bordeaux à regénérer pour {cartographie.nom}")
+        logger.debug("🔄 Tableau de Bordeaux à regénérer pour %s", cartographie.nom)
 
 def verifier_alertes_seuil_risque(risque, evaluation):
     """Vérifier et créer des alertes si seuil dépassé"""
@@ -1395,7 +1419,7 @@ def verifier_alertes_seuil_risque(risque, evaluation):
         )
         db.session.add(alerte)
         db.session.commit()  # AJOUTER LE COMMIT
-        print(f"🚨 Alerte créée pour risque {risque.reference} - Niveau: {niveau}")
+        logger.warning("🚨 Alerte créée pour risque %s - Niveau: %s", risque.reference, niveau)
 
 def mettre_a_jour_kri_risque(risque):
     """Mettre à jour les KRI associés à un risque"""
@@ -1408,7 +1432,7 @@ def mettre_a_jour_kri_risque(risque):
         # Ajuster les seuils du KRI si nécessaire
         if derniere_eval.niveau_risque == 'Critique' and kri.seuil_critique:
             # Vérifier si le KRI est cohérent avec le niveau de risque
-            print(f"📈 KRI {kri.nom} vérifié pour risque {risque.reference}")
+            logger.debug("📈 KRI %s vérifié pour risque %s", kri.nom, risque.reference)
 
 def desactiver_kri_risque(risque_id):
     """Désactiver les KRI d'un risque archivé"""
@@ -1419,7 +1443,7 @@ def desactiver_kri_risque(risque_id):
         kri.est_actif = False
         kri.updated_at = datetime.utcnow()
         db.session.commit()  # AJOUTER LE COMMIT
-        print(f"🔴 KRI {kri.nom} désactivé")
+        logger.debug("🔴 KRI %s désactivé", kri.nom)
 
 def reactiver_kri_risque(risque_id):
     """Réactiver les KRI d'un risque restauré"""
@@ -1430,7 +1454,7 @@ def reactiver_kri_risque(risque_id):
         kri.est_actif = True
         kri.updated_at = datetime.utcnow()
         db.session.commit()  # AJOUTER LE COMMIT
-        print(f"🟢 KRI {kri.nom} réactivé")
+        logger.debug("🟢 KRI %s réactivé", kri.nom)
 
 def mettre_a_jour_statistiques_globales():
     """Mettre à jour les statistiques globales de l'application"""
@@ -1445,7 +1469,7 @@ def mettre_a_jour_statistiques_globales():
     }
     
     # Stocker ces statistiques (dans une table dédiée ou en cache)
-    print("🌍 Statistiques globales mises à jour")
+    logger.debug("🌍 Statistiques globales mises à jour")
 
 def generer_rapport_archivage(risque, user_id, motif):
     """Générer un rapport d'archivage"""
@@ -1459,7 +1483,7 @@ def generer_rapport_archivage(risque, user_id, motif):
         'kri_desactives': 1 if risque.kri else 0
     }
     
-    print(f"📋 Rapport d'archivage généré pour {risque.reference}")
+    logger.debug("📋 Rapport d'archivage généré pour %s", risque.reference)
 
 def historiser_modifications_risque(risque, user_id, modifications):
     """Historiser les modifications d'un risque"""
@@ -1474,12 +1498,12 @@ def historiser_modifications_risque(risque, user_id, modifications):
     )
     db.session.add(historique)
     db.session.commit()  # AJOUTER LE COMMIT
-    print(f"📝 Historique modif risque {risque.reference}")
+    logger.debug("📝 Historique modif risque %s", risque.reference)
 
 def regenerer_matrices_cartographie(cartographie_id):
     """Forcer la regénération des matrices au prochain accès"""
     # On pourrait implémenter un cache ici
-    print(f"🎨 Matrices à regénérer pour cartographie {cartographie_id}")
+    logger.debug("🎨 Matrices à regénérer pour cartographie %s", cartographie_id)
 
 def synchroniser_cartographie_apres_action(cartographie_id, action_type, user_id):
     """Synchronise toutes les vues après une action sur une cartographie"""
@@ -1489,7 +1513,7 @@ def synchroniser_cartographie_apres_action(cartographie_id, action_type, user_id
     if not cartographie:
         return
     
-    print(f"🔄 Synchronisation: {action_type} sur cartographie {cartographie.nom}")
+    logger.debug("🔄 Synchronisation: %s sur cartographie %s", action_type, cartographie.nom)
     
     # 1. Mettre à jour le timestamp de la cartographie
     cartographie.updated_at = datetime.utcnow()
@@ -1502,64 +1526,13 @@ def synchroniser_cartographie_apres_action(cartographie_id, action_type, user_id
     
     db.session.commit()
     
-    print(f"✅ Cartographie {cartographie.nom} synchronisée")
-
-def recalculer_indicateurs_cartographie(cartographie_id):
-    """Recalcule tous les indicateurs d'une cartographie"""
-    from models import Cartographie, Risque, EvaluationRisque, db  # AJOUTER db
-    from sqlalchemy import func
-    
-    cartographie = Cartographie.query.get(cartographie_id)
-    if not cartographie:
-        return
-    
-    # Compter les risques actifs
-    risques_actifs = Risque.query.filter_by(
-        cartographie_id=cartographie_id,
-        is_archived=False
-    ).count()
-    
-    # Compter les risques évalués
-    risques_evalues = db.session.query(Risque)\
-        .join(EvaluationRisque)\
-        .filter(
-            Risque.cartographie_id == cartographie_id,
-            Risque.is_archived == False
-        )\
-        .distinct()\
-        .count()
-    
-    # Calculer le score moyen
-    score_moyen = db.session.query(func.avg(EvaluationRisque.score_risque))\
-        .join(Risque)\
-        .filter(
-            Risque.cartographie_id == cartographie_id,
-            Risque.is_archived == False,
-            EvaluationRisque.id.in_(
-                db.session.query(
-                    func.max(EvaluationRisque.id)
-                ).group_by(EvaluationRisque.risque_id).subquery()
-            )
-        )\
-        .scalar()
-    
-    # Stocker les indicateurs (vous pouvez ajouter ces champs au modèle Cartographie)
-    cartographie.indicateurs = {
-        'risques_actifs': risques_actifs,
-        'risques_evalues': risques_evalues,
-        'score_moyen': round(score_moyen, 2) if score_moyen else 0,
-        'derniere_sync': datetime.utcnow()
-    }
-    
-    db.session.commit()  # AJOUTER LE COMMIT
-    print(f"📊 Indicateurs recalculés pour {cartographie.nom}")
+    logger.debug("✅ Cartographie %s synchronisée", cartographie.nom)
 
 def invalider_cache_cartographie(cartographie_id):
-    """Invalide le cache pour forcer le recalcul des vues"""
-    # Implémentation simple - vous pouvez utiliser Redis ou un cache mémoire
-    cache_key = f"cartographie_{cartographie_id}_stats"
-    # Supprimer le cache si existant
-    print(f"🗑️ Cache invalidé pour cartographie {cartographie_id}")
+    """Invalide le cache pour forcer le recalcul des vues (matrices, tableau de Bordeaux, statistiques)"""
+    # Nouvelle version de la cartographie : toutes ses clés sont périmées (services/cache.py)
+    cache_applicatif.invalider_cartographie(cartographie_id)
+    logger.debug("🗑️ Cache invalidé pour cartographie %s", cartographie_id)
 
 def generer_alerte_creation_risque(risque, user_id):
     """Générer une alerte lors de la création d'un risque"""
@@ -1577,9 +1550,9 @@ def generer_alerte_creation_risque(risque, user_id):
         )
         db.session.add(alerte)
         db.session.commit()  # AJOUTER LE COMMIT
-        print(f"📢 Alerte créée pour nouveau risque {risque.reference}")
+        logger.warning("📢 Alerte créée pour nouveau risque %s", risque.reference)
     except Exception as e:
-        print(f"❌ Erreur création alerte: {str(e)}")
+        logger.warning("❌ Erreur création alerte: %s", str(e))
 
 def generer_alerte_evaluation_risque(risque, user_id, donnees_evaluation):
     """Générer une alerte lors de l'évaluation d'un risque"""
@@ -1600,9 +1573,9 @@ def generer_alerte_evaluation_risque(risque, user_id, donnees_evaluation):
         )
         db.session.add(alerte)
         db.session.commit()  # AJOUTER LE COMMIT
-        print(f"📢 Alerte évaluation risque {risque.reference}")
+        logger.warning("📢 Alerte évaluation risque %s", risque.reference)
     except Exception as e:
-        print(f"❌ Erreur alerte évaluation: {str(e)}")
+        logger.warning("❌ Erreur alerte évaluation: %s", str(e))
 
 def notifier_archivage_risque(risque, user_id):
     """Notifier l'archivage d'un risque"""
@@ -1620,41 +1593,37 @@ def notifier_archivage_risque(risque, user_id):
         )
         db.session.add(alerte)
         db.session.commit()  # AJOUTER LE COMMIT
-        print(f"📢 Notification archivage risque {risque.reference}")
+        logger.debug("📢 Notification archivage risque %s", risque.reference)
     except Exception as e:
-        print(f"❌ Erreur notification archivage: {str(e)}")
+        logger.error("❌ Erreur notification archivage: %s", str(e))
 
 def generer_rapport_archivage(risque, user_id, motif):
     """Générer un rapport d'archivage"""
-    print(f"📋 Rapport d'archivage généré pour {risque.reference}")
-    print(f"   - Motif: {motif}")
-    print(f"   - Archivé par: {user_id}")
-    print(f"   - Date: {datetime.utcnow()}")
+    logger.debug("📋 Rapport d'archivage généré pour %s", risque.reference)
+    logger.debug("   - Motif: %s", motif)
+    logger.debug("   - Archivé par: %s", user_id)
+    logger.debug("   - Date: %s", datetime.utcnow())
 
 def generer_rapport_suppression(risque, user_id):
     """Générer un rapport de suppression"""
-    print(f"🗑️ Rapport suppression généré pour {risque.reference}")
-    print(f"   - Supprimé par: {user_id}")
-    print(f"   - Date: {datetime.utcnow()}")
+    logger.debug("🗑️ Rapport suppression généré pour %s", risque.reference)
+    logger.debug("   - Supprimé par: %s", user_id)
+    logger.debug("   - Date: %s", datetime.utcnow())
 
 def historiser_modifications_risque(risque, user_id, modifications):
     """Historiser les modifications d'un risque"""
     from models import db
-    print(f"📝 Historique modif risque {risque.reference}")
-    print(f"   - Modifications: {modifications}")
-    print(f"   - Par utilisateur: {user_id}")
+    logger.debug("📝 Historique modif risque %s", risque.reference)
+    logger.debug("   - Modifications: %s", modifications)
+    logger.debug("   - Par utilisateur: %s", user_id)
 
 def mettre_a_jour_references_croisees(risque, modifications):
     """Mettre à jour les références croisées"""
-    print(f"🔗 Mise à jour références croisées pour {risque.reference}")
+    logger.debug("🔗 Mise à jour références croisées pour %s", risque.reference)
 
 def nettoyer_donnees_orphelines():
     """Nettoyer les données orphelines"""
-    print("🧹 Nettoyage données orphelines")
-
-def invalider_cache_cartographie(cartographie_id):
-    """Invalider le cache d'une cartographie"""
-    print(f"🗑️ Cache invalidé pour cartographie {cartographie_id}")
+    logger.debug("🧹 Nettoyage données orphelines")
 
 def synchroniser_cartographie_complete(cartographie_id):
     """Synchronise complètement une cartographie après modification"""
@@ -1665,7 +1634,7 @@ def synchroniser_cartographie_complete(cartographie_id):
         return False
     
     try:
-        print(f"🔄 Début synchronisation cartographie {cartographie_id}: {cartographie.nom}")
+        logger.debug("🔄 Début synchronisation cartographie %s: %s", cartographie_id, cartographie.nom)
         
         # 1. Synchroniser les relations direction/service
         if cartographie.direction_id:
@@ -1705,7 +1674,7 @@ def synchroniser_cartographie_complete(cartographie_id):
                     risques_modifies += 1
                     db.session.add(risque)
         
-        print(f"📝 {risques_modifies} risques mis à jour")
+        logger.debug("📝 %s risques mis à jour", risques_modifies)
         
         # 3. Mettre à jour le timestamp
         cartographie.updated_at = datetime.utcnow()
@@ -1717,12 +1686,12 @@ def synchroniser_cartographie_complete(cartographie_id):
         invalider_cache_cartographie(cartographie_id)
         
         db.session.commit()
-        print(f"✅ Cartographie {cartographie.nom} synchronisée")
+        logger.debug("✅ Cartographie %s synchronisée", cartographie.nom)
         return True
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur synchronisation cartographie {cartographie_id}: {str(e)}")
+        logger.error("❌ Erreur synchronisation cartographie %s: %s", cartographie_id, str(e))
         import traceback
         traceback.print_exc()
         return False
@@ -1733,7 +1702,7 @@ def synchroniser_cartographie_apres_archivage(cartographie_id, user_id):
     from models import db, Cartographie  # IMPORTANT: importer db
     
     try:
-        print(f"🔄 Synchronisation après archivage cartographie {cartographie_id}")
+        logger.debug("🔄 Synchronisation après archivage cartographie %s", cartographie_id)
         
         cartographie = Cartographie.query.get(cartographie_id)
         if not cartographie:
@@ -1748,19 +1717,17 @@ def synchroniser_cartographie_apres_archivage(cartographie_id, user_id):
         # 3. Mettre à jour le cache
         invalider_cache_cartographie(cartographie_id)
         
-        print(f"✅ Synchronisation après archivage terminée pour cartographie {cartographie_id}")
+        logger.debug("✅ Synchronisation après archivage terminée pour cartographie %s", cartographie_id)
         return True
         
     except Exception as e:
-        print(f"❌ Erreur synchronisation après archivage: {str(e)}")
+        logger.error("❌ Erreur synchronisation après archivage: %s", str(e))
         import traceback
         traceback.print_exc()
         return False
     
 def get_kri_stats():
     """Récupérer les statistiques des KRI pour le dashboard"""
-    from sqlalchemy import func
-    
     # KRI actifs associés à des risques non archivés
     kris_actifs = KRI.query.join(Risque).filter(
         Risque.is_archived == False,
@@ -1768,26 +1735,12 @@ def get_kri_stats():
         KRI.type_indicateur == 'kri'
     ).count()
     
-    # KRI en alerte (mesure récente > seuil)
-    derniere_mesure_subq = db.session.query(
-        MesureKRI.kri_id,
-        func.max(MesureKRI.date_mesure).label('max_date')
-    ).group_by(MesureKRI.kri_id).subquery()
-    
-    kri_alertes = db.session.query(KRI).join(
-        derniere_mesure_subq, KRI.id == derniere_mesure_subq.c.kri_id
-    ).join(MesureKRI, and_(
-        MesureKRI.kri_id == KRI.id,
-        MesureKRI.date_mesure == derniere_mesure_subq.c.max_date
-    )).join(Risque, KRI.risque_id == Risque.id).filter(
+    # KRI en alerte (état de la dernière mesure maintenu sur KRI)
+    kri_alertes = KRI.query.join(Risque).filter(
         Risque.is_archived == False,
         KRI.est_actif == True,
-        KRI.seuil_alerte.isnot(None),
         KRI.type_indicateur == 'kri',
-        or_(
-            and_(KRI.sens_evaluation_seuil == 'superieur', MesureKRI.valeur >= KRI.seuil_alerte),
-            and_(KRI.sens_evaluation_seuil == 'inferieur', MesureKRI.valeur <= KRI.seuil_alerte)
-        )
+        KRI.etat_alerte.in_(KRI.ETATS_EN_ALERTE)
     ).count()
     
     return {
@@ -1839,13 +1792,13 @@ def notifier_archivage_cartographie(cartographie_id, user_id):
         
         if notifications_count > 0:
             db.session.commit()
-            print(f"📢 {notifications_count} notifications d'archivage envoyées")
+            logger.debug("📢 %s notifications d'archivage envoyées", notifications_count)
         else:
-            print(f"ℹ️ Aucune notification nécessaire")
+            logger.debug("ℹ️ Aucune notification nécessaire")
             
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur envoi notifications: {str(e)}")
+        logger.error("❌ Erreur envoi notifications: %s", str(e))
 
 
 def generer_rapport_archivage_cartographie(cartographie_id, user_id):
@@ -1881,16 +1834,16 @@ def generer_rapport_archivage_cartographie(cartographie_id, user_id):
         db.session.add(journal_entry)
         db.session.commit()
         
-        print(f"📋 Rapport d'archivage généré pour cartographie {cartographie_id}")
+        logger.debug("📋 Rapport d'archivage généré pour cartographie %s", cartographie_id)
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur génération rapport archivage: {str(e)}")
+        logger.error("❌ Erreur génération rapport archivage: %s", str(e))
 
 
 def recalculer_indicateurs_cartographie(cartographie_id):
     """Recalcule tous les indicateurs d'une cartographie"""
-    from models import Cartographie, Risque, EvaluationRisque
+    from models import Cartographie
     
     cartographie = Cartographie.query.get(cartographie_id)
     if not cartographie:
@@ -1901,7 +1854,7 @@ def recalculer_indicateurs_cartographie(cartographie_id):
         risques_actifs = [r for r in cartographie.risques if not getattr(r, 'is_archived', False)]
         nb_risques_actifs = len(risques_actifs)
         
-        # 2. Calculer les niveaux de risque
+        # 2. Calculer les niveaux de risque (évaluation courante portée par le risque)
         niveaux_risques = {
             'Critique': 0,
             'Élevé': 0, 
@@ -1910,19 +1863,11 @@ def recalculer_indicateurs_cartographie(cartographie_id):
         }
         
         for risque in risques_actifs:
-            if risque.evaluations:
-                # Prendre la dernière évaluation
-                derniere_eval = max(risque.evaluations, key=lambda x: x.created_at, default=None)
-                if derniere_eval and derniere_eval.niveau_risque in niveaux_risques:
-                    niveaux_risques[derniere_eval.niveau_risque] += 1
+            if risque.niveau_actuel in niveaux_risques:
+                niveaux_risques[risque.niveau_actuel] += 1
         
         # 3. Calculer le score moyen de risque
-        scores = []
-        for risque in risques_actifs:
-            if risque.evaluations:
-                derniere_eval = max(risque.evaluations, key=lambda x: x.created_at, default=None)
-                if derniere_eval and derniere_eval.score_risque:
-                    scores.append(derniere_eval.score_risque)
+        scores = [risque.score_actuel for risque in risques_actifs if risque.score_actuel]
         
         score_moyen = sum(scores) / len(scores) if scores else 0
         
@@ -1936,26 +1881,13 @@ def recalculer_indicateurs_cartographie(cartographie_id):
         if hasattr(cartographie, 'score_moyen_risque'):
             cartographie.score_moyen_risque = score_moyen
         
-        print(f"📊 Indicateurs recalculés pour cartographie {cartographie_id}")
-        print(f"   - Risques actifs: {nb_risques_actifs}")
-        print(f"   - Niveaux: {niveaux_risques}")
-        print(f"   - Score moyen: {score_moyen:.2f}")
-        
-    except Exception as e:
-        print(f"❌ Erreur recalcul indicateurs: {str(e)}")
-
-
-def invalider_cache_cartographie(cartographie_id):
-    """Invalide le cache pour une cartographie spécifique"""
-    try:
-        # Vous pouvez implémenter ici votre logique de cache
-        # Par exemple, supprimer des fichiers ou vider des clés Redis
-        
-        # Pour l'instant, juste un log
-        print(f"🗑️ Cache invalidé pour cartographie {cartographie_id}")
+        logger.debug("📊 Indicateurs recalculés pour cartographie %s", cartographie_id)
+        logger.debug("   - Risques actifs: %s", nb_risques_actifs)
+        logger.debug("   - Niveaux: %s", niveaux_risques)
+        logger.debug("   - Score moyen: %.2f", score_moyen)
         
     except Exception as e:
-        print(f"⚠️ Erreur invalidation cache: {str(e)}")
+        logger.error("❌ Erreur recalcul indicateurs: %s", str(e))
 
 
 def dupliquer_cartographie_complete(cartographie_id, user_id):
@@ -1967,7 +1899,7 @@ def dupliquer_cartographie_complete(cartographie_id, user_id):
         return None
     
     try:
-        print(f"🔄 Début duplication cartographie {cartographie_id}: {cartographie_origine.nom}")
+        logger.debug("🔄 Début duplication cartographie %s: %s", cartographie_id, cartographie_origine.nom)
         
         # Créer une nouvelle cartographie
         nouvelle_cartographie = Cartographie(
@@ -1983,7 +1915,7 @@ def dupliquer_cartographie_complete(cartographie_id, user_id):
         db.session.add(nouvelle_cartographie)
         db.session.flush()  # Pour obtenir l'ID
         
-        print(f"✅ Nouvelle cartographie créée: {nouvelle_cartographie.id}")
+        logger.debug("✅ Nouvelle cartographie créée: %s", nouvelle_cartographie.id)
         
         # Dictionnaire pour mapper les anciens IDs aux nouveaux
         risques_map = {}
@@ -2012,7 +1944,7 @@ def dupliquer_cartographie_complete(cartographie_id, user_id):
                 # Mapper l'ancien ID au nouveau
                 risques_map[risque_origine.id] = nouveau_risque.id
                 
-                print(f"📝 Risque dupliqué: {risque_origine.id} -> {nouveau_risque.id}")
+                logger.debug("📝 Risque dupliqué: %s -> %s", risque_origine.id, nouveau_risque.id, extra=EN_BOUCLE)
         
         db.session.commit()
         
@@ -2092,13 +2024,13 @@ def dupliquer_cartographie_complete(cartographie_id, user_id):
         # Recalculer les indicateurs de la nouvelle cartographie
         recalculer_indicateurs_cartographie(nouvelle_cartographie.id)
         
-        print(f"✅ Duplication terminée. Nouvelle cartographie: {nouvelle_cartographie.id}")
+        logger.debug("✅ Duplication terminée. Nouvelle cartographie: %s", nouvelle_cartographie.id)
         
         return nouvelle_cartographie.id
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur duplication cartographie: {str(e)}")
+        logger.error("❌ Erreur duplication cartographie: %s", str(e))
         import traceback
         traceback.print_exc()
         return None
@@ -2168,7 +2100,7 @@ def synchronisation_automatique():
     """Synchronisation automatique lancée périodiquement"""
     from models import Cartographie
     
-    print("🔄 SYNCHRONISATION AUTOMATIQUE EN COURS...")
+    logger.debug("🔄 SYNCHRONISATION AUTOMATIQUE EN COURS...")
     
     cartographies = Cartographie.query.all()
     results = []
@@ -2194,7 +2126,7 @@ def synchronisation_automatique():
                 'raison': 'Déjà à jour'
             })
     
-    print(f"✅ Synchronisation automatique terminée: {len([r for r in results if r['synchronisee']])}/{len(results)} cartographies")
+    logger.debug("✅ Synchronisation automatique terminée: %s/%s cartographies", len([r for r in results if r['synchronisee']]), len(results))
     return results
 
 
@@ -2207,7 +2139,7 @@ def synchroniser_processus_apres_modification(processus_id, action_type, user_id
         processus.updated_at = datetime.utcnow()
         db.session.commit()
         
-        print(f"🔄 Processus {processus.nom} synchronisé après {action_type}")
+        logger.debug("🔄 Processus %s synchronisé après %s", processus.nom, action_type)
         
         # Synchronisation globale
         synchroniser_donnees_globales()
@@ -2233,7 +2165,7 @@ def synchroniser_organigramme_fluide(processus_id):
             db.session.delete(lien)
     
     db.session.commit()
-    print(f"✅ Organigramme fluide synchronisé pour le processus {processus_id}")
+    logger.debug("✅ Organigramme fluide synchronisé pour le processus %s", processus_id)
 
 def synchroniser_evaluation_triphase(risque_id):
     """Synchronise automatiquement après une évaluation triphase"""
@@ -2243,7 +2175,7 @@ def synchroniser_evaluation_triphase(risque_id):
     if not risque:
         return
     
-    print(f"🔄 Synchronisation évaluation triphase pour risque {risque.reference}")
+    logger.debug("🔄 Synchronisation évaluation triphase pour risque %s", risque.reference)
     
     try:
         # 1. Mettre à jour les indicateurs de la cartographie
@@ -2262,53 +2194,44 @@ def synchroniser_evaluation_triphase(risque_id):
         
         db.session.commit()
         
-        print(f"✅ Synchronisation terminée pour risque {risque.reference}")
+        logger.debug("✅ Synchronisation terminée pour risque %s", risque.reference)
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur synchronisation: {str(e)}")
+        logger.error("❌ Erreur synchronisation: %s", str(e))
 
 def synchroniser_donnees_globales():
     """Synchronise toutes les données entre les différentes vues"""
     from models import db, Risque, Cartographie, EvaluationRisque
     from sqlalchemy import func, and_
     
-    print("🔄 SYNCHRONISATION GLOBALE DES DONNÉES...")
+    logger.debug("🔄 SYNCHRONISATION GLOBALE DES DONNÉES...")
     
     try:
         # 1. Synchroniser les compteurs de risques
         total_risques_actifs = Risque.query.filter_by(is_archived=False).count()
         
         # 2. Synchroniser les niveaux de risque
-        derniere_evaluation_subquery = db.session.query(
-            EvaluationRisque.risque_id,
-            func.max(EvaluationRisque.created_at).label('max_date')
-        ).group_by(EvaluationRisque.risque_id).subquery()
-        
         niveaux = db.session.query(
-            EvaluationRisque.niveau_risque,
-            func.count(EvaluationRisque.id)
-        ).select_from(EvaluationRisque)\
-         .join(derniere_evaluation_subquery, and_(
-             EvaluationRisque.risque_id == derniere_evaluation_subquery.c.risque_id,
-             EvaluationRisque.created_at == derniere_evaluation_subquery.c.max_date
-         ))\
-         .join(Risque, EvaluationRisque.risque_id == Risque.id)\
-         .filter(Risque.is_archived == False)\
-         .group_by(EvaluationRisque.niveau_risque).all()
+            Risque.niveau_actuel,
+            func.count(Risque.id)
+        ).filter(
+            Risque.is_archived == False,
+            Risque.niveau_actuel.isnot(None)
+        ).group_by(Risque.niveau_actuel).all()
         
         # 3. Synchroniser les cartographies
         cartographies = Cartographie.query.all()
         for carto in cartographies:
             mettre_a_jour_indicateurs_cartographie(carto.id)
         
-        print(f"✅ Synchronisation terminée: {total_risques_actifs} risques actifs")
-        print(f"📊 Répartition: {dict(niveaux)}")
+        logger.debug("✅ Synchronisation terminée: %s risques actifs", total_risques_actifs)
+        logger.debug("📊 Répartition: %s", dict(niveaux))
         
         return True
         
     except Exception as e:
-        print(f"❌ Erreur synchronisation: {str(e)}")
+        logger.error("❌ Erreur synchronisation: %s", str(e))
         return False
 
 def generer_matrice_cotation_classique():
@@ -2416,23 +2339,29 @@ def generer_graphique_kri(kri):
     dates = [m.date_mesure.strftime('%d/%m/%Y') for m in mesures_triees]
     valeurs = [m.valeur for m in mesures_triees]
     
+    image_png = rendu_graphiques.dessiner(_dessiner_graphique_kri, dates, valeurs, kri.seuil_alerte,
+                                          kri.seuil_critique, kri.unite_mesure, kri.nom)
+    return base64.b64encode(image_png).decode('utf-8')
+
+def _dessiner_graphique_kri(dates, valeurs, seuil_alerte, seuil_critique, unite_mesure, nom_kri):
+    """Courbe d'un KRI et ses seuils en octets PNG"""
     fig, ax = plt.subplots(figsize=(10, 6))
     
     # Courbe principale
     ax.plot(dates, valeurs, 'b-', linewidth=2, marker='o', markersize=4, label='Valeur KRI')
     
     # Seuils d'alerte
-    if kri.seuil_alerte:
-        ax.axhline(y=kri.seuil_alerte, color='orange', linestyle='--', 
-                  label=f'Seuil alerte ({kri.seuil_alerte})')
+    if seuil_alerte:
+        ax.axhline(y=seuil_alerte, color='orange', linestyle='--', 
+                  label=f'Seuil alerte ({seuil_alerte})')
     
-    if kri.seuil_critique:
-        ax.axhline(y=kri.seuil_critique, color='red', linestyle='--', 
-                  label=f'Seuil critique ({kri.seuil_critique})')
+    if seuil_critique:
+        ax.axhline(y=seuil_critique, color='red', linestyle='--', 
+                  label=f'Seuil critique ({seuil_critique})')
     
     ax.set_xlabel('Date')
-    ax.set_ylabel(f'Valeur ({kri.unite_mesure})')
-    ax.set_title(f'Évolution du KRI - {kri.nom}')
+    ax.set_ylabel(f'Valeur ({unite_mesure})')
+    ax.set_title(f'Évolution du KRI - {nom_kri}')
     ax.legend()
     ax.grid(True, alpha=0.3)
     
@@ -2440,23 +2369,22 @@ def generer_graphique_kri(kri):
     plt.xticks(rotation=45)
     plt.tight_layout()
     
-    # Conversion en base64
+    # Conversion en image PNG
     buffer = BytesIO()
     plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
     buffer.seek(0)
     image_png = buffer.getvalue()
     buffer.close()
-    
-    graphic = base64.b64encode(image_png).decode('utf-8')
     plt.close()
     
-    return graphic
+    return image_png
+
 def synchroniser_kri_automatique():
     """Synchronisation automatique des KRI"""
     from models import KRI, MesureKRI, Risque, db
     from datetime import datetime, timedelta
     
-    print("🔄 SYNCHRONISATION AUTOMATIQUE DES KRI...")
+    logger.debug("🔄 SYNCHRONISATION AUTOMATIQUE DES KRI...")
     
     try:
         kris = KRI.query.filter_by(est_actif=True).all()
@@ -2479,26 +2407,23 @@ def synchroniser_kri_automatique():
                 verifier_alertes_kri(kri)
         
         db.session.commit()
-        print(f"✅ {kris_synchronises}/{len(kris)} KRI synchronisés")
+        logger.debug("✅ %s/%s KRI synchronisés", kris_synchronises, len(kris))
         return True
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur synchronisation KRI: {str(e)}")
+        logger.error("❌ Erreur synchronisation KRI: %s", str(e))
         return False
 
 def verifier_alertes_kri(kri):
     """Vérifier et créer des alertes pour les KRI dépassant les seuils"""
-    from models import Alerte, MesureKRI, db
-    
-    if not kri.mesures:
-        return
+    from models import Alerte, db
     
-    derniere_mesure = MesureKRI.query.filter_by(kri_id=kri.id).order_by(MesureKRI.date_mesure.desc()).first()
-    if not derniere_mesure:
+    # Dernière mesure maintenue sur le KRI (sans charger l'historique)
+    if kri.derniere_mesure_id is None:
         return
     
-    valeur = derniere_mesure.valeur
+    valeur = kri.derniere_valeur
     
     # Vérifier le seuil critique
     if kri.seuil_critique and valeur >= kri.seuil_critique:
@@ -2544,7 +2469,7 @@ def synchroniser_kri_risque(risque_id):
         verifier_alertes_kri(kri)
         
         db.session.commit()
-        print(f"✅ KRI {kri.nom} synchronisé pour risque {risque.reference}")
+        logger.debug("✅ KRI %s synchronisé pour risque %s", kri.nom, risque.reference)
         return True
     
     return False
@@ -2554,12 +2479,12 @@ def synchroniser_matrices_apres_evaluation_triphase(cartographie_id, risque_id=N
     """Synchronise toutes les matrices après une évaluation triphase"""
     from models import Cartographie
     
-    print(f"🔄 Synchronisation matrices après évaluation triphase - Carto: {cartographie_id}, Risque: {risque_id}")
+    logger.debug("🔄 Synchronisation matrices après évaluation triphase - Carto: %s, Risque: %s", cartographie_id, risque_id)
     
     try:
         cartographie = Cartographie.query.get(cartographie_id)
         if not cartographie:
-            print(f"❌ Cartographie {cartographie_id} non trouvée")
+            logger.error("❌ Cartographie %s non trouvée", cartographie_id)
             return False
         
         # Forcer la regénération des matrices
@@ -2568,35 +2493,22 @@ def synchroniser_matrices_apres_evaluation_triphase(cartographie_id, risque_id=N
         # Mettre à jour les statistiques
         mettre_a_jour_statistiques_cartographie(cartographie_id)
         
-        print(f"✅ Matrices synchronisées pour cartographie {cartographie.nom}")
+        logger.debug("✅ Matrices synchronisées pour cartographie %s", cartographie.nom)
         return True
         
     except Exception as e:
-        print(f"❌ Erreur synchronisation matrices: {str(e)}")
+        logger.error("❌ Erreur synchronisation matrices: %s", str(e))
         return False
     
 def invalider_cache_matrices(cartographie_id):
     """Invalide le cache des matrices de façon robuste - À PLACER DANS utils.py"""
     from models import Cartographie
     
-    print(f"🗑️ Invalidation du cache pour cartographie {cartographie_id}")
-    
-    # Liste des clés de cache à invalider
-    cache_keys = [
-        f'matrice_classique_{cartographie_id}',
-        f'matrice_criticite_{cartographie_id}', 
-        f'matrice_priorisation_{cartographie_id}',
-        f'matrice_surbrillance_{cartographie_id}',
-        f'tableau_bordeaux_{cartographie_id}',
-        f'statistiques_{cartographie_id}',
-        f'indicateurs_{cartographie_id}'
-    ]
+    logger.debug("🗑️ Invalidation du cache pour cartographie %s", cartographie_id)
     
-    # Implémentation de l'invalidation (adaptez selon votre système de cache)
-    for key in cache_keys:
-        # Si vous utilisez un cache Redis ou mémoire :
-        # cache.delete(key)
-        print(f"   🔸 Cache invalidé: {key}")
+    # Matrices, tableau de Bordeaux, statistiques et indicateurs de la cartographie
+    # sont tous rangés sous sa version (services/cache.py)
+    cache_applicatif.invalider_cartographie(cartographie_id)
     
     # Forcer le recalcul au prochain affichage en mettant à jour le timestamp
     try:
@@ -2605,9 +2517,9 @@ def invalider_cache_matrices(cartographie_id):
             cartographie.derniere_sync_matrices = datetime.utcnow()
             # Si vous avez un champ pour forcer le recalcul :
             # cartographie.a_besoin_recalcul = True
-            print(f"   🔸 Timestamp de synchronisation mis à jour")
+            logger.debug("   🔸 Timestamp de synchronisation mis à jour")
     except Exception as e:
-        print(f"   ⚠️ Erreur mise à jour timestamp: {e}")
+        logger.warning("   ⚠️ Erreur mise à jour timestamp: %s", e)
     
     return True
 
@@ -2617,7 +2529,7 @@ def synchroniser_scores_apres_evaluation_triphase(risque_id):
     
     risque = Risque.query.get(risque_id)
     if not risque:
-        print(f"❌ Risque {risque_id} non trouvé pour synchronisation")
+        logger.error("❌ Risque %s non trouvé pour synchronisation", risque_id)
         return False
     
     try:
@@ -2646,7 +2558,7 @@ def synchroniser_scores_apres_evaluation_triphase(risque_id):
                 
                 db.session.commit()
                 
-                print(f"✅ Scores synchronisés pour {risque.reference}: {impact_final}×{probabilite_final}={score_final} → {niveau_final}")
+                logger.debug("✅ Scores synchronisés pour %s: %s×%s=%s → %s", risque.reference, impact_final, probabilite_final, score_final, niveau_final)
                 
                 # Déclencher les mises à jour globales
                 declencher_mise_a_jour_risque(risque_id, 'evaluation', 1, {
@@ -2662,7 +2574,7 @@ def synchroniser_scores_apres_evaluation_triphase(risque_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Erreur synchronisation scores: {str(e)}")
+        logger.error("❌ Erreur synchronisation scores: %s", str(e))
         return False
 
 def log_system(level, module, message, details=None, ip_address=None):
@@ -2677,9 +2589,9 @@ def log_system(level, module, message, details=None, ip_address=None):
         )
         db.session.add(log)
         db.session.commit()
-        print(f"[{level.upper()}] {module}: {message}")
+        logger.debug("[%s] %s: %s", level.upper(), module, message)
     except Exception as e:
-        print(f"❌ Erreur journalisation système: {e}")
+        logger.error("❌ Erreur journalisation système: %s", e)
 
 
 def create_notification(user_id, type, title, message, entity_type=None, entity_id=None):
@@ -2805,12 +2717,12 @@ class GestionnaireParametrage:
                         db.session.add(champ_perso)
             
             db.session.commit()
-            print(f"✅ Champs personnalisés sauvegardés pour risque {risque_id}")
+            logger.debug("✅ Champs personnalisés sauvegardés pour risque %s", risque_id)
             return True
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur sauvegarde champs personnalisés: {e}")
+            logger.error("❌ Erreur sauvegarde champs personnalisés: %s", e)
             return False
     
     @staticmethod
@@ -2864,11 +2776,11 @@ class GestionnaireParametrage:
             db.session.add(fichier_risque)
             db.session.commit()
             
-            print(f"✅ Fichier téléversé: {filename} pour risque {risque_id}")
+            logger.debug("✅ Fichier téléversé: %s pour risque %s", filename, risque_id)
             return fichier_risque
             
         except Exception as e:
-            print(f"❌ Erreur téléversement fichier: {e}")
+            logger.error("❌ Erreur téléversement fichier: %s", e)
             # Supprimer le fichier s'il a été partiellement créé
             if os.path.exists(filepath):
                 os.remove(filepath)
@@ -2891,7 +2803,7 @@ class GestionnaireParametrage:
         from app import db
         from models import Risque, ChampPersonnaliseRisque
         
-        print(f"🔄 Synchronisation champ ajouté: {champ.nom_technique}")
+        logger.debug("🔄 Synchronisation champ ajouté: %s", champ.nom_technique)
         
         # Pour les champs obligatoires, créer des entrées vides pour tous les risques existants
         if champ.est_obligatoire and champ.est_actif:
@@ -2918,10 +2830,10 @@ class GestionnaireParametrage:
                     db.session.add(champ_perso)
             
             db.session.commit()
-            print(f"✅ Champ ajouté à {len(risques)} risques existants")
+            logger.debug("✅ Champ ajouté à %s risques existants", len(risques))
     
     @staticmethod
     def synchroniser_modification_champ(champ):
         """Synchroniser la modification d'un champ"""
-        print(f"🔄 Synchronisation modification champ: {champ.nom_technique}")
+        logger.debug("🔄 Synchronisation modification champ: %s", champ.nom_technique)
         # Logique de synchronisation à implémenter selon les besoins